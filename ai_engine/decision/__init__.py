@@ -6,6 +6,7 @@
 主要组件:
 - RuleParser: 规则DSL解析器
 - RuleRuntime: 规则运行时引擎
+- RuleIndex: 规则编译索引
 - ActionExecutor: 动作执行器
 - AuditLogger: 审计日志记录器
 
@@ -24,6 +25,13 @@ from .rule_parser import (
     RuleValidationError,
 )
 
+from .rule_compiler import (
+    RuleIndex,
+    CompiledRule,
+    compile_condition,
+    compile_group,
+)
+
 from .rule_runtime import (
     RuleRuntime,
     RuleEvaluationError,
@@ -54,6 +62,11 @@ __all__ = [
     "LogicalOperator",
     "RuleParseError",
     "RuleValidationError",
+    # Rule Compiler
+    "RuleIndex",
+    "CompiledRule",
+    "compile_condition",
+    "compile_group",
     # Rule Runtime
     "RuleRuntime",
     "RuleEvaluationError",
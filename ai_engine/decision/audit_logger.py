@@ -10,7 +10,7 @@ Audit Logger - 决策审计日志记录器
 """
 
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import logging
 import time
 from dataclasses import dataclass, field, asdict
@@ -122,6 +122,54 @@ class AuditLogger:
         
         return entry
     
+    async def log_triggers(
+        self,
+        triggers: List[Tuple[Rule, Dict[str, Any], datetime]],
+        result: str = "success",
+    ) -> List[AuditLogEntry]:
+        """
+        批量记录规则触发日志（一次批量写入数据库）
+        
+        Args:
+            triggers: (规则, 预测数据, 触发时间) 列表
+            result: 执行结果
+        
+        Returns:
+            List[AuditLogEntry]: 审计日志条目列表
+        """
+        # 同一规则的条件/动作快照只序列化一次
+        snapshots: Dict[str, Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+        entries = []
+        
+        for rule, prediction, triggered_at in triggers:
+            snapshot = snapshots.get(rule.rule_id)
+            if snapshot is None:
+                snapshot = (rule.conditions.to_dict(), [a.to_dict() for a in rule.actions])
+                snapshots[rule.rule_id] = snapshot
+            
+            entries.append(AuditLogEntry(
+                rule_id=rule.rule_id,
+                rule_name=rule.name,
+                trigger_time=triggered_at or datetime.now(),
+                trigger_data=prediction,
+                conditions_snapshot=snapshot[0],
+                actions_executed=snapshot[1],
+                result=result,
+                asset_id=prediction.get("asset_id"),
+                prediction_id=prediction.get("prediction_id")
+            ))
+        
+        if not entries:
+            return entries
+        
+        self._add_many_to_memory(entries)
+        
+        if self._db_enabled:
+            await self._save_many_to_db(entries)
+        
+        logger.info(f"审计日志: 批量记录 {len(entries)} 次规则触发, 涉及 {len(snapshots)} 条规则")
+        return entries
+    
     def log_trigger_sync(
         self,
         rule: Rule,
@@ -165,6 +213,39 @@ class AuditLogger:
         if len(self._memory_logs) > self._max_memory_logs:
             self._memory_logs = self._memory_logs[-self._max_memory_logs:]
     
+    def _add_many_to_memory(self, entries: List[AuditLogEntry]):
+        """批量添加到内存日志"""
+        self._memory_logs.extend(entries)
+        if len(self._memory_logs) > self._max_memory_logs:
+            self._memory_logs = self._memory_logs[-self._max_memory_logs:]
+    
+    async def _save_many_to_db(self, entries: List[AuditLogEntry], batch_size: int = 1000):
+        """批量保存到数据库"""
+        try:
+            from app.models.platform_upgrade import DecisionAuditLog
+            
+            objects = [
+                DecisionAuditLog(
+                    rule_id=entry.rule_id,
+                    rule_name=entry.rule_name,
+                    trigger_time=entry.trigger_time,
+                    trigger_data=entry.trigger_data,
+                    conditions_snapshot=entry.conditions_snapshot,
+                    actions_executed=entry.actions_executed,
+                    result=entry.result,
+                    error_message=entry.error_message,
+                    execution_duration_ms=entry.execution_duration_ms,
+                    asset_id=entry.asset_id,
+                    prediction_id=entry.prediction_id
+                )
+                for entry in entries
+            ]
+            await DecisionAuditLog.bulk_create(objects, batch_size=batch_size)
+            logger.debug(f"审计日志已批量保存到数据库: {len(objects)} 条")
+            
+        except Exception as e:
+            logger.warning(f"批量保存审计日志到数据库失败: {e}")
+    
     async def _save_to_db(self, entry: AuditLogEntry):
         """保存到数据库"""
         try:
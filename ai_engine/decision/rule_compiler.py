@@ -0,0 +1,408 @@
+"""
+Rule Compiler - 规则编译器
+
+将解析后的规则条件树编译为闭包，评估时不再逐个条件分派运算符。
+
+主要功能:
+- 单个条件编译为 data -> bool 的闭包（运算符、目标值在编译期绑定）
+- AND/OR 条件组编译为短路求值的闭包
+- 条件组同时编译为按列求值的向量化版本（NumPy），用于批量评估
+- 规则按 (model_id, category_id) 分桶索引，桶内按优先级有序
+"""
+
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Dict, Any, List, Optional, Callable, Iterator, Tuple
+import logging
+import numbers
+import operator
+
+import numpy as np
+
+from .rule_parser import (
+    Rule,
+    Condition,
+    ConditionGroup,
+    ConditionOperator,
+    LogicalOperator,
+)
+
+logger = logging.getLogger(__name__)
+
+
+Predicate = Callable[[Dict[str, Any]], bool]
+BatchPredicate = Callable[["BatchColumns"], np.ndarray]
+
+
+def _between(value, bounds) -> bool:
+    return bounds[0] <= value <= bounds[1]
+
+
+_BINARY_OPERATORS: Dict[ConditionOperator, Callable[[Any, Any], bool]] = {
+    ConditionOperator.EQ: operator.eq,
+    ConditionOperator.NE: operator.ne,
+    ConditionOperator.GT: operator.gt,
+    ConditionOperator.GTE: operator.ge,
+    ConditionOperator.LT: operator.lt,
+    ConditionOperator.LTE: operator.le,
+    ConditionOperator.IN: lambda value, target: value in target,
+    ConditionOperator.NOT_IN: lambda value, target: value not in target,
+    ConditionOperator.BETWEEN: _between,
+}
+
+
+def _always_false(data: Dict[str, Any]) -> bool:
+    return False
+
+
+def compile_condition(condition: Condition) -> Predicate:
+    """
+    编译单个条件
+    
+    语义与逐条解释执行一致：字段不存在或为None时不满足，比较出错时不满足。
+    
+    Args:
+        condition: 条件对象
+    
+    Returns:
+        Predicate: 条件闭包
+    """
+    field_name = condition.field
+    op = condition.operator
+    target = condition.value
+    
+    try:
+        op = ConditionOperator(op)
+    except ValueError:
+        logger.warning(f"未知的运算符: {op}")
+        return _always_false
+    
+    if op == ConditionOperator.BETWEEN:
+        if not (isinstance(target, (list, tuple)) and len(target) == 2):
+            return _always_false
+    
+    # 字符串运算符：目标值在编译期转为字符串
+    if op in (ConditionOperator.CONTAINS, ConditionOperator.STARTS_WITH, ConditionOperator.ENDS_WITH):
+        text = str(target)
+        
+        if op == ConditionOperator.CONTAINS:
+            def predicate(data: Dict[str, Any]) -> bool:
+                value = data.get(field_name)
+                if value is None:
+                    return False
+                return text in str(value)
+        elif op == ConditionOperator.STARTS_WITH:
+            def predicate(data: Dict[str, Any]) -> bool:
+                value = data.get(field_name)
+                if value is None:
+                    return False
+                return str(value).startswith(text)
+        else:
+            def predicate(data: Dict[str, Any]) -> bool:
+                value = data.get(field_name)
+                if value is None:
+                    return False
+                return str(value).endswith(text)
+        
+        return predicate
+    
+    compare = _BINARY_OPERATORS[op]
+    
+    def predicate(data: Dict[str, Any]) -> bool:
+        value = data.get(field_name)
+        if value is None:
+            return False
+        try:
+            return compare(value, target)
+        except Exception as e:
+            logger.error(f"评估条件时出错: {e}")
+            return False
+    
+    return predicate
+
+
+def compile_group(group: ConditionGroup) -> Predicate:
+    """
+    编译条件组（AND/OR短路求值）
+    
+    Args:
+        group: 条件组
+    
+    Returns:
+        Predicate: 条件组闭包
+    """
+    predicates = tuple(
+        compile_group(item) if isinstance(item, ConditionGroup) else compile_condition(item)
+        for item in group.rules
+    )
+    is_and = LogicalOperator(group.type) == LogicalOperator.AND
+    
+    if len(predicates) == 1:
+        return predicates[0]
+    
+    if len(predicates) == 2:
+        first, second = predicates
+        if is_and:
+            return lambda data: bool(first(data)) and bool(second(data))
+        return lambda data: bool(first(data)) or bool(second(data))
+    
+    if is_and:
+        def and_group(data: Dict[str, Any]) -> bool:
+            for predicate in predicates:
+                if not predicate(data):
+                    return False
+            return True
+        return and_group
+    
+    def or_group(data: Dict[str, Any]) -> bool:
+        for predicate in predicates:
+            if predicate(data):
+                return True
+        return False
+    return or_group
+
+
+_NUMBER_TYPES = (int, float, bool)
+
+
+def _is_number(value: Any) -> bool:
+    return type(value) in _NUMBER_TYPES or isinstance(value, numbers.Real)
+
+
+class BatchColumns:
+    """
+    一批预测数据的按列视图
+    
+    数值列按需转换为 float64 数组（缺失/None 记录在 present 掩码中）；
+    包含非数值的列返回 None，由调用方回退到逐行求值。
+    """
+    
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.size = len(rows)
+        self._numeric: Dict[str, Optional[Tuple[np.ndarray, np.ndarray]]] = {}
+    
+    def numeric(self, field_name: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        获取数值列
+        
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: (values, present)，列中存在非数值时为None
+        """
+        if field_name in self._numeric:
+            return self._numeric[field_name]
+        
+        values = [row.get(field_name) for row in self.rows]
+        column = None
+        if all(v is None or _is_number(v) for v in values):
+            present = np.fromiter((v is not None for v in values), dtype=bool, count=self.size)
+            array = np.fromiter(
+                (np.nan if v is None else v for v in values), dtype=np.float64, count=self.size
+            )
+            column = (array, present)
+        
+        self._numeric[field_name] = column
+        return column
+    
+    def apply(self, predicate: Predicate) -> np.ndarray:
+        """逐行执行标量条件"""
+        return np.fromiter((bool(predicate(row)) for row in self.rows), dtype=bool, count=self.size)
+
+
+def compile_condition_batch(condition: Condition) -> BatchPredicate:
+    """
+    编译单个条件的向量化版本
+    
+    数值比较（eq/ne/gt/gte/lt/lte/between/in/not_in）在数值列上按列计算，
+    其余情况回退到逐行执行标量闭包，结果与标量版本一致。
+    
+    Args:
+        condition: 条件对象
+    
+    Returns:
+        BatchPredicate: 接收 BatchColumns 返回布尔掩码的闭包
+    """
+    scalar = compile_condition(condition)
+    field_name = condition.field
+    target = condition.value
+    
+    try:
+        op = ConditionOperator(condition.operator)
+    except ValueError:
+        op = None
+    
+    vector = None
+    if op in (ConditionOperator.IN, ConditionOperator.NOT_IN):
+        if isinstance(target, (list, tuple)) and target and all(_is_number(t) for t in target):
+            targets = np.asarray(target, dtype=np.float64)
+            if op == ConditionOperator.IN:
+                vector = lambda values: np.isin(values, targets)
+            else:
+                vector = lambda values: ~np.isin(values, targets)
+    elif op == ConditionOperator.BETWEEN:
+        if isinstance(target, (list, tuple)) and len(target) == 2 and all(_is_number(t) for t in target):
+            low, high = target
+            vector = lambda values: (values >= low) & (values <= high)
+    elif op in _BINARY_OPERATORS and _is_number(target):
+        compare = _BINARY_OPERATORS[op]
+        vector = lambda values: compare(values, target)
+    
+    if vector is None:
+        return lambda columns: columns.apply(scalar)
+    
+    def batch_predicate(columns: BatchColumns) -> np.ndarray:
+        column = columns.numeric(field_name)
+        if column is None:
+            return columns.apply(scalar)
+        values, present = column
+        with np.errstate(invalid="ignore"):
+            return present & vector(values)
+    
+    return batch_predicate
+
+
+def compile_group_batch(group: ConditionGroup) -> BatchPredicate:
+    """
+    编译条件组的向量化版本
+    
+    AND 组在掩码全为False、OR 组在掩码全为True时停止计算后续条件。
+    
+    Args:
+        group: 条件组
+    
+    Returns:
+        BatchPredicate: 接收 BatchColumns 返回布尔掩码的闭包
+    """
+    predicates = tuple(
+        compile_group_batch(item) if isinstance(item, ConditionGroup) else compile_condition_batch(item)
+        for item in group.rules
+    )
+    is_and = LogicalOperator(group.type) == LogicalOperator.AND
+    
+    if len(predicates) == 1:
+        return predicates[0]
+    
+    def batch_group(columns: BatchColumns) -> np.ndarray:
+        if not predicates:
+            return np.full(columns.size, is_and, dtype=bool)
+        
+        mask = predicates[0](columns)
+        for predicate in predicates[1:]:
+            if is_and:
+                if not mask.any():
+                    break
+                mask = mask & predicate(columns)
+            else:
+                if mask.all():
+                    break
+                mask = mask | predicate(columns)
+        return mask
+    
+    return batch_group
+
+
+class CompiledRule:
+    """编译后的规则"""
+    
+    __slots__ = ("rule", "predicate", "sort_key", "_batch_predicate")
+    
+    def __init__(self, rule: Rule, sequence: int):
+        self.rule = rule
+        self.predicate = compile_group(rule.conditions)
+        self._batch_predicate: Optional[BatchPredicate] = None
+        # 优先级相同时按加入顺序
+        self.sort_key = (rule.priority, sequence)
+    
+    @property
+    def batch_predicate(self) -> BatchPredicate:
+        """向量化条件（首次批量评估时编译）"""
+        if self._batch_predicate is None:
+            self._batch_predicate = compile_group_batch(self.rule.conditions)
+        return self._batch_predicate
+
+
+def _sort_key(compiled: CompiledRule) -> Tuple[int, int]:
+    return compiled.sort_key
+
+
+class RuleIndex:
+    """
+    规则索引
+    
+    启用的规则按 (model_id, category_id) 分桶，桶内按 (priority, 加入顺序) 有序，
+    增删时增量维护。评估时只需合并最多4个桶:
+    (model, category)、(model, None)、(None, category)、(None, None)。
+    """
+    
+    def __init__(self):
+        self._buckets: Dict[Tuple[Any, Any], List[CompiledRule]] = {}
+        self._entries: Dict[str, CompiledRule] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __contains__(self, rule_id: str) -> bool:
+        return rule_id in self._entries
+    
+    @staticmethod
+    def _bucket_key(rule: Rule) -> Tuple[Any, Any]:
+        return (rule.model_id, rule.category_id)
+    
+    def add(self, rule: Rule, sequence: int):
+        """加入（或替换）规则"""
+        self.discard(rule.rule_id)
+        compiled = CompiledRule(rule, sequence)
+        bucket = self._buckets.setdefault(self._bucket_key(rule), [])
+        insort(bucket, compiled, key=_sort_key)
+        self._entries[rule.rule_id] = compiled
+    
+    def discard(self, rule_id: str) -> bool:
+        """移除规则"""
+        compiled = self._entries.pop(rule_id, None)
+        if compiled is None:
+            return False
+        
+        key = self._bucket_key(compiled.rule)
+        bucket = self._buckets[key]
+        index = bisect_left(bucket, compiled.sort_key, key=_sort_key)
+        while bucket[index] is not compiled:
+            index += 1
+        del bucket[index]
+        if not bucket:
+            del self._buckets[key]
+        return True
+    
+    def clear(self):
+        """清空索引"""
+        self._buckets.clear()
+        self._entries.clear()
+    
+    def buckets(self) -> Iterator[Tuple[Tuple[Any, Any], List[CompiledRule]]]:
+        """遍历所有分桶 ((model_id, category_id), 有序规则列表)"""
+        return iter(self._buckets.items())
+    
+    def candidates(self, model_id: Any, category_id: Any) -> Iterator[CompiledRule]:
+        """
+        按优先级返回可能匹配预测的规则
+        
+        Args:
+            model_id: 预测的模型ID
+            category_id: 预测的类别ID
+        
+        Returns:
+            Iterator[CompiledRule]: 按优先级排序的候选规则
+        """
+        buckets = self._buckets
+        
+        try:
+            keys = {(model_id, category_id), (model_id, None), (None, category_id), (None, None)}
+            lists = [buckets[key] for key in keys if key in buckets]
+        except TypeError:
+            # 不可哈希的ID只能匹配未限定的规则
+            lists = [buckets[(None, None)]] if (None, None) in buckets else []
+        
+        if not lists:
+            return iter(())
+        if len(lists) == 1:
+            return iter(lists[0])
+        return merge(*lists, key=_sort_key)
@@ -8,25 +8,35 @@ Rule Runtime Engine - 规则运行时引擎
 - 评估预测结果是否满足规则条件
 - 按优先级排序规则
 - 管理规则冷却时间
+
+规则加入运行时时即编译为闭包，并按 (model_id, category_id) 建立有序索引，
+评估时只遍历可能匹配的规则（见 rule_compiler）。
+
+冷却时间保存在状态后端中（默认进程内，多worker部署时使用Redis共享），
+每次评估先求值全部候选规则，再一次性原子地为满足条件的规则占用冷却。
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Union
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Union, Iterator, Iterable, Tuple
+from itertools import count
 import logging
 import asyncio
 
+import numpy as np
+
 from .rule_parser import (
     Rule,
     RuleParser,
-    Condition,
-    ConditionGroup,
     Action,
-    ConditionOperator,
-    LogicalOperator,
 )
+from .rule_compiler import RuleIndex, BatchColumns, CompiledRule
+from platform_core.state import StateBackend, InMemoryStateBackend
 
 logger = logging.getLogger(__name__)
 
+# 状态后端中规则冷却的命名空间
+COOLDOWN_NAMESPACE = "decision:cooldown"
+
 
 class RuleEvaluationError(Exception):
     """规则评估错误"""
@@ -42,13 +52,32 @@ class RuleRuntime:
     
     def __init__(self):
         self._rules: Dict[str, Rule] = {}
-        self._cooldowns: Dict[str, datetime] = {}
+        self._state: StateBackend = InMemoryStateBackend()
         self._audit_logger = None  # 延迟初始化
+        
+        # 已启用规则的编译索引；加入顺序用于同优先级规则的稳定排序
+        self._index = RuleIndex()
+        self._sequence: Dict[str, int] = {}
+        self._sequence_counter = count()
     
     def set_audit_logger(self, audit_logger):
         """设置审计日志记录器"""
         self._audit_logger = audit_logger
     
+    def set_state_backend(self, backend: StateBackend):
+        """
+        设置冷却时间的状态后端
+        
+        多worker部署时使用共享后端（如 RedisStateBackend），保证同一规则在冷却期内
+        只被一个进程触发。共享后端下同步评估接口不可用。
+        """
+        self._state = backend
+    
+    @property
+    def state_backend(self) -> StateBackend:
+        """获取状态后端"""
+        return self._state
+    
     @property
     def rules(self) -> Dict[str, Rule]:
         """获取所有已加载的规则"""
@@ -67,6 +96,13 @@ class RuleRuntime:
             rule: 规则对象
         """
         self._rules[rule.rule_id] = rule
+        if rule.rule_id not in self._sequence:
+            self._sequence[rule.rule_id] = next(self._sequence_counter)
+        
+        if rule.enabled:
+            self._index.add(rule, self._sequence[rule.rule_id])
+        else:
+            self._index.discard(rule.rule_id)
         logger.info(f"添加规则: {rule.rule_id} - {rule.name}")
     
     def remove_rule(self, rule_id: str) -> bool:
@@ -81,12 +117,23 @@ class RuleRuntime:
         """
         if rule_id in self._rules:
             del self._rules[rule_id]
-            # 同时清除冷却时间
-            self._cooldowns.pop(rule_id, None)
+            self._sequence.pop(rule_id, None)
+            self._index.discard(rule_id)
+            # 同时清除冷却时间（共享后端中的冷却由其他进程共用，按过期时间自然失效）
+            if not self._state.shared:
+                self._state.clear_cooldowns_sync(COOLDOWN_NAMESPACE, [rule_id])
             logger.info(f"移除规则: {rule_id}")
             return True
         return False
     
+    def clear_rules(self):
+        """移除所有规则及冷却时间"""
+        self._rules.clear()
+        self._sequence.clear()
+        self._index.clear()
+        if not self._state.shared:
+            self._state.clear_cooldowns_sync(COOLDOWN_NAMESPACE)
+    
     def get_rule(self, rule_id: str) -> Optional[Rule]:
         """获取规则"""
         return self._rules.get(rule_id)
@@ -94,7 +141,9 @@ class RuleRuntime:
     def enable_rule(self, rule_id: str) -> bool:
         """启用规则"""
         if rule_id in self._rules:
-            self._rules[rule_id].enabled = True
+            rule = self._rules[rule_id]
+            rule.enabled = True
+            self._index.add(rule, self._sequence[rule_id])
             return True
         return False
     
@@ -102,6 +151,7 @@ class RuleRuntime:
         """禁用规则"""
         if rule_id in self._rules:
             self._rules[rule_id].enabled = False
+            self._index.discard(rule_id)
             return True
         return False
     
@@ -186,59 +236,34 @@ class RuleRuntime:
                 - prediction: 原始预测数据
                 - triggered_at: 触发时间
         """
-        triggered_actions = []
+        matched = self._match(prediction)
+        if not matched:
+            return []
         
-        # 获取所有启用的规则，按优先级排序（数字越小优先级越高）
-        enabled_rules = [r for r in self._rules.values() if r.enabled]
-        sorted_rules = sorted(enabled_rules, key=lambda r: r.priority)
+        # 一次性占用冷却（冷却期内的规则不触发）
+        acquired = await self._state.acquire_cooldowns(COOLDOWN_NAMESPACE, self._cooldown_requests(matched))
         
-        for rule in sorted_rules:
-            # 检查冷却时间
-            if self._is_in_cooldown(rule.rule_id):
+        triggered_actions = []
+        for rule in matched:
+            if rule.cooldown_seconds > 0 and rule.rule_id not in acquired:
                 logger.debug(f"规则 {rule.rule_id} 在冷却期内，跳过")
                 continue
             
-            # 检查模型ID匹配（如果规则指定了模型）
-            if rule.model_id is not None:
-                if prediction.get("model_id") != rule.model_id:
-                    continue
+            triggered_at = datetime.now()
             
-            # 检查类别ID匹配（如果规则指定了类别）
-            if rule.category_id is not None:
-                if prediction.get("category_id") != rule.category_id:
-                    continue
+            # 记录审计日志
+            if self._audit_logger:
+                try:
+                    await self._audit_logger.log_trigger(
+                        rule=rule,
+                        prediction=prediction,
+                        triggered_at=triggered_at
+                    )
+                except Exception as e:
+                    logger.error(f"记录规则 {rule.rule_id} 审计日志时出错: {e}")
             
-            # 评估条件
-            try:
-                if self._evaluate_conditions(rule.conditions, prediction):
-                    triggered_at = datetime.now()
-                    
-                    # 记录审计日志
-                    if self._audit_logger:
-                        await self._audit_logger.log_trigger(
-                            rule=rule,
-                            prediction=prediction,
-                            triggered_at=triggered_at
-                        )
-                    
-                    # 收集动作
-                    for action in rule.actions:
-                        triggered_actions.append({
-                            "rule_id": rule.rule_id,
-                            "rule_name": rule.name,
-                            "action": action,
-                            "prediction": prediction,
-                            "triggered_at": triggered_at,
-                        })
-                    
-                    # 设置冷却时间
-                    if rule.cooldown_seconds > 0:
-                        self._set_cooldown(rule.rule_id, rule.cooldown_seconds)
-                    
-                    logger.info(f"规则 {rule.rule_id} 被触发，产生 {len(rule.actions)} 个动作")
-                    
-            except Exception as e:
-                logger.error(f"评估规则 {rule.rule_id} 时出错: {e}")
+            self._append_actions(triggered_actions, rule, prediction, triggered_at)
+            logger.info(f"规则 {rule.rule_id} 被触发，产生 {len(rule.actions)} 个动作")
         
         return triggered_actions
     
@@ -246,189 +271,233 @@ class RuleRuntime:
         """
         同步版本的评估方法（不记录审计日志）
         
-        用于测试或不需要审计日志的场景。
+        用于测试或不需要审计日志的场景，仅支持进程内状态后端。
         """
-        triggered_actions = []
+        matched = self._match(prediction)
+        if not matched:
+            return []
         
-        enabled_rules = [r for r in self._rules.values() if r.enabled]
-        sorted_rules = sorted(enabled_rules, key=lambda r: r.priority)
+        acquired = self._local_state().acquire_cooldowns_sync(
+            COOLDOWN_NAMESPACE, self._cooldown_requests(matched)
+        )
         
-        for rule in sorted_rules:
-            if self._is_in_cooldown(rule.rule_id):
+        triggered_actions = []
+        for rule in matched:
+            if rule.cooldown_seconds > 0 and rule.rule_id not in acquired:
                 continue
-            
-            if rule.model_id is not None:
-                if prediction.get("model_id") != rule.model_id:
-                    continue
-            
-            if rule.category_id is not None:
-                if prediction.get("category_id") != rule.category_id:
-                    continue
-            
+            self._append_actions(triggered_actions, rule, prediction, datetime.now())
+        
+        return triggered_actions
+    
+    def _match(self, prediction: Dict[str, Any]) -> List[Rule]:
+        """按优先级返回条件满足的规则（不考虑冷却）"""
+        matched = []
+        for rule, predicate in self._iter_candidates(prediction):
             try:
-                if self._evaluate_conditions(rule.conditions, prediction):
-                    triggered_at = datetime.now()
-                    
-                    for action in rule.actions:
-                        triggered_actions.append({
-                            "rule_id": rule.rule_id,
-                            "rule_name": rule.name,
-                            "action": action,
-                            "prediction": prediction,
-                            "triggered_at": triggered_at,
-                        })
-                    
-                    if rule.cooldown_seconds > 0:
-                        self._set_cooldown(rule.rule_id, rule.cooldown_seconds)
-                        
+                if predicate(prediction):
+                    matched.append(rule)
             except Exception as e:
                 logger.error(f"评估规则 {rule.rule_id} 时出错: {e}")
-        
-        return triggered_actions
+        return matched
     
-    def _evaluate_conditions(
-        self, 
-        conditions: ConditionGroup, 
-        data: Dict[str, Any]
-    ) -> bool:
+    @staticmethod
+    def _cooldown_requests(rules: Iterable[Rule]) -> Dict[str, int]:
+        """需要占用冷却的规则 {rule_id: 冷却秒数}"""
+        return {rule.rule_id: rule.cooldown_seconds for rule in rules if rule.cooldown_seconds > 0}
+    
+    @staticmethod
+    def _append_actions(
+        triggered_actions: List[Dict[str, Any]],
+        rule: Rule,
+        prediction: Dict[str, Any],
+        triggered_at: datetime,
+    ):
+        """收集规则的动作"""
+        for action in rule.actions:
+            triggered_actions.append({
+                "rule_id": rule.rule_id,
+                "rule_name": rule.name,
+                "action": action,
+                "prediction": prediction,
+                "triggered_at": triggered_at,
+            })
+    
+    def _local_state(self) -> InMemoryStateBackend:
+        """获取进程内状态后端（同步接口使用）"""
+        if self._state.shared:
+            raise RuleEvaluationError("共享状态后端不支持同步接口，请使用异步接口")
+        return self._state
+    
+    async def evaluate_batch(self, predictions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        评估条件组
+        批量评估预测结果
+        
+        每个规则分桶在与其 (model_id, category_id) 匹配的预测子集上按列求值（NumPy），
+        结果与依次调用 evaluate 相同：动作按预测顺序、规则优先级排列，
+        冷却期内的规则不触发，有冷却时间的规则在一批中只由第一条满足条件的预测触发。
+        审计日志合并为一次批量写入。
         
         Args:
-            conditions: 条件组
-            data: 数据字典
-            
+            predictions: 预测结果字典列表
+        
         Returns:
-            bool: 条件是否满足
+            List[Dict]: 触发的动作列表（结构同 evaluate）
         """
-        results = []
+        hits = self._match_batch(predictions)
+        acquired = await self._state.acquire_cooldowns(
+            COOLDOWN_NAMESPACE, self._cooldown_requests(compiled.rule for compiled, _ in hits.values())
+        )
+        triggered = self._apply_batch_cooldowns(hits, acquired, len(predictions))
+        triggered_at = datetime.now()
         
-        for rule in conditions.rules:
-            if isinstance(rule, ConditionGroup):
-                # 递归评估嵌套条件组
-                result = self._evaluate_conditions(rule, data)
-            else:
-                # 评估单个条件
-                result = self._evaluate_single_condition(rule, data)
-            results.append(result)
-        
-        # 根据逻辑运算符组合结果
-        if conditions.type == LogicalOperator.AND:
-            return all(results)
-        else:  # OR
-            return any(results)
-    
-    def _evaluate_single_condition(
-        self, 
-        condition: Condition, 
-        data: Dict[str, Any]
-    ) -> bool:
+        if self._audit_logger and triggered:
+            await self._audit_logger.log_triggers([
+                (compiled.rule, predictions[index], triggered_at)
+                for index, compiled in triggered
+            ])
+        
+        return self._collect_batch_actions(triggered, predictions, triggered_at)
+    
+    def evaluate_batch_sync(self, predictions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        同步版本的批量评估（不记录审计日志，仅支持进程内状态后端）
+        """
+        hits = self._match_batch(predictions)
+        acquired = self._local_state().acquire_cooldowns_sync(
+            COOLDOWN_NAMESPACE, self._cooldown_requests(compiled.rule for compiled, _ in hits.values())
+        )
+        triggered = self._apply_batch_cooldowns(hits, acquired, len(predictions))
+        return self._collect_batch_actions(triggered, predictions, datetime.now())
+    
+    def _match_batch(self, predictions: List[Dict[str, Any]]) -> Dict[str, Tuple[CompiledRule, List[int]]]:
         """
-        评估单个条件
+        批量匹配规则（不考虑冷却）
         
-        Args:
-            condition: 条件对象
-            data: 数据字典
-            
         Returns:
-            bool: 条件是否满足
+            Dict[str, Tuple[CompiledRule, List[int]]]: 规则ID -> (编译规则, 满足条件的预测序号)
         """
-        signal_value = data.get(condition.field)
-        
-        # 如果字段不存在，条件不满足
-        if signal_value is None:
-            return False
+        # 按模型/类别建立预测下标；每个规则分桶只需在对应的预测子集上求值一次
+        by_model: Dict[Any, List[int]] = {}
+        by_category: Dict[Any, List[int]] = {}
+        by_pair: Dict[Tuple[Any, Any], List[int]] = {}
+        for index, prediction in enumerate(predictions):
+            model_id = prediction.get("model_id")
+            category_id = prediction.get("category_id")
+            try:
+                by_pair.setdefault((model_id, category_id), []).append(index)
+            except TypeError:
+                # 不可哈希的ID只能匹配未限定的规则
+                continue
+            by_model.setdefault(model_id, []).append(index)
+            by_category.setdefault(category_id, []).append(index)
         
-        operator = condition.operator
-        target_value = condition.value
+        all_indices = list(range(len(predictions)))
+        hits: Dict[str, Tuple[CompiledRule, List[int]]] = {}
         
-        try:
-            if operator == ConditionOperator.EQ:
-                return signal_value == target_value
-            
-            elif operator == ConditionOperator.NE:
-                return signal_value != target_value
-            
-            elif operator == ConditionOperator.GT:
-                return signal_value > target_value
-            
-            elif operator == ConditionOperator.GTE:
-                return signal_value >= target_value
-            
-            elif operator == ConditionOperator.LT:
-                return signal_value < target_value
-            
-            elif operator == ConditionOperator.LTE:
-                return signal_value <= target_value
-            
-            elif operator == ConditionOperator.IN:
-                return signal_value in target_value
-            
-            elif operator == ConditionOperator.NOT_IN:
-                return signal_value not in target_value
-            
-            elif operator == ConditionOperator.BETWEEN:
-                if isinstance(target_value, (list, tuple)) and len(target_value) == 2:
-                    return target_value[0] <= signal_value <= target_value[1]
-                return False
-            
-            elif operator == ConditionOperator.CONTAINS:
-                return str(target_value) in str(signal_value)
-            
-            elif operator == ConditionOperator.STARTS_WITH:
-                return str(signal_value).startswith(str(target_value))
+        for (model_id, category_id), bucket in self._index.buckets():
+            if model_id is None and category_id is None:
+                indices = all_indices
+            elif category_id is None:
+                indices = by_model.get(model_id)
+            elif model_id is None:
+                indices = by_category.get(category_id)
+            else:
+                indices = by_pair.get((model_id, category_id))
+            if not indices:
+                continue
             
-            elif operator == ConditionOperator.ENDS_WITH:
-                return str(signal_value).endswith(str(target_value))
+            columns = BatchColumns([predictions[i] for i in indices])
             
-            else:
-                logger.warning(f"未知的运算符: {operator}")
-                return False
+            for compiled in bucket:
+                rule_id = compiled.rule.rule_id
+                try:
+                    mask = compiled.batch_predicate(columns)
+                except Exception as e:
+                    logger.error(f"评估规则 {rule_id} 时出错: {e}")
+                    continue
                 
-        except Exception as e:
-            logger.error(f"评估条件时出错: {e}")
-            return False
+                matched = np.flatnonzero(mask)
+                if len(matched) == 0:
+                    continue
+                
+                if indices is all_indices:
+                    rule_hits = matched.tolist()
+                else:
+                    rule_hits = [indices[i] for i in matched.tolist()]
+                hits[rule_id] = (compiled, rule_hits)
+        
+        return hits
     
-    def _is_in_cooldown(self, rule_id: str) -> bool:
+    @staticmethod
+    def _apply_batch_cooldowns(
+        hits: Dict[str, Tuple[CompiledRule, List[int]]],
+        acquired: Iterable[str],
+        batch_size: int,
+    ) -> List[Tuple[int, CompiledRule]]:
         """
-        检查规则是否在冷却期
+        应用冷却语义
         
         Args:
-            rule_id: 规则ID
-            
+            hits: _match_batch 的结果
+            acquired: 本次成功占用冷却的规则ID
+            batch_size: 预测条数（用于日志）
+        
         Returns:
-            bool: 是否在冷却期
+            List[Tuple[int, CompiledRule]]: 按 (预测序号, 规则优先级) 排序的触发记录
         """
-        if rule_id not in self._cooldowns:
-            return False
+        triggered: List[Tuple[int, CompiledRule]] = []
+        for rule_id, (compiled, indices) in hits.items():
+            if compiled.rule.cooldown_seconds > 0:
+                # 冷却期内不触发；占用冷却后本批次只由第一条满足条件的预测触发
+                if rule_id in acquired:
+                    triggered.append((min(indices), compiled))
+            else:
+                triggered.extend((index, compiled) for index in indices)
         
-        cooldown_until = self._cooldowns[rule_id]
-        if datetime.now() >= cooldown_until:
-            # 冷却期已过，清除记录
-            del self._cooldowns[rule_id]
-            return False
+        triggered.sort(key=lambda item: (item[0], item[1].sort_key))
         
-        return True
+        if triggered:
+            logger.info(f"批量评估 {batch_size} 条预测，触发 {len(triggered)} 次规则")
+        return triggered
+    
+    @staticmethod
+    def _collect_batch_actions(
+        triggered: List[Tuple[int, CompiledRule]],
+        predictions: List[Dict[str, Any]],
+        triggered_at: datetime,
+    ) -> List[Dict[str, Any]]:
+        """将触发记录展开为动作列表"""
+        triggered_actions = []
+        for index, compiled in triggered:
+            rule = compiled.rule
+            prediction = predictions[index]
+            for action in rule.actions:
+                triggered_actions.append({
+                    "rule_id": rule.rule_id,
+                    "rule_name": rule.name,
+                    "action": action,
+                    "prediction": prediction,
+                    "triggered_at": triggered_at,
+                })
+        return triggered_actions
     
-    def _set_cooldown(self, rule_id: str, seconds: int):
+    def _iter_candidates(self, prediction: Dict[str, Any]) -> Iterator:
         """
-        设置规则冷却时间
+        按优先级返回与预测的模型/类别匹配的启用规则
         
-        Args:
-            rule_id: 规则ID
-            seconds: 冷却秒数
+        Yields:
+            Tuple[Rule, Callable]: (规则, 编译后的条件闭包)
         """
-        if seconds > 0:
-            self._cooldowns[rule_id] = datetime.now() + timedelta(seconds=seconds)
-            logger.debug(f"规则 {rule_id} 进入冷却期 {seconds} 秒")
+        for compiled in self._index.candidates(prediction.get("model_id"), prediction.get("category_id")):
+            yield compiled.rule, compiled.predicate
     
     def clear_cooldown(self, rule_id: str):
         """清除规则冷却时间"""
-        self._cooldowns.pop(rule_id, None)
+        self._local_state().clear_cooldowns_sync(COOLDOWN_NAMESPACE, [rule_id])
     
     def clear_all_cooldowns(self):
         """清除所有冷却时间"""
-        self._cooldowns.clear()
+        self._local_state().clear_cooldowns_sync(COOLDOWN_NAMESPACE)
     
     def get_cooldown_remaining(self, rule_id: str) -> Optional[int]:
         """
@@ -437,17 +506,30 @@ class RuleRuntime:
         Returns:
             Optional[int]: 剩余秒数，如果不在冷却期返回None
         """
-        if rule_id not in self._cooldowns:
-            return None
-        
-        cooldown_until = self._cooldowns[rule_id]
-        remaining = (cooldown_until - datetime.now()).total_seconds()
-        
-        if remaining <= 0:
-            del self._cooldowns[rule_id]
-            return None
+        remaining = self._local_state().get_cooldowns_sync(COOLDOWN_NAMESPACE, [rule_id])
+        return int(remaining[rule_id]) if rule_id in remaining else None
+    
+    async def clear_cooldown_async(self, rule_id: str):
+        """清除规则冷却时间（支持共享状态后端）"""
+        await self._state.clear_cooldowns(COOLDOWN_NAMESPACE, [rule_id])
+    
+    async def clear_all_cooldowns_async(self):
+        """清除所有冷却时间（支持共享状态后端）"""
+        await self._state.clear_cooldowns(COOLDOWN_NAMESPACE)
+    
+    async def get_cooldowns_remaining_async(self, rule_ids: Iterable[str]) -> Dict[str, int]:
+        """
+        批量获取剩余冷却时间（支持共享状态后端，一次查询）
         
-        return int(remaining)
+        Returns:
+            Dict[str, int]: 在冷却期的规则ID -> 剩余秒数
+        """
+        remaining = await self._state.get_cooldowns(COOLDOWN_NAMESPACE, rule_ids)
+        return {rule_id: int(seconds) for rule_id, seconds in remaining.items()}
+    
+    async def get_cooldown_remaining_async(self, rule_id: str) -> Optional[int]:
+        """获取规则剩余冷却时间（秒，支持共享状态后端）"""
+        return (await self.get_cooldowns_remaining_async([rule_id])).get(rule_id)
 
 
 # 全局规则运行时实例
@@ -20,6 +20,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 from loguru import logger
 
+from platform_core.timeseries.table_registry import get_table_registry
+
 
 # =====================================================
 # 异常定义
@@ -455,6 +457,7 @@ class FeatureStore:
         """
         self.database = database
         self._td_client = None
+        self._table_registry = get_table_registry()
     
     @property
     def td_client(self):
@@ -730,13 +733,20 @@ class FeatureStore:
             bool: 是否成功
         """
         try:
+            child_table_name = FeatureTableNaming.get_child_table_name(
+                category_code, view_name, asset_code
+            )
+            if self._table_registry.contains(child_table_name, self.database):
+                return True
+            
             create_sql = FeatureTableNaming.get_create_child_table_sql(
                 category_code, view_name, asset_code, asset_id, self.database
             )
             
             if self.td_client:
                 await self.td_client.execute(create_sql)
-                logger.debug(f"子表已确保存在: {category_code}_{view_name}_{asset_code}")
+                self._table_registry.add(child_table_name, self.database)
+                logger.debug(f"子表已确保存在: {child_table_name}")
             
             return True
         except Exception as e:
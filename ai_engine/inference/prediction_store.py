@@ -24,6 +24,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 from loguru import logger
 
+from platform_core.timeseries.table_registry import get_table_registry
+
 
 class PredictionStoreError(Exception):
     """预测存储异常"""
@@ -333,12 +335,18 @@ class PredictionStore:
     - 8.1: 双写模式支持
     """
     
+    # 批量写入时单条TDengine INSERT语句的最大字节数（低于TDengine默认的1MB SQL长度上限）
+    MAX_TDENGINE_SQL_BYTES = 900 * 1024
+    
+    # PostgreSQL bulk_create 每批行数
+    PG_BULK_BATCH_SIZE = 1000
+    
     def __init__(self):
         self._pg_enabled = True
         self._td_enabled = True
         self._td_client = None
         self._database = os.getenv("TDENGINE_DATABASE", "test_db")
-        self._created_tables: set = set()  # 缓存已创建的表
+        self._table_registry = get_table_registry()  # 进程级已知表缓存
     
     def enable_postgresql(self, enabled: bool = True):
         """启用/禁用PostgreSQL写入"""
@@ -378,19 +386,9 @@ class PredictionStore:
         td_success = True
         
         # 创建预测记录
-        record = PredictionRecord(
-            model_id=model_id,
-            model_version=model_version,
-            asset_id=asset_id,
-            asset_code=asset_code,
-            category_code=category_code,
-            predicted_value=prediction_result.get("predicted_value", 0.0),
-            confidence=prediction_result.get("confidence", 0.0),
-            is_anomaly=prediction_result.get("is_anomaly"),
-            anomaly_score=prediction_result.get("anomaly_score"),
-            target_time=prediction_result.get("target_time"),
-            prediction_details=prediction_result.get("prediction_details", prediction_result),
-            prediction_time=datetime.now()
+        record = self._build_record(
+            model_id, model_version, asset_id, asset_code, category_code,
+            prediction_result, datetime.now()
         )
         
         # 1. 写入PostgreSQL
@@ -414,6 +412,88 @@ class PredictionStore:
         
         return pg_success, td_success
     
+    async def save_predictions(
+        self,
+        model_id: int,
+        model_version: str,
+        predictions: List[Dict[str, Any]]
+    ) -> Tuple[bool, bool]:
+        """
+        批量保存同一模型版本的预测结果到双存储
+        
+        PostgreSQL使用一次 bulk_create（按 PG_BULK_BATCH_SIZE 分批），
+        TDengine使用多表多行INSERT（语句超过 MAX_TDENGINE_SQL_BYTES 时拆分），
+        缺失的子表先用一条语句批量创建。
+        
+        Args:
+            model_id: 模型ID
+            model_version: 模型版本
+            predictions: 预测列表，每项包含 asset_id、asset_code、category_code、prediction_result
+        
+        Returns:
+            Tuple[bool, bool]: (PostgreSQL写入成功, TDengine写入成功)
+        """
+        pg_success = True
+        td_success = True
+        if not predictions:
+            return pg_success, td_success
+        
+        prediction_time = datetime.now()
+        records = [
+            self._build_record(
+                model_id, model_version, item["asset_id"], item["asset_code"],
+                item["category_code"], item["prediction_result"], prediction_time
+            )
+            for item in predictions
+        ]
+        
+        # 1. 写入PostgreSQL
+        if self._pg_enabled:
+            try:
+                await self._save_batch_to_postgresql(records)
+                logger.debug(f"✅ PostgreSQL批量写入成功: model={model_id}, count={len(records)}")
+            except Exception as e:
+                logger.error(f"❌ PostgreSQL批量写入失败: {e}")
+                pg_success = False
+        
+        # 2. 写入TDengine
+        if self._td_enabled:
+            try:
+                await self._save_batch_to_tdengine(records)
+                logger.debug(f"✅ TDengine批量写入成功: model={model_id}, count={len(records)}")
+            except Exception as e:
+                logger.error(f"❌ TDengine批量写入失败: {e}")
+                td_success = False
+                # TDengine写入失败不影响主流程（属性15: 双写错误隔离）
+        
+        return pg_success, td_success
+    
+    @staticmethod
+    def _build_record(
+        model_id: int,
+        model_version: str,
+        asset_id: int,
+        asset_code: str,
+        category_code: str,
+        prediction_result: Dict[str, Any],
+        prediction_time: datetime
+    ) -> PredictionRecord:
+        """由预测结果字典创建预测记录"""
+        return PredictionRecord(
+            model_id=model_id,
+            model_version=model_version,
+            asset_id=asset_id,
+            asset_code=asset_code,
+            category_code=category_code,
+            predicted_value=prediction_result.get("predicted_value", 0.0),
+            confidence=prediction_result.get("confidence", 0.0),
+            is_anomaly=prediction_result.get("is_anomaly"),
+            anomaly_score=prediction_result.get("anomaly_score"),
+            target_time=prediction_result.get("target_time"),
+            prediction_details=prediction_result.get("prediction_details", prediction_result),
+            prediction_time=prediction_time
+        )
+    
     async def _save_to_postgresql(self, record: PredictionRecord):
         """保存到PostgreSQL"""
         from app.models.platform_upgrade import AIPrediction, AIModelVersion
@@ -438,6 +518,32 @@ class PredictionStore:
         )
         await prediction.save()
     
+    async def _save_batch_to_postgresql(self, records: List[PredictionRecord]):
+        """批量保存到PostgreSQL（同一模型版本，bulk_create）"""
+        from app.models.platform_upgrade import AIPrediction, AIModelVersion
+        
+        version = await AIModelVersion.get_or_none(
+            model_id=records[0].model_id,
+            version=records[0].model_version
+        )
+        version_id = version.id if version else None
+        
+        await AIPrediction.bulk_create([
+            AIPrediction(
+                model_version_id=version_id,
+                asset_id=record.asset_id,
+                input_data=record.prediction_details or {},
+                predicted_value=record.predicted_value,
+                confidence=record.confidence,
+                is_anomaly=record.is_anomaly,
+                anomaly_score=record.anomaly_score,
+                prediction_time=record.prediction_time,
+                target_time=record.target_time or (record.prediction_time + timedelta(hours=1)),
+                prediction_details=record.prediction_details
+            )
+            for record in records
+        ], batch_size=self.PG_BULK_BATCH_SIZE)
+    
     async def _save_to_tdengine(self, record: PredictionRecord):
         """
         保存到TDengine
@@ -462,24 +568,92 @@ class PredictionStore:
         )
         
         # 构建INSERT语句
-        target_time_str = f"'{record.target_time.isoformat()}'" if record.target_time else "NULL"
-        details_str = json.dumps(record.prediction_details or {})
-        
-        sql = f"""INSERT INTO {self._database}.{child_table_name} VALUES (
-            NOW(),
-            {record.model_id},
-            '{record.model_version}',
-            {record.predicted_value},
-            {record.confidence},
-            {str(record.is_anomaly).lower() if record.is_anomaly is not None else 'NULL'},
-            {record.anomaly_score if record.anomaly_score is not None else 'NULL'},
-            {target_time_str},
-            NULL,
-            '{details_str}'
-        )"""
+        sql = f"INSERT INTO {self._database}.{child_table_name} VALUES {self._format_tdengine_row(record, 'NOW()')}"
         
         await self._execute_tdengine(sql)
     
+    async def _save_batch_to_tdengine(self, records: List[PredictionRecord]):
+        """
+        批量保存到TDengine
+        
+        所有子表的行写入同一条多表INSERT（INSERT INTO t1 VALUES (...)(...) t2 VALUES (...)），
+        语句过长时按 MAX_TDENGINE_SQL_BYTES 拆分。同一子表的多行时间戳依次加1毫秒，避免覆盖。
+        """
+        # 子表 -> 记录
+        tables: Dict[str, List[PredictionRecord]] = {}
+        for record in records:
+            child_table_name = PredictionTableNaming.get_child_table_name(
+                record.category_code,
+                record.asset_code
+            )
+            tables.setdefault(child_table_name, []).append(record)
+        
+        await self._ensure_child_tables(tables)
+        
+        statements: List[str] = []
+        parts: List[str] = []
+        size = 0
+        for child_table_name, table_records in tables.items():
+            base_ms = int(table_records[0].prediction_time.timestamp() * 1000)
+            rows = "".join(
+                self._format_tdengine_row(record, str(base_ms + offset))
+                for offset, record in enumerate(table_records)
+            )
+            part = f"{self._database}.{child_table_name} VALUES {rows}"
+            part_size = len(part.encode("utf-8")) + 1
+            if parts and size + part_size > self.MAX_TDENGINE_SQL_BYTES:
+                statements.append("INSERT INTO " + " ".join(parts))
+                parts, size = [], 0
+            parts.append(part)
+            size += part_size
+        if parts:
+            statements.append("INSERT INTO " + " ".join(parts))
+        
+        for sql in statements:
+            await self._execute_tdengine(sql)
+    
+    @staticmethod
+    def _format_tdengine_row(record: PredictionRecord, ts: str) -> str:
+        """格式化一行TDengine VALUES"""
+        target_time_str = f"'{record.target_time.isoformat()}'" if record.target_time else "NULL"
+        details_str = json.dumps(record.prediction_details or {}, default=str).replace("'", "\\'")
+        is_anomaly = str(record.is_anomaly).lower() if record.is_anomaly is not None else 'NULL'
+        anomaly_score = record.anomaly_score if record.anomaly_score is not None else 'NULL'
+        
+        return (
+            f"({ts}, {record.model_id}, '{record.model_version}', {record.predicted_value}, "
+            f"{record.confidence}, {is_anomaly}, {anomaly_score}, {target_time_str}, NULL, '{details_str}')"
+        )
+    
+    async def _ensure_child_tables(self, tables: Dict[str, List[PredictionRecord]]):
+        """确保批量写入涉及的子表存在（未登记的子表用一条语句批量创建）"""
+        missing = [
+            (child_table_name, table_records[0])
+            for child_table_name, table_records in tables.items()
+            if not self._table_registry.contains(child_table_name, self._database)
+        ]
+        if not missing:
+            return
+        
+        for category_code in {record.category_code for _, record in missing}:
+            await self._ensure_stable(category_code)
+        
+        clauses = []
+        for child_table_name, record in missing:
+            stable_name = PredictionTableNaming.get_stable_name(record.category_code)
+            clauses.append(
+                f"{self._database}.{child_table_name} USING {self._database}.{stable_name} "
+                f"TAGS ({record.asset_id}, '{record.asset_code}')"
+            )
+        
+        try:
+            await self._execute_tdengine("CREATE TABLE IF NOT EXISTS " + " IF NOT EXISTS ".join(clauses))
+        except Exception as e:
+            if "table already exists" not in str(e).lower():
+                raise
+        for child_table_name, _ in missing:
+            self._table_registry.add(child_table_name, self._database)
+    
     async def _ensure_child_table(
         self,
         stable_name: str,
@@ -489,9 +663,7 @@ class PredictionStore:
         category_code: str
     ):
         """确保子表存在"""
-        cache_key = f"{self._database}.{child_table_name}"
-        
-        if cache_key in self._created_tables:
+        if self._table_registry.contains(child_table_name, self._database):
             return
         
         # 先确保超级表存在
@@ -507,30 +679,29 @@ class PredictionStore:
         
         try:
             await self._execute_tdengine(sql)
-            self._created_tables.add(cache_key)
+            self._table_registry.add(child_table_name, self._database)
         except Exception as e:
             # 表可能已存在
             if "table already exists" not in str(e).lower():
                 raise
-            self._created_tables.add(cache_key)
+            self._table_registry.add(child_table_name, self._database)
     
     async def _ensure_stable(self, category_code: str):
         """确保超级表存在"""
         stable_name = PredictionTableNaming.get_stable_name(category_code)
-        cache_key = f"{self._database}.{stable_name}"
         
-        if cache_key in self._created_tables:
+        if self._table_registry.contains(stable_name, self._database):
             return
         
         sql = PredictionTableNaming.get_create_stable_sql(category_code, self._database)
         
         try:
             await self._execute_tdengine(sql)
-            self._created_tables.add(cache_key)
+            self._table_registry.add(stable_name, self._database)
         except Exception as e:
             if "table already exists" not in str(e).lower():
                 raise
-            self._created_tables.add(cache_key)
+            self._table_registry.add(stable_name, self._database)
     
     async def _execute_tdengine(self, sql: str):
         """执行TDengine SQL"""
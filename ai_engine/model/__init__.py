@@ -10,6 +10,7 @@
 - ModelVersionManager: 模型版本管理器
 - ModelStorage: 统一的模型存储接口
 - StorageBackend: 存储后端抽象基类
+- ModelArtifactCache: 按校验和缓存下载的模型文件
 
 存储后端:
 - LocalStorage: 本地文件系统存储
@@ -36,6 +37,12 @@ from .storage import (
     set_model_storage_service,
 )
 
+# 从artifact_cache导出模型制品本地缓存
+from .artifact_cache import (
+    ModelArtifactCache,
+    artifact_mmap_mode,
+)
+
 # 从backends导出存储后端
 from .backends import (
     StorageBackend,
@@ -59,6 +66,9 @@ __all__ = [
     "ModelStorageService",
     "get_model_storage_service",
     "set_model_storage_service",
+    # Model Artifact Cache
+    "ModelArtifactCache",
+    "artifact_mmap_mode",
     # Storage Backends
     "StorageBackend",
     "StorageResult",
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型制品本地缓存
+
+按文件SHA256校验和（与 ModelStorageService.get_model_checksum、模型版本的 file_hash 一致）
+在本地目录保存从存储后端下载的模型文件，重启或扩容的节点不再重复下载:
+
+- 内容寻址: 文件名为 <校验和><扩展名>，同一内容只保存一份，写入后不再修改
+- 流式下载: 分块写入临时文件并增量计算校验和，不把整个文件读入内存，
+  校验通过后原子重命名，多个进程同时下载同一文件也不会读到不完整的文件
+- 单飞下载: 同一进程内对同一校验和的并发请求只下载一次
+- LRU淘汰: 总大小超过上限时按最近使用时间（文件修改时间，命中时更新）删除最旧的文件
+
+缓存中的文件不可变，joblib格式的模型可以只读内存映射加载（见 artifact_mmap_mode），
+多个进程共享同一份页缓存。
+"""
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Any, Optional, Tuple
+from loguru import logger
+
+from .backends import StorageBackend, StorageBackendException
+
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# 可以内存映射加载的格式（joblib.load 的 mmap_mode 只作用于 joblib 写入的未压缩numpy数组，其余情况忽略）
+MMAP_FORMATS = (".joblib", ".pkl")
+
+_CHECKSUM_NAME = re.compile(r"^[0-9a-f]{64}$")
+
+
+def artifact_mmap_mode(file_path: str) -> Optional[str]:
+    """
+    获取模型文件的内存映射方式
+    
+    只对缓存中的制品（文件名为校验和，内容不可变）使用只读映射；
+    其他路径的文件可能被覆盖，按普通方式加载。
+    
+    Returns:
+        Optional[str]: joblib.load 的 mmap_mode 参数
+    """
+    path = Path(file_path)
+    if path.suffix.lower() in MMAP_FORMATS and _CHECKSUM_NAME.match(path.stem):
+        return "r"
+    return None
+
+
+def stream_to_file(
+    stream: BinaryIO,
+    dest_path: Path,
+    expected_checksum: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[str, int]:
+    """
+    分块把流写入文件并计算SHA256校验和（同步阻塞，应在线程中调用）
+    
+    先写入同目录的临时文件，校验通过后原子重命名为目标文件。
+    
+    Args:
+        stream: 输入流（调用方负责关闭）
+        dest_path: 目标文件路径
+        expected_checksum: 期望的校验和（可选），不一致时抛出异常且不生成目标文件
+        chunk_size: 每次读取的字节数
+    
+    Returns:
+        Tuple[str, int]: (校验和, 文件大小)
+    
+    Raises:
+        StorageBackendException: 校验和不一致
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = dest_path.with_name(f".{dest_path.name}.{uuid.uuid4().hex}.partial")
+    try:
+        with open(partial_path, "wb") as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                sha256.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        checksum = sha256.hexdigest()
+        if expected_checksum and checksum != expected_checksum.lower():
+            raise StorageBackendException(
+                f"模型文件校验和不一致: 期望 {expected_checksum}, 实际 {checksum}"
+            )
+        os.replace(partial_path, dest_path)
+        return checksum, size
+    finally:
+        if partial_path.exists():
+            partial_path.unlink()
+
+
+class ModelArtifactCache:
+    """
+    模型制品本地缓存
+    
+    使用示例:
+    ```python
+    cache = ModelArtifactCache("data/model_cache", max_bytes=10 * 1024 ** 3)
+    
+    # 命中时直接返回本地路径，未命中时从存储后端流式下载
+    local_path = await cache.fetch(backend, "models/ab12cd34/model.joblib", checksum=version.file_hash)
+    ```
+    """
+    
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int = 10 * 1024 ** 3,
+        chunk_size: int = DEFAULT_CHUNK_SIZE
+    ):
+        """
+        初始化缓存
+        
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节），至少保留最近写入的一个文件
+            chunk_size: 下载时每次读取的字节数
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._remove_stale_downloads()
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        # 校验和 -> 进行中的下载
+        self._downloading: Dict[str, asyncio.Future] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._downloaded_bytes = 0
+    
+    def _remove_stale_downloads(self, max_age: float = 24 * 3600):
+        """删除异常退出时遗留的临时下载文件（超过 max_age 秒未修改的以"."开头的文件）"""
+        now = time.time()
+        for path in list(self.cache_dir.glob(".*")) + list(self.cache_dir.glob("*/.*")):
+            try:
+                if now - path.stat().st_mtime > max_age:
+                    path.unlink()
+            except OSError:
+                pass
+    
+    def _artifact_path(self, checksum: str, extension: str) -> Path:
+        """缓存文件路径（按校验和前2位分目录）"""
+        return self.cache_dir / checksum[:2] / f"{checksum}{extension}"
+    
+    def lookup(self, checksum: Optional[str], extension: str = "") -> Optional[str]:
+        """
+        查找缓存的制品，命中时更新最近使用时间
+        
+        Args:
+            checksum: 文件校验和
+            extension: 文件扩展名（如 ".joblib"）
+        
+        Returns:
+            Optional[str]: 本地路径，未缓存时为None
+        """
+        if not checksum:
+            return None
+        path = self._artifact_path(checksum.lower(), extension)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return str(path)
+    
+    async def fetch(
+        self,
+        backend: StorageBackend,
+        file_path: str,
+        checksum: Optional[str] = None
+    ) -> str:
+        """
+        获取制品的本地路径，未缓存时从存储后端下载
+        
+        未提供校验和时无法在下载前判断是否命中，下载后按计算出的校验和保存。
+        
+        Args:
+            backend: 存储后端
+            file_path: 存储路径
+            checksum: 期望的文件校验和（可选）
+        
+        Returns:
+            str: 本地路径
+        
+        Raises:
+            StorageBackendException: 下载失败或校验和不一致
+        """
+        extension = Path(file_path).suffix.lower()
+        cached = self.lookup(checksum, extension)
+        if cached is not None:
+            self._hits += 1
+            return cached
+        
+        key = checksum.lower() if checksum else file_path
+        pending = self._downloading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        self._misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._downloading[key] = future
+        try:
+            local_path = await self._download(backend, file_path, checksum, extension)
+            future.set_result(local_path)
+            return local_path
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._downloading.pop(key, None)
+    
+    async def _download(
+        self,
+        backend: StorageBackend,
+        file_path: str,
+        checksum: Optional[str],
+        extension: str
+    ) -> str:
+        """流式下载到缓存目录并淘汰超出上限的文件"""
+        try:
+            stream = await asyncio.to_thread(backend.open_stream, file_path)
+        except NotImplementedError:
+            stream = await backend.download(file_path)
+        started = time.perf_counter()
+        # 先写入以下载标识命名的文件，得到校验和后再重命名为内容地址
+        staging_path = self.cache_dir / f".download-{uuid.uuid4().hex}"
+        
+        def run() -> Tuple[str, int]:
+            try:
+                actual, size = stream_to_file(stream, staging_path, checksum, self.chunk_size)
+            finally:
+                stream.close()
+            target = self._artifact_path(actual, extension)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staging_path, target)
+            return str(target), size
+        
+        local_path, size = await asyncio.to_thread(run)
+        self._downloaded_bytes += size
+        logger.info(
+            f"✅ 模型文件已缓存: {file_path} -> {local_path} "
+            f"({size / 1024 ** 2:.1f} MB, {time.perf_counter() - started:.1f}s)"
+        )
+        await asyncio.to_thread(self.evict, local_path)
+        return local_path
+    
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        按最近使用时间淘汰文件直到总大小不超过上限（同步阻塞）
+        
+        已被加载（包括内存映射）的文件删除后，进程中已打开的副本不受影响。
+        
+        Args:
+            keep: 不淘汰的文件路径（刚写入的文件）
+        
+        Returns:
+            int: 淘汰的文件数
+        """
+        entries = []
+        total = 0
+        for path in self.cache_dir.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        
+        evicted = 0
+        entries.sort(key=lambda entry: entry[0])
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if keep is not None and str(path) == keep:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+            logger.info(f"模型缓存超出上限，淘汰: {path.name} ({size / 1024 ** 2:.1f} MB)")
+        self._evictions += evicted
+        return evicted
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存状态
+        
+        Returns:
+            Dict: 目录、占用及命中统计
+        """
+        files = [path for path in self.cache_dir.glob("*/*") if not path.name.startswith(".")]
+        size = sum(path.stat().st_size for path in files if path.exists())
+        return {
+            "cache_dir": str(self.cache_dir.absolute()),
+            "files": len(files),
+            "size_mb": round(size / 1024 ** 2, 2),
+            "max_mb": round(self.max_bytes / 1024 ** 2, 2),
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "downloaded_mb": round(self._downloaded_bytes / 1024 ** 2, 2),
+        }
@@ -146,6 +146,27 @@ class LocalStorage(StorageBackend):
             logger.error(f"❌ 文件下载失败: {file_path}, {e}")
             raise StorageBackendException(f"文件下载失败: {e}")
     
+    def open_stream(self, file_path: str) -> BinaryIO:
+        """
+        打开本地文件的只读流
+        
+        Args:
+            file_path: 存储路径
+        
+        Returns:
+            BinaryIO: 文件对象
+        
+        Raises:
+            StorageBackendException: 文件不存在或打开失败
+        """
+        full_path = self._get_full_path(file_path)
+        if not full_path.exists():
+            raise StorageBackendException(f"文件不存在: {file_path}")
+        try:
+            return open(full_path, "rb")
+        except Exception as e:
+            raise StorageBackendException(f"文件打开失败: {e}")
+    
     async def delete(self, file_path: str) -> bool:
         """
         从本地存储删除文件
@@ -20,6 +20,25 @@ from .storage_backend import (
 )
 
 
+class _ObjectStream(io.RawIOBase):
+    """MinIO对象响应的只读流，关闭时释放连接"""
+    
+    def __init__(self, response):
+        self._response = response
+    
+    def readable(self) -> bool:
+        return True
+    
+    def read(self, size: int = -1) -> bytes:
+        return self._response.read(None if size is None or size < 0 else size)
+    
+    def close(self):
+        if not self.closed:
+            self._response.close()
+            self._response.release_conn()
+        super().close()
+
+
 class MinIOStorage(StorageBackend):
     """
     MinIO对象存储实现
@@ -173,6 +192,28 @@ class MinIOStorage(StorageBackend):
             logger.error(f"❌ 文件下载失败: {file_path}, {e}")
             raise StorageBackendException(f"文件下载失败: {e}")
     
+    def open_stream(self, file_path: str) -> BinaryIO:
+        """
+        打开MinIO对象的只读流（HTTP响应按需读取）
+        
+        Args:
+            file_path: 存储路径
+        
+        Returns:
+            BinaryIO: 对象流，关闭时释放连接
+        
+        Raises:
+            StorageBackendException: 对象不存在或打开失败
+        """
+        try:
+            client = self._get_client()
+            return _ObjectStream(client.get_object(self.bucket, file_path))
+        except StorageBackendException:
+            raise
+        except Exception as e:
+            logger.error(f"❌ 文件打开失败: {file_path}, {e}")
+            raise StorageBackendException(f"文件打开失败: {e}")
+    
     async def delete(self, file_path: str) -> bool:
         """
         从MinIO删除文件
@@ -175,6 +175,24 @@ class StorageBackend(ABC):
         """
         pass
     
+    def open_stream(self, file_path: str) -> BinaryIO:
+        """
+        打开文件的只读流（分块读取，不把整个文件读入内存）
+        
+        同步阻塞调用，应在线程中使用；调用方负责关闭返回的流。
+        不支持流式读取的后端抛出 NotImplementedError，调用方改用 download。
+        
+        Args:
+            file_path: 存储路径
+        
+        Returns:
+            BinaryIO: 支持 read(size) 和 close() 的流
+        
+        Raises:
+            StorageBackendException: 文件不存在或打开失败
+        """
+        raise NotImplementedError
+    
     def validate_format(self, filename: str) -> Tuple[bool, Optional[str]]:
         """
         验证文件格式是否支持
@@ -11,6 +11,8 @@
 - 删除模型版本时，平台应清理关联的模型文件
 """
 
+import asyncio
+import hashlib
 import os
 import io
 import tempfile
@@ -20,6 +22,7 @@ from loguru import logger
 
 from .backends import StorageBackend, StorageResult, StorageBackendException
 from .backends import LocalStorage, MinIOStorage
+from .artifact_cache import ModelArtifactCache, stream_to_file, DEFAULT_CHUNK_SIZE
 
 
 class ModelStorage:
@@ -103,20 +106,47 @@ class ModelStorageService:
     - 模型文件上传、下载、删除
     - 模型版本关联管理
     - 模型文件加载到内存
+    - 按校验和缓存下载的模型文件（ModelArtifactCache）
     
     需求: 2.1, 2.4, 2.5
     """
     
-    def __init__(self, backend: Optional[StorageBackend] = None):
+    def __init__(
+        self,
+        backend: Optional[StorageBackend] = None,
+        artifact_cache: Optional[ModelArtifactCache] = None
+    ):
         """
         初始化模型存储服务
         
         Args:
             backend: 存储后端实例，如果为None则使用默认本地存储
+            artifact_cache: 模型制品本地缓存，如果为None则按环境变量创建
+                （MODEL_ARTIFACT_CACHE_MAX_MB=0 时不使用缓存）
         """
         self._backend = backend or self._create_default_backend()
+        self._artifact_cache = artifact_cache or self._create_default_artifact_cache()
         self._temp_dir = tempfile.mkdtemp(prefix="model_storage_")
         logger.info(f"✅ 模型存储服务初始化: {self._backend}")
+    
+    def _create_default_artifact_cache(self) -> Optional[ModelArtifactCache]:
+        """
+        创建默认模型制品缓存
+        
+        - MODEL_ARTIFACT_CACHE_DIR: 缓存目录（默认 data/model_cache）
+        - MODEL_ARTIFACT_CACHE_MAX_MB: 缓存大小上限（默认10240，0表示不使用缓存）
+        """
+        max_mb = int(os.getenv("MODEL_ARTIFACT_CACHE_MAX_MB", "10240"))
+        if max_mb <= 0:
+            return None
+        try:
+            return ModelArtifactCache(
+                cache_dir=os.getenv("MODEL_ARTIFACT_CACHE_DIR", "data/model_cache"),
+                max_bytes=max_mb * 1024 ** 2,
+            )
+        except Exception as e:
+            logger.warning(f"模型制品缓存初始化失败，不使用缓存: {e}")
+            return None
 
     def _create_default_backend(self) -> StorageBackend:
         """
@@ -146,6 +176,11 @@ class ModelStorageService:
         """获取当前存储后端"""
         return self._backend
     
+    @property
+    def artifact_cache(self) -> Optional[ModelArtifactCache]:
+        """获取模型制品本地缓存（未启用时为None）"""
+        return self._artifact_cache
+    
     async def upload_model(
         self,
         file: BinaryIO,
@@ -237,11 +272,29 @@ class ModelStorageService:
             Optional[str]: 校验和，如果文件不存在则返回None
         """
         try:
-            file = await self._backend.download(file_path)
-            return self._backend.calculate_checksum(file)
+            stream = await self._open_stream(file_path)
+            return await asyncio.to_thread(self._stream_checksum, stream)
         except Exception:
             return None
     
+    async def _open_stream(self, file_path: str) -> BinaryIO:
+        """打开存储文件的读取流（后端不支持流式读取时整体下载）"""
+        try:
+            return await asyncio.to_thread(self._backend.open_stream, file_path)
+        except NotImplementedError:
+            return await self._backend.download(file_path)
+    
+    @staticmethod
+    def _stream_checksum(stream: BinaryIO) -> str:
+        """分块计算流的SHA256校验和并关闭流"""
+        sha256 = hashlib.sha256()
+        try:
+            for chunk in iter(lambda: stream.read(DEFAULT_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        finally:
+            stream.close()
+        return sha256.hexdigest()
+    
     async def verify_model_checksum(self, file_path: str, expected_checksum: str) -> bool:
         """
         验证模型文件校验和
@@ -255,31 +308,53 @@ class ModelStorageService:
         """
         return await self._backend.verify_checksum(file_path, expected_checksum)
     
-    async def load_model_to_temp(self, file_path: str) -> str:
+    def is_model_cached(self, file_path: str, checksum: Optional[str]) -> bool:
         """
-        将模型文件加载到临时目录
+        检查模型文件是否已在本地制品缓存中
+        
+        Args:
+            file_path: 存储路径
+            checksum: 文件校验和
+        
+        Returns:
+            bool: 是否已缓存（命中时无需访问存储后端）
+        """
+        if self._artifact_cache is None or not checksum:
+            return False
+        return self._artifact_cache.lookup(checksum, Path(file_path).suffix.lower()) is not None
+    
+    async def load_model_to_temp(self, file_path: str, checksum: Optional[str] = None) -> str:
+        """
+        将模型文件加载到本地
         
         需求: 2.4 - 激活模型版本时，推理服务应从存储后端加载实际模型文件
         
-        用于推理服务加载模型时，先将模型文件从存储后端下载到本地临时目录。
+        用于推理服务加载模型时，先将模型文件从存储后端分块下载到本地（不整体读入内存）。
+        启用制品缓存时按校验和缓存，已缓存的文件直接返回本地路径；
+        未启用时下载到临时目录。
         
         Args:
             file_path: 存储路径
+            checksum: 文件SHA256校验和（可选，提供时用于命中缓存和校验下载内容）
         
         Returns:
-            str: 临时文件的本地路径
+            str: 本地文件路径
         """
         try:
-            # 下载文件
-            file_content = await self._backend.download(file_path)
+            if self._artifact_cache is not None:
+                return await self._artifact_cache.fetch(self._backend, file_path, checksum)
+            
+            # 分块保存到临时目录
+            temp_path = Path(self._temp_dir) / Path(file_path).name
+            stream = await self._open_stream(file_path)
             
-            # 提取文件名
-            filename = Path(file_path).name
+            def run():
+                try:
+                    stream_to_file(stream, temp_path, checksum)
+                finally:
+                    stream.close()
             
-            # 保存到临时目录
-            temp_path = Path(self._temp_dir) / filename
-            with open(temp_path, "wb") as f:
-                f.write(file_content.read())
+            await asyncio.to_thread(run)
             
             logger.info(f"✅ 模型文件加载到临时目录: {temp_path}")
             return str(temp_path)
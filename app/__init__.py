@@ -39,6 +39,52 @@ async def lifespan(app: FastAPI):
         await init_data()
         logger.info("✅ 数据库初始化完成")
         
+        # 初始化运行时状态后端 (规则冷却、报警状态)
+        if settings.STATE_BACKEND == "redis":
+            logger.info("初始化Redis状态后端...")
+            try:
+                from app.core.redis import get_redis_client
+                from platform_core.state import create_state_backend
+                from app.services.alarm_detection import alarm_engine
+                from ai_engine.decision import rule_runtime
+                
+                client = await get_redis_client()
+                await client.redis.ping()
+                state_backend = create_state_backend("redis", redis=client.redis)
+                alarm_engine.set_state_backend(state_backend)
+                rule_runtime.set_state_backend(state_backend)
+                logger.info("✅ Redis状态后端初始化完成")
+            except Exception as e:
+                logger.warning(f"⚠️ Redis状态后端初始化失败，使用进程内状态: {e}")
+        
+        # 实时最新值缓存镜像到Redis (多worker共享最新值)
+        if settings.LAST_VALUE_CACHE_MIRROR:
+            try:
+                from app.core.redis import get_redis_client
+                from platform_core.timeseries import get_last_value_cache
+                
+                client = await get_redis_client()
+                await client.redis.ping()
+                last_values = get_last_value_cache()
+                last_values.attach_redis(client.redis)
+                last_values.start_mirror()
+                logger.info("✅ 最新值缓存Redis镜像已启用")
+            except Exception as e:
+                logger.warning(f"⚠️ 最新值缓存Redis镜像启用失败，仅使用进程内缓存: {e}")
+        
+        # 启动实时推送服务 (跨节点分发方式由 REALTIME_DISTRIBUTION 选择)
+        try:
+            from platform_core.realtime import push_service
+            
+            stream_options = {}
+            if settings.REALTIME_DISTRIBUTION == "streams":
+                stream_options["shards"] = settings.REALTIME_STREAM_SHARDS
+            await push_service.initialize(distribution=settings.REALTIME_DISTRIBUTION, **stream_options)
+            await push_service.start()
+            logger.info(f"✅ 实时推送服务启动完成 (distribution={settings.REALTIME_DISTRIBUTION})")
+        except Exception as e:
+            logger.warning(f"⚠️ 实时推送服务启动失败: {e}")
+        
         # 初始化外部API服务
         logger.info("初始化外部API服务...")
         from app.services.external_api import external_api_service
@@ -131,6 +177,35 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"⚠️ 工作流调度器停止失败: {e}")
         
+        # 停止实时推送服务
+        try:
+            from platform_core.realtime import push_service
+            await push_service.stop()
+        except Exception as e:
+            logger.warning(f"⚠️ 实时推送服务停止失败: {e}")
+        
+        # 停止HTTP轮询调度器（关闭共享的HTTP客户端连接池）
+        try:
+            from platform_core.ingestion.polling_scheduler import shutdown_http_polling_scheduler
+            await shutdown_http_polling_scheduler()
+        except Exception as e:
+            logger.warning(f"⚠️ HTTP轮询调度器停止失败: {e}")
+        
+        # 写出最新值缓存的待镜像更新
+        if settings.LAST_VALUE_CACHE_MIRROR:
+            try:
+                from platform_core.timeseries import get_last_value_cache
+                await get_last_value_cache().stop_mirror()
+            except Exception as e:
+                logger.warning(f"⚠️ 最新值缓存镜像停止失败: {e}")
+        
+        # 关闭AI推理执行器（线程池和工作进程）
+        try:
+            from app.services.ai.inference_executor import shutdown_inference_executor
+            shutdown_inference_executor()
+        except Exception as e:
+            logger.warning(f"⚠️ 推理执行器关闭失败: {e}")
+        
         # 卸载AI模块
         try:
             from app.ai_module.loader import ai_loader
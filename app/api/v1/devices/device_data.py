@@ -1,6 +1,7 @@
 from typing import Optional, List
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
+from fastapi.responses import StreamingResponse
 from app.core.dependency import DependAuth
 from app.controllers.device_data import DeviceDataController
 
@@ -206,6 +207,52 @@ async def get_device_history_data(
         raise HTTPException(status_code=500, detail="更新设备实时数据失败")
 
 
+@router.get("/history/export", summary="流式导出设备历史数据", dependencies=[DependAuth])
+async def export_device_history_data(
+    device_code: str = Query(..., description="设备编号"),
+    start_time: Optional[int] = Query(None, description="开始时间，毫秒时间戳"),
+    end_time: Optional[int] = Query(None, description="结束时间，毫秒时间戳"),
+    status: Optional[str] = Query(None, description="设备状态"),
+    format: str = Query("ndjson", description="导出格式: ndjson / csv / arrow"),
+    order: str = Query("asc", regex="^(asc|desc)$", description="时间排序"),
+    chunk_size: int = Query(5000, ge=100, le=50000, description="每次查询的行数"),
+):
+    """流式导出设备历史数据（单次请求下载完整时间范围）"""
+    from platform_core.timeseries import HistoryExporter
+
+    try:
+        export_format = HistoryExporter.check_format(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    start_dt = datetime.fromtimestamp(start_time / 1000) if start_time else None
+    end_dt = datetime.fromtimestamp(end_time / 1000) if end_time else None
+
+    try:
+        stream = await device_data_controller.stream_device_history_data(
+            device_code=device_code,
+            start_time=start_dt,
+            end_time=end_dt,
+            status=status,
+            export_format=export_format,
+            chunk_size=chunk_size,
+            descending=(order == "desc"),
+        )
+    except Exception as e:
+        logger.error(f"API: 导出设备历史数据失败 - Error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"导出设备历史数据失败: {str(e)}")
+
+    if stream is None:
+        raise HTTPException(status_code=404, detail="设备或历史数据表不存在")
+
+    filename = f"{device_code}_history.{HistoryExporter.file_extension(export_format)}"
+    return StreamingResponse(
+        stream,
+        media_type=HistoryExporter.media_type(export_format),
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 # 批量更新功能暂时移除，等待DeviceRealTimeDataUpdate schema定义
 
 
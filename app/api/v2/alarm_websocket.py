@@ -25,12 +25,14 @@ async def alarm_websocket_endpoint(
     websocket: WebSocket,
     device_types: Optional[str] = Query(None, description="订阅的设备类型，逗号分隔"),
     token: Optional[str] = Query(None, description="JWT认证token"),
+    batch: bool = Query(False, description="是否以批量帧接收报警"),
 ):
     """
     报警WebSocket端点
     
     连接后会实时接收报警通知：
     - type: "alarm" - 新报警触发
+    - type: "alarm_batch" - 批量报警（batch=true 时，data 为报警列表，count 为条数）
     - type: "statistics_update" - 统计数据更新
     - type: "ping" - 心跳
     """
@@ -47,7 +49,7 @@ async def alarm_websocket_endpoint(
         device_type_list = [t.strip() for t in device_types.split(",") if t.strip()]
     
     # 建立连接
-    await alarm_ws_manager.connect(websocket, user.id, device_type_list)
+    await alarm_ws_manager.connect(websocket, user.id, device_type_list, batch=batch)
     
     try:
         # 发送连接成功消息
@@ -55,7 +57,8 @@ async def alarm_websocket_endpoint(
             "type": "connected",
             "timestamp": datetime.now().isoformat(),
             "message": "报警WebSocket连接成功",
-            "subscribed_types": device_type_list or "all"
+            "subscribed_types": device_type_list or "all",
+            "batch": batch
         }, ensure_ascii=False)
         await websocket.send_text(welcome_msg)
         
@@ -80,7 +83,7 @@ async def alarm_websocket_endpoint(
                     elif msg_type == "subscribe":
                         # 更新订阅
                         new_types = msg.get("device_types", [])
-                        alarm_ws_manager.subscriptions[websocket]["device_types"] = new_types
+                        alarm_ws_manager.update_subscription(websocket, new_types)
                         ack_msg = json.dumps({
                             "type": "subscribed",
                             "timestamp": datetime.now().isoformat(),
@@ -327,7 +327,7 @@ async def get_rule(
         try:
             rule_runtime = await get_rule_runtime()
             runtime_rule = rule_runtime.get_rule(rule_id)
-            cooldown_remaining = rule_runtime.get_cooldown_remaining(rule_id)
+            cooldown_remaining = await rule_runtime.get_cooldown_remaining_async(rule_id)
             result["runtime_status"] = {
                 "loaded": runtime_rule is not None,
                 "cooldown_remaining": cooldown_remaining
@@ -613,7 +613,7 @@ async def clear_rule_cooldown(
         # 清除运行时冷却
         try:
             rule_runtime = await get_rule_runtime()
-            rule_runtime.clear_cooldown(rule_id)
+            await rule_runtime.clear_cooldown_async(rule_id)
         except Exception as e:
             logger.warning(f"清除冷却时间失败: {e}")
         
@@ -648,9 +648,10 @@ async def get_runtime_status(
         
         rules = rule_runtime.rules
         rule_status = []
+        cooldowns = await rule_runtime.get_cooldowns_remaining_async(rules.keys())
         
         for rule_id, rule in rules.items():
-            cooldown_remaining = rule_runtime.get_cooldown_remaining(rule_id)
+            cooldown_remaining = cooldowns.get(rule_id)
             rule_status.append({
                 "rule_id": rule_id,
                 "name": rule.name,
@@ -688,8 +689,7 @@ async def reload_rules(
         rule_runtime = await get_rule_runtime()
         
         # 清除现有规则
-        rule_runtime._rules.clear()
-        rule_runtime.clear_all_cooldowns()
+        rule_runtime.clear_rules()
         
         # 重新加载
         loaded_count = await rule_runtime.load_rules_from_db()
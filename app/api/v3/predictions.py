@@ -118,7 +118,7 @@ async def create_prediction(
         
         # 4. 执行预测
         try:
-            result = await inference_service.predict(
+            result = await inference_service.predict_batched(
                 model_id=prediction_request.model_id,
                 asset_id=prediction_request.asset_id,
                 input_data=prediction_request.input_data
@@ -127,18 +127,25 @@ async def create_prediction(
             logger.error(f"推理执行失败: {e}")
             return Fail(code=500, msg=f"预测执行失败: {str(e)}")
         
+        # 推理服务不抛出异常，失败（包括微批调用失败、预测器返回失败）以 success=False 返回
+        prediction_result = result.get("prediction") or {}
+        if not result.get("success") or prediction_result.get("success") is False:
+            error = result.get("error") or prediction_result.get("error") or "预测失败"
+            logger.error(f"推理执行失败: {error}")
+            return Fail(code=500, msg=f"预测执行失败: {error}")
+        
         # 5. 保存预测结果
         prediction = AIPrediction(
             model_version_id=active_version.id,
             asset_id=prediction_request.asset_id,
             input_data=prediction_request.input_data,
-            predicted_value=result.get("predicted_value", 0),
-            confidence=result.get("confidence"),
-            prediction_details=result.get("details"),
+            predicted_value=prediction_result.get("predicted_value", 0),
+            confidence=prediction_result.get("confidence"),
+            prediction_details=prediction_result.get("details"),
             prediction_time=datetime.now(),
             target_time=datetime.now() + timedelta(hours=1),  # 默认预测1小时后
-            is_anomaly=result.get("is_anomaly"),
-            anomaly_score=result.get("anomaly_score")
+            is_anomaly=prediction_result.get("is_anomaly"),
+            anomaly_score=prediction_result.get("anomaly_score")
         )
         await prediction.save()
         
@@ -379,6 +386,35 @@ async def get_asset_predictions(
         return Fail(code=500, msg=f"查询失败: {str(e)}")
 
 
+@router.get("/executor/status", summary="获取推理执行器状态")
+async def get_executor_status(
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    获取推理执行器状态
+    
+    包括排队任务数、按模型的排队情况、超时/拒绝次数、平均排队和执行耗时，
+    预测器缓存的占用和命中统计，以及微批处理的延迟和批大小直方图
+    """
+    try:
+        from app.services.ai.inference_executor import get_inference_executor
+        
+        inference_service = await get_inference_service()
+        return Success(
+            code=200,
+            msg="获取成功",
+            data={
+                **get_inference_executor().get_stats(),
+                "predictor_cache": inference_service.get_cache_stats() if inference_service else None,
+                "micro_batcher": inference_service.get_batcher_stats() if inference_service else None
+            }
+        )
+        
+    except Exception as e:
+        logger.error(f"获取推理执行器状态失败: {e}")
+        return Fail(code=500, msg=f"查询失败: {str(e)}")
+
+
 @router.get("/{prediction_id}", summary="获取预测详情")
 async def get_prediction_detail(
     prediction_id: int,
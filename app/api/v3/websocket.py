@@ -20,8 +20,10 @@ from app.models.admin import User
 
 # 导入实时推送模块
 from platform_core.realtime.websocket_server import connection_manager
+from platform_core.realtime.encoding import MessageEncoding, available_encodings
 from platform_core.realtime.subscription_manager import subscription_manager, SubscriptionType
 from platform_core.realtime.push_service import push_service
+from platform_core.timeseries.last_value_cache import get_last_value_cache
 
 logger = logging.getLogger(__name__)
 
@@ -66,16 +68,21 @@ async def websocket_endpoint(
     连接URL: ws://host/api/v3/ws?token={jwt_token}
     
     支持的消息类型：
-    - subscribe: 订阅资产数据
+    - subscribe: 订阅资产数据（可通过 encoding 选择推送帧编码），订阅成功后推送各资产的最新值快照
     - unsubscribe: 取消订阅
     - ping: 心跳检测
+    - get_schema: 获取资产类别的信号表（columnar 编码）
     
     推送的消息类型：
     - connection: 连接状态
     - asset_data: 资产数据更新
     - alert: 告警通知
     - prediction: 预测结果
+    - schema: 信号表（columnar 编码，首次推送该类别数据前发送）
     - pong: 心跳响应
+    
+    订阅和心跳等请求的响应始终为JSON文本帧；推送消息按连接选择的编码发送，
+    msgpack / columnar 为二进制帧。
     """
     # 验证令牌
     user = await verify_websocket_token(token)
@@ -85,9 +92,9 @@ async def websocket_endpoint(
     
     user_id = user.id
     
-    # 建立连接
-    connected = await connection_manager.connect(websocket, user_id)
-    if not connected:
+    # 建立连接（同一用户可同时保持多个连接）
+    connection_id = await connection_manager.connect(websocket, user_id)
+    if connection_id is None:
         return
     
     try:
@@ -97,7 +104,7 @@ async def websocket_endpoint(
             
             try:
                 message = json.loads(data)
-                await handle_client_message(user_id, message, websocket)
+                await handle_client_message(user_id, message, websocket, connection_id)
             except json.JSONDecodeError:
                 await send_error(websocket, "无效的JSON格式")
             except Exception as e:
@@ -109,15 +116,23 @@ async def websocket_endpoint(
     except Exception as e:
         logger.error(f"WebSocket错误: user_id={user_id}, error={e}")
     finally:
-        # 清理连接和订阅
-        await connection_manager.disconnect(user_id)
-        await subscription_manager.unsubscribe_all(user_id)
+        # 清理连接和订阅（用户其他连接仍在订阅的资产保留用户级订阅）
+        conn_info = connection_manager.get_connection(connection_id)
+        assets = set(conn_info.subscribed_assets) if conn_info else set()
+        await connection_manager.disconnect(connection_id)
+        if not connection_manager.is_connected(user_id):
+            await subscription_manager.unsubscribe_all(user_id)
+        else:
+            released = assets - connection_manager.get_user_subscriptions(user_id)
+            if released:
+                await subscription_manager.unsubscribe_batch(user_id, list(released))
 
 
 async def handle_client_message(
     user_id: int,
     message: Dict[str, Any],
-    websocket: WebSocket
+    websocket: WebSocket,
+    connection_id: int
 ):
     """
     处理客户端消息
@@ -126,14 +141,15 @@ async def handle_client_message(
         user_id: 用户ID
         message: 消息内容
         websocket: WebSocket连接
+        connection_id: 连接ID
     """
     action = message.get("action")
     
     if action == "subscribe":
-        await handle_subscribe(user_id, message, websocket)
+        await handle_subscribe(user_id, message, websocket, connection_id)
     
     elif action == "unsubscribe":
-        await handle_unsubscribe(user_id, message, websocket)
+        await handle_unsubscribe(user_id, message, websocket, connection_id)
     
     elif action == "ping":
         await handle_ping(websocket)
@@ -141,6 +157,9 @@ async def handle_client_message(
     elif action == "get_subscriptions":
         await handle_get_subscriptions(user_id, websocket)
     
+    elif action == "get_schema":
+        await handle_get_schema(message, websocket)
+    
     else:
         await send_error(websocket, f"未知的操作: {action}")
 
@@ -148,7 +167,8 @@ async def handle_client_message(
 async def handle_subscribe(
     user_id: int,
     message: Dict[str, Any],
-    websocket: WebSocket
+    websocket: WebSocket,
+    connection_id: int
 ):
     """
     处理订阅请求
@@ -157,11 +177,19 @@ async def handle_subscribe(
     {
         "action": "subscribe",
         "asset_ids": [1, 2, 3],
-        "type": "asset_data"  // 可选: asset_data, alert, prediction, all
+        "type": "asset_data",  // 可选: asset_data, alert, prediction, all
+        "max_rate": 2,  // 可选: 资产数据最大推送频率（次/秒）
+        "signals": ["temperature", "current"],  // 可选: 信号白名单
+        "delta": true,  // 可选: 只推送变化的信号
+        "encoding": "msgpack"  // 可选: 推送帧编码 json（默认）/ msgpack / columnar，作用于整个连接
     }
     """
     asset_ids = message.get("asset_ids", [])
     sub_type_str = message.get("type", "asset_data")
+    max_rate = message.get("max_rate")
+    signals = message.get("signals")
+    delta = bool(message.get("delta", False))
+    encoding = message.get("encoding")
     
     if not asset_ids:
         await send_error(websocket, "asset_ids不能为空")
@@ -170,6 +198,27 @@ async def handle_subscribe(
     if not isinstance(asset_ids, list):
         asset_ids = [asset_ids]
     
+    if max_rate is not None:
+        try:
+            max_rate = float(max_rate)
+        except (TypeError, ValueError):
+            await send_error(websocket, "max_rate必须为数字")
+            return
+        if max_rate <= 0:
+            await send_error(websocket, "max_rate必须大于0")
+            return
+    
+    if signals is not None:
+        if isinstance(signals, str):
+            signals = [signals]
+        if not isinstance(signals, list):
+            await send_error(websocket, "signals必须为信号名列表")
+            return
+    
+    if encoding is not None and encoding not in available_encodings():
+        await send_error(websocket, f"不支持的编码: {encoding}，可用: {', '.join(available_encodings())}")
+        return
+    
     # 转换订阅类型
     try:
         sub_type = SubscriptionType(sub_type_str)
@@ -180,11 +229,21 @@ async def handle_subscribe(
     subscriptions = await subscription_manager.subscribe_batch(
         user_id=user_id,
         asset_ids=asset_ids,
-        subscription_type=sub_type
+        subscription_type=sub_type,
+        max_rate=max_rate,
+        signals=signals,
+        delta=delta
     )
     
     # 同时更新连接管理器的订阅（用于快速查找）
-    await connection_manager.subscribe(user_id, asset_ids)
+    await connection_manager.subscribe(connection_id, asset_ids)
+    
+    if encoding is not None:
+        if encoding == MessageEncoding.COLUMNAR:
+            # 预先加载信号表，避免首批数据按 msgpack 发送
+            await connection_manager.schema_registry.load_assets(asset_ids)
+        connection_manager.set_encoding(connection_id, encoding)
+    conn_info = connection_manager.get_connection(connection_id)
     
     # 发送确认
     await websocket.send_text(json.dumps({
@@ -192,16 +251,58 @@ async def handle_subscribe(
         "success": True,
         "subscribed_assets": asset_ids,
         "subscription_type": sub_type.value,
+        "options": subscriptions[0].options() if subscriptions else None,
+        "encoding": conn_info.encoding if conn_info else MessageEncoding.JSON,
         "timestamp": datetime.now().isoformat()
     }, ensure_ascii=False))
     
+    # 推送最新值快照（来自最新值缓存），客户端无需等待下一次数据更新
+    if sub_type in (SubscriptionType.ASSET_DATA, SubscriptionType.ALL):
+        await send_snapshots(connection_id, asset_ids, subscriptions[0] if subscriptions else None)
+    
     logger.info(f"订阅成功: user_id={user_id}, assets={asset_ids}, type={sub_type.value}")
 
 
+async def send_snapshots(connection_id: int, asset_ids: list, subscription=None) -> int:
+    """
+    推送订阅资产的最新值快照
+    
+    快照读取最新值缓存，不查询TDengine；缓存中没有的资产不推送。
+    快照消息与 asset_data 格式相同，并带有 "snapshot": true（列式编码的帧中为 "s": 1）。
+    
+    Returns:
+        int: 推送的快照数量
+    """
+    from app.models.platform_upgrade import Asset
+    
+    try:
+        rows = await Asset.filter(id__in=asset_ids).values("id", "code")
+        asset_by_code = {row["code"]: row["id"] for row in rows}
+        snapshots = await get_last_value_cache().get_many(asset_by_code)
+    except Exception as e:
+        logger.warning(f"读取最新值快照失败: {e}")
+        return 0
+    
+    for code, snapshot in snapshots.items():
+        values = snapshot["values"]
+        if subscription is not None:
+            values = subscription.select_signals(values)
+        await connection_manager.push_to_connection(connection_id, {
+            "type": "asset_data",
+            "asset_id": asset_by_code[code],
+            "data": values,
+            "timestamp": snapshot["ts"].isoformat(),
+            "quality": values.get("quality", "good"),
+            "snapshot": True
+        })
+    return len(snapshots)
+
+
 async def handle_unsubscribe(
     user_id: int,
     message: Dict[str, Any],
-    websocket: WebSocket
+    websocket: WebSocket,
+    connection_id: int
 ):
     """
     处理取消订阅请求
@@ -221,11 +322,14 @@ async def handle_unsubscribe(
     if not isinstance(asset_ids, list):
         asset_ids = [asset_ids]
     
-    # 批量取消订阅
-    count = await subscription_manager.unsubscribe_batch(user_id, asset_ids)
+    # 更新连接管理器
+    await connection_manager.unsubscribe(connection_id, asset_ids)
     
-    # 同时更新连接管理器
-    await connection_manager.unsubscribe(user_id, asset_ids)
+    # 批量取消订阅（用户其他连接仍在订阅的资产保留用户级订阅）
+    remaining = connection_manager.get_user_subscriptions(user_id)
+    count = await subscription_manager.unsubscribe_batch(
+        user_id, [asset_id for asset_id in asset_ids if asset_id not in remaining]
+    )
     
     # 发送确认
     await websocket.send_text(json.dumps({
@@ -271,7 +375,8 @@ async def handle_get_subscriptions(user_id: int, websocket: WebSocket):
             {
                 "asset_id": sub.asset_id,
                 "type": sub.subscription_type.value,
-                "created_at": sub.created_at.isoformat()
+                "created_at": sub.created_at.isoformat(),
+                "options": sub.options()
             }
             for sub in subscriptions
         ],
@@ -279,6 +384,36 @@ async def handle_get_subscriptions(user_id: int, websocket: WebSocket):
     }, ensure_ascii=False))
 
 
+async def handle_get_schema(message: Dict[str, Any], websocket: WebSocket):
+    """
+    获取资产所属类别的信号表（用于解码 columnar 帧）
+    
+    消息格式:
+    {
+        "action": "get_schema",
+        "asset_id": 1
+    }
+    """
+    asset_id = message.get("asset_id")
+    if asset_id is None:
+        await send_error(websocket, "asset_id不能为空")
+        return
+    
+    registry = connection_manager.schema_registry
+    schema = registry.get_for_asset(asset_id)
+    if schema is None:
+        await registry.load_assets([asset_id])
+        schema = registry.get_for_asset(asset_id)
+    if schema is None:
+        await send_error(websocket, f"资产不存在或未配置信号定义: {asset_id}")
+        return
+    
+    response = schema.message()
+    response["asset_id"] = asset_id
+    response["timestamp"] = datetime.now().isoformat()
+    await websocket.send_text(json.dumps(response, ensure_ascii=False))
+
+
 async def send_error(websocket: WebSocket, error_message: str):
     """
     发送错误消息
@@ -6,7 +6,7 @@ Requirements: 6.1, 7.4 - 服务调用路径统一
 """
 from typing import Optional, List
 from fastapi import APIRouter, Depends, Query
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
 
 from app.core.auth_dependencies import get_current_active_user
@@ -49,6 +49,13 @@ async def get_category_model():
     return AssetCategory
 
 
+def format_tdengine_time(value: datetime) -> str:
+    """格式化为TDengine时间字面量（带时区的时间先转换为服务器本地时间）"""
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
 async def asset_to_dict(asset, include_category: bool = False) -> dict:
     """将资产转换为字典"""
     result = {
@@ -536,6 +543,82 @@ async def get_history_data(
         )
 
 
+@router.get("/{asset_id}/history/export", summary="流式导出资产历史数据")
+async def export_history_data(
+    asset_id: int,
+    start_time: datetime = Query(..., description="开始时间"),
+    end_time: datetime = Query(..., description="结束时间"),
+    format: str = Query("ndjson", description="导出格式: ndjson / csv / arrow"),
+    order: str = Query("asc", regex="^(asc|desc)$", description="时间排序"),
+    chunk_size: int = Query(5000, ge=100, le=50000, description="每次查询的行数"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    流式导出资产历史数据 (从TDengine)
+    
+    按时间键集游标分块查询并逐块输出，单次请求即可下载完整时间范围，
+    服务端不会一次性加载全部数据。
+    """
+    from platform_core.timeseries import HistoryExporter
+    
+    try:
+        export_format = HistoryExporter.check_format(format)
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content=create_error_response(code=ErrorCodes.BAD_REQUEST, message=str(e))
+        )
+    
+    # 统一格式化后比较（带时区和不带时区的时间不能直接比较）
+    start_literal, end_literal = format_tdengine_time(start_time), format_tdengine_time(end_time)
+    if start_literal > end_literal:
+        return JSONResponse(
+            status_code=400,
+            content=create_error_response(code=ErrorCodes.BAD_REQUEST, message="开始时间不能晚于结束时间")
+        )
+    
+    Asset = await get_asset_model()
+    asset = await Asset.get_or_none(id=asset_id).prefetch_related("category")
+    
+    if not asset:
+        return JSONResponse(
+            status_code=404,
+            content=create_error_response(code=ErrorCodes.ASSET_NOT_FOUND, message="资产不存在")
+        )
+    
+    database = asset.category.tdengine_database if asset.category else None
+    stable = asset.category.tdengine_stable_prefix if asset.category else None
+    
+    if not database or not stable:
+        return JSONResponse(
+            status_code=400,
+            content=create_error_response(code=ErrorCodes.BAD_REQUEST, message="该资产类别未配置TDengine存储")
+        )
+    
+    async def query(sql: str):
+        return await tdengine_service.query_columnar(sql, database)
+    
+    exporter = HistoryExporter(
+        query,
+        table=f"{database}.{stable}",
+        where_clause=(
+            f"device_code='{asset.code}' "
+            f"AND ts >= '{start_literal}' AND ts <= '{end_literal}'"
+        ),
+        chunk_size=chunk_size,
+        descending=(order == "desc"),
+    )
+    
+    logger.info(f"导出资产历史数据: {asset.code}, 格式: {export_format.value}, 用户: {current_user.username}")
+    
+    filename = f"{asset.code}_history.{HistoryExporter.file_extension(export_format)}"
+    return StreamingResponse(
+        exporter.stream(export_format),
+        media_type=HistoryExporter.media_type(export_format),
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 # =====================================================
 # 批量操作API
 # =====================================================
@@ -1,6 +1,6 @@
 import json
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Tuple, Any
+from typing import List, Optional, Tuple, Any, AsyncIterator
 from decimal import Decimal
 
 from fastapi import HTTPException
@@ -14,6 +14,7 @@ from app.schemas.devices import DeviceRealTimeDataCreate, DeviceRealtimeQuery
 from app.core.tdengine_connector import TDengineConnector
 from app.core.database import get_db_connection
 from app.settings.config import settings
+from platform_core.timeseries.last_value_cache import LastValueCache, get_last_value_cache
 
 
 class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict]):
@@ -37,6 +38,35 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
             return round(float(val), 3)
         return val
 
+    # TDengine实时查询结果中不属于监测数据的字段
+    _REALTIME_SPECIAL_FIELDS = {"device_code", "device_name", "name", "install_location", "ts"}
+
+    def _realtime_from_snapshot(self, device: DeviceInfo, snapshot: dict, type_code: str) -> dict:
+        """由最新值缓存快照构建设备实时数据（与TDengine查询结果的格式一致）"""
+        data_fields = {name: self._round_value(val) for name, val in snapshot["values"].items()}
+        return {
+            "device_code": device.device_code,
+            "device_name": device.device_name or "",
+            "type_code": type_code,
+            "ts": snapshot["ts"].isoformat(sep=" ", timespec="milliseconds"),
+            "device_status": data_fields.get("device_status", "online"),
+            **data_fields,
+        }
+
+    def _prime_last_values(self, last_values: LastValueCache, device_code: str, row_data: dict) -> None:
+        """用 LAST_ROW 查询结果回填最新值缓存"""
+        signals = {}
+        ts_value = None
+        for field_name, val in row_data.items():
+            if field_name.startswith("last_row(") and field_name.endswith(")"):
+                field_name = field_name[9:-1]
+            if field_name == "ts":
+                ts_value = val
+            elif field_name not in self._REALTIME_SPECIAL_FIELDS:
+                signals[field_name] = val
+        if ts_value:
+            last_values.prime(device_code, signals, ts_value)
+
     async def create_realtime_data(self, obj_in: DeviceRealTimeDataCreate) -> DeviceInfo:
         """创建设备实时数据
 
@@ -157,41 +187,21 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
 
         return online_count
 
-    async def get_device_history_data(
+    async def _build_history_conditions(
         self,
-        device_id: Optional[int] = None,
-        device_code: Optional[str] = None,
-        start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None,
-        status: Optional[str] = None,
-        page: int = 1,
-        page_size: int = 10,
-    ) -> Tuple[int, List[dict]]:
-        """查询设备历史数据
-
-        Args:
-            device_id: 设备ID
-            device_code: 设备编号
-            start_time: 开始时间
-            end_time: 结束时间
-            status: 设备状态
-            page: 页码
-            page_size: 每页数量
+        device_code: Optional[str],
+        start_time: Optional[datetime],
+        end_time: Optional[datetime],
+        status: Optional[str],
+    ) -> Tuple[Optional[DeviceInfo], List[str], List[str]]:
+        """构建历史数据查询条件
 
         Returns:
-            元组(总数量, 历史数据列表)
+            元组(设备, 候选子表名列表, 查询条件列表)，设备不存在时设备为None
         """
-        from app.core.tdengine_connector import TDengineConnector
-        from app.models.device import DeviceInfo, DeviceType
-        from datetime import datetime, timezone
-
-        logger.info(
-            f"🔍 [历史数据查询] 开始查询: device_id={device_id}, device_code={device_code}, start_time={start_time}, end_time={end_time}, status={status}, page={page}, page_size={page_size}"
-        )
-
         # 构建查询条件
         conditions = []
-        table_name = None
+        potential_table_names = []
         asset = None
 
         if device_code:
@@ -199,7 +209,7 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
             asset = await DeviceInfo.filter(device_code=device_code).first()
             if not asset:
                 logger.warning(f"❌ 设备编号 {device_code} 不存在，无法查询历史数据")
-                return 0, []
+                return None, [], []
             
             # 准备可能的表名列表，稍后连接数据库时验证
             potential_table_names = [
@@ -210,12 +220,10 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                 device_code.lower(),
                 device_code
             ]
-            # 默认使用第一个，如果没有找到合适的，将在后续逻辑中处理
-            table_name = potential_table_names[0]
             logger.info(f"✅ 设备信息: device_code={device_code}, device_type={asset.device_type}, 待验证表名={potential_table_names}")
         else:
             logger.warning("❌ 未提供设备编号，无法查询历史数据")
-            return 0, []  # 设备编号是必须的
+            return None, [], []  # 设备编号是必须的
 
         if start_time:
             # TDengine REST API 最好使用 ISO 8601 格式 (UTC) 以避免时区歧义
@@ -242,7 +250,118 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
         if device_code:
              conditions.append(f"device_code = '{device_code}'")
 
+        return asset, potential_table_names, conditions
+
+    async def _resolve_history_table(
+        self,
+        td_connector: TDengineConnector,
+        asset: DeviceInfo,
+        potential_table_names: List[str],
+        conditions: List[str],
+    ) -> Tuple[Optional[str], str]:
+        """确定历史数据查询的表（超级表优先，其次子表）
+
+        Returns:
+            元组(表名, WHERE条件)，未找到表时表名为None
+        """
         where_clause = " AND ".join(conditions) if conditions else "1=1"
+        target_table = None
+        
+        # 1. 优先尝试从设备类型配置中获取超级表名
+        if asset and asset.device_type:
+            device_type_obj = await DeviceType.filter(type_code=asset.device_type).first()
+            if device_type_obj and device_type_obj.tdengine_stable_name:
+                # 使用反引号包裹表名，防止大小写问题
+                target_table = f"`{device_type_obj.tdengine_stable_name}`"
+                logger.info(f"✅ 从设备类型配置获取到超级表: {target_table}")
+        
+        # 2. 如果没找到配置的超级表，尝试之前的逻辑 (作为回退)
+        if not target_table:
+            # 尝试获取超级表 (旧逻辑，可能不准确)
+            try:
+                stables_res = await td_connector.query_data("SHOW STABLES")
+                if stables_res and stables_res.get('data'):
+                    for stable in stables_res['data']:
+                        # stable[0] 是表名
+                        if isinstance(stable, list) and len(stable) > 0 and isinstance(stable[0], str) and 'meters' in stable[0]:
+                            target_table = f"`{stable[0]}`"
+                            break
+                    if not target_table and stables_res['data'] and isinstance(stables_res['data'][0], list):
+                         target_table = f"`{stables_res['data'][0][0]}`"
+        
+                    if target_table:
+                        logger.info(f"✅ 自动发现超级表: {target_table}")
+            except Exception as e:
+                logger.warning(f"⚠️ 获取超级表失败: {e}")
+        
+            # 3. 如果没找到超级表，尝试子表逻辑
+            if not target_table:
+                # 检查表是否存在 (尝试多个可能的表名)
+                found_table = None
+                for name in potential_table_names:
+                    # TDengine 表名可能包含特殊字符，需要用反引号包裹
+                    # 但 SHOW TABLES LIKE 不需要包裹，它匹配的是字符串
+                    check_table_sql = f"SHOW TABLES LIKE '{name}'"
+                    logger.info(f"🔍 检查表是否存在: {check_table_sql}")
+                    try:
+                        table_check_result = await td_connector.query_data(check_table_sql)
+                        if table_check_result and table_check_result.get('data'):
+                            # 确保找到的表名是正确的
+                            found_table = name
+                            logger.info(f"✅ 找到表: {found_table}")
+                            break
+                    except Exception as e:
+                        logger.warning(f"⚠️ 检查表 {name} 失败: {e}")
+        
+                if found_table:
+                    # 构造查询时，表名必须加反引号，特别是当表名包含连字符时
+                    target_table = f"`{found_table}`"
+                    # 如果是具体子表，不需要 device_code 过滤条件
+                    conditions_sub = [c for c in conditions if not c.startswith("device_code =")]
+                    where_clause = " AND ".join(conditions_sub) if conditions_sub else "1=1"
+        
+        if not target_table:
+            logger.warning(f"❌ 未找到可查询的表 (超级表或子表)")
+
+        return target_table, where_clause
+
+    async def get_device_history_data(
+        self,
+        device_id: Optional[int] = None,
+        device_code: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 10,
+    ) -> Tuple[int, List[dict]]:
+        """查询设备历史数据
+
+        Args:
+            device_id: 设备ID
+            device_code: 设备编号
+            start_time: 开始时间
+            end_time: 结束时间
+            status: 设备状态
+            page: 页码
+            page_size: 每页数量
+
+        Returns:
+            元组(总数量, 历史数据列表)
+        """
+        from app.core.tdengine_connector import TDengineConnector
+        from app.models.device import DeviceInfo, DeviceType
+        from datetime import datetime, timezone
+
+        logger.info(
+            f"🔍 [历史数据查询] 开始查询: device_id={device_id}, device_code={device_code}, start_time={start_time}, end_time={end_time}, status={status}, page={page}, page_size={page_size}"
+        )
+
+        asset, potential_table_names, conditions = await self._build_history_conditions(
+            device_code, start_time, end_time, status
+        )
+        if asset is None:
+            return 0, []
 
         # 获取TDengine配置并初始化连接器
         from app.settings.config import settings, TDengineCredentials
@@ -256,66 +375,13 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
             database=tdengine_creds.database,
         )
         try:
-            target_table = None
-            
-            # 1. 优先尝试从设备类型配置中获取超级表名
-            if asset and asset.device_type:
-                device_type_obj = await DeviceType.filter(type_code=asset.device_type).first()
-                if device_type_obj and device_type_obj.tdengine_stable_name:
-                    # 使用反引号包裹表名，防止大小写问题
-                    target_table = f"`{device_type_obj.tdengine_stable_name}`"
-                    logger.info(f"✅ 从设备类型配置获取到超级表: {target_table}")
-            
-            # 2. 如果没找到配置的超级表，尝试之前的逻辑 (作为回退)
-            if not target_table:
-                # 尝试获取超级表 (旧逻辑，可能不准确)
-                try:
-                    stables_res = await td_connector.query_data("SHOW STABLES")
-                    if stables_res and stables_res.get('data'):
-                        for stable in stables_res['data']:
-                            # stable[0] 是表名
-                            if isinstance(stable, list) and len(stable) > 0 and isinstance(stable[0], str) and 'meters' in stable[0]:
-                                target_table = f"`{stable[0]}`"
-                                break
-                        if not target_table and stables_res['data'] and isinstance(stables_res['data'][0], list):
-                             target_table = f"`{stables_res['data'][0][0]}`"
-                        
-                        if target_table:
-                            logger.info(f"✅ 自动发现超级表: {target_table}")
-                except Exception as e:
-                    logger.warning(f"⚠️ 获取超级表失败: {e}")
-
-                # 3. 如果没找到超级表，尝试子表逻辑
-                if not target_table:
-                    # 检查表是否存在 (尝试多个可能的表名)
-                    found_table = None
-                    for name in potential_table_names:
-                        # TDengine 表名可能包含特殊字符，需要用反引号包裹
-                        # 但 SHOW TABLES LIKE 不需要包裹，它匹配的是字符串
-                        check_table_sql = f"SHOW TABLES LIKE '{name}'"
-                        logger.info(f"🔍 检查表是否存在: {check_table_sql}")
-                        try:
-                            table_check_result = await td_connector.query_data(check_table_sql)
-                            if table_check_result and table_check_result.get('data'):
-                                # 确保找到的表名是正确的
-                                found_table = name
-                                logger.info(f"✅ 找到表: {found_table}")
-                                break
-                        except Exception as e:
-                            logger.warning(f"⚠️ 检查表 {name} 失败: {e}")
-                    
-                    if found_table:
-                        # 构造查询时，表名必须加反引号，特别是当表名包含连字符时
-                        target_table = f"`{found_table}`"
-                        # 如果是具体子表，不需要 device_code 过滤条件
-                        conditions_sub = [c for c in conditions if not c.startswith("device_code =")]
-                        where_clause = " AND ".join(conditions_sub) if conditions_sub else "1=1"
-            
+            target_table, where_clause = await self._resolve_history_table(
+                td_connector, asset, potential_table_names, conditions
+            )
             if not target_table:
-                logger.warning(f"❌ 未找到可查询的表 (超级表或子表)")
                 await td_connector.close()
                 return 0, []
-            
+
             table_name = target_table
             logger.info(f"🚀 最终查询表名: {table_name}, 条件: {where_clause}")
             
@@ -382,6 +448,86 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
             await td_connector.close()
             raise HTTPException(status_code=500, detail=f"查询设备历史数据失败: {e}")
 
+    async def stream_device_history_data(
+        self,
+        device_code: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        status: Optional[str] = None,
+        export_format: str = "ndjson",
+        chunk_size: int = 5000,
+        descending: bool = False,
+    ) -> Optional[AsyncIterator[bytes]]:
+        """流式导出设备历史数据
+
+        按时间键集游标分块查询TDengine并逐块编码输出，不使用LIMIT/OFFSET分页和count(*)，
+        内存占用与导出时间范围无关。
+
+        Args:
+            device_code: 设备编号
+            start_time: 开始时间
+            end_time: 结束时间
+            status: 设备状态
+            export_format: 导出格式 ndjson / csv / arrow
+            chunk_size: 每次查询的行数
+            descending: 是否按时间倒序
+
+        Returns:
+            字节流异步迭代器，设备或表不存在时返回None
+        """
+        from platform_core.timeseries import ColumnarResult, HistoryExporter
+        from app.settings.config import TDengineCredentials
+
+        HistoryExporter.check_format(export_format)
+
+        asset, potential_table_names, conditions = await self._build_history_conditions(
+            device_code, start_time, end_time, status
+        )
+        if asset is None:
+            return None
+
+        tdengine_creds = TDengineCredentials()
+        td_connector = TDengineConnector(
+            host=tdengine_creds.host,
+            port=tdengine_creds.port,
+            user=tdengine_creds.user,
+            password=tdengine_creds.password,
+            database=tdengine_creds.database,
+        )
+        try:
+            table_name, where_clause = await self._resolve_history_table(
+                td_connector, asset, potential_table_names, conditions
+            )
+        except Exception:
+            await td_connector.close()
+            raise
+
+        if not table_name:
+            await td_connector.close()
+            return None
+
+        async def query(sql: str) -> ColumnarResult:
+            return ColumnarResult.from_response(await td_connector.query_data(sql))
+
+        exporter = HistoryExporter(
+            query,
+            table=table_name,
+            where_clause=where_clause,
+            chunk_size=chunk_size,
+            descending=descending,
+        )
+        logger.info(f"🚀 [历史数据导出] 表名: {table_name}, 条件: {where_clause}, 格式: {export_format}")
+
+        async def stream() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in exporter.stream(export_format):
+                    yield chunk
+            finally:
+                await td_connector.close()
+                logger.info(f"✅ 历史数据导出完成: device_code={device_code}, 行数={exporter.rows_exported}")
+
+        return stream()
+
     async def update_device_realtime_data(self, device_id: int, data: dict) -> DeviceRealTimeData:
         """更新设备实时数据（覆盖式更新）
 
@@ -554,25 +700,28 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                 super_table_name = None
                 logger.info("查询所有设备类型，将按设备类型分组查询")
 
+            # 先读取最新值缓存，仅对未命中的设备查询 TDengine
+            last_values = get_last_value_cache()
+            cached = await last_values.get_many([d.device_code for d in current_page_devices])
+            uncached_devices = [d for d in current_page_devices if d.device_code not in cached]
+            
             # 查询 TDengine 数据
             device_data_map = {}
             
             if current_page_devices:
                 try:
-                    if super_table_name:
+                    if not uncached_devices:
+                        logger.debug("当前页设备均命中最新值缓存，跳过TDengine查询")
+                    elif super_table_name:
                         # 统一使用 device_code 作为 tag 列名
                         tag_col = "device_code"
                         # 移除对 plasma_cutter_2025 的特殊处理，统一规范
                         # if super_table_name == "plasma_cutter_2025":
                         #     tag_col = "device_id"
 
-                        # 单一设备类型查询
-                        where_clause = ""
-                        if query.device_codes:
-                            codes_str = ", ".join([f"'{code}'" for code in query.device_codes])
-                            where_clause = f"WHERE {tag_col} IN ({codes_str})"
-                        elif query.device_code:
-                            where_clause = f"WHERE {tag_col} = '{query.device_code}'"
+                        # 单一设备类型查询（仅查询当前页未命中缓存的设备）
+                        codes_str = ", ".join([f"'{d.device_code}'" for d in uncached_devices])
+                        where_clause = f"WHERE {tag_col} IN ({codes_str})"
 
                         if where_clause:
                             batch_sql = f"SELECT LAST_ROW(*), {tag_col} FROM `{super_table_name}` {where_clause} GROUP BY {tag_col}"
@@ -592,6 +741,7 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                                 device_code_val = row_dict.get(tag_col)
                                 if device_code_val:
                                     device_data_map[device_code_val] = row_dict
+                                    self._prime_last_values(last_values, device_code_val, row_dict)
                                 else:
                                     logger.warning(f"Row data missing {tag_col}: {row_dict}. This row will be skipped.")
                     else:
@@ -600,7 +750,7 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                         
                         # 按设备类型分组
                         devices_by_type = {}
-                        for device in current_page_devices:
+                        for device in uncached_devices:
                             device_type = device.device_type
                             if device_type not in devices_by_type:
                                 devices_by_type[device_type] = []
@@ -637,6 +787,7 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                                     device_code_val = row_dict.get(tag_col)
                                     if device_code_val:
                                         device_data_map[device_code_val] = row_dict
+                                        self._prime_last_values(last_values, device_code_val, row_dict)
 
                     # 辅助函数：从 TDengine 结果中提取字段值
                     def get_signal_value(row_data, field_name):
@@ -649,6 +800,11 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                     
                     # 处理每个设备的数据
                     for device in current_page_devices:
+                        snapshot = cached.get(device.device_code)
+                        if snapshot is not None:
+                            realtime_data_list.append(self._realtime_from_snapshot(device, snapshot, device.device_type))
+                            continue
+                        
                         row_data = device_data_map.get(device.device_code)
                         if row_data:
                             # 动态提取所有字段（除了特殊字段）
@@ -807,55 +963,64 @@ class DeviceDataController(CRUDBase[DeviceInfo, DeviceRealTimeDataCreate, dict])
                     "type_code": query.type_code,
                 }
 
-            # 2. 仅针对当前页的设备查询TDengine
-            device_codes_for_tdengine = [d.device_code for d in current_page_devices]
+            # 2. 先读取最新值缓存，仅对未命中的设备查询TDengine
+            last_values = get_last_value_cache()
+            cached = await last_values.get_many([d.device_code for d in current_page_devices])
+            device_codes_for_tdengine = [d.device_code for d in current_page_devices if d.device_code not in cached]
             realtime_data_list = []
 
-            from app.settings.config import TDengineCredentials
-
-            tdengine_creds = TDengineCredentials()
-            tdengine_connector = TDengineConnector(
-                host=tdengine_creds.host,
-                port=tdengine_creds.port,
-                user=tdengine_creds.user,
-                password=tdengine_creds.password,
-                database=tdengine_creds.database,
-            )
-
             # 根据设备类型获取对应的TDengine超级表名
             device_type_obj = await DeviceType.filter(type_code=query.type_code, is_active=True).first()
             if not device_type_obj:
                 raise HTTPException(status_code=404, detail=f"设备类型 {query.type_code} 不存在或未激活")
-            
-            super_table_name = device_type_obj.tdengine_stable_name
-            logger.info(f"使用TDengine超级表: {super_table_name} (设备类型: {query.type_code})")
-            
-            # 统一使用 device_code 作为 tag 列名
-            tag_col = "device_code"
-            # 移除对 plasma_cutter_2025 的特殊处理
-            # if super_table_name == "plasma_cutter_2025":
-            #     tag_col = "device_id"
-                
-            codes_str = ", ".join([f"'{code}'" for code in device_codes_for_tdengine])
-            where_clause = f"WHERE {tag_col} IN ({codes_str})"
 
-            batch_sql = f"SELECT LAST_ROW(*), {tag_col} FROM `{super_table_name}` {where_clause} GROUP BY {tag_col}"
-            logger.debug(f"PAGED - TDengine SQL: {batch_sql}")
+            device_data_map = {}
+            if device_codes_for_tdengine:
+                from app.settings.config import TDengineCredentials
+
+                tdengine_creds = TDengineCredentials()
+                tdengine_connector = TDengineConnector(
+                    host=tdengine_creds.host,
+                    port=tdengine_creds.port,
+                    user=tdengine_creds.user,
+                    password=tdengine_creds.password,
+                    database=tdengine_creds.database,
+                )
 
-            raw_result = await tdengine_connector.execute_sql(batch_sql, target_db=tdengine_creds.database)
+                super_table_name = device_type_obj.tdengine_stable_name
+                logger.info(f"使用TDengine超级表: {super_table_name} (设备类型: {query.type_code})")
 
-            device_data_map = {}
-            if isinstance(raw_result, dict) and "data" in raw_result and "column_meta" in raw_result:
-                columns = [col[0] for col in raw_result["column_meta"]]
-                for row in raw_result["data"]:
-                    row_dict = dict(zip(columns, row))
-                    # Map tag_col back to device_code for internal logic
-                    device_code_val = row_dict.get(tag_col)
-                    if device_code_val:
-                        device_data_map[device_code_val] = row_dict
+                # 统一使用 device_code 作为 tag 列名
+                tag_col = "device_code"
+                # 移除对 plasma_cutter_2025 的特殊处理
+                # if super_table_name == "plasma_cutter_2025":
+                #     tag_col = "device_id"
+
+                codes_str = ", ".join([f"'{code}'" for code in device_codes_for_tdengine])
+                where_clause = f"WHERE {tag_col} IN ({codes_str})"
+
+                batch_sql = f"SELECT LAST_ROW(*), {tag_col} FROM `{super_table_name}` {where_clause} GROUP BY {tag_col}"
+                logger.debug(f"PAGED - TDengine SQL: {batch_sql}")
+
+                raw_result = await tdengine_connector.execute_sql(batch_sql, target_db=tdengine_creds.database)
+
+                if isinstance(raw_result, dict) and "data" in raw_result and "column_meta" in raw_result:
+                    columns = [col[0] for col in raw_result["column_meta"]]
+                    for row in raw_result["data"]:
+                        row_dict = dict(zip(columns, row))
+                        # Map tag_col back to device_code for internal logic
+                        device_code_val = row_dict.get(tag_col)
+                        if device_code_val:
+                            device_data_map[device_code_val] = row_dict
+                            self._prime_last_values(last_values, device_code_val, row_dict)
 
             # 3. 合并数据
             for device in current_page_devices:
+                snapshot = cached.get(device.device_code)
+                if snapshot is not None:
+                    realtime_data_list.append(self._realtime_from_snapshot(device, snapshot, query.type_code))
+                    continue
+
                 row_data = device_data_map.get(device.device_code)
                 
                 # 检查TDengine数据有效性：必须有时间戳
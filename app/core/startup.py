@@ -44,6 +44,9 @@ class ApplicationStartup:
             # 预热缓存（可选，在后台执行）
             asyncio.create_task(self._warm_up_caches())
             
+            # 预热TDengine已知表缓存（后台执行）
+            asyncio.create_task(self._warm_up_table_registry())
+            
             logger.info("应用初始化完成")
             
         except Exception as e:
@@ -152,6 +155,19 @@ class ApplicationStartup:
         except Exception as e:
             logger.error(f"缓存预热失败: {str(e)}")
     
+    async def _warm_up_table_registry(self) -> None:
+        """从TDengine预热已知表缓存，稳态写入无需再执行建表DDL"""
+        try:
+            from app.core.tdengine_config import tdengine_config_manager
+            from platform_core.timeseries.tdengine_client import get_tdengine_client
+            from platform_core.timeseries.table_registry import get_table_registry
+            
+            config = tdengine_config_manager.get_server_config()
+            await get_table_registry().seed(get_tdengine_client(), [config.database])
+            
+        except Exception as e:
+            logger.warning(f"TDengine已知表缓存预热失败: {str(e)}")
+    
     async def health_check(self) -> dict:
         """健康检查"""
         health_status = {
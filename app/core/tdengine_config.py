@@ -29,6 +29,8 @@ class TDengineServerConfig:
     is_external: bool = True
     description: str = ""
     tags: Dict[str, str] = field(default_factory=dict)
+    protocol: str = "rest"  # 传输协议: rest / websocket / native
+    native_port: int = 6030  # 原生连接端口（protocol=native时使用）
 
 
 @dataclass
@@ -64,7 +66,9 @@ class TDengineConfigManager:
             timeout=int(os.getenv("TDENGINE_TIMEOUT", "30")),
             max_retries=int(os.getenv("TDENGINE_MAX_RETRIES", "3")),
             is_external=os.getenv("TDENGINE_EXTERNAL", "false").lower() == "true",
-            description="主TDengine服务器"
+            description="主TDengine服务器",
+            protocol=os.getenv("TDENGINE_PROTOCOL", "rest").lower(),
+            native_port=int(os.getenv("TDENGINE_NATIVE_PORT", "6030"))
         )
         
         self.add_server("main", main_config)
@@ -88,7 +92,9 @@ class TDengineConfigManager:
                 database=os.getenv(f"{prefix}DATABASE", "test_db"),
                 timeout=int(os.getenv(f"{prefix}TIMEOUT", "30")),
                 is_external=os.getenv(f"{prefix}EXTERNAL", "true").lower() == "true",
-                description=os.getenv(f"{prefix}DESCRIPTION", f"TDengine服务器 - {server_name}")
+                description=os.getenv(f"{prefix}DESCRIPTION", f"TDengine服务器 - {server_name}"),
+                protocol=os.getenv(f"{prefix}PROTOCOL", "rest").lower(),
+                native_port=int(os.getenv(f"{prefix}NATIVE_PORT", "6030"))
             )
             self.add_server(server_name, server_config)
     
@@ -137,6 +143,7 @@ class TDengineConfigManager:
             "host": config.host,
             "port": config.port,
             "database": config.database,
+            "protocol": config.protocol,
             "is_external": config.is_external,
             "description": config.description,
             "is_default": server_name == self.default_server,
@@ -336,7 +343,9 @@ class TDengineConfigManager:
                     "timeout": config.timeout,
                     "is_external": config.is_external,
                     "description": config.description,
-                    "tags": config.tags
+                    "tags": config.tags,
+                    "protocol": config.protocol,
+                    "native_port": config.native_port
                 }
                 for name, config in self.servers.items()
             },
@@ -357,7 +366,9 @@ class TDengineConfigManager:
                     timeout=server_data.get("timeout", 30),
                     is_external=server_data.get("is_external", True),
                     description=server_data.get("description", ""),
-                    tags=server_data.get("tags", {})
+                    tags=server_data.get("tags", {}),
+                    protocol=server_data.get("protocol", "rest"),
+                    native_port=server_data.get("native_port", 6030)
                 )
                 self.add_server(name, server_config)
         
@@ -1,12 +1,11 @@
-import httpx
 from typing import Optional
-from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
 from app.log import logger
 from app.core.tdengine_config import tdengine_config_manager, TDengineServerConfig
+from app.core.tdengine_transport import create_transport
 
 
 class TDengineConnector:
-    def __init__(self, host: str = None, port: int = None, user: str = None, password: str = None, database: str = None, server_name: str = None):
+    def __init__(self, host: str = None, port: int = None, user: str = None, password: str = None, database: str = None, server_name: str = None, protocol: str = None):
         """
         初始化TDengine连接器
         
@@ -17,54 +16,56 @@ class TDengineConnector:
             password: 密码 (可选)
             database: 数据库名 (可选)
             server_name: 配置管理器中的服务器名称 (可选，优先使用)
+            protocol: 传输协议 rest/websocket/native (可选，默认取服务器配置)
         """
+        native_port = 6030
+        pool_size = 10
         if server_name:
             # 使用配置管理器中的服务器配置
             config = tdengine_config_manager.get_server_config(server_name)
+            server_host, server_port = config.host, config.port
             self.base_url = f"http://{config.host}:{config.port}"
             self.auth = (config.user, config.password)
             self.database = database or config.database
             self.server_name = server_name
             self.timeout = config.timeout
+            self.protocol = protocol or config.protocol
+            native_port = config.native_port
+            pool_size = config.connection_pool_size
         else:
             # 使用直接传入的参数
             if not host:
                 # 如果没有提供参数，使用默认服务器配置
                 config = tdengine_config_manager.get_server_config()
+                server_host, server_port = config.host, config.port
                 self.base_url = f"http://{config.host}:{config.port}"
                 self.auth = (config.user, config.password)
                 self.database = database or config.database
                 self.server_name = tdengine_config_manager.default_server
                 self.timeout = config.timeout
+                self.protocol = protocol or config.protocol
+                native_port = config.native_port
+                pool_size = config.connection_pool_size
             else:
                 # 使用传入的参数
+                server_host, server_port = host, port or 6041
                 self.base_url = f"http://{host}:{port or 6041}"
                 self.auth = (user or "root", password or "taosdata")
                 self.database = database or "test_db"
                 self.server_name = None
                 self.timeout = 30
+                self.protocol = protocol or "rest"
         
-        # 显式禁用环境代理以提高初始化速度
-        self._connection_pool = httpx.AsyncClient(timeout=self.timeout, trust_env=False)  # Use a single client for connection pooling
-
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_fixed(2),
-        retry=retry_if_exception_type(httpx.RequestError) | retry_if_exception_type(httpx.HTTPStatusError),
-        reraise=True,
-    )
-    async def _request(self, method: str, path: str, **kwargs):
-        url = f"{self.base_url}{path}"
-        try:
-            response = await self._connection_pool.request(method, url, auth=self.auth, **kwargs)
-            response.raise_for_status()  # Raise an exception for 4xx or 5xx status codes
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
-            raise
-        except httpx.RequestError as e:
-            logger.error(f"An error occurred while requesting {e.request.url!r}: {e}")
-            raise
+        self._transport = create_transport(
+            self.protocol,
+            host=server_host,
+            port=server_port,
+            user=self.auth[0],
+            password=self.auth[1],
+            timeout=self.timeout,
+            pool_size=pool_size,
+            native_port=native_port,
+        )
 
     async def execute_sql(self, sql: str, target_db: str = None):
         db_to_use = target_db or self.database
@@ -72,24 +73,7 @@ class TDengineConnector:
         # 判断是查询语句还是执行语句
         is_query = sql.strip().upper().startswith("SELECT") or sql.strip().upper().startswith("DESCRIBE")
 
-        if is_query:
-            # SELECT 和 DESCRIBE 查询使用 /rest/sql/{db} 端点
-            if not db_to_use:
-                raise ValueError("Database must be specified for query operations")
-            path = f"/rest/sql/{db_to_use}"
-            # 查询语句不需要 'USE db;' 前缀
-            final_sql = sql
-        else:
-            # 其他语句 (CREATE, INSERT, etc.) 使用 /rest/sql 端点
-            path = "/rest/sql"
-            # 如果没有在SQL中指定数据库，则添加 'USE db;'
-            if db_to_use and not any(db_cmd in sql.upper() for db_cmd in ["USE ", db_to_use.upper() + "."]):
-                final_sql = f"USE {db_to_use}; {sql}"
-            else:
-                final_sql = sql
-
-        logger.info(f"Executing SQL: {final_sql} on path {path}")
-        return await self._request("POST", path, data=final_sql)
+        return await self._transport.execute(sql, db_to_use, is_query=is_query)
 
     async def create_database(self, db_name: str, if_not_exists: bool = True):
         sql = f"CREATE DATABASE {'IF NOT EXISTS ' if if_not_exists else ''}{db_name}"
@@ -163,9 +147,10 @@ class TDengineConnector:
             return {
                 "host": self.base_url,
                 "database": self.database,
+                "protocol": self._transport.protocol,
                 "is_external": True,
                 "description": "直接连接的TDengine服务器"
             }
 
     async def close(self):
-        await self._connection_pool.aclose()
+        await self._transport.close()
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+TDengine传输层
+
+TDengineConnector 通过传输层与TDengine通信，按服务器配置选择协议:
+
+- rest: taosAdapter REST接口（httpx，JSON结果），默认
+- websocket: taosAdapter WebSocket接口（taos-ws-py / taosws），结果以二进制数据块传输
+- native: 原生连接（taospy / taos，需要本地安装TDengine客户端驱动）
+
+所有传输层返回与REST接口相同结构的结果字典:
+{"code": 0, "column_meta": [[name, type, length], ...], "data": [[...], ...], "rows": n}
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+from tenacity import retry, stop_after_attempt, wait_fixed, retry_if_exception_type
+
+from app.log import logger
+
+
+SUPPORTED_PROTOCOLS = ("rest", "websocket", "native")
+
+
+class TDengineTransport(ABC):
+    """TDengine传输层基类"""
+    
+    protocol: str = ""
+    
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        timeout: int = 30,
+        pool_size: int = 10,
+    ):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.pool_size = pool_size
+    
+    @abstractmethod
+    async def execute(self, sql: str, database: Optional[str] = None, is_query: bool = False) -> Dict[str, Any]:
+        """
+        执行SQL并返回REST格式的结果
+        
+        Args:
+            sql: SQL语句
+            database: 数据库名
+            is_query: 是否为查询语句（SELECT/DESCRIBE）
+        
+        Returns:
+            Dict: REST格式的结果
+        """
+        pass
+    
+    @abstractmethod
+    async def close(self):
+        """关闭连接"""
+        pass
+
+
+class RestTransport(TDengineTransport):
+    """REST传输（taosAdapter /rest/sql）"""
+    
+    protocol = "rest"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.base_url = f"http://{self.host}:{self.port}"
+        self.auth = (self.user, self.password)
+        # 显式禁用环境代理以提高初始化速度
+        self._client = httpx.AsyncClient(timeout=self.timeout, trust_env=False)
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_fixed(2),
+        retry=retry_if_exception_type(httpx.RequestError) | retry_if_exception_type(httpx.HTTPStatusError),
+        reraise=True,
+    )
+    async def _request(self, method: str, path: str, **kwargs):
+        url = f"{self.base_url}{path}"
+        try:
+            response = await self._client.request(method, url, auth=self.auth, **kwargs)
+            response.raise_for_status()  # Raise an exception for 4xx or 5xx status codes
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e.response.status_code} - {e.response.text}")
+            raise
+        except httpx.RequestError as e:
+            logger.error(f"An error occurred while requesting {e.request.url!r}: {e}")
+            raise
+    
+    async def execute(self, sql: str, database: Optional[str] = None, is_query: bool = False) -> Dict[str, Any]:
+        if is_query:
+            # SELECT 和 DESCRIBE 查询使用 /rest/sql/{db} 端点
+            if not database:
+                raise ValueError("Database must be specified for query operations")
+            path = f"/rest/sql/{database}"
+            # 查询语句不需要 'USE db;' 前缀
+            final_sql = sql
+        else:
+            # 其他语句 (CREATE, INSERT, etc.) 使用 /rest/sql 端点
+            path = "/rest/sql"
+            # 如果没有在SQL中指定数据库，则添加 'USE db;'
+            if database and not any(db_cmd in sql.upper() for db_cmd in ["USE ", database.upper() + "."]):
+                final_sql = f"USE {database}; {sql}"
+            else:
+                final_sql = sql
+        
+        logger.info(f"Executing SQL: {final_sql} on path {path}")
+        return await self._request("POST", path, data=final_sql)
+    
+    async def close(self):
+        await self._client.aclose()
+
+
+class _DBAPITransport(TDengineTransport):
+    """
+    基于DB-API驱动的传输基类
+    
+    驱动为同步实现，调用放到线程池执行；每个数据库维护一个有界连接池。
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._idle: Dict[str, List[Any]] = {}
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+    
+    @abstractmethod
+    def _connect(self, database: Optional[str]):
+        """创建驱动连接（同步，在线程池中调用）"""
+        pass
+    
+    async def _acquire(self, database: Optional[str]):
+        key = database or ""
+        slots = self._slots.setdefault(key, asyncio.Semaphore(self.pool_size))
+        await slots.acquire()
+        
+        idle = self._idle.setdefault(key, [])
+        if idle:
+            return idle.pop()
+        try:
+            return await asyncio.to_thread(self._connect, database)
+        except Exception:
+            slots.release()
+            raise
+    
+    def _release(self, database: Optional[str], conn, broken: bool = False):
+        key = database or ""
+        if broken:
+            self._close_quietly(conn)
+        else:
+            self._idle[key].append(conn)
+        self._slots[key].release()
+    
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _discard_after(self, database: Optional[str], conn, call: "asyncio.Future"):
+        """
+        丢弃仍在执行的连接：立即移出连接池（释放名额），等线程中的调用结束后再关闭，
+        避免关闭与进行中的驱动调用竞争
+        """
+        key = database or ""
+        self._slots[key].release()
+        
+        def close_when_done(done: "asyncio.Future"):
+            if not done.cancelled():
+                done.exception()
+            asyncio.get_running_loop().run_in_executor(None, self._close_quietly, conn)
+        
+        call.add_done_callback(close_when_done)
+    
+    @staticmethod
+    def _normalize_value(value: Any) -> Any:
+        """与REST结果保持一致：时间戳转ISO字符串，二进制转文本"""
+        if isinstance(value, datetime):
+            return value.isoformat(timespec="milliseconds")
+        if isinstance(value, (bytes, bytearray)):
+            return value.decode("utf-8", errors="replace")
+        return value
+    
+    def _run(self, conn, sql: str) -> Dict[str, Any]:
+        """执行SQL并转换为REST格式（同步，在线程池中调用）"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            description = cursor.description
+            
+            if not description:
+                affected = cursor.rowcount if cursor.rowcount is not None else 0
+                return {
+                    "code": 0,
+                    "column_meta": [["affected_rows", "INT", 4]],
+                    "data": [[affected]],
+                    "rows": 1,
+                }
+            
+            column_meta = [
+                [col[0], col[1], col[3] if len(col) > 3 and col[3] is not None else col[2]]
+                for col in description
+            ]
+            normalize = self._normalize_value
+            data: List[List[Any]] = [[normalize(v) for v in row] for row in cursor.fetchall()]
+            
+            return {"code": 0, "column_meta": column_meta, "data": data, "rows": len(data)}
+        finally:
+            cursor.close()
+    
+    async def execute(self, sql: str, database: Optional[str] = None, is_query: bool = False) -> Dict[str, Any]:
+        logger.info(f"Executing SQL: {sql} via {self.protocol}")
+        conn = await self._acquire(database)
+        # shield: 超时或调用方取消时线程中的调用继续执行，call 在线程结束时才完成
+        call = asyncio.ensure_future(asyncio.to_thread(self._run, conn, sql))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(call), timeout=self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # 连接可能仍在执行，移出连接池，线程结束后再关闭
+            self._discard_after(database, conn, call)
+            raise
+        except Exception as e:
+            self._release(database, conn, broken=self._is_connection_error(e))
+            raise
+        self._release(database, conn)
+        return result
+    
+    @staticmethod
+    def _is_connection_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return any(word in message for word in ("connection", "closed", "broken", "network"))
+    
+    async def close(self):
+        for idle in self._idle.values():
+            for conn in idle:
+                try:
+                    await asyncio.to_thread(conn.close)
+                except Exception:
+                    pass
+        self._idle.clear()
+        self._slots.clear()
+
+
+class WebSocketTransport(_DBAPITransport):
+    """
+    WebSocket传输（taosAdapter /rest/ws）
+    
+    依赖 taos-ws-py（import taosws），查询结果以二进制数据块传输，避免REST的JSON编解码开销。
+    """
+    
+    protocol = "websocket"
+    
+    def _connect(self, database: Optional[str]):
+        import taosws
+        
+        dsn = f"taosws://{self.user}:{self.password}@{self.host}:{self.port}"
+        if database:
+            dsn = f"{dsn}/{database}"
+        return taosws.connect(dsn)
+
+
+class NativeTransport(_DBAPITransport):
+    """
+    原生传输（taosc）
+    
+    依赖 taospy（import taos）及本地TDengine客户端驱动，默认端口6030。
+    """
+    
+    protocol = "native"
+    
+    def _connect(self, database: Optional[str]):
+        import taos
+        
+        return taos.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=database,
+        )
+
+
+_TRANSPORTS = {
+    "rest": RestTransport,
+    "websocket": WebSocketTransport,
+    "native": NativeTransport,
+}
+
+
+def create_transport(
+    protocol: str,
+    host: str,
+    port: int,
+    user: str,
+    password: str,
+    timeout: int = 30,
+    pool_size: int = 10,
+    native_port: int = 6030,
+) -> TDengineTransport:
+    """
+    按协议创建传输层
+    
+    非REST协议的驱动未安装时回退到REST传输。
+    
+    Args:
+        protocol: 协议类型 rest / websocket / native
+        host: 主机地址
+        port: taosAdapter端口（REST/WebSocket）
+        user: 用户名
+        password: 密码
+        timeout: 超时时间（秒）
+        pool_size: 连接池大小
+        native_port: 原生连接端口
+    
+    Returns:
+        TDengineTransport: 传输层实例
+    """
+    protocol = (protocol or "rest").lower()
+    transport_class = _TRANSPORTS.get(protocol)
+    if transport_class is None:
+        raise ValueError(f"不支持的TDengine协议: {protocol}，可选: {', '.join(SUPPORTED_PROTOCOLS)}")
+    
+    if protocol == "websocket":
+        try:
+            import taosws  # noqa: F401
+        except ImportError:
+            logger.warning("未安装taos-ws-py，TDengine WebSocket传输回退为REST")
+            transport_class = RestTransport
+    elif protocol == "native":
+        try:
+            import taos  # noqa: F401
+            port = native_port
+        except ImportError:
+            logger.warning("未安装taospy，TDengine原生传输回退为REST")
+            transport_class = RestTransport
+    
+    return transport_class(host, port, user, password, timeout=timeout, pool_size=pool_size)
@@ -0,0 +1 @@
+from loguru import logger
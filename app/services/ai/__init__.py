@@ -32,6 +32,21 @@ from app.services.ai.inference_service import (
     XGBoostPredictor,
     inference_service
 )
+from app.services.ai.inference_executor import (
+    InferenceExecutor,
+    InferenceExecutorConfig,
+    InferenceQueueFullError,
+    InferenceTimeoutError,
+    get_inference_executor
+)
+from app.services.ai.predictor_cache import (
+    PredictorCache,
+    PredictorCacheConfig
+)
+from app.services.ai.micro_batcher import (
+    InferenceMicroBatcher,
+    MicroBatcherConfig
+)
 
 __all__ = [
     # 原有组件
@@ -47,5 +62,14 @@ __all__ = [
     "IsolationForestPredictor",
     "ARIMAPredictor",
     "XGBoostPredictor",
-    "inference_service"
+    "inference_service",
+    "InferenceExecutor",
+    "InferenceExecutorConfig",
+    "InferenceQueueFullError",
+    "InferenceTimeoutError",
+    "get_inference_executor",
+    "PredictorCache",
+    "PredictorCacheConfig",
+    "InferenceMicroBatcher",
+    "MicroBatcherConfig"
 ]
@@ -34,14 +34,14 @@ class TDengineLoader:
         """
         
         try:
-            result = await self.td_service.execute_query(sql)
+            # Columnar result decodes straight into typed arrays (no per-row dicts)
+            result = await self.td_service.execute_query_columnar(sql)
             
-            if result and 'data' in result and 'head' in result:
-                df = pd.DataFrame(result['data'], columns=result['head'])
-                return df
+            if result.num_rows > 0:
+                return result.to_pandas()
             else:
-                logger.warning(f"No data found or invalid format for device {device_id}")
-                return pd.DataFrame()
+                logger.warning(f"No data found for device {device_id}")
+                return pd.DataFrame(columns=result.columns)
                 
         except Exception as e:
             logger.error(f"Error loading data from TDengine: {e}")
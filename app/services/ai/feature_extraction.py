@@ -5,10 +5,13 @@
 从设备数据中提取统计、时序和频域特征
 """
 
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Sequence, TYPE_CHECKING
 import numpy as np
 from loguru import logger
 
+if TYPE_CHECKING:
+    from platform_core.timeseries.columnar import ColumnarResult
+
 
 class StatisticalFeatureExtractor:
     """统计特征提取器"""
@@ -25,12 +28,12 @@ class StatisticalFeatureExtractor:
         Returns:
             统计特征字典
         """
-        if not data or len(data) == 0:
+        if data is None or len(data) == 0:
             logger.warning("数据为空，无法提取特征")
             return {}
         
         try:
-            arr = np.array(data, dtype=float)
+            arr = np.asarray(data, dtype=float)
             
             # 移除NaN值
             arr = arr[~np.isnan(arr)]
@@ -83,11 +86,11 @@ class TimeSeriesFeatureExtractor:
         Returns:
             趋势描述: "上升"、"下降"、"平稳"
         """
-        if not data or len(data) < 2:
+        if data is None or len(data) < 2:
             return "未知"
         
         try:
-            arr = np.array(data, dtype=float)
+            arr = np.asarray(data, dtype=float)
             arr = arr[~np.isnan(arr)]
             
             if len(arr) < 2:
@@ -128,11 +131,11 @@ class TimeSeriesFeatureExtractor:
         Returns:
             变化率特征
         """
-        if not data or len(data) < 2:
+        if data is None or len(data) < 2:
             return {}
         
         try:
-            arr = np.array(data, dtype=float)
+            arr = np.asarray(data, dtype=float)
             arr = arr[~np.isnan(arr)]
             
             if len(arr) < 2:
@@ -167,11 +170,11 @@ class TimeSeriesFeatureExtractor:
         Returns:
             自相关系数
         """
-        if not data or len(data) < max_lag + 1:
+        if data is None or len(data) < max_lag + 1:
             return {}
         
         try:
-            arr = np.array(data, dtype=float)
+            arr = np.asarray(data, dtype=float)
             arr = arr[~np.isnan(arr)]
             
             if len(arr) < max_lag + 1:
@@ -242,12 +245,12 @@ class FrequencyFeatureExtractor:
         Returns:
             频域特征字典
         """
-        if not data or len(data) < 4:
+        if data is None or len(data) < 4:
             logger.warning("数据点太少，无法进行FFT分析")
             return {}
         
         try:
-            arr = np.array(data, dtype=float)
+            arr = np.asarray(data, dtype=float)
             arr = arr[~np.isnan(arr)]
             
             if len(arr) < 4:
@@ -340,7 +343,7 @@ class FeatureExtractor:
         Returns:
             特征字典
         """
-        if not data or len(data) == 0:
+        if data is None or len(data) == 0:
             logger.warning("数据为空，无法提取特征")
             return {}
         
@@ -369,7 +372,7 @@ class FeatureExtractor:
     
     def extract_features_batch(
         self,
-        data_dict: Dict[str, List[float]],
+        data_dict: Dict[str, Sequence[float]],
         **kwargs
     ) -> Dict[str, Dict[str, Any]]:
         """
@@ -393,6 +396,35 @@ class FeatureExtractor:
                 results[metric_name] = {}
         
         return results
+    
+    def extract_features_columnar(
+        self,
+        result: "ColumnarResult",
+        columns: Optional[Sequence[str]] = None,
+        **kwargs
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        从列式查询结果批量提取特征
+        
+        直接使用 TDengineClient.query_columnar 返回的列数组，空值替换为NaN后
+        由各提取器剔除，不再逐行构造Python对象。
+        
+        Args:
+            result: 列式查询结果
+            columns: 需要提取的列名，默认为全部数值列
+            **kwargs: 传递给extract_all_features的参数
+        
+        Returns:
+            {列名: 特征字典} 的字典
+        """
+        if columns is None:
+            columns = [
+                name for name in result.columns
+                if result.column(name).dtype.kind in "iuf"
+            ]
+        
+        data_dict = {name: result.to_float(name) for name in columns if name in result}
+        return self.extract_features_batch(data_dict, **kwargs)
 
 
 # 创建全局实例
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理执行器
+
+模型加载（joblib.load）和推理（sklearn / xgboost / statsmodels）都是同步的CPU计算，
+直接在 async 接口中执行会阻塞事件循环，期间其他API请求都无法处理。
+执行器把这些调用移出事件循环:
+
+- 线程池: 用于释放GIL的库（numpy / sklearn / xgboost），模型在主进程中加载，线程共享
+- 进程池: 用于以纯Python计算为主的库，每个工作进程是单进程的 ProcessPoolExecutor，
+  模型加载时预加载到每个工作进程，调用分发到进行中任务最少的进程
+- 有界队列: 排队和执行中的任务总数超过 max_queue_size 时直接拒绝（InferenceQueueFullError）
+- 按模型的并发上限: 同一模型同时执行的任务数不超过 max_concurrency_per_model，其余排队等待
+- 超时与取消: 超时（InferenceTimeoutError）或调用方取消时，未开始的任务被取消；
+  进程模式下已开始的任务所在进程被终止并重建，线程无法中断，任务结束前继续占用并发名额
+"""
+
+import asyncio
+import concurrent.futures
+import importlib
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, TYPE_CHECKING
+from loguru import logger
+
+from app.services.ai.inference_service import InferenceError
+
+if TYPE_CHECKING:
+    from app.services.ai.inference_service import BasePredictor
+
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+class InferenceQueueFullError(InferenceError):
+    """推理队列已满"""
+    pass
+
+
+class InferenceTimeoutError(InferenceError):
+    """推理超时"""
+    pass
+
+
+# 工作进程中的预测器: 模型键 -> 预测器
+_worker_predictors: Dict[Tuple, "BasePredictor"] = {}
+
+
+def _worker_predictor(spec: Tuple) -> "BasePredictor":
+    """获取工作进程中的预测器（未加载时按规格加载）"""
+    predictor = _worker_predictors.get(spec)
+    if predictor is None:
+        module_name, class_name, model_id, version_id, file_path = spec
+        predictor_class = getattr(importlib.import_module(module_name), class_name)
+        predictor = predictor_class(model_id, version_id)
+        if not predictor.load_model_sync(file_path):
+            raise InferenceError(f"工作进程加载模型失败: {file_path}")
+        _worker_predictors[spec] = predictor
+    return predictor
+
+
+class _ByteCounter:
+    """只统计写入字节数的文件对象"""
+    
+    def __init__(self):
+        self.size = 0
+    
+    def write(self, data) -> int:
+        size = memoryview(data).nbytes
+        self.size += size
+        return size
+
+
+def measure_model_bytes(model: Any, file_path: Optional[str] = None) -> int:
+    """
+    估算模型占用的内存（字节）
+    
+    以模型序列化后的大小估算（不生成序列化结果，只计数），numpy数组、树结构等
+    主要内存占用都会计入；无法序列化时使用模型文件大小。
+    """
+    try:
+        counter = _ByteCounter()
+        pickle.Pickler(counter, protocol=pickle.HIGHEST_PROTOCOL).dump(model)
+        return counter.size
+    except Exception:
+        if file_path and os.path.exists(file_path):
+            return os.path.getsize(file_path)
+        return 0
+
+
+def _load_and_measure(predictor: "BasePredictor", file_path: str) -> bool:
+    """加载模型并记录占用的内存"""
+    if not predictor.load_model_sync(file_path):
+        return False
+    predictor.size_bytes = measure_model_bytes(predictor.model, file_path)
+    return True
+
+
+def _worker_load(spec: Tuple) -> int:
+    """在工作进程中预加载模型，返回模型占用的内存（字节）"""
+    predictor = _worker_predictor(spec)
+    if not predictor.size_bytes:
+        predictor.size_bytes = measure_model_bytes(predictor.model, spec[4])
+    return predictor.size_bytes
+
+
+def _worker_call(spec: Tuple, method: str, payload: Any) -> Any:
+    """在工作进程中调用预测器方法"""
+    return getattr(_worker_predictor(spec), method)(payload)
+
+
+def _worker_release(model_id: int, version_id: Optional[int] = None) -> int:
+    """从工作进程中移除模型（version_id 为None时移除所有版本）"""
+    keys = [
+        spec for spec in _worker_predictors
+        if spec[2] == model_id and (version_id is None or spec[3] == version_id)
+    ]
+    for spec in keys:
+        del _worker_predictors[spec]
+    return len(keys)
+
+
+@dataclass
+class InferenceExecutorConfig:
+    """
+    推理执行器配置
+    
+    Attributes:
+        thread_workers: 线程池大小
+        process_workers: 工作进程数量（0表示不使用进程池，process模式的预测器改用线程池）
+        max_queue_size: 排队和执行中的任务总数上限
+        max_concurrency_per_model: 每个模型同时执行的任务数上限
+        timeout: 单次推理超时（秒）
+        load_timeout: 模型加载超时（秒）
+        modes: 按算法覆盖执行方式，例如 {"isolation_forest": "process"}
+    """
+    thread_workers: int = 4
+    process_workers: int = 2
+    max_queue_size: int = 256
+    max_concurrency_per_model: int = 4
+    timeout: float = 30.0
+    load_timeout: float = 300.0
+    modes: Dict[str, str] = field(default_factory=dict)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InferenceExecutorConfig":
+        """从字典创建"""
+        defaults = cls()
+        return cls(**{key: data.get(key, getattr(defaults, key)) for key in defaults.__dataclass_fields__})
+
+
+@dataclass
+class InferenceExecutorStatistics:
+    """
+    推理执行器统计
+    
+    Attributes:
+        submitted: 提交的任务数
+        completed: 成功完成的任务数
+        failed: 执行出错的任务数
+        rejected: 因队列已满被拒绝的任务数
+        timeouts: 超时的任务数
+        cancelled: 被调用方取消的任务数
+        process_restarts: 因超时或取消重建工作进程的次数
+        avg_wait_ms: 排队等待时间的滑动平均（毫秒）
+        avg_run_ms: 执行时间的滑动平均（毫秒）
+    """
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    cancelled: int = 0
+    process_restarts: int = 0
+    avg_wait_ms: float = 0.0
+    avg_run_ms: float = 0.0
+    
+    def record(self, wait_ms: float, run_ms: float):
+        """记录一次完成的任务"""
+        if self.completed == 0:
+            self.avg_wait_ms, self.avg_run_ms = wait_ms, run_ms
+        else:
+            self.avg_wait_ms = self.avg_wait_ms * 0.9 + wait_ms * 0.1
+            self.avg_run_ms = self.avg_run_ms * 0.9 + run_ms * 0.1
+        self.completed += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "process_restarts": self.process_restarts,
+            "avg_wait_ms": round(self.avg_wait_ms, 2),
+            "avg_run_ms": round(self.avg_run_ms, 2),
+        }
+
+
+class _ProcessWorker:
+    """单个工作进程（单进程的 ProcessPoolExecutor，便于定向预加载和终止）"""
+    
+    def __init__(self, index: int):
+        self.index = index
+        self.in_flight = 0
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+    
+    def submit(self, fn, *args) -> concurrent.futures.Future:
+        return self._pool.submit(fn, *args)
+    
+    def restart(self):
+        """
+        终止工作进程（中断正在执行的任务）并重建，模型在下次调用时按规格重新加载
+        
+        旧进程池中排队的任务随之取消，其调用方收到 InferenceError（见 InferenceExecutor._run）。
+        """
+        pool = self._pool
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+    
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceExecutor:
+    """
+    推理执行器
+    
+    使用示例:
+    ```python
+    executor = InferenceExecutor(InferenceExecutorConfig(process_workers=4, timeout=10))
+    predictor = ARIMAPredictor(model_id, version_id, executor=executor)
+    
+    await predictor.load_model(file_path)         # 预加载到每个工作进程
+    result = await predictor.predict(input_data)  # 超时抛出 InferenceTimeoutError
+    ```
+    """
+    
+    def __init__(self, config: Optional[InferenceExecutorConfig] = None):
+        """
+        初始化执行器
+        
+        Args:
+            config: 执行器配置（可选）
+        """
+        self._config = config or InferenceExecutorConfig()
+        self._threads: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._workers: List[_ProcessWorker] = []
+        # model_id -> 并发名额
+        self._model_limits: Dict[int, asyncio.Semaphore] = {}
+        # model_id -> 排队和执行中的任务数
+        self._model_pending: Dict[int, int] = {}
+        self._pending = 0
+        self._statistics = InferenceExecutorStatistics()
+    
+    @property
+    def config(self) -> InferenceExecutorConfig:
+        """获取执行器配置"""
+        return self._config
+    
+    @property
+    def statistics(self) -> InferenceExecutorStatistics:
+        """获取执行器统计"""
+        return self._statistics
+    
+    def mode_for(self, predictor: "BasePredictor") -> str:
+        """预测器的执行方式（配置覆盖优先；未启用进程池时为 thread）"""
+        mode = self._config.modes.get(predictor.algorithm, predictor.executor_mode)
+        if mode not in EXECUTOR_MODES:
+            raise InferenceError(f"不支持的执行方式: {mode}")
+        if mode == "process" and self._config.process_workers <= 0:
+            return "thread"
+        return mode
+    
+    # =====================================================
+    # 执行池
+    # =====================================================
+    
+    def _get_threads(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._config.thread_workers,
+                thread_name_prefix="inference"
+            )
+        return self._threads
+    
+    def _get_workers(self) -> List[_ProcessWorker]:
+        if not self._workers:
+            self._workers = [_ProcessWorker(i) for i in range(self._config.process_workers)]
+            logger.info(f"推理工作进程已启动: {len(self._workers)} 个")
+        return self._workers
+    
+    @staticmethod
+    def _spec(predictor: "BasePredictor", file_path: Optional[str] = None) -> Tuple:
+        """工作进程中的模型规格（同时作为工作进程中的缓存键）"""
+        cls = type(predictor)
+        return (cls.__module__, cls.__qualname__, predictor.model_id, predictor.version_id,
+                file_path or predictor.file_path)
+    
+    def _model_limit(self, model_id: int) -> asyncio.Semaphore:
+        limit = self._model_limits.get(model_id)
+        if limit is None:
+            limit = asyncio.Semaphore(self._config.max_concurrency_per_model)
+            self._model_limits[model_id] = limit
+        return limit
+    
+    # =====================================================
+    # 加载与调用
+    # =====================================================
+    
+    async def load(self, predictor: "BasePredictor", file_path: str) -> bool:
+        """
+        加载模型
+        
+        线程模式在线程池中调用 load_model_sync；进程模式预加载到每个工作进程，
+        主进程中的预测器不持有模型。加载后 predictor.size_bytes 为模型占用的内存
+        （进程模式为所有工作进程中的副本之和）。
+        
+        Returns:
+            bool: 加载是否成功
+        """
+        if not os.path.exists(file_path):
+            logger.error(f"模型文件不存在: {file_path}")
+            return False
+        
+        loop = asyncio.get_running_loop()
+        try:
+            async with asyncio.timeout(self._config.load_timeout):
+                if self.mode_for(predictor) == "thread":
+                    success = await loop.run_in_executor(self._get_threads(), _load_and_measure, predictor, file_path)
+                else:
+                    spec = self._spec(predictor, file_path)
+                    sizes = await asyncio.gather(*[
+                        asyncio.wrap_future(worker.submit(_worker_load, spec))
+                        for worker in self._get_workers()
+                    ])
+                    predictor.size_bytes = sum(sizes)
+                    predictor.is_loaded = True
+                    success = True
+        except TimeoutError:
+            logger.error(f"❌ 模型加载超时({self._config.load_timeout}s): {file_path}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ 模型加载失败: {e}")
+            return False
+        
+        if success:
+            predictor.file_path = file_path
+        return success
+    
+    async def call(self, predictor: "BasePredictor", method: str, payload: Any) -> Any:
+        """
+        在执行池中调用预测器的同步方法
+        
+        Args:
+            predictor: 预测器
+            method: 方法名（predict_sync / batch_predict_sync）
+            payload: 方法参数
+        
+        Raises:
+            InferenceQueueFullError: 排队和执行中的任务已达上限
+            InferenceTimeoutError: 超过 timeout 未完成（含排队时间）
+            InferenceError: 模型未加载或预测失败
+        """
+        if not predictor.is_loaded:
+            raise InferenceError("模型未加载")
+        if self._pending >= self._config.max_queue_size:
+            self._statistics.rejected += 1
+            raise InferenceQueueFullError(f"推理队列已满({self._config.max_queue_size})，请稍后重试")
+        
+        model_id = predictor.model_id
+        self._pending += 1
+        self._model_pending[model_id] = self._model_pending.get(model_id, 0) + 1
+        self._statistics.submitted += 1
+        queued_at = time.monotonic()
+        try:
+            async with asyncio.timeout(self._config.timeout):
+                return await self._run(predictor, method, payload, queued_at)
+        except TimeoutError:
+            self._statistics.timeouts += 1
+            raise InferenceTimeoutError(f"推理超时({self._config.timeout}s): model_id={model_id}")
+        except asyncio.CancelledError:
+            self._statistics.cancelled += 1
+            raise
+        except InferenceError:
+            self._statistics.failed += 1
+            raise
+        except Exception as e:
+            self._statistics.failed += 1
+            raise InferenceError(f"预测失败: {str(e)}")
+        finally:
+            self._pending -= 1
+            self._model_pending[model_id] -= 1
+    
+    async def _run(self, predictor: "BasePredictor", method: str, payload: Any, queued_at: float) -> Any:
+        """获取模型并发名额后提交到执行池"""
+        limit = self._model_limit(predictor.model_id)
+        await limit.acquire()
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        worker: Optional[_ProcessWorker] = None
+        
+        try:
+            if self.mode_for(predictor) == "thread":
+                future = self._get_threads().submit(getattr(predictor, method), payload)
+            else:
+                worker = min(self._get_workers(), key=lambda w: w.in_flight)
+                worker.in_flight += 1
+                future = worker.submit(_worker_call, self._spec(predictor), method, payload)
+        except BaseException:
+            # 提交失败（进程池已损坏、执行池正在关闭、方法不存在等）: 归还名额
+            limit.release()
+            if worker is not None:
+                worker.in_flight -= 1
+            raise
+        
+        def on_done(_):
+            # 并发名额在任务真正结束时释放（线程中的任务无法中断）
+            loop.call_soon_threadsafe(limit.release)
+            if worker is not None:
+                loop.call_soon_threadsafe(self._finish_worker_task, worker)
+        
+        future.add_done_callback(on_done)
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            task = asyncio.current_task()
+            if future.cancelled() and not (task is not None and task.cancelling()):
+                # 调用方未取消，是执行池取消了排队中的任务（其他请求取消时重建了工作进程，或执行池正在关闭）
+                raise InferenceError("推理任务被执行池取消（工作进程已重建），请重试") from None
+            # 超时或调用方取消: 未开始的任务直接取消，已开始的进程任务终止进程
+            if not future.cancel() and worker is not None and future.running():
+                logger.warning(f"推理任务被取消，重建工作进程 #{worker.index}")
+                worker.restart()
+                self._statistics.process_restarts += 1
+            raise
+        
+        self._statistics.record((started - queued_at) * 1000, (time.monotonic() - started) * 1000)
+        return result
+    
+    @staticmethod
+    def _finish_worker_task(worker: _ProcessWorker):
+        worker.in_flight -= 1
+    
+    def release(self, predictor: "BasePredictor"):
+        """
+        从工作进程中移除预测器的模型版本（卸载、淘汰或切换版本时调用）
+        
+        移除任务排在已提交的调用之后，不影响进行中的推理。
+        """
+        if not self._workers or self.mode_for(predictor) != "process":
+            return
+        for worker in self._workers:
+            worker.submit(_worker_release, predictor.model_id, predictor.version_id)
+    
+    # =====================================================
+    # 统计与关闭
+    # =====================================================
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取执行器状态
+        
+        Returns:
+            Dict: 配置、排队情况及统计
+        """
+        return {
+            "thread_workers": self._config.thread_workers,
+            "process_workers": len(self._workers),
+            "max_queue_size": self._config.max_queue_size,
+            "max_concurrency_per_model": self._config.max_concurrency_per_model,
+            "pending": self._pending,
+            "pending_by_model": {model_id: count for model_id, count in self._model_pending.items() if count},
+            "process_in_flight": [worker.in_flight for worker in self._workers],
+            **self._statistics.to_dict(),
+        }
+    
+    def shutdown(self):
+        """关闭线程池和工作进程"""
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        for worker in self._workers:
+            worker.shutdown()
+        self._workers = []
+        logger.info("推理执行器已关闭")
+
+
+# 全局推理执行器实例
+_inference_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """获取全局推理执行器（按 settings 中的 INFERENCE_* 配置创建）"""
+    global _inference_executor
+    if _inference_executor is None:
+        from app.settings import settings
+        
+        _inference_executor = InferenceExecutor(InferenceExecutorConfig(
+            thread_workers=settings.INFERENCE_THREAD_WORKERS,
+            process_workers=settings.INFERENCE_PROCESS_WORKERS,
+            max_queue_size=settings.INFERENCE_QUEUE_SIZE,
+            max_concurrency_per_model=settings.INFERENCE_MODEL_CONCURRENCY,
+            timeout=settings.INFERENCE_TIMEOUT,
+        ))
+    return _inference_executor
+
+
+def shutdown_inference_executor():
+    """关闭全局推理执行器（应用关闭时调用）"""
+    global _inference_executor
+    if _inference_executor is not None:
+        _inference_executor.shutdown()
+        _inference_executor = None
@@ -12,7 +12,7 @@
 
 import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from loguru import logger
 
@@ -31,20 +31,88 @@ class BasePredictor(ABC):
     """
     预测器基类 - 统一推理接口
     
-    所有具体预测器必须继承此类并实现抽象方法
+    所有具体预测器必须继承此类并实现同步的 load_model_sync / predict_sync。
+    异步接口 load_model / predict / batch_predict 通过推理执行器（InferenceExecutor）
+    在线程池或进程池中执行同步实现，不阻塞事件循环；executor_mode 指定默认的执行方式:
+    - thread: 释放GIL的库（numpy / sklearn / xgboost），模型加载在主进程
+    - process: 以纯Python计算为主的库（statsmodels），模型预加载到每个工作进程
     """
     
-    def __init__(self, model_id: int, version_id: int):
+    # 算法类型（对应 InferenceService.PREDICTOR_CLASSES 的键）
+    algorithm: str = ""
+    
+    # 默认执行方式: thread / process
+    executor_mode: str = "thread"
+    
+    def __init__(self, model_id: int, version_id: int, executor=None):
         self.model_id = model_id
         self.version_id = version_id
         self.model = None
         self.is_loaded = False
         self.model_info: Dict[str, Any] = {}
+        self.file_path: Optional[str] = None
+        # 模型占用的内存（字节，加载时由执行器测量）
+        self.size_bytes = 0
+        self._executor = executor
+    
+    @property
+    def executor(self):
+        """推理执行器（未指定时使用全局执行器）"""
+        if self._executor is None:
+            from app.services.ai.inference_executor import get_inference_executor
+            
+            self._executor = get_inference_executor()
+        return self._executor
+    
+    @staticmethod
+    def _mmap_mode(file_path: str) -> Optional[str]:
+        """
+        joblib.load 的 mmap_mode（本地制品缓存中的文件不可变，numpy数组以只读内存映射加载，
+        多个工作进程共享同一份页缓存）
+        """
+        try:
+            from ai_engine.model.artifact_cache import artifact_mmap_mode
+        except ImportError:
+            return None
+        return artifact_mmap_mode(file_path)
     
-    @abstractmethod
     async def load_model(self, file_path: str) -> bool:
         """
-        加载模型到内存
+        加载模型（在执行器中执行，进程模式下预加载到每个工作进程）
+        
+        Args:
+            file_path: 模型文件路径
+        
+        Returns:
+            bool: 加载是否成功
+        """
+        return await self.executor.load(self, file_path)
+    
+    async def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        执行单次预测（在执行器中执行）
+        
+        Raises:
+            InferenceError: 预测失败、排队已满或超时
+        """
+        return await self.executor.call(self, "predict_sync", input_data)
+    
+    async def batch_predict(self, input_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        批量预测（在执行器中执行）
+        
+        Args:
+            input_batch: 输入数据列表
+        
+        Returns:
+            预测结果列表
+        """
+        return await self.executor.call(self, "batch_predict_sync", input_batch)
+    
+    @abstractmethod
+    def load_model_sync(self, file_path: str) -> bool:
+        """
+        加载模型到内存（同步，在执行器的线程或工作进程中调用）
         
         Args:
             file_path: 模型文件路径
@@ -55,9 +123,9 @@ class BasePredictor(ABC):
         pass
     
     @abstractmethod
-    async def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_sync(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """
-        执行单次预测
+        执行单次预测（同步）
         
         Args:
             input_data: 输入数据
@@ -67,9 +135,9 @@ class BasePredictor(ABC):
         """
         pass
     
-    async def batch_predict(self, input_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def batch_predict_sync(self, input_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        批量预测
+        批量预测（同步，默认逐条调用 predict_sync）
         
         Args:
             input_batch: 输入数据列表
@@ -80,7 +148,7 @@ class BasePredictor(ABC):
         results = []
         for input_data in input_batch:
             try:
-                result = await self.predict(input_data)
+                result = self.predict_sync(input_data)
                 results.append(result)
             except Exception as e:
                 results.append({
@@ -89,8 +157,51 @@ class BasePredictor(ABC):
                 })
         return results
     
+    def _stack_features(
+        self,
+        input_batch: List[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[List[int], Any]], Dict[int, str]]:
+        """
+        提取批量输入的特征并堆叠为矩阵
+        
+        特征数相同的输入堆叠为同一个矩阵（通常只有一组），每组只需调用一次模型。
+        
+        Args:
+            input_batch: 输入数据列表
+        
+        Returns:
+            Tuple: ([(输入下标列表, 特征矩阵), ...], {无法提取特征的输入下标: 错误信息})
+        """
+        import numpy as np
+        
+        groups: Dict[int, Tuple[List[int], List[List[float]]]] = {}
+        errors: Dict[int, str] = {}
+        for index, input_data in enumerate(input_batch):
+            features = self._extract_features(input_data)
+            if not features:
+                errors[index] = "无法从输入数据提取特征"
+                continue
+            indices, rows = groups.setdefault(len(features), ([], []))
+            indices.append(index)
+            rows.append(features)
+        
+        return [
+            (indices, np.array(rows, dtype=np.float64))
+            for indices, rows in groups.values()
+        ], errors
+    
+    def release(self):
+        """
+        释放工作进程中的模型副本（缓存淘汰或切换版本时调用）
+        
+        不修改预测器状态，已取得该预测器的请求仍可完成；主进程中的模型随预测器一起回收。
+        """
+        if self._executor is not None:
+            self._executor.release(self)
+    
     def unload_model(self):
-        """卸载模型释放内存"""
+        """卸载模型释放内存（进程模式下同时从工作进程中移除）"""
+        self.release()
         self.model = None
         self.is_loaded = False
         logger.info(f"模型已卸载: model_id={self.model_id}")
@@ -103,7 +214,9 @@ class IsolationForestPredictor(BasePredictor):
     用于检测设备数据中的异常模式
     """
     
-    async def load_model(self, file_path: str) -> bool:
+    algorithm = "isolation_forest"
+    
+    def load_model_sync(self, file_path: str) -> bool:
         """加载孤立森林模型"""
         try:
             import joblib
@@ -112,7 +225,7 @@ class IsolationForestPredictor(BasePredictor):
                 logger.error(f"模型文件不存在: {file_path}")
                 return False
             
-            self.model = joblib.load(file_path)
+            self.model = joblib.load(file_path, mmap_mode=self._mmap_mode(file_path))
             self.is_loaded = True
             
             logger.info(f"✅ 孤立森林模型加载成功: {file_path}")
@@ -125,7 +238,7 @@ class IsolationForestPredictor(BasePredictor):
             logger.error(f"❌ 模型加载失败: {e}")
             return False
     
-    async def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_sync(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """执行异常检测预测"""
         if not self.is_loaded or self.model is None:
             raise InferenceError("模型未加载")
@@ -137,31 +250,60 @@ class IsolationForestPredictor(BasePredictor):
             if not features:
                 raise InferenceError("无法从输入数据提取特征")
             
-            # 2. 执行预测
+            # 2. 执行预测（异常标签由分数得出，与 model.predict 一致，无需再遍历一次森林）
             import numpy as np
             features_array = np.array([features])
             
             anomaly_score = float(self.model.decision_function(features_array)[0])
-            prediction = int(self.model.predict(features_array)[0])
-            is_anomaly = prediction == -1
             
-            # 3. 计算置信度 (基于异常分数的绝对值)
-            confidence = min(abs(anomaly_score), 1.0)
-            
-            return {
-                "success": True,
-                "predicted_value": anomaly_score,
-                "is_anomaly": is_anomaly,
-                "anomaly_score": anomaly_score,
-                "confidence": confidence,
-                "prediction_time": datetime.now().isoformat(),
-                "algorithm": "isolation_forest"
-            }
+            return self._build_result(anomaly_score, datetime.now().isoformat())
             
         except Exception as e:
             logger.error(f"❌ 预测失败: {e}")
             raise InferenceError(f"预测失败: {str(e)}")
     
+    def batch_predict_sync(self, input_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        向量化批量异常检测
+        
+        所有输入的特征堆叠为一个矩阵，只调用一次 decision_function，
+        异常标签为 分数 < 0（即 IsolationForest.predict 的判定）。
+        """
+        if not self.is_loaded or self.model is None:
+            raise InferenceError("模型未加载")
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(input_batch)
+        groups, errors = self._stack_features(input_batch)
+        for index, error in errors.items():
+            results[index] = {"success": False, "error": error}
+        
+        prediction_time = datetime.now().isoformat()
+        for indices, features_matrix in groups:
+            try:
+                scores = self.model.decision_function(features_matrix).tolist()
+            except Exception as e:
+                logger.error(f"❌ 批量预测失败: {e}")
+                for index in indices:
+                    results[index] = {"success": False, "error": f"预测失败: {str(e)}"}
+                continue
+            for index, anomaly_score in zip(indices, scores):
+                results[index] = self._build_result(anomaly_score, prediction_time)
+        
+        return results
+    
+    def _build_result(self, anomaly_score: float, prediction_time: str) -> Dict[str, Any]:
+        """由异常分数构造预测结果"""
+        return {
+            "success": True,
+            "predicted_value": anomaly_score,
+            "is_anomaly": anomaly_score < 0,
+            "anomaly_score": anomaly_score,
+            # 置信度 (基于异常分数的绝对值)
+            "confidence": min(abs(anomaly_score), 1.0),
+            "prediction_time": prediction_time,
+            "algorithm": "isolation_forest"
+        }
+    
     def _extract_features(self, input_data: Dict[str, Any]) -> List[float]:
         """从输入数据提取特征向量"""
         features = []
@@ -181,7 +323,12 @@ class ARIMAPredictor(BasePredictor):
     用于预测设备指标的未来趋势
     """
     
-    async def load_model(self, file_path: str) -> bool:
+    algorithm = "arima"
+    
+    # statsmodels 预测以纯Python计算为主，在工作进程中执行
+    executor_mode = "process"
+    
+    def load_model_sync(self, file_path: str) -> bool:
         """加载ARIMA模型"""
         try:
             import joblib
@@ -190,7 +337,7 @@ class ARIMAPredictor(BasePredictor):
                 logger.error(f"模型文件不存在: {file_path}")
                 return False
             
-            self.model = joblib.load(file_path)
+            self.model = joblib.load(file_path, mmap_mode=self._mmap_mode(file_path))
             self.is_loaded = True
             
             logger.info(f"✅ ARIMA模型加载成功: {file_path}")
@@ -203,7 +350,7 @@ class ARIMAPredictor(BasePredictor):
             logger.error(f"❌ ARIMA模型加载失败: {e}")
             return False
     
-    async def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_sync(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """执行时间序列预测"""
         if not self.is_loaded or self.model is None:
             raise InferenceError("模型未加载")
@@ -257,7 +404,9 @@ class XGBoostPredictor(BasePredictor):
     用于回归和分类预测任务
     """
     
-    async def load_model(self, file_path: str) -> bool:
+    algorithm = "xgboost"
+    
+    def load_model_sync(self, file_path: str) -> bool:
         """加载XGBoost模型"""
         try:
             import joblib
@@ -266,7 +415,7 @@ class XGBoostPredictor(BasePredictor):
                 logger.error(f"模型文件不存在: {file_path}")
                 return False
             
-            self.model = joblib.load(file_path)
+            self.model = joblib.load(file_path, mmap_mode=self._mmap_mode(file_path))
             self.is_loaded = True
             
             logger.info(f"✅ XGBoost模型加载成功: {file_path}")
@@ -279,7 +428,7 @@ class XGBoostPredictor(BasePredictor):
             logger.error(f"❌ XGBoost模型加载失败: {e}")
             return False
     
-    async def predict(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+    def predict_sync(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """执行XGBoost预测"""
         if not self.is_loaded or self.model is None:
             raise InferenceError("模型未加载")
@@ -320,6 +469,51 @@ class XGBoostPredictor(BasePredictor):
             logger.error(f"❌ XGBoost预测失败: {e}")
             raise InferenceError(f"XGBoost预测失败: {str(e)}")
     
+    def batch_predict_sync(self, input_batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        向量化批量预测
+        
+        所有输入的特征堆叠为一个矩阵，predict 和 predict_proba 各调用一次。
+        """
+        if not self.is_loaded or self.model is None:
+            raise InferenceError("模型未加载")
+        
+        import numpy as np
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(input_batch)
+        groups, errors = self._stack_features(input_batch)
+        for index, error in errors.items():
+            results[index] = {"success": False, "error": error}
+        
+        prediction_time = datetime.now().isoformat()
+        for indices, features_matrix in groups:
+            try:
+                predicted_values = np.asarray(self.model.predict(features_matrix), dtype=np.float64).tolist()
+            except Exception as e:
+                logger.error(f"❌ XGBoost批量预测失败: {e}")
+                for index in indices:
+                    results[index] = {"success": False, "error": f"XGBoost预测失败: {str(e)}"}
+                continue
+            
+            # 尝试获取预测概率（分类任务）
+            confidences = [0.0] * len(indices)
+            try:
+                if hasattr(self.model, 'predict_proba'):
+                    confidences = np.max(self.model.predict_proba(features_matrix), axis=1).tolist()
+            except Exception:
+                confidences = [0.8] * len(indices)  # 默认置信度
+            
+            for index, predicted_value, confidence in zip(indices, predicted_values, confidences):
+                results[index] = {
+                    "success": True,
+                    "predicted_value": predicted_value,
+                    "confidence": confidence,
+                    "prediction_time": prediction_time,
+                    "algorithm": "xgboost"
+                }
+        
+        return results
+    
     def _extract_features(self, input_data: Dict[str, Any]) -> List[float]:
         """从输入数据提取特征向量"""
         features = []
@@ -348,8 +542,32 @@ class InferenceService:
         "xgboost": XGBoostPredictor
     }
     
-    def __init__(self):
-        self._predictors: Dict[int, BasePredictor] = {}
+    def __init__(self, cache_config=None, batcher_config=None):
+        """
+        Args:
+            cache_config: 预测器缓存配置（PredictorCacheConfig，默认按 settings 中的 INFERENCE_CACHE_* 配置）
+            batcher_config: 微批处理配置（MicroBatcherConfig，默认按 settings 中的 INFERENCE_BATCH_* 配置，
+                未启用时 predict_batched 直接调用 predict）
+        """
+        from app.services.ai.predictor_cache import PredictorCache, PredictorCacheConfig
+        from app.services.ai.micro_batcher import InferenceMicroBatcher, MicroBatcherConfig
+        
+        if cache_config is None or batcher_config is None:
+            from app.settings import settings
+            
+            if cache_config is None:
+                cache_config = PredictorCacheConfig(
+                    max_bytes=settings.INFERENCE_CACHE_MAX_MB * 1024 ** 2,
+                    ttl=settings.INFERENCE_CACHE_TTL,
+                    idle_ttl=settings.INFERENCE_CACHE_IDLE_TTL,
+                )
+            if batcher_config is None and settings.INFERENCE_BATCH_ENABLED:
+                batcher_config = MicroBatcherConfig(
+                    max_batch_size=settings.INFERENCE_BATCH_MAX_SIZE,
+                    max_wait_ms=settings.INFERENCE_BATCH_MAX_WAIT_MS,
+                )
+        self._cache = PredictorCache(cache_config)
+        self._batcher = InferenceMicroBatcher(self.batch_predict, batcher_config) if batcher_config else None
     
     async def predict(
         self, 
@@ -413,6 +631,34 @@ class InferenceService:
                 "error": f"预测失败: {str(e)}"
             }
     
+    async def predict_batched(
+        self,
+        model_id: int,
+        asset_id: int,
+        input_data: Dict[str, Any],
+        persist: bool = True
+    ) -> Dict[str, Any]:
+        """
+        通过微批处理器执行单个预测（实时逐点调用使用）
+        
+        同一模型的并发请求在 max_wait_ms 内合并为一次 batch_predict（一次向量化模型调用、
+        一次批量持久化），返回 batch_predict 的单条结果: 成功时与 predict 结构相同，
+        预测器返回失败时为 {"success": False, "error": ...}（predict 包装为 success=True）。
+        与 predict 一样不抛出异常。未启用微批处理时直接调用 predict。
+        
+        Args:
+            model_id: 模型ID
+            asset_id: 资产ID
+            input_data: 输入数据
+            persist: 是否持久化结果
+        
+        Returns:
+            预测结果字典
+        """
+        if self._batcher is None:
+            return await self.predict(model_id, asset_id, input_data, persist=persist)
+        return await self._batcher.submit(model_id, asset_id, input_data, persist=persist)
+    
     async def batch_predict(
         self,
         model_id: int,
@@ -422,34 +668,76 @@ class InferenceService:
         """
         批量预测
         
+        整批输入交给预测器的 batch_predict（孤立森林、XGBoost为一次向量化模型调用），
+        成功的结果一次批量写入PostgreSQL和TDengine。
+        
         Args:
             model_id: 模型ID
             predictions: 预测请求列表，每个包含 asset_id 和 input_data
             persist: 是否持久化结果
         
         Returns:
-            预测结果列表
+            预测结果列表（与请求一一对应）
         """
-        results = []
+        results: List[Optional[Dict[str, Any]]] = [None] * len(predictions)
+        pending: List[Tuple[int, int, Dict[str, Any]]] = []
         
-        for pred_request in predictions:
+        for index, pred_request in enumerate(predictions):
             asset_id = pred_request.get("asset_id")
             input_data = pred_request.get("input_data", {})
             
             if not asset_id:
-                results.append({
+                results[index] = {
                     "success": False,
                     "error": "缺少 asset_id"
-                })
+                }
                 continue
+            pending.append((index, asset_id, input_data))
+        
+        if not pending:
+            return results
+        
+        try:
+            # 1. 获取预测器
+            predictor = await self._get_predictor(model_id)
+            if not predictor:
+                error = {
+                    "success": False,
+                    "error": f"无法获取模型 {model_id} 的预测器"
+                }
+                for index, _, _ in pending:
+                    results[index] = dict(error)
+                return results
             
-            result = await self.predict(
-                model_id=model_id,
-                asset_id=asset_id,
-                input_data=input_data,
-                persist=persist
-            )
-            results.append(result)
+            # 2. 执行批量预测
+            prediction_results = await predictor.batch_predict([input_data for _, _, input_data in pending])
+            
+        except Exception as e:
+            logger.error(f"❌ 批量预测失败: {e}")
+            message = str(e) if isinstance(e, InferenceError) else f"预测失败: {str(e)}"
+            for index, _, _ in pending:
+                results[index] = {"success": False, "error": message}
+            return results
+        
+        to_save: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+        for (index, asset_id, input_data), prediction_result in zip(pending, prediction_results):
+            if not prediction_result.get("success"):
+                results[index] = {
+                    "success": False,
+                    "error": prediction_result.get("error", "预测失败")
+                }
+                continue
+            results[index] = {
+                "success": True,
+                "model_id": model_id,
+                "asset_id": asset_id,
+                "prediction": prediction_result
+            }
+            to_save.append((asset_id, input_data, prediction_result))
+        
+        # 3. 批量持久化预测结果
+        if persist and to_save:
+            await self._save_predictions(model_id, predictor.version_id, to_save)
         
         return results
     
@@ -507,15 +795,42 @@ class InferenceService:
         ]
     
     async def _get_predictor(self, model_id: int) -> Optional[BasePredictor]:
-        """获取或创建预测器实例"""
+        """获取预测器实例（缓存未命中时加载，同一模型的并发请求只加载一次）"""
+        return await self._cache.get(model_id, lambda current: self._load_predictor(model_id, current))
+    
+    def _release_removed(self, model_id: int):
+        """从缓存移除预测器并释放其工作进程中的模型副本（刷新时发现模型已停用或无生产版本）"""
+        removed = self._cache.remove(model_id)
+        if removed is not None:
+            removed.release()
+    
+    def warm_model(self, model_id: int):
+        """
+        后台预加载模型的生产版本并原子替换缓存中的预测器
         
-        # 检查缓存
-        if model_id in self._predictors:
-            predictor = self._predictors[model_id]
-            if predictor.is_loaded:
-                return predictor
+        在激活新版本后调用，加载完成前请求继续使用旧版本，不会遇到冷加载。
         
-        # 创建新的预测器
+        Returns:
+            Optional[asyncio.Task]: 预加载任务
+        """
+        logger.info(f"后台预加载模型: {model_id}")
+        return self._cache.schedule_refresh(model_id, lambda current: self._load_predictor(model_id, current))
+    
+    async def _load_predictor(
+        self,
+        model_id: int,
+        current: Optional[BasePredictor] = None
+    ) -> Optional[BasePredictor]:
+        """
+        加载模型生产版本的预测器
+        
+        Args:
+            model_id: 模型ID
+            current: 当前缓存的预测器，生产版本未变化时直接返回它
+        
+        Returns:
+            Optional[BasePredictor]: 预测器，失败时为None
+        """
         from app.models.platform_upgrade import AIModel, AIModelVersion
         
         try:
@@ -527,6 +842,8 @@ class InferenceService:
             
             if not model.is_active:
                 logger.error(f"模型未激活: {model_id}")
+                if current is not None:
+                    self._release_removed(model_id)
                 return None
             
             # 获取生产版本
@@ -536,8 +853,13 @@ class InferenceService:
             )
             if not version:
                 logger.error(f"模型没有生产版本: {model_id}")
+                if current is not None:
+                    self._release_removed(model_id)
                 return None
             
+            if current is not None and current.version_id == version.id and current.is_loaded:
+                return current
+            
             # 创建预测器
             predictor_class = self.PREDICTOR_CLASSES.get(model.algorithm)
             if not predictor_class:
@@ -557,9 +879,6 @@ class InferenceService:
                 logger.error(f"模型加载失败: {model_id}")
                 return None
             
-            # 缓存预测器
-            self._predictors[model_id] = predictor
-            
             return predictor
             
         except Exception as e:
@@ -572,7 +891,8 @@ class InferenceService:
         
         需求: 2.4 - 激活模型版本时，推理服务应从存储后端加载实际模型文件
         
-        优先从存储后端加载，如果存储后端有文件则下载到临时目录。
+        优先从存储后端加载，如果存储后端有文件则按版本的 file_hash 从本地制品缓存获取，
+        未缓存时下载到缓存。
         如果存储后端没有文件，则使用本地文件路径。
         
         Args:
@@ -591,11 +911,13 @@ class InferenceService:
                     from ai_engine.model import get_model_storage_service
                     
                     storage_service = get_model_storage_service()
+                    file_hash = getattr(version, 'file_hash', None)
                     
-                    # 检查文件是否存在于存储后端
-                    if await storage_service.model_exists(storage_path):
-                        # 下载到临时目录
-                        local_path = await storage_service.load_model_to_temp(storage_path)
+                    # 已在本地制品缓存中时无需访问存储后端，否则检查文件是否存在于存储后端
+                    if (storage_service.is_model_cached(storage_path, file_hash)
+                            or await storage_service.model_exists(storage_path)):
+                        # 按校验和从本地缓存获取，未缓存时分块下载并校验
+                        local_path = await storage_service.load_model_to_temp(storage_path, checksum=file_hash)
                         logger.info(f"✅ 从存储后端加载模型: {storage_path} -> {local_path}")
                         return local_path
                     else:
@@ -697,6 +1019,122 @@ class InferenceService:
             logger.error(f"❌ 保存预测结果失败: {e}")
             # 不抛出异常，预测结果保存失败不影响预测本身
     
+    async def _save_predictions(
+        self,
+        model_id: int,
+        version_id: int,
+        items: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]
+    ):
+        """
+        批量保存预测结果
+        
+        资产和模型版本各查询一次，通过PredictionStore.save_predictions一次写入双存储；
+        不存在的资产只写PostgreSQL。
+        
+        Args:
+            model_id: 模型ID
+            version_id: 模型版本ID
+            items: [(资产ID, 输入数据, 预测结果), ...]
+        """
+        try:
+            from app.models.platform_upgrade import Asset, AIModelVersion
+            
+            asset_ids = list({asset_id for asset_id, _, _ in items})
+            assets = {
+                asset.id: asset
+                for asset in await Asset.filter(id__in=asset_ids).prefetch_related("category")
+            }
+            version = await AIModelVersion.get_or_none(id=version_id)
+            
+            stored = []
+            fallback = []
+            for asset_id, input_data, result in items:
+                asset = assets.get(asset_id)
+                if asset is None or version is None:
+                    fallback.append((asset_id, input_data, result))
+                    continue
+                stored.append({
+                    "asset_id": asset_id,
+                    "asset_code": asset.code,
+                    "category_code": asset.category.code if asset.category else "default",
+                    "prediction_result": {
+                        "predicted_value": result.get("predicted_value", 0.0),
+                        "confidence": result.get("confidence", 0.0),
+                        "is_anomaly": result.get("is_anomaly"),
+                        "anomaly_score": result.get("anomaly_score"),
+                        "prediction_details": result,
+                        "input_data": input_data,
+                    }
+                })
+            
+            if fallback:
+                logger.warning(
+                    f"{len(fallback)} 条预测的资产或模型版本不存在，仅保存到PostgreSQL: model={model_id}"
+                )
+            
+            if stored:
+                try:
+                    from ai_engine.inference.prediction_store import get_prediction_store
+                    
+                    pg_success, td_success = await get_prediction_store().save_predictions(
+                        model_id=model_id,
+                        model_version=version.version,
+                        predictions=stored
+                    )
+                    
+                    if not pg_success:
+                        logger.warning(f"⚠️ PostgreSQL批量写入失败: model={model_id}, count={len(stored)}")
+                    if not td_success:
+                        logger.warning(f"⚠️ TDengine批量写入失败（不影响主流程）: model={model_id}, count={len(stored)}")
+                        
+                except ImportError:
+                    logger.warning("PredictionStore模块未安装，使用传统方式保存")
+                    fallback.extend(
+                        (entry["asset_id"], entry["prediction_result"]["input_data"],
+                         entry["prediction_result"]["prediction_details"])
+                        for entry in stored
+                    )
+            
+            if fallback:
+                await self._save_predictions_postgresql_only(version_id, fallback)
+            
+        except Exception as e:
+            logger.error(f"❌ 批量保存预测结果失败: {e}")
+            # 不抛出异常，预测结果保存失败不影响预测本身
+    
+    async def _save_predictions_postgresql_only(
+        self,
+        version_id: int,
+        items: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]
+    ):
+        """批量保存到PostgreSQL（回退方案，一次bulk_create）"""
+        from app.models.platform_upgrade import AIPrediction
+        
+        try:
+            prediction_time = datetime.now()
+            target_time = prediction_time + timedelta(hours=1)
+            
+            await AIPrediction.bulk_create([
+                AIPrediction(
+                    model_version_id=version_id,
+                    asset_id=asset_id,
+                    input_data=input_data,
+                    predicted_value=result.get("predicted_value", 0.0),
+                    confidence=result.get("confidence", 0.0),
+                    is_anomaly=result.get("is_anomaly"),
+                    anomaly_score=result.get("anomaly_score"),
+                    prediction_time=prediction_time,
+                    target_time=target_time,
+                    prediction_details=result
+                )
+                for asset_id, input_data, result in items
+            ], batch_size=1000)
+            
+            logger.debug(f"✅ 预测结果已批量保存到PostgreSQL: {len(items)} 条")
+            
+        except Exception as e:
+            logger.error(f"❌ PostgreSQL批量保存失败: {e}")
+    
     async def _save_prediction_postgresql_only(
         self,
         version_id: int,
@@ -741,15 +1179,22 @@ class InferenceService:
             model_id: 指定模型ID，为None时清除所有缓存
         """
         if model_id:
-            if model_id in self._predictors:
-                self._predictors[model_id].unload_model()
-                del self._predictors[model_id]
+            predictor = self._cache.remove(model_id)
+            if predictor is not None:
+                predictor.unload_model()
                 logger.info(f"已清除模型 {model_id} 的预测器缓存")
         else:
-            for predictor in self._predictors.values():
+            for predictor in self._cache.clear():
                 predictor.unload_model()
-            self._predictors.clear()
             logger.info("已清除所有预测器缓存")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取预测器缓存状态"""
+        return self._cache.get_stats()
+    
+    def get_batcher_stats(self) -> Optional[Dict[str, Any]]:
+        """获取微批处理状态（未启用时为None）"""
+        return self._batcher.get_stats() if self._batcher is not None else None
 
 
 # 全局推理服务实例
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理微批处理器
+
+实时调用方每次只预测一个资产，逐个调用时每个请求都是一次模型调用和一次写库。
+微批处理器收集同一模型的并发请求，合并为一次 InferenceService.batch_predict
+（一次向量化模型调用、一次批量写库），再把结果分发给各请求:
+
+- 按 (模型, 是否持久化) 分队列，队列达到 max_batch_size 条或第一条请求等待满
+  max_wait_ms 时提交
+- 自适应等待: 按请求到达间隔的滑动平均估计流量，间隔大于 max_wait_ms 时
+  等待也凑不成批，请求直接提交，低流量时不增加延迟
+- 调用方取消的请求在提交时跳过；批量调用出错时该批所有请求收到同一个失败结果
+  （{"success": False, "error": ...}），与 InferenceService.predict 一样不抛出异常
+- 统计请求延迟、排队等待和批大小的直方图
+"""
+
+import asyncio
+import bisect
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+from loguru import logger
+
+
+# 批量预测函数: (model_id, 预测请求列表, 是否持久化) -> 与请求一一对应的结果列表
+BatchPredictFn = Callable[[int, List[Dict[str, Any]], bool], Awaitable[List[Dict[str, Any]]]]
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+@dataclass
+class MicroBatcherConfig:
+    """
+    微批处理器配置
+    
+    Attributes:
+        max_batch_size: 单批最大请求数
+        max_wait_ms: 第一条请求的最长等待时间（毫秒）
+        adaptive: 是否按到达间隔自适应（低流量时直接提交）
+    """
+    max_batch_size: int = 64
+    max_wait_ms: float = 5.0
+    adaptive: bool = True
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MicroBatcherConfig":
+        """从字典创建"""
+        defaults = cls()
+        return cls(**{key: data.get(key, getattr(defaults, key)) for key in defaults.__dataclass_fields__})
+
+
+class Histogram:
+    """固定分桶直方图（每个桶统计小于等于上界的值，最后一个桶为超出所有上界的值）"""
+    
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+    
+    def observe(self, value: float):
+        """记录一个值"""
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._count += 1
+        self._sum += value
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """按分桶估算分位数（返回所在桶的上界，超出所有上界时为None）"""
+        if not self._count:
+            return None
+        target = q * self._count
+        cumulative = 0
+        for bound, count in zip(self._buckets, self._counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        labels = [f"<={bound}" for bound in self._buckets] + [f">{self._buckets[-1]}"]
+        return {
+            "count": self._count,
+            "avg": round(self._sum / self._count, 2) if self._count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip(labels, self._counts)),
+        }
+
+
+@dataclass
+class MicroBatcherStatistics:
+    """
+    微批处理器统计
+    
+    Attributes:
+        requests: 提交的请求数
+        batches: 提交的批次数
+        direct: 低流量时未等待直接提交的批次数
+        full_batches: 因达到最大批大小提交的批次数
+        cancelled: 提交前被调用方取消的请求数
+        failed_batches: 批量调用出错的批次数
+    """
+    requests: int = 0
+    batches: int = 0
+    direct: int = 0
+    full_batches: int = 0
+    cancelled: int = 0
+    failed_batches: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "direct": self.direct,
+            "full_batches": self.full_batches,
+            "cancelled": self.cancelled,
+            "failed_batches": self.failed_batches,
+        }
+
+
+class _PendingRequest:
+    """排队中的请求"""
+    
+    __slots__ = ("request", "future", "queued_at")
+    
+    def __init__(self, request: Dict[str, Any], future: asyncio.Future):
+        self.request = request
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class _BatchQueue:
+    """单个 (模型, 是否持久化) 的请求队列"""
+    
+    __slots__ = ("items", "timer", "last_arrival", "interval")
+    
+    def __init__(self):
+        self.items: List[_PendingRequest] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.last_arrival: Optional[float] = None
+        # 请求到达间隔的滑动平均（秒）
+        self.interval: Optional[float] = None
+    
+    def arrive(self, now: float):
+        """记录一次请求到达"""
+        if self.last_arrival is not None:
+            gap = now - self.last_arrival
+            self.interval = gap if self.interval is None else self.interval * 0.8 + gap * 0.2
+        self.last_arrival = now
+
+
+class InferenceMicroBatcher:
+    """
+    推理微批处理器
+    
+    使用示例:
+    ```python
+    batcher = InferenceMicroBatcher(inference_service.batch_predict, MicroBatcherConfig(max_wait_ms=2))
+    
+    # 成功时与 InferenceService.predict 结构相同，失败时为 {"success": False, "error": ...}
+    result = await batcher.submit(model_id, asset_id, input_data)
+    ```
+    """
+    
+    def __init__(self, batch_predict: BatchPredictFn, config: Optional[MicroBatcherConfig] = None):
+        """
+        初始化微批处理器
+        
+        Args:
+            batch_predict: 批量预测函数
+            config: 微批处理配置（可选）
+        """
+        self._batch_predict = batch_predict
+        self._config = config or MicroBatcherConfig()
+        self._queues: Dict[Tuple[int, bool], _BatchQueue] = {}
+        self._tasks: set = set()
+        self._statistics = MicroBatcherStatistics()
+        self._latency = Histogram(LATENCY_BUCKETS_MS)
+        self._queue_wait = Histogram(LATENCY_BUCKETS_MS)
+        self._batch_size = Histogram(BATCH_SIZE_BUCKETS)
+    
+    @property
+    def config(self) -> MicroBatcherConfig:
+        """获取微批处理配置"""
+        return self._config
+    
+    @property
+    def statistics(self) -> MicroBatcherStatistics:
+        """获取统计"""
+        return self._statistics
+    
+    async def submit(
+        self,
+        model_id: int,
+        asset_id: int,
+        input_data: Dict[str, Any],
+        persist: bool = True
+    ) -> Dict[str, Any]:
+        """
+        提交单个预测请求，等待所在批次完成
+        
+        Args:
+            model_id: 模型ID
+            asset_id: 资产ID
+            input_data: 输入数据
+            persist: 是否持久化结果
+        
+        Returns:
+            预测结果字典，与 batch_predict 的单条结果相同: 成功时为
+            {"success": True, "model_id", "asset_id", "prediction"}（与 predict 相同）；
+            预测器返回失败或批量调用出错时为 {"success": False, "error": ...}
+            （predict 对预测器返回的失败仍包装为 success=True），不抛出异常
+        """
+        loop = asyncio.get_running_loop()
+        key = (model_id, persist)
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = _BatchQueue()
+        
+        now = time.monotonic()
+        queue.arrive(now)
+        pending = _PendingRequest({"asset_id": asset_id, "input_data": input_data}, loop.create_future())
+        queue.items.append(pending)
+        self._statistics.requests += 1
+        
+        if len(queue.items) >= self._config.max_batch_size:
+            self._statistics.full_batches += 1
+            self._flush(key)
+        elif len(queue.items) == 1:
+            if self._config.adaptive and (queue.interval is None or queue.interval * 1000 > self._config.max_wait_ms):
+                # 等待期间预计没有其他请求到达
+                self._statistics.direct += 1
+                self._flush(key)
+            else:
+                queue.timer = loop.call_later(self._config.max_wait_ms / 1000, self._flush, key)
+        
+        try:
+            return await pending.future
+        finally:
+            self._latency.observe((time.monotonic() - now) * 1000)
+    
+    def _flush(self, key: Tuple[int, bool]):
+        """提交队列中的请求"""
+        queue = self._queues.get(key)
+        if queue is None or not queue.items:
+            return
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        
+        items, queue.items = queue.items, []
+        task = asyncio.get_running_loop().create_task(self._run(key, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, key: Tuple[int, bool], items: List[_PendingRequest]):
+        """执行一批请求并分发结果"""
+        model_id, persist = key
+        now = time.monotonic()
+        
+        active = []
+        for item in items:
+            if item.future.done():
+                self._statistics.cancelled += 1
+                continue
+            self._queue_wait.observe((now - item.queued_at) * 1000)
+            active.append(item)
+        if not active:
+            return
+        
+        self._statistics.batches += 1
+        self._batch_size.observe(len(active))
+        try:
+            results = await self._batch_predict(model_id, [item.request for item in active], persist)
+        except Exception as e:
+            self._statistics.failed_batches += 1
+            logger.error(f"❌ 微批预测失败: model_id={model_id}, batch={len(active)}, {e}")
+            for item in active:
+                if not item.future.done():
+                    item.future.set_result({"success": False, "error": f"预测失败: {str(e)}"})
+            return
+        
+        for item, result in zip(active, results):
+            if not item.future.done():
+                item.future.set_result(result)
+    
+    async def drain(self):
+        """提交所有排队中的请求并等待进行中的批次完成（关闭前调用）"""
+        for key in list(self._queues):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取微批处理状态
+        
+        Returns:
+            Dict: 配置、排队数、统计及延迟/批大小直方图
+        """
+        return {
+            "max_batch_size": self._config.max_batch_size,
+            "max_wait_ms": self._config.max_wait_ms,
+            "queued": sum(len(queue.items) for queue in self._queues.values()),
+            "running_batches": len(self._tasks),
+            **self._statistics.to_dict(),
+            "latency_ms": self._latency.to_dict(),
+            "queue_wait_ms": self._queue_wait.to_dict(),
+            "batch_size": self._batch_size.to_dict(),
+        }
@@ -60,8 +60,21 @@ class ModelRegistry:
         "archived": "已归档"
     }
     
-    def __init__(self):
-        self._predictors_cache: Dict[int, Any] = {}
+    def _notify_inference_service(self, model_id: int, activated: bool):
+        """
+        通知推理服务模型版本变化
+        
+        激活时后台预加载新版本并原子替换（请求不会遇到冷加载），停用时清除缓存。
+        """
+        try:
+            from app.services.ai.inference_service import inference_service
+            
+            if activated:
+                inference_service.warm_model(model_id)
+            else:
+                inference_service.clear_predictor_cache(model_id)
+        except Exception as e:
+            logger.warning(f"通知推理服务失败: model_id={model_id}, {e}")
     
     async def register_model(self, model_data: Dict[str, Any]) -> int:
         """
@@ -266,9 +279,8 @@ class ModelRegistry:
             model.status = "deployed"
             await model.save()
             
-            # 7. 清除预测器缓存
-            if model_id in self._predictors_cache:
-                del self._predictors_cache[model_id]
+            # 7. 推理服务后台预加载新版本，加载完成后替换缓存的预测器
+            self._notify_inference_service(model_id, activated=True)
             
             logger.info(f"✅ 模型版本激活成功: {model.name} v{version}")
             return True
@@ -304,9 +316,8 @@ class ModelRegistry:
             model.is_active = False
             await model.save()
             
-            # 清除缓存
-            if model_id in self._predictors_cache:
-                del self._predictors_cache[model_id]
+            # 清除推理服务缓存的预测器
+            self._notify_inference_service(model_id, activated=False)
             
             logger.info(f"✅ 模型已停用: {model.name}")
             return True
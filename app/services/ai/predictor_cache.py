@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预测器缓存
+
+按模型ID缓存已加载的预测器:
+
+- 按模型占用内存的LRU: 缓存总量超过 max_bytes 时淘汰最久未使用的预测器
+  （占用量在加载时测量，见 BasePredictor.size_bytes）
+- 空闲淘汰: 超过 idle_ttl 未被使用的预测器被淘汰
+- 过期刷新: 加载超过 ttl 的预测器在被使用时后台刷新（检查生产版本是否变化），
+  刷新期间继续使用旧预测器
+- 单飞加载: 同一模型并发的首次请求只加载一次，其余请求等待同一个加载结果
+- 热切换: 激活新版本时后台预加载，加载完成后原子替换缓存中的预测器，
+  请求不会遇到冷加载；被替换的预测器不修改状态，进行中的请求照常完成
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Callable, Awaitable, TYPE_CHECKING
+from loguru import logger
+
+if TYPE_CHECKING:
+    from app.services.ai.inference_service import BasePredictor
+
+
+# 加载函数: 参数为当前缓存的预测器（首次加载时为None），返回新预测器；
+# 返回当前预测器表示无需替换，返回None表示加载失败
+PredictorLoader = Callable[[Optional["BasePredictor"]], Awaitable[Optional["BasePredictor"]]]
+
+
+@dataclass
+class PredictorCacheConfig:
+    """
+    预测器缓存配置
+    
+    Attributes:
+        max_bytes: 缓存的模型总占用上限（字节），至少保留最近使用的一个预测器
+        ttl: 预测器加载后的有效期（秒），过期后使用时后台刷新，0表示不刷新
+        idle_ttl: 预测器空闲淘汰时间（秒），0表示不淘汰
+    """
+    max_bytes: int = 2 * 1024 ** 3
+    ttl: float = 300.0
+    idle_ttl: float = 3600.0
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PredictorCacheConfig":
+        """从字典创建"""
+        defaults = cls()
+        return cls(**{key: data.get(key, getattr(defaults, key)) for key in defaults.__dataclass_fields__})
+
+
+@dataclass
+class PredictorCacheStatistics:
+    """
+    预测器缓存统计
+    
+    Attributes:
+        hits: 命中次数
+        misses: 未命中次数（冷加载）
+        coalesced: 等待其他请求进行中的加载的次数（单飞）
+        loads: 加载成功次数（含刷新和预热）
+        load_failures: 加载失败次数
+        swaps: 替换为新版本预测器的次数
+        refreshes: 过期后台刷新次数
+        evictions: 因超出内存上限淘汰的次数
+        idle_evictions: 因空闲淘汰的次数
+    """
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    loads: int = 0
+    load_failures: int = 0
+    swaps: int = 0
+    refreshes: int = 0
+    evictions: int = 0
+    idle_evictions: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "load_failures": self.load_failures,
+            "swaps": self.swaps,
+            "refreshes": self.refreshes,
+            "evictions": self.evictions,
+            "idle_evictions": self.idle_evictions,
+        }
+
+
+class _CacheEntry:
+    """缓存条目"""
+    
+    __slots__ = ("predictor", "size_bytes", "loaded_at", "last_access")
+    
+    def __init__(self, predictor: "BasePredictor"):
+        now = time.monotonic()
+        self.predictor = predictor
+        # 写入时的占用，之后预测器重新测量也不影响缓存总量的计算
+        self.size_bytes = predictor.size_bytes
+        self.loaded_at = now
+        self.last_access = now
+
+
+class PredictorCache:
+    """
+    预测器缓存
+    
+    使用示例:
+    ```python
+    cache = PredictorCache(PredictorCacheConfig(max_bytes=512 * 1024 ** 2))
+    
+    predictor = await cache.get(model_id, loader)   # 未缓存时单飞加载
+    cache.schedule_refresh(model_id, loader)        # 激活新版本: 后台加载后原子替换
+    ```
+    """
+    
+    def __init__(self, config: Optional[PredictorCacheConfig] = None):
+        """
+        初始化缓存
+        
+        Args:
+            config: 缓存配置（可选）
+        """
+        self._config = config or PredictorCacheConfig()
+        # model_id -> 条目，按最近使用排序（最久未使用的在前）
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._size = 0
+        # model_id -> 进行中的首次加载
+        self._loading: Dict[int, asyncio.Future] = {}
+        # model_id -> 进行中的刷新任务
+        self._refreshing: Dict[int, asyncio.Task] = {}
+        # model_id -> 代次，移除或发起新刷新时递增，过时的加载结果不写入缓存
+        self._generations: Dict[int, int] = {}
+        self._statistics = PredictorCacheStatistics()
+    
+    @property
+    def config(self) -> PredictorCacheConfig:
+        """获取缓存配置"""
+        return self._config
+    
+    @property
+    def statistics(self) -> PredictorCacheStatistics:
+        """获取缓存统计"""
+        return self._statistics
+    
+    def __contains__(self, model_id: int) -> bool:
+        return model_id in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    # =====================================================
+    # 读取与加载
+    # =====================================================
+    
+    def peek(self, model_id: int) -> Optional["BasePredictor"]:
+        """获取缓存的预测器（不加载、不更新使用时间）"""
+        entry = self._entries.get(model_id)
+        return entry.predictor if entry is not None else None
+    
+    async def get(self, model_id: int, loader: PredictorLoader) -> Optional["BasePredictor"]:
+        """
+        获取预测器，未缓存时加载（同一模型的并发请求只加载一次）
+        
+        Args:
+            model_id: 模型ID
+            loader: 加载函数
+        
+        Returns:
+            Optional[BasePredictor]: 预测器，加载失败时为None
+        """
+        now = time.monotonic()
+        self._evict_idle(now)
+        
+        entry = self._entries.get(model_id)
+        if entry is not None and entry.predictor.is_loaded:
+            self._statistics.hits += 1
+            entry.last_access = now
+            self._entries.move_to_end(model_id)
+            if self._config.ttl and now - entry.loaded_at > self._config.ttl:
+                # 过期期间继续使用旧预测器，后台刷新
+                self._start_refresh(model_id, loader, stale=True)
+            return entry.predictor
+        
+        pending = self._loading.get(model_id)
+        if pending is not None:
+            self._statistics.coalesced += 1
+            return await asyncio.shield(pending)
+        
+        self._statistics.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[model_id] = future
+        generation = self._generations.get(model_id, 0)
+        predictor = None
+        try:
+            predictor = await self._load(model_id, loader, None)
+            if predictor is not None:
+                if self._generations.get(model_id, 0) == generation:
+                    self.put(model_id, predictor)
+                else:
+                    # 加载期间预测器被移除或发起了刷新，结果不写入缓存
+                    predictor.release()
+        finally:
+            self._loading.pop(model_id, None)
+            if not future.done():
+                future.set_result(predictor)
+        return predictor
+    
+    async def _load(
+        self,
+        model_id: int,
+        loader: PredictorLoader,
+        current: Optional["BasePredictor"]
+    ) -> Optional["BasePredictor"]:
+        """调用加载函数并记录统计（异常视为加载失败）"""
+        try:
+            predictor = await loader(current)
+        except Exception as e:
+            logger.error(f"❌ 预测器加载失败: model_id={model_id}, {e}")
+            predictor = None
+        if predictor is None:
+            self._statistics.load_failures += 1
+        elif predictor is not current:
+            self._statistics.loads += 1
+        return predictor
+    
+    # =====================================================
+    # 写入、刷新与淘汰
+    # =====================================================
+    
+    def put(self, model_id: int, predictor: "BasePredictor"):
+        """
+        写入（或原子替换）预测器
+        
+        替换时旧预测器只释放工作进程中的副本，不修改状态，已取得它的请求照常完成。
+        """
+        old = self._entries.pop(model_id, None)
+        if old is not None:
+            self._size -= old.size_bytes
+        
+        entry = _CacheEntry(predictor)
+        self._entries[model_id] = entry
+        self._size += entry.size_bytes
+        
+        if old is not None and old.predictor is not predictor:
+            self._statistics.swaps += 1
+            old.predictor.release()
+            logger.info(
+                f"🔄 预测器已切换: model_id={model_id}, version {old.predictor.version_id} -> {predictor.version_id}"
+            )
+        self._evict_oversize()
+    
+    def schedule_refresh(self, model_id: int, loader: PredictorLoader) -> Optional[asyncio.Task]:
+        """
+        后台加载并替换预测器（激活新版本时调用）
+        
+        加载完成前继续使用旧预测器；较晚发起的刷新优先，较早的加载结果被丢弃。
+        
+        Returns:
+            Optional[asyncio.Task]: 刷新任务（没有运行中的事件循环时为None）
+        """
+        return self._start_refresh(model_id, loader, stale=False)
+    
+    def _start_refresh(self, model_id: int, loader: PredictorLoader, stale: bool) -> Optional[asyncio.Task]:
+        task = self._refreshing.get(model_id)
+        if stale and task is not None and not task.done():
+            return task
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        
+        generation = self._generations.get(model_id, 0) + 1
+        self._generations[model_id] = generation
+        task = loop.create_task(self._refresh(model_id, loader, generation, stale))
+        self._refreshing[model_id] = task
+        task.add_done_callback(lambda done: self._refresh_done(model_id, done))
+        return task
+    
+    def _refresh_done(self, model_id: int, task: asyncio.Task):
+        if self._refreshing.get(model_id) is task:
+            del self._refreshing[model_id]
+    
+    async def _refresh(self, model_id: int, loader: PredictorLoader, generation: int, stale: bool) -> bool:
+        """加载并在代次未变化时替换"""
+        if stale:
+            self._statistics.refreshes += 1
+        current = self.peek(model_id)
+        predictor = await self._load(model_id, loader, current)
+        
+        if self._generations.get(model_id) != generation:
+            # 期间发起了新的刷新或预测器被移除
+            if predictor is not None and predictor is not current:
+                predictor.release()
+            return False
+        
+        entry = self._entries.get(model_id)
+        if predictor is None:
+            if entry is not None:
+                # 刷新失败时继续使用旧预测器，下个有效期后重试
+                entry.loaded_at = time.monotonic()
+            return False
+        
+        if predictor is current and entry is not None:
+            # 版本未变化
+            entry.loaded_at = time.monotonic()
+            return True
+        
+        self.put(model_id, predictor)
+        return True
+    
+    def remove(self, model_id: int) -> Optional["BasePredictor"]:
+        """
+        移除预测器（停用模型时调用），进行中的加载和刷新结果不再写入缓存
+        
+        Returns:
+            Optional[BasePredictor]: 被移除的预测器
+        """
+        self._generations[model_id] = self._generations.get(model_id, 0) + 1
+        entry = self._entries.pop(model_id, None)
+        if entry is None:
+            return None
+        self._size -= entry.size_bytes
+        return entry.predictor
+    
+    def clear(self) -> list:
+        """清空缓存，返回被移除的预测器"""
+        predictors = []
+        for model_id in list(self._entries):
+            predictors.append(self.remove(model_id))
+        return predictors
+    
+    def _evict_oversize(self):
+        """淘汰最久未使用的预测器直到总占用不超过上限（至少保留最近使用的一个）"""
+        while self._size > self._config.max_bytes and len(self._entries) > 1:
+            model_id, entry = next(iter(self._entries.items()))
+            self._evict(model_id, entry)
+            self._statistics.evictions += 1
+            logger.info(
+                f"预测器缓存超出上限，淘汰: model_id={model_id}, {entry.size_bytes / 1024 ** 2:.1f} MB"
+            )
+    
+    def _evict_idle(self, now: float):
+        """淘汰空闲超时的预测器（按最近使用排序，只需检查开头）"""
+        idle_ttl = self._config.idle_ttl
+        if not idle_ttl:
+            return
+        while self._entries:
+            model_id, entry = next(iter(self._entries.items()))
+            if now - entry.last_access <= idle_ttl:
+                break
+            self._evict(model_id, entry)
+            self._statistics.idle_evictions += 1
+            logger.info(f"预测器空闲超时，淘汰: model_id={model_id}")
+    
+    def _evict(self, model_id: int, entry: _CacheEntry):
+        del self._entries[model_id]
+        self._size -= entry.size_bytes
+        entry.predictor.release()
+    
+    # =====================================================
+    # 统计
+    # =====================================================
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存状态
+        
+        Returns:
+            Dict: 占用、条目及统计
+        """
+        now = time.monotonic()
+        return {
+            "entries": len(self._entries),
+            "size_mb": round(self._size / 1024 ** 2, 2),
+            "max_mb": round(self._config.max_bytes / 1024 ** 2, 2),
+            "loading": len(self._loading),
+            "refreshing": len(self._refreshing),
+            "models": {
+                model_id: {
+                    "version_id": entry.predictor.version_id,
+                    "size_mb": round(entry.size_bytes / 1024 ** 2, 2),
+                    "age_seconds": round(now - entry.loaded_at, 1),
+                    "idle_seconds": round(now - entry.last_access, 1),
+                }
+                for model_id, entry in self._entries.items()
+            },
+            **self._statistics.to_dict(),
+        }
@@ -3,19 +3,28 @@
 """
 报警检测引擎服务
 负责检测设备数据是否触发报警规则
+
+活跃报警、连续触发/恢复计数和静默期保存在状态后端中（platform_core.state），
+多worker部署时使用Redis后端共享，同一报警只会由一个进程创建。
+
+统计报警的窗口聚合在内存中增量维护（alarm_window），窗口首次使用时从历史数据回填一次。
+变化率报警的"上一次的值"取自实时最新值缓存（platform_core.timeseries.last_value_cache），
+与写入路径和实时查询共用同一份数据。
 """
 
 import asyncio
 import logging
 from typing import Optional, Dict, List, Any
-from datetime import datetime, timedelta
+from datetime import datetime
 from decimal import Decimal
 from tortoise.expressions import F
-from tortoise.functions import Avg, Max, Min, Sum, Count
 
 from app.models.alarm import AlarmRule, AlarmRecord
 from app.models.device import DeviceField, DeviceMaintenanceRecord, DeviceHistoryData
 from app.log import logger
+from app.services.alarm_window import WindowAggregator, WINDOW_FUNCTIONS, parse_window
+from platform_core.state import StateBackend, InMemoryStateBackend, AlarmOutcome, AlarmAction
+from platform_core.timeseries.last_value_cache import LastValueCache, get_last_value_cache
 
 
 class AlarmDetectionEngine:
@@ -25,19 +34,22 @@ class AlarmDetectionEngine:
         self._rules_cache: Dict[str, List[AlarmRule]] = {}  # {device_type_code: [rules]}
         self._cache_time: Optional[datetime] = None
         self._cache_ttl = 300  # 缓存5分钟
-        self._trigger_counts: Dict[str, Dict[str, int]] = {}  # {device_code: {rule_code: count}}
-        self._last_alarm_time: Dict[str, Dict[str, datetime]] = {}  # 静默期控制
-        # Phase 3: ROC检测缓存 {device_code: {field_code: {"value": val, "time": dt}}}
-        self._last_values: Dict[str, Dict[str, Dict[str, Any]]] = {} 
+        # Phase 3: ROC检测使用的最新值缓存 (device_code, field_code) -> 最新值/上一个值
+        self._last_values: LastValueCache = get_last_value_cache()
+        # Phase 3: 统计报警滑动窗口 {(device_code, field_code, window_seconds): SlidingWindow}
+        self._windows = WindowAggregator()
         
-        # Phase 4: 报警自动恢复状态
-        self._active_alarms: Dict[str, Dict[str, int]] = {}  # {device_code: {rule_code: alarm_id}}
-        self._recovery_counts: Dict[str, Dict[str, int]] = {}  # {device_code: {rule_code: consecutive_normal_count}}
+        # 活跃报警、触发/恢复计数、静默期（Phase 4: 报警自动恢复状态）
+        self._state: StateBackend = InMemoryStateBackend()
         
         # Phase 3: 维护模式缓存 {device_code: True}
         self._maintenance_cache: Dict[str, bool] = {}
         self._maintenance_cache_time: Optional[datetime] = None
     
+    def set_state_backend(self, backend: StateBackend) -> None:
+        """设置状态后端（多worker部署时使用共享后端，如 RedisStateBackend）"""
+        self._state = backend
+    
     async def load_rules(self, force: bool = False) -> None:
         """加载报警规则到缓存"""
         now = datetime.now()
@@ -68,8 +80,9 @@ class AlarmDetectionEngine:
                     self._rules_cache[type_code] = []
                 self._rules_cache[type_code].append(rule)
             
-            # 加载当前活跃的报警
-            await self._load_active_alarms_from_db()
+            # 同步当前活跃的报警（共享后端下每个周期只由一个进程执行）
+            if force or await self._state.try_lock("alarm:active_sync", self._cache_ttl):
+                await self._load_active_alarms_from_db()
             
             # 加载维护状态
             await self._load_maintenance_status()
@@ -140,6 +153,8 @@ class AlarmDetectionEngine:
                 effective_rules_map[rule.field_code] = rule
         
         triggered_alarms = []
+        evaluations = []
+        outcomes: List[AlarmOutcome] = []
         
         for rule in effective_rules_map.values():
             # 0. 检查高级生效条件 (Phase 3: 状态/时间过滤/维护模式)
@@ -174,7 +189,9 @@ class AlarmDetectionEngine:
             
             if statistics_config and statistics_config.get("enabled"):
                 # 统计报警
-                stat_value = await self._get_statistical_value(device_code, field_code, statistics_config)
+                stat_value = await self._get_statistical_value(
+                    device_code, field_code, statistics_config, numeric_value, data
+                )
                 if stat_value is None:
                     continue
                 check_value = stat_value
@@ -195,67 +212,61 @@ class AlarmDetectionEngine:
             if threshold_config.get("type") == "change_rate":
                 self._update_last_value(device_code, field_code, numeric_value, data)
 
-            # 检查该规则是否有活跃报警
-            is_active = False
-            active_alarm_id = None
-            if device_code in self._active_alarms and rule_code in self._active_alarms[device_code]:
-                is_active = True
-                active_alarm_id = self._active_alarms[device_code][rule_code]
-
-            if result["triggered"]:
-                # 重置恢复计数
-                if device_code in self._recovery_counts and rule_code in self._recovery_counts[device_code]:
-                    self._recovery_counts[device_code][rule_code] = 0
-                
-                # 如果已经是活跃状态，则不需要重复创建报警
-                if is_active:
-                    # 报警合并: 更新活跃报警的状态
-                    await self._merge_active_alarm(active_alarm_id, check_value)
-                    continue
-
-                # 检查触发条件（连续次数）
-                if self._check_trigger_condition(device_code, rule, result["triggered"]):
-                    # 检查静默期
-                    if self._check_silent_period(device_code, rule):
-                        # 创建报警记录
-                        alarm = await self._create_alarm_record(
-                            rule=rule,
-                            device_code=device_code,
-                            device_name=device_name,
-                            device_type_code=device_type_code,
-                            field_code=field_code,
-                            trigger_value=check_value,
-                            level=result["level"],
-                            message=result["message"]
-                        )
-                        if alarm:
-                            triggered_alarms.append(alarm)
-                            # 记录活跃状态
-                            if device_code not in self._active_alarms:
-                                self._active_alarms[device_code] = {}
-                            self._active_alarms[device_code][rule_code] = alarm["id"]
-            else:
-                # 重置触发计数
-                self._reset_trigger_count(device_code, rule.rule_code)
-                
-                # Phase 4: 自动恢复逻辑
-                if is_active:
-                    # 获取恢复配置
-                    trigger_config = rule.trigger_config or {}
-                    auto_recover = trigger_config.get("auto_recover", True)
-                    
-                    if auto_recover:
-                        recovery_threshold = trigger_config.get("auto_recovery_count", 3)
-                        
-                        if device_code not in self._recovery_counts:
-                            self._recovery_counts[device_code] = {}
-                        
-                        current_recovery = self._recovery_counts[device_code].get(rule_code, 0) + 1
-                        self._recovery_counts[device_code][rule_code] = current_recovery
-                        
-                        if current_recovery >= recovery_threshold:
-                            # 触发恢复
-                            await self._resolve_alarm(active_alarm_id, device_code, rule_code)
+            trigger_condition = rule.trigger_condition or {}
+            trigger_config = rule.trigger_config or {}
+            notification_config = rule.notification_config or {}
+            # Phase 4: 自动恢复配置
+            recovery_count = 0
+            if trigger_config.get("auto_recover", True):
+                recovery_count = max(1, trigger_config.get("auto_recovery_count", 3))
+            
+            evaluations.append((rule, result, check_value))
+            outcomes.append(AlarmOutcome(
+                rule_code=rule_code,
+                triggered=result["triggered"],
+                consecutive_count=trigger_condition.get("consecutive_count", 1),
+                silent_period=notification_config.get("silent_period", 300),  # 默认5分钟
+                recovery_count=recovery_count,
+            ))
+        
+        if not outcomes:
+            return triggered_alarms
+        
+        # 连续次数、静默期、活跃/恢复状态的判定与更新在状态后端中一次完成
+        decisions = await self._state.apply_alarm_outcomes(device_code, outcomes)
+        if not decisions:
+            return triggered_alarms
+        
+        evaluated = {rule.rule_code: (rule, result, check_value) for rule, result, check_value in evaluations}
+        for decision in decisions:
+            rule, result, check_value = evaluated[decision.rule_code]
+            
+            if decision.action == AlarmAction.MERGE:
+                # 报警合并: 更新活跃报警的状态
+                await self._merge_active_alarm(decision.alarm_id, check_value)
+            
+            elif decision.action == AlarmAction.OPEN:
+                # 创建报警记录
+                alarm = await self._create_alarm_record(
+                    rule=rule,
+                    device_code=device_code,
+                    device_name=device_name,
+                    device_type_code=device_type_code,
+                    field_code=rule.field_code,
+                    trigger_value=check_value,
+                    level=result["level"],
+                    message=result["message"]
+                )
+                if alarm:
+                    triggered_alarms.append(alarm)
+                    # 记录活跃状态
+                    await self._state.set_active_alarm(device_code, rule.rule_code, alarm["id"])
+                else:
+                    await self._state.release_active_alarm(device_code, rule.rule_code)
+            
+            elif decision.action == AlarmAction.RESOLVE:
+                # Phase 4: 自动恢复
+                await self._resolve_alarm(decision.alarm_id, device_code, rule.rule_code)
         
         return triggered_alarms
     
@@ -320,90 +331,81 @@ class AlarmDetectionEngine:
         self, 
         device_code: str, 
         field_code: str, 
-        config: Dict[str, Any]
+        config: Dict[str, Any],
+        value: float,
+        data: Dict[str, Any]
     ) -> Optional[float]:
         """
-        获取统计值
+        将当前值加入滑动窗口并获取统计值
         Config: {
             "window": "5m", // 5 minutes
             "function": "avg" // avg, max, min, sum, count
         }
         """
         try:
-            window_str = config.get("window", "5m")
+            window_seconds = parse_window(config.get("window", "5m"))
             func_type = config.get("function", "avg")
-            
-            # 解析时间窗口
-            window_minutes = 5
-            if window_str.endswith("m"):
-                window_minutes = int(window_str[:-1])
-            elif window_str.endswith("h"):
-                window_minutes = int(window_str[:-1]) * 60
-            
-            start_time = datetime.now() - timedelta(minutes=window_minutes)
-            
-            # 查询历史数据
-            # 注意：这里假设DeviceHistoryData有对应的字段
-            # 如果field_code是动态的，可能需要使用RawSQL或者更复杂的查询
-            # 简单起见，我们假设field_code对应模型的一个属性
-            
-            # 首先找到设备ID
-            # 优化：应该缓存 device_code -> device_id 的映射
-            from app.models.device import DeviceInfo
-            device = await DeviceInfo.get_or_none(device_code=device_code)
-            if not device:
+            if func_type not in WINDOW_FUNCTIONS:
                 return None
-                
-            # 构建查询
-            query = DeviceHistoryData.filter(
-                device_id=device.id,
-                data_timestamp__gte=start_time
-            )
             
-            if func_type == "avg":
-                result = await query.annotate(val=Avg(field_code)).first()
-            elif func_type == "max":
-                result = await query.annotate(val=Max(field_code)).first()
-            elif func_type == "min":
-                result = await query.annotate(val=Min(field_code)).first()
-            elif func_type == "sum":
-                result = await query.annotate(val=Sum(field_code)).first()
-            elif func_type == "count":
-                # Count is a bit different, it returns int
-                count = await query.count()
-                return float(count)
-            else:
-                return None
-                
-            if result and result.val is not None:
-                return float(result.val)
-                
-            return None
+            now = self._get_data_time(data).timestamp()
+            window = await self._windows.get_window(
+                device_code, field_code, window_seconds, now, loader=self._load_window_history
+            )
+            self._windows.add(window, now, value)
+            return window.value(func_type)
             
         except Exception as e:
             logger.warning(f"获取统计值失败 {device_code} {field_code}: {str(e)}")
             return None
+    
+    async def _load_window_history(
+        self,
+        device_code: str,
+        field_code: str,
+        start_ts: float,
+        end_ts: float
+    ) -> List[tuple]:
+        """
+        从历史数据回填统计窗口（每个窗口只执行一次）
+        
+        Returns:
+            [(timestamp, value), ...] 按时间升序
+        """
+        from app.models.device import DeviceInfo
+        device = await DeviceInfo.get_or_none(device_code=device_code)
+        if not device:
+            return []
+        
+        # 注意：这里假设DeviceHistoryData有对应的字段
+        rows = await DeviceHistoryData.filter(
+            device_id=device.id,
+            data_timestamp__gte=datetime.fromtimestamp(start_ts),
+            data_timestamp__lt=datetime.fromtimestamp(end_ts),
+        ).order_by("data_timestamp").values_list("data_timestamp", field_code)
+        
+        return [(ts.timestamp(), float(val)) for ts, val in rows if val is not None]
 
     def _calculate_roc(self, device_code: str, field_code: str, current_value: float, data: Dict[str, Any]) -> Optional[float]:
         """
         计算变化率 (Rate of Change)
         返回单位: 值变化量/分钟
         """
-        if device_code not in self._last_values:
-            return None
-            
-        last_data = self._last_values[device_code].get(field_code)
-        if not last_data:
-            return None
-            
-        last_value = last_data["value"]
-        last_time = last_data["time"]
-        
         # 获取当前时间
         current_time = self._get_data_time(data)
         
+        # 早于当前数据的最近一个值（当前数据可能已由写入路径先行写入缓存）
+        last_data = self._last_values.previous(device_code, field_code, current_time)
+        if last_data is None:
+            return None
+        
+        try:
+            last_value = float(last_data[0])
+        except (ValueError, TypeError):
+            return None
+        
         # 计算时间差 (秒)
-        time_diff = (current_time - last_time).total_seconds()
+        time_diff = current_time.timestamp() - last_data[1]
         
         # 如果时间差太小（例如小于1秒），或者是负数（乱序），则不计算
         if time_diff < 1.0:
@@ -417,14 +419,8 @@ class AlarmDetectionEngine:
         return roc_per_minute
 
     def _update_last_value(self, device_code: str, field_code: str, value: float, data: Dict[str, Any]) -> None:
-        """更新上一次的值缓存"""
-        if device_code not in self._last_values:
-            self._last_values[device_code] = {}
-            
-        self._last_values[device_code][field_code] = {
-            "value": value,
-            "time": self._get_data_time(data)
-        }
+        """更新上一次的值缓存（单个信号，不代表设备的完整最新数据）"""
+        self._last_values.update(device_code, {field_code: value}, self._get_data_time(data), primary=False)
         
     def _get_data_time(self, data: Dict[str, Any]) -> datetime:
         """从数据中获取时间，如果没有则使用当前时间"""
@@ -513,52 +509,6 @@ class AlarmDetectionEngine:
         
         return {"triggered": False, "level": None, "message": "正常"}
     
-    def _check_trigger_condition(self, device_code: str, rule: AlarmRule, triggered: bool) -> bool:
-        """检查触发条件（连续次数）"""
-        rule_code = rule.rule_code
-        condition = rule.trigger_condition or {}
-        consecutive_count = condition.get("consecutive_count", 1)
-        
-        if device_code not in self._trigger_counts:
-            self._trigger_counts[device_code] = {}
-        
-        if triggered:
-            current_count = self._trigger_counts[device_code].get(rule_code, 0) + 1
-            self._trigger_counts[device_code][rule_code] = current_count
-            
-            if current_count >= consecutive_count:
-                return True
-        else:
-            self._trigger_counts[device_code][rule_code] = 0
-        
-        return False
-    
-    def _reset_trigger_count(self, device_code: str, rule_code: str) -> None:
-        """重置触发计数"""
-        if device_code in self._trigger_counts:
-            self._trigger_counts[device_code][rule_code] = 0
-    
-    def _check_silent_period(self, device_code: str, rule: AlarmRule) -> bool:
-        """检查静默期（避免重复报警）"""
-        rule_code = rule.rule_code
-        notification_config = rule.notification_config or {}
-        silent_period = notification_config.get("silent_period", 300)  # 默认5分钟
-        
-        if device_code not in self._last_alarm_time:
-            self._last_alarm_time[device_code] = {}
-        
-        last_time = self._last_alarm_time[device_code].get(rule_code)
-        now = datetime.now()
-        
-        if last_time:
-            elapsed = (now - last_time).total_seconds()
-            if elapsed < silent_period:
-                return False
-        
-        # 更新最后报警时间
-        self._last_alarm_time[device_code][rule_code] = now
-        return True
-    
     async def _create_alarm_record(
         self,
         rule: AlarmRule,
@@ -640,29 +590,44 @@ class AlarmDetectionEngine:
             logger.error(f"合并报警失败: {str(e)}")
 
     async def _load_active_alarms_from_db(self) -> None:
-        """从数据库加载当前活跃的报警"""
+        """
+        从数据库同步当前活跃的报警到状态后端
+        
+        先读取状态后端再查询数据库：状态中已登记的报警在登记前已写入数据库，
+        因此数据库中不再是active的（如已人工处理）可以安全移除，数据库中active但
+        状态中缺失的（如状态过期、进程重启）补充登记。
+        """
         try:
+            registered = await self._state.get_active_alarms()
+            
             # 获取所有状态为active的报警
             active_records = await AlarmRecord.filter(status="active").prefetch_related("rule").all()
             
-            self._active_alarms = {}
-            count = 0
-            
+            db_active: Dict[str, Dict[str, int]] = {}
             for record in active_records:
                 if not record.device_code or not record.rule:
                     continue
-                    
-                device_code = record.device_code
-                rule_code = record.rule.rule_code
-                
-                if device_code not in self._active_alarms:
-                    self._active_alarms[device_code] = {}
-                    
-                self._active_alarms[device_code][rule_code] = record.id
-                count += 1
-                
+                db_active.setdefault(record.device_code, {})[record.rule.rule_code] = record.id
+            
+            missing = [
+                (device_code, rule_code, alarm_id)
+                for device_code, rules in db_active.items()
+                for rule_code, alarm_id in rules.items()
+                if registered.get(device_code, {}).get(rule_code) != alarm_id
+            ]
+            stale = [
+                (device_code, rule_code, alarm_id)
+                for device_code, rules in registered.items()
+                for rule_code, alarm_id in rules.items()
+                if db_active.get(device_code, {}).get(rule_code) != alarm_id
+            ]
+            
+            await self._state.remove_active_alarms(stale)
+            await self._state.add_active_alarms(missing)
+            
+            count = sum(len(rules) for rules in db_active.values())
             if count > 0:
-                logger.info(f"已加载 {count} 条活跃报警记录")
+                logger.info(f"已加载 {count} 条活跃报警记录 (补充 {len(missing)} 条, 移除 {len(stale)} 条)")
                 
         except Exception as e:
             logger.error(f"加载活跃报警失败: {str(e)}")
@@ -670,6 +635,8 @@ class AlarmDetectionEngine:
     async def _resolve_alarm(self, alarm_id: int, device_code: str, rule_code: str) -> None:
         """
         自动解决报警
+        
+        写入失败时记录保持active，下次同步活跃报警时会重新登记。
         """
         try:
             record = await AlarmRecord.get_or_none(id=alarm_id)
@@ -684,15 +651,7 @@ class AlarmDetectionEngine:
                 await record.save()
                 
                 logger.info(f"报警自动恢复: ID={alarm_id}, 设备={device_code}, 规则={rule_code}")
-                
-            # 清理缓存
-            if device_code in self._active_alarms:
-                self._active_alarms[device_code].pop(rule_code, None)
-                if not self._active_alarms[device_code]:
-                    del self._active_alarms[device_code]
-                    
-            if device_code in self._recovery_counts:
-                self._recovery_counts[device_code].pop(rule_code, None)
+            # 活跃状态已由状态后端在判定恢复时清除
                 
         except Exception as e:
             logger.error(f"自动解决报警失败: {str(e)}")
@@ -782,7 +741,8 @@ class AlarmDetectionEngine:
             "total_rules": total_rules,
             "device_types": list(self._rules_cache.keys()),
             "cache_time": self._cache_time.isoformat() if self._cache_time else None,
-            "trigger_counts": len(self._trigger_counts),
+            "state_backend": self._state.describe(),
+            "statistic_windows": self._windows.get_stats(),
         }
 
 
@@ -8,7 +8,7 @@
 import asyncio
 import json
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set, Tuple, FrozenSet
 from datetime import datetime
 from fastapi import WebSocket, WebSocketDisconnect, Query
 import jwt
@@ -19,45 +19,105 @@ from app.log import logger
 
 
 class AlarmWebSocketManager:
-    """报警WebSocket连接管理器"""
+    """
+    报警WebSocket连接管理器
+    
+    维护 设备类型 -> 连接 索引，广播时按设备类型分组报警，只遍历相关连接；
+    订阅相同设备类型集合的连接共享同一份编码结果。批量模式的连接每帧接收多条报警
+    （alarm_batch），发送并发执行并带单连接超时。
+    """
     
-    def __init__(self):
+    def __init__(self, batch_size: int = 200, send_timeout: float = 5.0):
+        """
+        Args:
+            batch_size: 批量帧中每帧最多包含的报警数
+            send_timeout: 单个连接一次广播的发送超时（秒），超时后断开该连接
+        """
+        self.batch_size = batch_size
+        self.send_timeout = send_timeout
         self.active_connections: List[WebSocket] = []
-        self.subscriptions: Dict[WebSocket, Dict] = {}  # {websocket: {device_types: [], user_id: int}}
+        self.subscriptions: Dict[WebSocket, Dict] = {}  # {websocket: {device_types: [], user_id: int, batch: bool}}
+        # 设备类型 -> 订阅该类型的连接
+        self._type_index: Dict[str, Set[WebSocket]] = {}
+        # 订阅所有类型的连接
+        self._all_types: Set[WebSocket] = set()
     
     async def connect(
         self, 
         websocket: WebSocket, 
         user_id: int,
-        device_types: Optional[List[str]] = None
+        device_types: Optional[List[str]] = None,
+        batch: bool = False
     ):
-        """建立WebSocket连接"""
+        """
+        建立WebSocket连接
+        
+        Args:
+            websocket: WebSocket连接
+            user_id: 用户ID
+            device_types: 订阅的设备类型，空表示订阅所有类型
+            batch: 是否接收批量帧（alarm_batch）
+        """
         await websocket.accept()
         self.active_connections.append(websocket)
         self.subscriptions[websocket] = {
             "user_id": user_id,
             "device_types": device_types or [],  # 空列表表示订阅所有类型
+            "batch": batch,
             "connected_at": datetime.now().isoformat()
         }
+        self._index(websocket, device_types or [])
         logger.info(f"报警WebSocket连接已建立，用户ID: {user_id}, 订阅类型: {device_types or '全部'}")
     
+    def _index(self, websocket: WebSocket, device_types: List[str]):
+        """加入设备类型索引"""
+        if not device_types:
+            self._all_types.add(websocket)
+            return
+        for device_type in device_types:
+            self._type_index.setdefault(device_type, set()).add(websocket)
+    
+    def _unindex(self, websocket: WebSocket, device_types: List[str]):
+        """移出设备类型索引"""
+        self._all_types.discard(websocket)
+        for device_type in device_types:
+            sockets = self._type_index.get(device_type)
+            if sockets is not None:
+                sockets.discard(websocket)
+                if not sockets:
+                    del self._type_index[device_type]
+    
+    def update_subscription(self, websocket: WebSocket, device_types: Optional[List[str]]):
+        """更新连接订阅的设备类型（空表示订阅所有类型）"""
+        sub = self.subscriptions.get(websocket)
+        if sub is None:
+            return
+        self._unindex(websocket, sub["device_types"])
+        sub["device_types"] = list(device_types or [])
+        self._index(websocket, sub["device_types"])
+    
     def disconnect(self, websocket: WebSocket):
         """断开WebSocket连接"""
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
         if websocket in self.subscriptions:
             sub = self.subscriptions[websocket]
+            self._unindex(websocket, sub.get("device_types") or [])
             logger.info(f"报警WebSocket连接已断开，用户ID: {sub.get('user_id')}")
             del self.subscriptions[websocket]
     
+    @staticmethod
+    def _encode(message: Dict) -> str:
+        return json.dumps(message, ensure_ascii=False, default=str)
+    
     async def send_alarm(self, websocket: WebSocket, alarm: Dict):
         """发送报警消息到单个连接"""
         try:
-            message = json.dumps({
+            message = self._encode({
                 "type": "alarm",
                 "timestamp": datetime.now().isoformat(),
                 "data": alarm
-            }, ensure_ascii=False, default=str)
+            })
             await websocket.send_text(message)
         except Exception as e:
             logger.error(f"发送报警消息失败: {str(e)}")
@@ -65,29 +125,99 @@ class AlarmWebSocketManager:
     
     async def broadcast_alarm(self, alarm: Dict):
         """广播报警消息到所有相关订阅者"""
-        device_type = alarm.get("device_type_code")
-        disconnected = []
-        
-        for websocket, subscription in self.subscriptions.items():
-            try:
-                subscribed_types = subscription.get("device_types", [])
-                
-                # 检查是否订阅了该设备类型
-                if not subscribed_types or device_type in subscribed_types:
-                    await self.send_alarm(websocket, alarm)
-                    
-            except Exception as e:
-                logger.error(f"广播报警失败: {str(e)}")
-                disconnected.append(websocket)
-        
-        # 清理断开的连接
-        for ws in disconnected:
-            self.disconnect(ws)
+        await self.broadcast_alarms([alarm])
+    
+    def _build_frames(self, alarms: List[Dict], batch: bool, timestamp: str) -> List[str]:
+        """将一组报警编码为帧（批量模式按 batch_size 分帧，否则每条报警一帧）"""
+        if not batch:
+            return [
+                self._encode({"type": "alarm", "timestamp": timestamp, "data": alarm})
+                for alarm in alarms
+            ]
+        return [
+            self._encode({
+                "type": "alarm_batch",
+                "timestamp": timestamp,
+                "count": len(chunk),
+                "data": chunk
+            })
+            for chunk in (
+                alarms[i:i + self.batch_size] for i in range(0, len(alarms), self.batch_size)
+            )
+        ]
+    
+    async def _send_frames(self, websocket: WebSocket, frames: List[str]) -> bool:
+        """按顺序发送帧，失败或超时返回False"""
+        try:
+            async with asyncio.timeout(self.send_timeout):
+                for frame in frames:
+                    await websocket.send_text(frame)
+            return True
+        except Exception as e:
+            logger.error(f"发送报警消息失败: {repr(e)}")
+            return False
+    
+    async def _deliver(self, deliveries: List[Tuple[WebSocket, List[str]]]):
+        """并发发送，并断开发送失败的连接"""
+        if not deliveries:
+            return
+        results = await asyncio.gather(
+            *(self._send_frames(websocket, frames) for websocket, frames in deliveries)
+        )
+        for (websocket, _), ok in zip(deliveries, results):
+            if not ok:
+                self.disconnect(websocket)
     
     async def broadcast_alarms(self, alarms: List[Dict]):
-        """批量广播报警消息"""
-        for alarm in alarms:
-            await self.broadcast_alarm(alarm)
+        """
+        批量广播报警消息
+        
+        报警按设备类型分组后，通过索引找到相关连接；订阅相同设备类型集合的连接共享
+        同一组已编码的帧。
+        """
+        if not alarms or not self.subscriptions:
+            return
+        
+        # 设备类型 -> 报警（保持原有顺序）
+        by_type: Dict[Any, List[int]] = {}
+        for position, alarm in enumerate(alarms):
+            by_type.setdefault(alarm.get("device_type_code"), []).append(position)
+        
+        # 订阅类型集合 -> 连接
+        groups: Dict[Optional[FrozenSet[str]], List[WebSocket]] = {}
+        if self._all_types:
+            groups[None] = list(self._all_types)
+        for device_type in by_type:
+            for websocket in self._type_index.get(device_type, ()):
+                types = frozenset(self.subscriptions[websocket]["device_types"])
+                groups.setdefault(types, []).append(websocket)
+        
+        timestamp = datetime.now().isoformat()
+        frame_cache: Dict[Tuple[Optional[FrozenSet[str]], bool], List[str]] = {}
+        deliveries: List[Tuple[WebSocket, List[str]]] = []
+        seen: Set[WebSocket] = set()
+        
+        for types, sockets in groups.items():
+            if types is None:
+                selected = alarms
+            else:
+                positions = sorted(
+                    position for device_type in types for position in by_type.get(device_type, ())
+                )
+                selected = [alarms[position] for position in positions]
+            
+            for websocket in sockets:
+                if websocket in seen:
+                    continue
+                seen.add(websocket)
+                batch = self.subscriptions[websocket].get("batch", False)
+                key = (types, batch)
+                frames = frame_cache.get(key)
+                if frames is None:
+                    frames = frame_cache[key] = self._build_frames(selected, batch, timestamp)
+                deliveries.append((websocket, frames))
+        
+        await self._deliver(deliveries)
     
     async def send_statistics_update(self):
         """发送统计更新通知"""
@@ -96,15 +226,7 @@ class AlarmWebSocketManager:
             "timestamp": datetime.now().isoformat(),
         }, ensure_ascii=False)
         
-        disconnected = []
-        for websocket in self.active_connections:
-            try:
-                await websocket.send_text(message)
-            except Exception:
-                disconnected.append(websocket)
-        
-        for ws in disconnected:
-            self.disconnect(ws)
+        await self._deliver([(websocket, [message]) for websocket in list(self.active_connections)])
     
     def get_connection_count(self) -> int:
         """获取当前连接数"""
@@ -116,6 +238,7 @@ class AlarmWebSocketManager:
             {
                 "user_id": sub.get("user_id"),
                 "device_types": sub.get("device_types"),
+                "batch": sub.get("batch", False),
                 "connected_at": sub.get("connected_at")
             }
             for sub in self.subscriptions.values()
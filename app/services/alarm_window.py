@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报警统计窗口聚合
+按 (设备, 字段, 窗口长度) 在内存中维护滑动时间窗口，供统计报警使用
+
+- 环形缓冲保存窗口内的数据点，按时间淘汰
+- 运行和（sum/avg/count）与单调队列（min/max）增量维护，每个数据点 O(1) 均摊
+- 窗口首次使用时从历史数据回填一次，之后只由实时数据驱动
+- 容量上限: 单个窗口最多保留 max_points 个点，超出时提前淘汰最旧的点（此时统计值只覆盖
+  最近 max_points 个点，计入 truncated_points 并在每个窗口首次截断时记录警告）；
+  所有窗口的点数总和超过 max_total_points 时淘汰最久未使用的窗口
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Optional, Dict, List, Tuple, Callable, Awaitable, Deque
+
+from app.log import logger
+
+
+# 支持的统计函数
+WINDOW_FUNCTIONS = ("avg", "max", "min", "sum", "count")
+
+# 历史回填函数: (device_code, field_code, start_ts, end_ts) -> [(ts, value), ...]（按时间升序）
+HistoryLoader = Callable[[str, str, float, float], Awaitable[List[Tuple[float, float]]]]
+
+
+def parse_window(window_str: str) -> int:
+    """解析时间窗口配置（"5m" / "1h"），返回秒数，无法解析时为5分钟"""
+    window_minutes = 5
+    try:
+        if window_str.endswith("m"):
+            window_minutes = int(window_str[:-1])
+        elif window_str.endswith("h"):
+            window_minutes = int(window_str[:-1]) * 60
+    except (ValueError, AttributeError):
+        pass
+    return window_minutes * 60
+
+
+class SlidingWindow:
+    """
+    单个滑动时间窗口
+    
+    时间戳按到达顺序单调处理：乱序到达的数据点按已见过的最大时间戳记入。
+    点数超过 max_points 时提前淘汰最旧的点，统计值只覆盖最近 max_points 个点（truncated 记录次数）。
+    """
+    
+    __slots__ = (
+        "window_seconds", "max_points", "truncated", "key", "_points", "_min", "_max",
+        "_sum", "_seq", "_latest", "_since_resum",
+    )
+    
+    # 每淘汰这么多个点重新求和一次，消除运行和的浮点累积误差
+    _RESUM_INTERVAL = 10000
+    
+    def __init__(self, window_seconds: float, max_points: int = 10000):
+        self.window_seconds = window_seconds
+        self.max_points = max_points
+        # 因超出 max_points 提前淘汰（仍在时间窗口内）的点数
+        self.truncated = 0
+        # 所属 WindowAggregator 中的键（未注册或已被淘汰时为None）
+        self.key: Optional[Tuple[str, str, int]] = None
+        self._points: Deque[Tuple[int, float, float]] = deque()  # (seq, ts, value)
+        self._min: Deque[Tuple[int, float]] = deque()  # (seq, value) 单调递增
+        self._max: Deque[Tuple[int, float]] = deque()  # (seq, value) 单调递减
+        self._sum = 0.0
+        self._seq = 0
+        self._latest: Optional[float] = None
+        self._since_resum = 0
+    
+    def __len__(self) -> int:
+        return len(self._points)
+    
+    def add(self, ts: float, value: float) -> bool:
+        """
+        加入数据点并淘汰窗口外的数据
+        
+        Returns:
+            bool: 是否因超出 max_points 淘汰了时间窗口内的点
+        """
+        if self._latest is not None and ts < self._latest:
+            if ts < self._latest - self.window_seconds:
+                return False
+            ts = self._latest
+        self._latest = ts
+        
+        seq = self._seq
+        self._seq += 1
+        self._points.append((seq, ts, value))
+        self._sum += value
+        
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        
+        self.evict(ts)
+        if len(self._points) > self.max_points:
+            self._pop_oldest()
+            self.truncated += 1
+            return True
+        return False
+    
+    def evict(self, now: float) -> None:
+        """淘汰早于 now - window_seconds 的数据点"""
+        cutoff = now - self.window_seconds
+        points = self._points
+        while points and points[0][1] < cutoff:
+            self._pop_oldest()
+    
+    def _pop_oldest(self) -> None:
+        seq, _, value = self._points.popleft()
+        if self._min and self._min[0][0] == seq:
+            self._min.popleft()
+        if self._max and self._max[0][0] == seq:
+            self._max.popleft()
+        
+        if not self._points:
+            self._sum = 0.0
+            self._since_resum = 0
+            return
+        
+        self._sum -= value
+        self._since_resum += 1
+        if self._since_resum >= self._RESUM_INTERVAL:
+            self._sum = sum(point[2] for point in self._points)
+            self._since_resum = 0
+    
+    def value(self, func: str) -> Optional[float]:
+        """
+        计算统计值
+        
+        Args:
+            func: avg / max / min / sum / count
+        
+        Returns:
+            Optional[float]: 统计值，窗口为空（count除外）或函数不支持时为None
+        """
+        count = len(self._points)
+        if func == "count":
+            return float(count)
+        if count == 0:
+            return None
+        if func == "avg":
+            return self._sum / count
+        if func == "sum":
+            return self._sum
+        if func == "max":
+            return self._max[0][1]
+        if func == "min":
+            return self._min[0][1]
+        return None
+
+
+class WindowAggregator:
+    """
+    滑动窗口注册表
+    
+    窗口按 (device_code, field_code, window_seconds) 创建，窗口数量或所有窗口的点数总和
+    超过上限时淘汰最久未使用的窗口。同一窗口的历史回填只执行一次（并发请求等待同一次回填）。
+    数据点通过 add 加入，以便统计总点数和截断情况。
+    """
+    
+    def __init__(self, max_windows: int = 50000, max_points: int = 10000, max_total_points: int = 2000000):
+        """
+        Args:
+            max_windows: 最大窗口数量
+            max_points: 单个窗口最多保留的数据点数
+            max_total_points: 所有窗口保留的数据点总数上限（每个点约100字节）
+        """
+        self._max_windows = max_windows
+        self._max_points = max_points
+        self._max_total_points = max_total_points
+        self._windows: "OrderedDict[Tuple[str, str, int], SlidingWindow]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str, int], asyncio.Future] = {}
+        self._total_points = 0
+        
+        self._stats = {
+            "backfills": 0, "backfill_points": 0, "evictions": 0,
+            "memory_evictions": 0, "truncated_points": 0,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._windows)
+    
+    async def get_window(
+        self,
+        device_code: str,
+        field_code: str,
+        window_seconds: int,
+        now: float,
+        loader: Optional[HistoryLoader] = None,
+    ) -> SlidingWindow:
+        """
+        获取窗口（首次使用时从历史数据回填）
+        
+        Args:
+            device_code: 设备编码
+            field_code: 字段编码
+            window_seconds: 窗口长度（秒）
+            now: 当前数据点时间戳，回填范围为 [now - window_seconds, now)
+            loader: 历史回填函数
+        
+        Returns:
+            SlidingWindow: 窗口
+        """
+        key = (device_code, field_code, window_seconds)
+        window = self._windows.get(key)
+        if window is not None:
+            self._windows.move_to_end(key)
+            return window
+        
+        pending = self._loading.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            window = SlidingWindow(window_seconds, self._max_points)
+            if loader is not None:
+                try:
+                    history = await loader(device_code, field_code, now - window_seconds, now)
+                    for ts, value in history:
+                        if window.add(ts, value):
+                            self._stats["truncated_points"] += 1
+                    self._stats["backfills"] += 1
+                    self._stats["backfill_points"] += len(window)
+                except Exception as e:
+                    logger.warning(f"统计窗口历史回填失败 {device_code} {field_code}: {str(e)}")
+            
+            window.key = key
+            if window.truncated:
+                self._warn_truncated(window)
+            self._windows[key] = window
+            self._total_points += len(window)
+            while len(self._windows) > self._max_windows:
+                self._evict_oldest()
+                self._stats["evictions"] += 1
+            self._enforce_total_points()
+            future.set_result(window)
+            return window
+        except BaseException:
+            # 任务被取消等情况：等待中的调用方随之取消
+            if not future.done():
+                future.cancel()
+            raise
+        finally:
+            self._loading.pop(key, None)
+    
+    def add(self, window: SlidingWindow, ts: float, value: float) -> None:
+        """
+        向窗口加入数据点（统计总点数和截断，总点数超出上限时淘汰最久未使用的其他窗口）
+        
+        Args:
+            window: get_window 返回的窗口
+            ts: 时间戳
+            value: 值
+        """
+        if window.key is None:
+            # 已被淘汰的窗口不再计入总点数
+            window.add(ts, value)
+            return
+        before = len(window)
+        if window.add(ts, value):
+            self._stats["truncated_points"] += 1
+            if window.truncated == 1:
+                self._warn_truncated(window)
+        self._total_points += len(window) - before
+        if self._total_points > self._max_total_points:
+            self._enforce_total_points()
+    
+    @staticmethod
+    def _warn_truncated(window: SlidingWindow) -> None:
+        """窗口首次截断时记录警告"""
+        device_code, field_code, window_seconds = window.key
+        logger.warning(
+            f"统计窗口数据点超过上限 {window.max_points}，统计值只覆盖最近 {window.max_points} 个点: "
+            f"{device_code} {field_code} {window_seconds}s"
+        )
+    
+    def _remove(self, key: Tuple[str, str, int]) -> None:
+        window = self._windows.pop(key)
+        window.key = None
+        self._total_points -= len(window)
+    
+    def _evict_oldest(self) -> None:
+        self._remove(next(iter(self._windows)))
+    
+    def _enforce_total_points(self) -> None:
+        """淘汰最久未使用的窗口直到总点数不超过上限（至少保留最近使用的一个）"""
+        while self._total_points > self._max_total_points and len(self._windows) > 1:
+            self._evict_oldest()
+            self._stats["memory_evictions"] += 1
+    
+    def clear(self, device_code: Optional[str] = None) -> None:
+        """清除窗口（device_code为None时清除全部）"""
+        for key in [k for k in self._windows if device_code is None or k[0] == device_code]:
+            self._remove(key)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取统计信息"""
+        return {"windows": len(self._windows), "total_points": self._total_points, **self._stats}
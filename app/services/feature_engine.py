@@ -14,6 +14,8 @@ from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from enum import Enum
 from dataclasses import dataclass, field
+
+import numpy as np
 from loguru import logger
 
 
@@ -891,8 +893,8 @@ class FeatureQualityMonitor:
         """延迟加载TDengine客户端"""
         if self._td_client is None:
             try:
-                from app.core.tdengine_connector import td_client
-                self._td_client = td_client
+                from platform_core.timeseries import get_tdengine_client
+                self._td_client = get_tdengine_client()
             except ImportError:
                 logger.warning("TDengine客户端未配置")
                 self._td_client = None
@@ -989,8 +991,8 @@ class FeatureQualityMonitor:
             WHERE ts >= NOW() - INTERVAL {time_range_hours} HOUR
             """
             
-            result = await self.td_client.query(sql)
-            total_count = result[0]["total_count"] if result else 0
+            result = await self.td_client.query_columnar(sql, self.database)
+            total_count = result.first("total_count", 0)
             
             # 计算预期数据点数量
             # 假设每个时间窗口产生一个数据点
@@ -1021,17 +1023,16 @@ class FeatureQualityMonitor:
             FROM {table_name}
             """
             
-            result = await self.td_client.query(sql)
-            if not result or not result[0].get("latest_time"):
+            result = await self.td_client.query_columnar(sql, self.database)
+            if not result.num_rows or result.null_mask("latest_time")[0]:
                 return 0.0
             
-            latest_time = result[0]["latest_time"]
-            if isinstance(latest_time, str):
-                latest_time = datetime.fromisoformat(latest_time.replace('Z', '+00:00'))
+            # 列式结果的时间戳为datetime64[ms]（墙上时间）
+            latest_time = result["latest_time"][0]
             
             # 计算时间差
-            time_diff = datetime.now() - latest_time.replace(tzinfo=None)
-            diff_seconds = time_diff.total_seconds()
+            time_diff = np.datetime64(datetime.now(), "ms") - latest_time
+            diff_seconds = float(time_diff / np.timedelta64(1, "s"))
             
             # 根据时间差计算新鲜度
             warning_threshold = self.thresholds["freshness_warning_seconds"]
@@ -1109,15 +1110,14 @@ class FeatureQualityMonitor:
             WHERE ts >= NOW() - INTERVAL {time_range_hours} HOUR
             """
             
-            result = await self.td_client.query(sql)
-            if not result:
+            result = await self.td_client.query_columnar(sql, self.database)
+            if not result.num_rows:
                 return 1.0
             
-            stats = result[0]
-            avg_val = stats.get("avg_val", 0)
-            std_val = stats.get("std_val", 0)
-            min_val = stats.get("min_val", 0)
-            max_val = stats.get("max_val", 0)
+            avg_val = result.first("avg_val", 0)
+            std_val = result.first("std_val", 0)
+            min_val = result.first("min_val", 0)
+            max_val = result.first("max_val", 0)
             
             # 检查是否有异常
             if std_val == 0:
@@ -1188,12 +1188,12 @@ class FeatureQualityMonitor:
             WHERE ts >= NOW() - INTERVAL {time_range_hours} HOUR
             """
             
-            result = await self.td_client.query(sql)
-            if not result:
+            result = await self.td_client.query_columnar(sql, self.database)
+            if not result.num_rows:
                 return 1.0
             
-            total = result[0].get("total", 0)
-            non_null = result[0].get("non_null", 0)
+            total = result.first("total", 0)
+            non_null = result.first("non_null", 0)
             
             if total == 0:
                 return 1.0
@@ -1220,19 +1220,27 @@ class FeatureQualityMonitor:
             if not self.td_client:
                 return []
             
-            result = await self.td_client.query(f"DESCRIBE {table_name}")
+            result = await self.td_client.query_columnar(f"DESCRIBE {table_name}", self.database)
+            if not result.num_rows:
+                return []
             
             numeric_types = {"FLOAT", "DOUBLE", "INT", "BIGINT", "SMALLINT", "TINYINT"}
             columns = []
             
-            for row in result:
-                field = row.get("Field", row.get("field", ""))
-                col_type = row.get("Type", row.get("type", "")).upper()
+            # DESCRIBE 结果列: field, type, length, note（大小写随版本不同）
+            names = {name.lower(): name for name in result.columns}
+            fields = result[names.get("field", result.columns[0])]
+            types = result[names.get("type", result.columns[1])]
+            notes = result[names["note"]] if "note" in names else [""] * result.num_rows
+            
+            for field, col_type, note in zip(fields, types, notes):
+                field = field or ""
+                col_type = (col_type or "").upper()
                 
                 # 跳过时间戳和TAG列
                 if field.lower() in ("ts", "_wstart", "_wend"):
                     continue
-                if row.get("Note", row.get("note", "")).upper() == "TAG":
+                if (note or "").upper() == "TAG":
                     continue
                 
                 if any(t in col_type for t in numeric_types):
@@ -292,6 +292,10 @@ class TDengineServiceAdapter:
         result = await self.client.query(sql, database)
         return {"data": result}
     
+    async def query_columnar(self, sql: str, database: Optional[str] = None):
+        """执行查询并返回列式结果"""
+        return await self.client.query_columnar(sql, database)
+    
     async def get_databases(self) -> List[str]:
         """获取数据库列表"""
         return await self.client.get_databases()
@@ -72,6 +72,10 @@ class TDengineSchemaManager:
                 # 更新现有表
                 await self._update_stable(stable_name, signals, category.tdengine_database)
             
+            # 表结构已变更，失效写入路径的已知表缓存
+            from platform_core.timeseries.table_registry import get_table_registry
+            get_table_registry().invalidate_category(category_code)
+            
             # 4. 记录Schema版本
             await self._record_schema_change(
                 category=category,
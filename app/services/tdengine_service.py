@@ -58,6 +58,14 @@ class TDengineService:
             logger.error(f"TDengine查询执行失败: {sql}, 错误: {e}")
             raise
     
+    async def execute_query_columnar(self, sql: str, database: Optional[str] = None):
+        """执行查询并返回列式结果（ColumnarResult）"""
+        try:
+            return await self.client.query_columnar(sql, database)
+        except Exception as e:
+            logger.error(f"TDengine查询执行失败: {sql}, 错误: {e}")
+            raise
+    
     async def execute_sql(self, sql: str, database: Optional[str] = None) -> Dict[str, Any]:
         """执行SQL语句"""
         try:
@@ -1,5 +1,6 @@
 import os
 import typing
+from urllib.parse import quote
 from dotenv import load_dotenv
 
 from pydantic import Field, field_validator
@@ -210,6 +211,33 @@ class Settings(BaseSettings):
     # Redis配置
     redis: RedisCredentials = Field(default_factory=RedisCredentials)
     
+    # 运行时状态后端（规则冷却、报警状态）: memory / redis，多worker部署时使用redis
+    STATE_BACKEND: str = Field(default="memory")
+    
+    # 实时最新值缓存是否镜像到Redis（多worker部署时各进程共享最新值）
+    LAST_VALUE_CACHE_MIRROR: bool = Field(default=False)
+    
+    # 实时推送跨节点分发: pubsub / streams（Redis Streams 分片，按订阅过滤、断线续读），所有节点必须一致
+    REALTIME_DISTRIBUTION: str = Field(default="pubsub")
+    REALTIME_STREAM_SHARDS: int = Field(default=16)
+    
+    # AI推理执行器: 线程池大小、工作进程数（0表示不使用进程池）、排队上限、每个模型的并发上限、推理超时（秒）
+    INFERENCE_THREAD_WORKERS: int = Field(default=4)
+    INFERENCE_PROCESS_WORKERS: int = Field(default=2)
+    INFERENCE_QUEUE_SIZE: int = Field(default=256)
+    INFERENCE_MODEL_CONCURRENCY: int = Field(default=4)
+    INFERENCE_TIMEOUT: float = Field(default=30.0)
+    
+    # AI预测器缓存: 模型内存占用上限（MB）、加载后的有效期（秒）、空闲淘汰时间（秒），0表示不刷新/不淘汰
+    INFERENCE_CACHE_MAX_MB: int = Field(default=2048)
+    INFERENCE_CACHE_TTL: float = Field(default=300.0)
+    INFERENCE_CACHE_IDLE_TTL: float = Field(default=3600.0)
+    
+    # AI推理微批处理: 是否启用、单批最大请求数、最长等待时间（毫秒）
+    INFERENCE_BATCH_ENABLED: bool = Field(default=True)
+    INFERENCE_BATCH_MAX_SIZE: int = Field(default=64)
+    INFERENCE_BATCH_MAX_WAIT_MS: float = Field(default=5.0)
+    
     # Celery配置
     celery: CelerySettings = Field(default_factory=CelerySettings)
     
@@ -282,6 +310,13 @@ class Settings(BaseSettings):
         """获取数据库连接URL"""
         creds = self.tortoise_orm.connections.postgres.credentials
         return f"postgresql://{creds.user}:{creds.password}@{creds.host}:{creds.port}/{creds.database}"
+    
+    @property
+    def REDIS_URL(self) -> str:
+        """获取Redis连接URL"""
+        creds = self.redis
+        auth = f":{quote(creds.password, safe='')}@" if creds.password else ""
+        return f"redis://{auth}{creds.host}:{creds.port}/{creds.db}"
 
 
 
@@ -360,27 +360,42 @@ async def get_asset_realtime_data(
     asset_id: int,
     current_user = Depends(get_current_user)
 ):
-    """获取资产实时数据"""
+    """获取资产实时数据（优先读取最新值缓存，未命中时查询TDengine并回填）"""
     try:
+        from platform_core.timeseries.last_value_cache import get_last_value_cache
+        
         # 1. 获取资产信息
         asset = await Asset.get(id=asset_id).prefetch_related("category")
         
-        # 2. 查询最新数据
-        table_name = f"raw_{asset.category.code}_{asset.code}"
-        
-        sql = f"""
-        SELECT * FROM {table_name}
-        ORDER BY ts DESC
-        LIMIT 1
-        """
-        
-        from app.core.tdengine_connector import td_client
-        result = await td_client.query(sql)
+        # 2. 读取最新值缓存
+        last_values = get_last_value_cache()
+        snapshot = (await last_values.get_many([asset.code])).get(asset.code)
+        if snapshot is not None:
+            realtime_data = {"ts": snapshot["ts"].isoformat(), **snapshot["values"]}
+        else:
+            # 3. 缓存未命中时查询最新数据
+            table_name = f"raw_{asset.category.code}_{asset.code}"
+            
+            sql = f"""
+            SELECT * FROM {table_name}
+            ORDER BY ts DESC
+            LIMIT 1
+            """
+            
+            from app.core.tdengine_connector import td_client
+            result = await td_client.query(sql)
+            realtime_data = result[0] if result else None
+            if realtime_data and realtime_data.get("ts"):
+                last_values.prime(
+                    asset.code,
+                    {key: value for key, value in realtime_data.items() if key != "ts"},
+                    realtime_data["ts"]
+                )
         
         return success_response(
             data={
                 "asset": await asset.to_dict(),
-                "realtime_data": result[0] if result else None,
+                "realtime_data": realtime_data,
                 "timestamp": datetime.now().isoformat()
             }
         )
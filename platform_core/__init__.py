@@ -10,6 +10,7 @@ Platform Core Layer - 平台核心层 (platform_core)
 - timeseries: 时序数据服务模块
 - ingestion: 数据采集层模块
 - realtime: 实时WebSocket推送服务模块
+- state: 运行时状态后端模块（规则冷却、报警状态）
 
 迁移说明:
 - V3版本整合了platform_v2的所有功能到platform_core
@@ -26,6 +27,7 @@ from . import metadata
 from . import timeseries
 from . import ingestion
 from . import realtime
+from . import state
 
 __all__ = [
     "asset",
@@ -34,4 +36,5 @@ __all__ = [
     "timeseries",
     "ingestion",
     "realtime",
+    "state",
 ]
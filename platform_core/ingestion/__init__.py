@@ -47,6 +47,21 @@ from platform_core.ingestion.dual_writer import (
     get_dual_write_adapter,
     create_dual_write_adapter,
 )
+from platform_core.ingestion.write_buffer import (
+    IngestionWriteBuffer,
+    WriteBufferConfig,
+    WriteBufferStatistics,
+    BackpressurePolicy,
+    get_ingestion_write_buffer,
+)
+from platform_core.ingestion.polling_scheduler import (
+    HTTPPollingScheduler,
+    PollingSchedulerConfig,
+    PollSourceStatistics,
+    TimerWheel,
+    get_http_polling_scheduler,
+    shutdown_http_polling_scheduler,
+)
 from platform_core.ingestion.consistency_verifier import (
     ConsistencyVerifier,
     ConsistencyReport,
@@ -97,6 +112,19 @@ __all__ = [
     "DualWriteError",
     "get_dual_write_adapter",
     "create_dual_write_adapter",
+    # 写缓冲
+    "IngestionWriteBuffer",
+    "WriteBufferConfig",
+    "WriteBufferStatistics",
+    "BackpressurePolicy",
+    "get_ingestion_write_buffer",
+    # HTTP轮询调度
+    "HTTPPollingScheduler",
+    "PollingSchedulerConfig",
+    "PollSourceStatistics",
+    "TimerWheel",
+    "get_http_polling_scheduler",
+    "shutdown_http_polling_scheduler",
     # 一致性验证
     "ConsistencyVerifier",
     "ConsistencyReport",
@@ -10,6 +10,15 @@ from platform_core.ingestion.adapters.base_adapter import (
     AdapterStatus,
     AdapterStatistics,
 )
+from platform_core.ingestion.adapters.payload_parsers import (
+    PayloadParser,
+    PayloadParserRegistry,
+    JSONPayloadParser,
+    MsgPackPayloadParser,
+    RegisterLayoutParser,
+    create_parser,
+    register_parser_format,
+)
 from platform_core.ingestion.adapters.mqtt_adapter import MQTTAdapter
 from platform_core.ingestion.adapters.http_adapter import HTTPAdapter
 
@@ -18,6 +27,13 @@ __all__ = [
     "DataPoint",
     "AdapterStatus",
     "AdapterStatistics",
+    "PayloadParser",
+    "PayloadParserRegistry",
+    "JSONPayloadParser",
+    "MsgPackPayloadParser",
+    "RegisterLayoutParser",
+    "create_parser",
+    "register_parser_format",
     "MQTTAdapter",
     "HTTPAdapter",
 ]
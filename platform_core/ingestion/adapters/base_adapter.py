@@ -13,10 +13,12 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Any, AsyncIterator, Optional, List
+from typing import Dict, Any, AsyncIterator, Optional, List, Union
 import logging
 import asyncio
 
+from platform_core.ingestion.adapters.payload_parsers import PayloadParserRegistry, Records
+
 logger = logging.getLogger(__name__)
 
 
@@ -168,6 +170,8 @@ class BaseAdapter(ABC):
     
     定义数据采集适配器的抽象接口，所有协议适配器都应继承此类。
     
+    负载按主题选择解析器（配置项 parsers / payload_format，见 payload_parsers 模块）。
+    
     Attributes:
         config: 适配器配置字典
         name: 适配器名称
@@ -199,6 +203,18 @@ class BaseAdapter(ABC):
         self._on_data_callbacks: List[callable] = []
         self._on_error_callbacks: List[callable] = []
         self._on_status_change_callbacks: List[callable] = []
+        
+        # 负载解析器（配置错误时使用JSON，错误由 validate_config 报告）
+        self._parser_errors: List[str] = []
+        try:
+            self._parsers = PayloadParserRegistry.from_config(
+                config.get("parsers"),
+                config.get("payload_format", "json")
+            )
+        except ValueError as e:
+            self._parser_errors.append(f"负载解析器配置错误: {e}")
+            self._parsers = PayloadParserRegistry()
+            logger.error(f"适配器 {self.name} 负载解析器配置错误，使用JSON解析: {e}")
     
     @property
     def status(self) -> AdapterStatus:
@@ -357,6 +373,72 @@ class BaseAdapter(ABC):
         finally:
             await self.stop()
     
+    def parse_payload(
+        self,
+        payload: Union[bytes, bytearray, memoryview],
+        topic: Optional[str] = None
+    ) -> Records:
+        """
+        按主题选择解析器解析负载（不解码为字符串）
+        
+        Args:
+            payload: 原始字节数据
+            topic: 主题（可选）
+        
+        Returns:
+            Records: 记录列表
+        
+        Raises:
+            ValueError: 负载格式错误
+        """
+        return self._parsers.parse(payload, topic)
+    
+    def process_payload(
+        self,
+        payload: Union[bytes, bytearray, memoryview],
+        topic: Optional[str] = None
+    ) -> List[DataPoint]:
+        """
+        解析负载为数据点（一条负载可包含多条记录）
+        
+        成功的数据点由 run() 计入统计，此处只累计字节数和错误。
+        
+        Args:
+            payload: 原始字节数据
+            topic: 主题（可选）
+        
+        Returns:
+            List[DataPoint]: 数据点列表，解析失败时为空
+        """
+        self._statistics.total_bytes_received += len(payload)
+        try:
+            records = self._parsers.parse(payload, topic)
+        except Exception as e:
+            self._statistics.record_error(f"数据解析失败: {e}")
+            logger.warning(f"适配器 {self.name} 数据解析失败: {e}, topic={topic}")
+            return []
+        return self.build_data_points(records, topic)
+    
+    def build_data_points(self, records: Records, topic: Optional[str] = None) -> List[DataPoint]:
+        """
+        由解析后的记录构造数据点（无法构造的记录计为错误）
+        
+        Args:
+            records: 解析器输出的记录
+            topic: 主题（可选）
+        
+        Returns:
+            List[DataPoint]: 数据点列表
+        """
+        data_points = []
+        for record in records:
+            data_point = self._build_data_point(record, topic)
+            if data_point is not None:
+                data_points.append(data_point)
+            else:
+                self._statistics.record_error("消息解析失败")
+        return data_points
+    
     def process_raw_data(self, raw_data: bytes, topic: Optional[str] = None) -> Optional[DataPoint]:
         """
         处理原始数据
@@ -368,17 +450,14 @@ class BaseAdapter(ABC):
             topic: 主题（可选，用于MQTT等协议）
         
         Returns:
-            DataPoint: 解析后的数据点，解析失败返回None
+            DataPoint: 解析后的数据点（负载包含多条记录时为第一条），解析失败返回None
         """
-        import json
-        
-        try:
-            data = json.loads(raw_data.decode("utf-8"))
-            return self._parse_data(data, topic)
-        except Exception as e:
-            self._statistics.record_error(f"数据解析失败: {e}")
-            logger.error(f"适配器 {self.name} 数据解析失败: {e}")
-            return None
+        data_points = self.process_payload(raw_data, topic)
+        return data_points[0] if data_points else None
+    
+    def _build_data_point(self, record: Dict[str, Any], topic: Optional[str] = None) -> Optional[DataPoint]:
+        """由解析后的记录构造DataPoint（子类可重写）"""
+        return self._parse_data(record, topic)
     
     def _parse_data(self, data: Dict[str, Any], topic: Optional[str] = None) -> Optional[DataPoint]:
         """
@@ -410,6 +489,9 @@ class BaseAdapter(ABC):
                 timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
             except ValueError:
                 timestamp = datetime.now()
+        elif isinstance(timestamp, (int, float)):
+            # Unix时间戳（秒或毫秒）
+            timestamp = datetime.fromtimestamp(timestamp / 1000 if timestamp > 1e12 else timestamp)
         elif timestamp is None:
             timestamp = datetime.now()
         
@@ -519,6 +601,7 @@ class BaseAdapter(ABC):
         # 基础验证
         if not self.config:
             errors.append("配置不能为空")
+        errors.extend(self._parser_errors)
         
         return len(errors) == 0, errors
     
@@ -535,6 +618,7 @@ class BaseAdapter(ABC):
             "status": self._status.value,
             "is_running": self.is_running,
             "statistics": self.statistics.to_dict(),
+            "payload_parsers": self._parsers.describe(),
             "start_time": self._start_time.isoformat() if self._start_time else None,
         }
     
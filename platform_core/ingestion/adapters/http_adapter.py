@@ -15,6 +15,11 @@ import logging
 from datetime import datetime
 from typing import Dict, Any, AsyncIterator, Optional, List
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from platform_core.ingestion.adapters.base_adapter import (
     BaseAdapter,
     DataPoint,
@@ -50,17 +55,26 @@ class HTTPAdapter(BaseAdapter):
             "password": "pass"
         },
         "response_format": "json",
-        "data_path": "data.items"
+        "data_path": "data.items",
+        "scheduler": "own"
     }
+    
+    scheduler 为 "shared" 时不创建自己的客户端和轮询循环，而是加入共享的
+    HTTPPollingScheduler（连接池、时间轮调度、按主机限流、条件请求），
+    轮询结果进入接收队列由 receive() 产出。
     """
     
-    def __init__(self, config: Dict[str, Any], name: Optional[str] = None):
+    # 共享调度模式下接收队列最多缓存的轮询结果数
+    _INBOX_SIZE = 100
+    
+    def __init__(self, config: Dict[str, Any], name: Optional[str] = None, scheduler=None):
         """
         初始化HTTP适配器
         
         Args:
             config: HTTP配置字典
             name: 适配器名称
+            scheduler: 轮询调度器（可选，默认在 scheduler 为 "shared" 时使用全局调度器）
         """
         config["protocol"] = "http"
         super().__init__(config, name)
@@ -91,6 +105,32 @@ class HTTPAdapter(BaseAdapter):
         # HTTP客户端
         self._client = None
         self._session = None
+        
+        # 共享轮询调度
+        self._scheduler = scheduler
+        self._use_scheduler = scheduler is not None or config.get("scheduler", "own") == "shared"
+        self._inbox: asyncio.Queue = asyncio.Queue(maxsize=self._INBOX_SIZE)
+        self._dropped_polls = 0
+    
+    @property
+    def url(self) -> str:
+        return self._url
+    
+    @property
+    def poll_interval(self) -> float:
+        return self._poll_interval
+    
+    @property
+    def verify_ssl(self) -> bool:
+        return self._verify_ssl
+    
+    @property
+    def retry_count(self) -> int:
+        return self._retry_count
+    
+    @property
+    def retry_delay(self) -> float:
+        return self._retry_delay
     
     def validate_config(self) -> tuple[bool, List[str]]:
         """验证HTTP配置"""
@@ -108,6 +148,9 @@ class HTTPAdapter(BaseAdapter):
         if self._timeout <= 0:
             errors.append("timeout 必须大于0")
         
+        if self.config.get("scheduler", "own") not in ("own", "shared"):
+            errors.append("scheduler 必须是 own 或 shared")
+        
         return len(errors) == 0, errors
     
     async def connect(self) -> bool:
@@ -117,6 +160,9 @@ class HTTPAdapter(BaseAdapter):
         Returns:
             bool: 连接是否成功
         """
+        if self._use_scheduler:
+            return await self._connect_with_scheduler()
+        
         try:
             # 尝试导入httpx（推荐）或aiohttp
             try:
@@ -135,6 +181,16 @@ class HTTPAdapter(BaseAdapter):
             logger.error(f"HTTP适配器 {self.name} 连接失败: {e}")
             return False
     
+    async def _connect_with_scheduler(self) -> bool:
+        """加入共享轮询调度器"""
+        if self._scheduler is None:
+            from platform_core.ingestion.polling_scheduler import get_http_polling_scheduler
+            self._scheduler = get_http_polling_scheduler()
+        
+        await self._scheduler.start()
+        self._scheduler.add_source(self)
+        return True
+    
     async def _connect_with_httpx(self) -> bool:
         """使用httpx创建会话"""
         import httpx
@@ -200,6 +256,11 @@ class HTTPAdapter(BaseAdapter):
     
     async def disconnect(self):
         """关闭HTTP会话"""
+        if self._use_scheduler:
+            if self._scheduler is not None:
+                self._scheduler.remove_source(self.name)
+            return
+        
         try:
             if self._client:
                 await self._client.aclose()
@@ -221,6 +282,11 @@ class HTTPAdapter(BaseAdapter):
         Yields:
             DataPoint: 解析后的数据点
         """
+        if self._use_scheduler:
+            async for data_point in self._receive_scheduled():
+                yield data_point
+            return
+        
         while self._running:
             try:
                 # 发送请求
@@ -242,6 +308,84 @@ class HTTPAdapter(BaseAdapter):
                 logger.error(f"HTTP轮询失败: {e}")
                 await asyncio.sleep(self._poll_interval)
     
+    async def _receive_scheduled(self) -> AsyncIterator[DataPoint]:
+        """从接收队列产出调度器轮询得到的数据点"""
+        while self._running:
+            try:
+                async with asyncio.timeout(1.0):
+                    data_points = await self._inbox.get()
+            except TimeoutError:
+                continue
+            for data_point in data_points:
+                if not self._running:
+                    break
+                yield data_point
+    
+    # =====================================================
+    # 共享调度接口（由 HTTPPollingScheduler 调用）
+    # =====================================================
+    
+    def build_request(self) -> Dict[str, Any]:
+        """
+        构造请求参数（httpx.AsyncClient.request 的关键字参数）
+        
+        Returns:
+            Dict: method / url / params / json / headers / auth / timeout
+        """
+        auth = None
+        if self._auth_config and self._auth_config.get("type", "").lower() == "basic":
+            import httpx
+            auth = httpx.BasicAuth(
+                self._auth_config.get("username", ""),
+                self._auth_config.get("password", "")
+            )
+        
+        return {
+            "method": self._method,
+            "url": self._url,
+            "params": self._params if self._method == "GET" else None,
+            "json": self._body if self._method != "GET" and self._body else None,
+            "headers": self._headers,
+            "auth": auth,
+            "timeout": self._timeout,
+        }
+    
+    def parse_response_content(self, content: bytes) -> List[DataPoint]:
+        """
+        解析响应内容为数据点（可在线程中调用）
+        
+        Args:
+            content: 响应体
+        
+        Returns:
+            List[DataPoint]: 数据点列表
+        """
+        if self._response_format == "json":
+            response_data = orjson.loads(content) if orjson is not None else json.loads(content)
+        else:
+            response_data = {"raw": content.decode("utf-8", errors="replace")}
+        return self._parse_response(response_data)
+    
+    def deliver(self, data_points: List[DataPoint], bytes_received: int = 0):
+        """
+        接收调度器轮询得到的数据点
+        
+        接收队列已满（run() 循环处理不及时）时丢弃本次结果并计数。
+        """
+        self._statistics.total_bytes_received += bytes_received
+        if not data_points:
+            return
+        try:
+            self._inbox.put_nowait(data_points)
+        except asyncio.QueueFull:
+            self._dropped_polls += 1
+            logger.warning(f"HTTP适配器 {self.name} 接收队列已满，丢弃本次轮询结果")
+    
+    def record_poll_error(self, error: Exception):
+        """记录调度器轮询失败"""
+        self._statistics.record_error(str(error))
+        logger.warning(f"HTTP适配器 {self.name} 轮询失败: {error}")
+    
     async def _fetch_data(self) -> List[DataPoint]:
         """
         获取数据
@@ -461,5 +605,9 @@ class HTTPAdapter(BaseAdapter):
             "timeout": self._timeout,
             "retry_count": self._retry_count,
             "data_path": self._data_path,
+            "scheduler": "shared" if self._use_scheduler else "own",
         })
+        if self._use_scheduler and self._scheduler is not None:
+            info["polling"] = self._scheduler.get_source_statistics(self.name)
+            info["dropped_polls"] = self._dropped_polls
         return info
@@ -12,14 +12,25 @@ MQTT协议适配器
 import asyncio
 import json
 import logging
+import os
+import socket
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, AsyncIterator, Optional, List
+from functools import partial
+from typing import Dict, Any, AsyncIterator, Optional, List, Tuple
 
 from platform_core.ingestion.adapters.base_adapter import (
     BaseAdapter,
     DataPoint,
     AdapterStatus,
 )
+from platform_core.ingestion.adapters.payload_parsers import (
+    ParseResult,
+    parse_messages,
+    parse_messages_in_worker,
+    parser_config_key,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -44,8 +55,28 @@ class MQTTAdapter(BaseAdapter):
         "keepalive": 60,
         "clean_session": True,
         "reconnect_interval": 5,
-        "max_reconnect_attempts": 10
+        "max_reconnect_attempts": 10,
+        "payload_format": "json",
+        "parsers": [
+            {"topic": "edge/+/msgpack", "format": "msgpack"},
+            {"topic": "plc/+/registers", "format": "registers", "registers": [...]}
+        ],
+        "shared_group": "ingestion",
+        "batch_size": 500,
+        "batch_wait": 0.05,
+        "max_queue_size": 10000,
+        "parse_workers": 0,
+        "parse_executor": "thread"
     }
+    
+    parsers 按主题选择负载解析器，未匹配的主题使用 payload_format（见 payload_parsers 模块）。
+    
+    shared_group 不为空时以共享订阅（$share/{group}/{topic}）订阅各主题，
+    多个平台实例使用同一分组即由Broker在实例间分摊同一主题的消息。
+    
+    收到的消息先进入接收队列（max_queue_size），receive_batch 按批取出并解析。
+    parse_workers 为0时在事件循环中解析；大于0时按批拆分到线程池（thread）
+    或进程池（process，适合CPU密集的解码器）并发解析，DataPoint仍在事件循环中构造。
     """
     
     def __init__(self, config: Dict[str, Any], name: Optional[str] = None):
@@ -65,7 +96,13 @@ class MQTTAdapter(BaseAdapter):
         self._username = config.get("username")
         self._password = config.get("password")
         self._topics = config.get("topics", ["#"])
-        self._client_id = config.get("client_id", f"ingestion_{id(self)}")
+        self._shared_group = config.get("shared_group")
+        # 共享订阅的各实例需要不同的客户端ID
+        default_client_id = (
+            f"ingestion_{socket.gethostname()}_{os.getpid()}_{id(self)}"
+            if self._shared_group else f"ingestion_{id(self)}"
+        )
+        self._client_id = config.get("client_id", default_client_id)
         self._qos = config.get("qos", 1)
         self._keepalive = config.get("keepalive", 60)
         self._clean_session = config.get("clean_session", True)
@@ -75,9 +112,31 @@ class MQTTAdapter(BaseAdapter):
         self._max_reconnect_attempts = config.get("max_reconnect_attempts", 10)
         self._reconnect_attempts = 0
         
+        # 批量接收配置
+        self._batch_size = config.get("batch_size", 500)
+        self._batch_wait = config.get("batch_wait", 0.05)
+        self._max_queue_size = config.get("max_queue_size", 10000)
+        self._parse_workers = config.get("parse_workers", 0)
+        self._parse_executor_type = config.get("parse_executor", "thread")
+        self._parse_executor: Optional[Executor] = None
+        self._parser_config_key = parser_config_key(config.get("parsers"), config.get("payload_format", "json"))
+        
         # MQTT客户端
         self._client = None
-        self._message_queue: asyncio.Queue = asyncio.Queue()
+        # 接收队列: (topic, payload)
+        self._message_queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_queue_size)
+        self._pump_task: Optional[asyncio.Task] = None
+        self._dropped_messages = 0
+    
+    @property
+    def subscriptions(self) -> List[str]:
+        """实际订阅的主题（配置 shared_group 时为共享订阅）"""
+        if not self._shared_group:
+            return list(self._topics)
+        return [
+            topic if topic.startswith("$share/") else f"$share/{self._shared_group}/{topic}"
+            for topic in self._topics
+        ]
     
     def validate_config(self) -> tuple[bool, List[str]]:
         """验证MQTT配置"""
@@ -95,6 +154,20 @@ class MQTTAdapter(BaseAdapter):
         if self._qos not in [0, 1, 2]:
             errors.append("MQTT qos 必须是 0, 1 或 2")
         
+        if self._shared_group is not None and (
+            not self._shared_group or any(c in self._shared_group for c in "/+#")
+        ):
+            errors.append("MQTT shared_group 不能为空，且不能包含 / + #")
+        
+        if not isinstance(self._parse_workers, int) or self._parse_workers < 0:
+            errors.append("parse_workers 必须是非负整数")
+        
+        if self._parse_executor_type not in ("thread", "process"):
+            errors.append("parse_executor 必须是 thread 或 process")
+        
+        if not isinstance(self._batch_size, int) or self._batch_size <= 0:
+            errors.append("batch_size 必须是正整数")
+        
         return len(errors) == 0, errors
     
     async def connect(self) -> bool:
@@ -140,10 +213,13 @@ class MQTTAdapter(BaseAdapter):
             await self._client.__aenter__()
             
             # 订阅主题
-            for topic in self._topics:
+            for topic in self.subscriptions:
                 await self._client.subscribe(topic, qos=self._qos)
                 logger.info(f"MQTT适配器 {self.name} 订阅主题: {topic}")
             
+            # 后台任务将消息转入接收队列
+            self._pump_task = asyncio.create_task(self._pump_messages(self._client))
+            
             self._reconnect_attempts = 0
             logger.info(f"MQTT适配器 {self.name} 连接成功: {self._host}:{self._port}")
             return True
@@ -160,19 +236,18 @@ class MQTTAdapter(BaseAdapter):
             if rc == 0:
                 logger.info(f"MQTT适配器 {self.name} 连接成功")
                 # 订阅主题
-                for topic in self._topics:
+                for topic in self.subscriptions:
                     client.subscribe(topic, qos=self._qos)
                     logger.info(f"MQTT适配器 {self.name} 订阅主题: {topic}")
             else:
                 logger.error(f"MQTT连接失败，返回码: {rc}")
         
+        loop = asyncio.get_running_loop()
+        
         def on_message(client, userdata, msg):
-            # 将消息放入队列
+            # 将消息放入队列（在网络线程中调用）
             try:
-                asyncio.get_event_loop().call_soon_threadsafe(
-                    self._message_queue.put_nowait,
-                    (msg.topic, msg.payload)
-                )
+                loop.call_soon_threadsafe(self._enqueue_nowait, msg.topic, msg.payload)
             except Exception as e:
                 logger.error(f"消息入队失败: {e}")
         
@@ -193,7 +268,6 @@ class MQTTAdapter(BaseAdapter):
         self._client.on_disconnect = on_disconnect
         
         # 连接（在线程中运行）
-        loop = asyncio.get_event_loop()
         await loop.run_in_executor(
             None,
             lambda: self._client.connect(self._host, self._port, self._keepalive)
@@ -210,6 +284,14 @@ class MQTTAdapter(BaseAdapter):
     
     async def disconnect(self):
         """断开MQTT连接"""
+        if self._pump_task is not None:
+            self._pump_task.cancel()
+            try:
+                await self._pump_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._pump_task = None
+        
         if self._client is None:
             return
         
@@ -229,6 +311,117 @@ class MQTTAdapter(BaseAdapter):
         finally:
             self._client = None
     
+    async def stop(self):
+        """停止适配器并关闭解析工作池"""
+        await super().stop()
+        if self._parse_executor is not None:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+    
+    # =====================================================
+    # 接收
+    # =====================================================
+    
+    def _enqueue_nowait(self, topic: str, payload: Any):
+        """消息入队，队列已满时丢弃并计数"""
+        try:
+            self._message_queue.put_nowait((topic, payload))
+        except asyncio.QueueFull:
+            self._dropped_messages += 1
+            if self._dropped_messages % 1000 == 1:
+                logger.warning(f"MQTT适配器 {self.name} 接收队列已满，已丢弃 {self._dropped_messages} 条消息")
+    
+    async def _pump_messages(self, client):
+        """将aiomqtt消息转入接收队列（队列满时暂停读取，由TCP向Broker反压）"""
+        async for message in client.messages:
+            await self._message_queue.put((str(message.topic), message.payload))
+    
+    async def _collect(self, max_items: int, max_wait: float) -> List[Tuple[str, Any]]:
+        """从接收队列取出最多 max_items 条消息，最多等待 max_wait 秒"""
+        queue = self._message_queue
+        messages = []
+        deadline = time.monotonic() + max_wait
+        while len(messages) < max_items:
+            if not queue.empty():
+                messages.append(queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                async with asyncio.timeout(remaining):
+                    messages.append(await queue.get())
+            except TimeoutError:
+                break
+        return messages
+    
+    def _get_parse_executor(self) -> Executor:
+        if self._parse_executor is None:
+            if self._parse_executor_type == "process":
+                self._parse_executor = ProcessPoolExecutor(max_workers=self._parse_workers)
+            else:
+                self._parse_executor = ThreadPoolExecutor(
+                    max_workers=self._parse_workers,
+                    thread_name_prefix=f"mqtt-parse-{self.name}"
+                )
+        return self._parse_executor
+    
+    async def _parse_batch(self, messages: List[Tuple[str, Any]]) -> List[ParseResult]:
+        """解析一批消息（按 parse_workers 拆分到工作池并发执行）"""
+        if self._parse_workers <= 0:
+            return parse_messages(self._parsers, messages)
+        
+        chunk_size = max(32, -(-len(messages) // self._parse_workers))
+        chunks = [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+        if self._parse_executor_type == "process":
+            worker = partial(parse_messages_in_worker, self._parser_config_key)
+        else:
+            worker = partial(parse_messages, self._parsers)
+        
+        loop = asyncio.get_running_loop()
+        executor = self._get_parse_executor()
+        parsed = await asyncio.gather(*(loop.run_in_executor(executor, worker, chunk) for chunk in chunks))
+        return [result for chunk_results in parsed for result in chunk_results]
+    
+    async def receive_batch(
+        self,
+        max_items: Optional[int] = None,
+        max_wait: Optional[float] = None
+    ) -> List[DataPoint]:
+        """
+        批量接收并解析消息
+        
+        Args:
+            max_items: 最多取出的消息数，默认为配置的 batch_size
+            max_wait: 最长等待时间（秒），默认为配置的 batch_wait；队列中已有
+                足够消息时立即返回
+        
+        Returns:
+            List[DataPoint]: 解析后的数据点（一条消息可包含多个数据点），超时无消息时为空
+        """
+        messages = await self._collect(
+            max_items or self._batch_size,
+            self._batch_wait if max_wait is None else max_wait
+        )
+        if not messages:
+            return []
+        
+        messages = [
+            (topic, payload.encode("utf-8") if isinstance(payload, str) else payload or b"")
+            for topic, payload in messages
+        ]
+        results = await self._parse_batch(messages)
+        
+        data_points = []
+        for (topic, payload), (records, error) in zip(messages, results):
+            self._statistics.total_bytes_received += len(payload)
+            if error is not None:
+                self._statistics.record_error(f"数据解析失败: {error}")
+                logger.warning(f"MQTT消息解析失败: {error}, topic={topic}")
+                continue
+            data_points.extend(self.build_data_points(records, topic))
+        return data_points
+    
     async def receive(self) -> AsyncIterator[DataPoint]:
         """
         接收MQTT消息
@@ -240,81 +433,23 @@ class MQTTAdapter(BaseAdapter):
             logger.error(f"MQTT适配器 {self.name} 未连接")
             return
         
-        try:
-            # 检查是否是aiomqtt客户端
-            if hasattr(self._client, 'messages'):
-                # aiomqtt方式
-                async for message in self._client.messages:
-                    if not self._running:
-                        break
-                    
-                    data_point = await self._process_message(
-                        str(message.topic),
-                        message.payload
-                    )
-                    if data_point:
-                        yield data_point
-            else:
-                # paho-mqtt方式 - 从队列读取
-                while self._running:
-                    try:
-                        topic, payload = await asyncio.wait_for(
-                            self._message_queue.get(),
-                            timeout=1.0
-                        )
-                        data_point = await self._process_message(topic, payload)
-                        if data_point:
-                            yield data_point
-                    except asyncio.TimeoutError:
-                        continue
-                    except Exception as e:
-                        self._statistics.record_error(str(e))
-                        logger.error(f"处理MQTT消息失败: {e}")
-                        
-        except Exception as e:
-            self._statistics.record_error(str(e))
-            logger.error(f"MQTT接收消息失败: {e}")
+        while self._running:
+            for data_point in await self.receive_batch():
+                yield data_point
             
-            # 尝试重连
-            if self._running:
+            # aiomqtt读取任务异常结束（连接断开）时重连
+            pump = self._pump_task
+            if pump is not None and pump.done() and self._message_queue.empty():
+                error = None if pump.cancelled() else pump.exception()
+                self._pump_task = None
+                self._statistics.record_error(str(error or "消息读取结束"))
+                logger.error(f"MQTT接收消息失败: {error}")
                 await self._handle_reconnect()
+                if self.status != AdapterStatus.RUNNING:
+                    break
     
-    async def _process_message(self, topic: str, payload: bytes) -> Optional[DataPoint]:
-        """
-        处理MQTT消息
-        
-        Args:
-            topic: 消息主题
-            payload: 消息负载
-        
-        Returns:
-            DataPoint: 解析后的数据点
-        """
-        try:
-            # 记录接收字节数
-            self._statistics.total_bytes_received += len(payload)
-            
-            # 解析JSON
-            data = json.loads(payload.decode("utf-8"))
-            
-            # 解析为DataPoint
-            data_point = self._parse_mqtt_message(topic, data)
-            
-            if data_point:
-                self._statistics.record_success(len(payload))
-                return data_point
-            else:
-                self._statistics.record_error("消息解析失败")
-                return None
-                
-        except json.JSONDecodeError as e:
-            self._statistics.record_error(f"JSON解析失败: {e}")
-            logger.warning(f"MQTT消息JSON解析失败: {e}, topic={topic}")
-            return None
-        except Exception as e:
-            self._statistics.record_error(str(e))
-            logger.error(f"处理MQTT消息失败: {e}")
-            return None
+    def _build_data_point(self, record: Dict[str, Any], topic: Optional[str] = None) -> Optional[DataPoint]:
+        return self._parse_mqtt_message(topic or "", record)
     
     def _parse_mqtt_message(self, topic: str, data: Dict[str, Any]) -> Optional[DataPoint]:
         """
@@ -450,9 +585,14 @@ class MQTTAdapter(BaseAdapter):
             "host": self._host,
             "port": self._port,
             "topics": self._topics,
+            "subscriptions": self.subscriptions,
             "client_id": self._client_id,
             "qos": self._qos,
             "reconnect_attempts": self._reconnect_attempts,
+            "parse_workers": self._parse_workers,
+            "parse_executor": self._parse_executor_type if self._parse_workers > 0 else None,
+            "queued_messages": self._message_queue.qsize(),
+            "dropped_messages": self._dropped_messages,
             "connected": self._client is not None and self.is_running,
         })
         return info
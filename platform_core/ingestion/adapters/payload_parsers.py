@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+消息负载解析器
+
+适配器按主题选择负载解析器，解析器直接处理字节数据（bytes / bytearray / memoryview），
+不先解码为字符串，输出与JSON消息相同结构的记录字典，再由适配器构造DataPoint。
+
+内置格式:
+- json: 安装 orjson 时直接解析字节/memoryview，否则使用标准库 json
+- msgpack: MessagePack（需要安装 msgpack）
+- registers: PLC网关的紧凑二进制寄存器帧，按配置的寄存器布局用 struct 解包；
+  负载长度为帧长度的整数倍时按多帧解析（网关批量上报）
+
+适配器配置示例:
+{
+    "payload_format": "json",
+    "parsers": [
+        {"topic": "edge/+/msgpack", "format": "msgpack"},
+        {
+            "topic": "plc/+/registers",
+            "format": "registers",
+            "byte_order": "big",
+            "timestamp": "u64",
+            "asset_level": 1,
+            "registers": [
+                {"name": "temperature", "type": "i16", "scale": 0.1},
+                {"name": "pressure", "type": "u16", "scale": 0.01},
+                {"type": "pad", "size": 2},
+                {"name": "running", "type": "bool"}
+            ]
+        }
+    ]
+}
+
+按配置顺序匹配主题（支持MQTT通配符 + 和 #），都不匹配时使用 payload_format。
+"""
+
+import json
+import struct
+from typing import Dict, Any, List, Optional, Tuple, Type, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# 解析结果: 记录字典列表，每条记录结构与JSON消息相同
+Records = List[Dict[str, Any]]
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """
+    判断主题是否匹配MQTT主题过滤器
+    
+    Args:
+        pattern: 主题过滤器（支持 + 和 #）
+        topic: 消息主题
+    """
+    if pattern == "#" or pattern == topic:
+        return True
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[i]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+def _as_records(obj: Any) -> Records:
+    """解析结果转为记录列表（支持单条记录或记录数组）"""
+    if isinstance(obj, dict):
+        return [obj]
+    if isinstance(obj, list):
+        return [item for item in obj if isinstance(item, dict)]
+    raise ValueError(f"负载必须是对象或对象数组: {type(obj).__name__}")
+
+
+class PayloadParser:
+    """负载解析器基类"""
+    
+    format = ""
+    
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        self.options = options or {}
+    
+    def parse(self, payload: Union[bytes, bytearray, memoryview], topic: Optional[str] = None) -> Records:
+        """
+        解析负载
+        
+        Args:
+            payload: 原始字节数据
+            topic: 消息主题（可选）
+        
+        Returns:
+            Records: 记录列表
+        
+        Raises:
+            ValueError: 负载格式错误
+        """
+        raise NotImplementedError
+    
+    def describe(self) -> Dict[str, Any]:
+        return {"format": self.format}
+
+
+class JSONPayloadParser(PayloadParser):
+    """JSON负载解析器（优先使用 orjson）"""
+    
+    format = "json"
+    
+    def parse(self, payload: Union[bytes, bytearray, memoryview], topic: Optional[str] = None) -> Records:
+        if orjson is not None:
+            return _as_records(orjson.loads(payload))
+        if isinstance(payload, memoryview):
+            payload = payload.tobytes()
+        return _as_records(json.loads(payload))
+    
+    def describe(self) -> Dict[str, Any]:
+        return {"format": self.format, "backend": "orjson" if orjson is not None else "json"}
+
+
+class MsgPackPayloadParser(PayloadParser):
+    """MessagePack负载解析器"""
+    
+    format = "msgpack"
+    
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        if msgpack is None:
+            raise ValueError("msgpack 负载格式需要安装 msgpack")
+        super().__init__(options)
+    
+    def parse(self, payload: Union[bytes, bytearray, memoryview], topic: Optional[str] = None) -> Records:
+        return _as_records(msgpack.unpackb(payload, raw=False))
+
+
+# 寄存器类型 -> struct格式字符
+REGISTER_TYPES = {
+    "bool": "?",
+    "i8": "b",
+    "u8": "B",
+    "i16": "h",
+    "u16": "H",
+    "i32": "i",
+    "u32": "I",
+    "i64": "q",
+    "u64": "Q",
+    "f32": "f",
+    "f64": "d",
+}
+
+# 帧首时间戳: none（使用接收时间）/ u32（秒）/ u64（毫秒）
+TIMESTAMP_TYPES = {"none": "", "u32": "I", "u64": "Q"}
+
+
+class RegisterLayoutParser(PayloadParser):
+    """
+    二进制寄存器帧解析器
+    
+    帧结构: [时间戳] + 按顺序排列的寄存器，无分隔符。寄存器值按 值 * scale + offset 换算，
+    scale 为1且 offset 为0时保留原始整数。资产编码取主题的第 asset_level 级
+    （从0开始，如 plc/+/registers 配置为1），未配置时由适配器从主题中提取。
+    """
+    
+    format = "registers"
+    
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        super().__init__(options)
+        options = self.options
+        
+        byte_order = options.get("byte_order", "big")
+        if byte_order not in ("big", "little"):
+            raise ValueError(f"不支持的字节序: {byte_order}")
+        timestamp = options.get("timestamp", "none")
+        if timestamp not in TIMESTAMP_TYPES:
+            raise ValueError(f"不支持的时间戳类型: {timestamp}")
+        registers = options.get("registers") or []
+        if not registers:
+            raise ValueError("registers 负载格式必须配置寄存器布局")
+        
+        fmt = [">" if byte_order == "big" else "<", TIMESTAMP_TYPES[timestamp]]
+        # (信号名, 缩放, 偏移)，顺序与解包结果一致
+        self._fields: List[Tuple[str, float, float]] = []
+        for register in registers:
+            register_type = register.get("type", "u16")
+            if register_type == "pad":
+                fmt.append(f"{int(register.get('size', 2))}x")
+                continue
+            if register_type not in REGISTER_TYPES:
+                raise ValueError(f"不支持的寄存器类型: {register_type}")
+            name = register.get("name")
+            if not name:
+                raise ValueError("寄存器必须配置 name")
+            fmt.append(REGISTER_TYPES[register_type])
+            self._fields.append((name, register.get("scale", 1), register.get("offset", 0)))
+        
+        self._has_timestamp = timestamp != "none"
+        self._names = tuple(name for name, _, _ in self._fields)
+        # 需要换算的寄存器: (位置, 缩放, 偏移)
+        self._scaled = tuple(
+            (i, scale, bias) for i, (_, scale, bias) in enumerate(self._fields) if scale != 1 or bias
+        )
+        self._asset_level: Optional[int] = options.get("asset_level")
+        self._struct = struct.Struct("".join(fmt))
+        self.frame_size = self._struct.size
+    
+    def parse(self, payload: Union[bytes, bytearray, memoryview], topic: Optional[str] = None) -> Records:
+        size = len(payload)
+        frame_size = self.frame_size
+        if size == 0 or size % frame_size:
+            raise ValueError(f"寄存器帧长度错误: {size} 字节（帧长度 {frame_size} 字节）")
+        
+        asset_code = None
+        if self._asset_level is not None and topic:
+            parts = topic.split("/")
+            if self._asset_level < len(parts):
+                asset_code = parts[self._asset_level]
+        
+        names = self._names
+        scaled = self._scaled
+        records = []
+        for values in self._struct.iter_unpack(payload):
+            record: Dict[str, Any] = {}
+            if asset_code:
+                record["asset_code"] = asset_code
+            if self._has_timestamp:
+                record["timestamp"] = values[0]
+                values = values[1:]
+            if scaled:
+                values = list(values)
+                for i, scale, bias in scaled:
+                    values[i] = values[i] * scale + bias
+            record["signals"] = dict(zip(names, values))
+            records.append(record)
+        return records
+    
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "frame_size": self.frame_size,
+            "registers": list(self._names),
+        }
+
+
+# 格式名称 -> 解析器类
+PARSER_FORMATS: Dict[str, Type[PayloadParser]] = {
+    JSONPayloadParser.format: JSONPayloadParser,
+    MsgPackPayloadParser.format: MsgPackPayloadParser,
+    RegisterLayoutParser.format: RegisterLayoutParser,
+}
+
+
+def register_parser_format(name: str, parser_class: Type[PayloadParser]) -> None:
+    """注册自定义负载格式"""
+    PARSER_FORMATS[name] = parser_class
+
+
+def create_parser(spec: Union[str, Dict[str, Any]]) -> PayloadParser:
+    """
+    根据配置创建解析器
+    
+    Args:
+        spec: 格式名称，或包含 format 及解析器选项的字典
+    
+    Raises:
+        ValueError: 不支持的格式或配置错误
+    """
+    if isinstance(spec, str):
+        spec = {"format": spec}
+    name = spec.get("format", "json")
+    parser_class = PARSER_FORMATS.get(name)
+    if parser_class is None:
+        raise ValueError(f"不支持的负载格式: {name}")
+    return parser_class(spec)
+
+
+class PayloadParserRegistry:
+    """
+    主题 -> 负载解析器
+    
+    按配置顺序匹配主题过滤器，匹配结果按主题缓存。
+    """
+    
+    # 主题缓存上限（超过时清空重建）
+    _CACHE_LIMIT = 10000
+    
+    def __init__(self, default: Optional[PayloadParser] = None):
+        self.default = default or JSONPayloadParser()
+        self._rules: List[Tuple[str, PayloadParser]] = []
+        self._cache: Dict[str, PayloadParser] = {}
+    
+    @classmethod
+    def from_config(
+        cls,
+        specs: Optional[List[Dict[str, Any]]] = None,
+        default_format: Union[str, Dict[str, Any]] = "json"
+    ) -> "PayloadParserRegistry":
+        """
+        从适配器配置创建
+        
+        Args:
+            specs: [{"topic": 主题过滤器, "format": 格式, ...解析器选项}, ...]
+            default_format: 未匹配主题使用的格式
+        
+        Raises:
+            ValueError: 配置错误
+        """
+        registry = cls(create_parser(default_format))
+        for spec in specs or []:
+            topic = spec.get("topic")
+            if not topic:
+                raise ValueError(f"负载解析器必须配置 topic: {spec}")
+            registry.add(topic, create_parser(spec))
+        return registry
+    
+    def add(self, pattern: str, parser: PayloadParser) -> None:
+        """添加主题过滤器对应的解析器"""
+        self._rules.append((pattern, parser))
+        self._cache.clear()
+    
+    def resolve(self, topic: Optional[str]) -> PayloadParser:
+        """获取主题对应的解析器"""
+        if topic is None or not self._rules:
+            return self.default
+        parser = self._cache.get(topic)
+        if parser is None:
+            parser = self.default
+            for pattern, candidate in self._rules:
+                if topic_matches(pattern, topic):
+                    parser = candidate
+                    break
+            if len(self._cache) >= self._CACHE_LIMIT:
+                self._cache.clear()
+            self._cache[topic] = parser
+        return parser
+    
+    def parse(self, payload: Union[bytes, bytearray, memoryview], topic: Optional[str] = None) -> Records:
+        """按主题选择解析器并解析负载"""
+        return self.resolve(topic).parse(payload, topic)
+    
+    def describe(self) -> List[Dict[str, Any]]:
+        """解析器配置摘要"""
+        rules = [{"topic": pattern, **parser.describe()} for pattern, parser in self._rules]
+        rules.append({"topic": None, **self.default.describe()})
+        return rules
+
+
+# 解析任务的单条结果: (记录, 错误信息)，解析失败时记录为None
+ParseResult = Tuple[Optional[Records], Optional[str]]
+
+
+def parse_messages(
+    registry: PayloadParserRegistry,
+    messages: List[Tuple[str, Union[bytes, bytearray, memoryview]]]
+) -> List[ParseResult]:
+    """
+    批量解析消息，单条失败不影响其他消息
+    
+    Args:
+        registry: 解析器注册表
+        messages: [(topic, payload), ...]
+    
+    Returns:
+        List[ParseResult]: 与 messages 一一对应
+    """
+    results: List[ParseResult] = []
+    for topic, payload in messages:
+        try:
+            results.append((registry.parse(payload, topic), None))
+        except Exception as e:
+            results.append((None, str(e)))
+    return results
+
+
+# 进程池工作进程内按配置缓存的注册表
+_worker_registries: Dict[str, PayloadParserRegistry] = {}
+
+
+def parser_config_key(specs: Optional[List[Dict[str, Any]]], default_format: Union[str, Dict[str, Any]]) -> str:
+    """解析器配置的序列化形式（传给进程池工作进程）"""
+    return json.dumps({"parsers": specs or [], "payload_format": default_format}, sort_keys=True, default=str)
+
+
+def parse_messages_in_worker(
+    config_key: str,
+    messages: List[Tuple[str, bytes]]
+) -> List[ParseResult]:
+    """
+    进程池入口: 按配置创建（并缓存）注册表后批量解析
+    
+    工作进程中只有内置格式和模块导入时注册的格式可用，
+    运行时通过 register_parser_format 注册的格式需在 fork 之前完成。
+    """
+    registry = _worker_registries.get(config_key)
+    if registry is None:
+        config = json.loads(config_key)
+        registry = PayloadParserRegistry.from_config(config["parsers"], config["payload_format"])
+        _worker_registries[config_key] = registry
+    return parse_messages(registry, messages)
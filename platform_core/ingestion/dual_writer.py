@@ -21,6 +21,8 @@ from platform_core.ingestion.dual_write_config import (
     get_dual_write_config_manager,
 )
 from platform_core.ingestion.adapters.base_adapter import DataPoint
+from platform_core.timeseries.table_registry import get_table_registry
+from platform_core.timeseries.last_value_cache import get_last_value_cache
 
 logger = logging.getLogger(__name__)
 
@@ -131,8 +133,17 @@ class DualWriteAdapter:
         # TDengine客户端（延迟初始化）
         self._td_client = None
         
+        # 进程级已知表缓存
+        self._table_registry = get_table_registry()
+        
+        # 实时最新值缓存（新结构写入成功后更新）
+        self._last_values = get_last_value_cache()
+        
         # 写入锁（防止并发问题）
         self._write_lock = asyncio.Lock()
+        
+        # 批量写入时单条SQL的最大字节数（TDengine默认maxSQLLength为1MB，留出余量）
+        self._max_batch_sql_bytes = 512 * 1024
     
     @property
     def config_manager(self) -> DualWriteConfigManager:
@@ -185,6 +196,7 @@ class DualWriteAdapter:
                 )
                 result.new_write_success = True
                 self._statistics["new_success"] += 1
+                self._last_values.update(asset_code, data, timestamp)
             except Exception as e:
                 result.new_write_success = False
                 result.new_write_error = str(e)
@@ -257,27 +269,105 @@ class DualWriteAdapter:
     async def write_batch(
         self,
         category_code: str,
-        data_points: List[Tuple[str, Dict[str, Any], Optional[datetime]]]
+        data_points: List[Tuple[str, Dict[str, Any], Optional[datetime]]],
+        batch_mode: bool = True
     ) -> List[DualWriteResult]:
         """
         批量写入数据
         
+        批量模式下，新结构按子表分组，使用TDengine多表插入语法
+        `INSERT INTO t1 USING stb TAGS(..) VALUES (..)(..) t2 USING ...`
+        一次写入多个子表（自动建表，无需逐条检查子表），SQL按大小切分。
+        结果仍按数据点逐条返回，与输入顺序一一对应。
+        
         Args:
             category_code: 资产类别编码
             data_points: 数据点列表 [(asset_code, data, timestamp), ...]
+            batch_mode: 是否使用多表批量插入（False时逐条写入）
         
         Returns:
             List[DualWriteResult]: 写入结果列表
         """
-        results = []
-        for asset_code, data, timestamp in data_points:
-            result = await self.write_asset_data(
-                category_code=category_code,
-                asset_code=asset_code,
-                data=data,
-                timestamp=timestamp
-            )
-            results.append(result)
+        if not batch_mode:
+            results = []
+            for asset_code, data, timestamp in data_points:
+                result = await self.write_asset_data(
+                    category_code=category_code,
+                    asset_code=asset_code,
+                    data=data,
+                    timestamp=timestamp
+                )
+                results.append(result)
+            return results
+        
+        points = [
+            (asset_code, data, timestamp or datetime.now())
+            for asset_code, data, timestamp in data_points
+        ]
+        results = [DualWriteResult(success=True) for _ in points]
+        self._statistics["total_writes"] += len(points)
+        
+        # 1. 写入新结构（主写入，多表批量插入）
+        if points and self._config_manager.should_write_to_new(category_code):
+            errors = await self._write_batch_to_new_structure(category_code, points)
+            
+            for index, (asset_code, data, timestamp) in enumerate(points):
+                error = errors.get(index)
+                if error is None:
+                    self._statistics["new_success"] += 1
+                    self._last_values.update(asset_code, data, timestamp)
+                    continue
+                
+                result = results[index]
+                result.new_write_success = False
+                result.new_write_error = str(error)
+                result.success = False
+                self._statistics["new_failures"] += 1
+                
+                self._log_error(
+                    category_code=category_code,
+                    asset_code=asset_code,
+                    target="new",
+                    error_type=type(error).__name__,
+                    error_message=str(error),
+                    data_snapshot=data
+                )
+            
+            if errors:
+                logger.error(f"新结构批量写入失败: {category_code} - {len(errors)}/{len(points)} 条")
+        
+        # 2. 如果启用双写，写入旧结构（兼容性写入，逐条执行）
+        if self._config_manager.should_write_to_old(category_code):
+            fail_on_old_error = self._config_manager.should_fail_on_old_error(category_code)
+            
+            for (asset_code, data, timestamp), result in zip(points, results):
+                self._statistics["dual_write_enabled_count"] += 1
+                
+                try:
+                    await self._write_to_old_structure(
+                        category_code, asset_code, data, timestamp
+                    )
+                    result.old_write_success = True
+                    self._statistics["old_success"] += 1
+                except Exception as e:
+                    result.old_write_success = False
+                    result.old_write_error = str(e)
+                    self._statistics["old_failures"] += 1
+                    
+                    self._log_error(
+                        category_code=category_code,
+                        asset_code=asset_code,
+                        target="old",
+                        error_type=type(e).__name__,
+                        error_message=str(e),
+                        data_snapshot=data
+                    )
+                    
+                    logger.warning(f"旧结构写入失败（已隔离）: {category_code}/{asset_code} - {e}")
+                    
+                    if fail_on_old_error:
+                        result.success = False
+        
         return results
     
     # =====================================================
@@ -316,24 +406,120 @@ class DualWriteAdapter:
         await self._ensure_child_table(td_client, stable_name, table_name, asset_code)
         
         # 构建插入SQL
-        columns = ["ts"]
-        values = [f"'{timestamp.isoformat()}'"]
+        columns = ["ts", *data.keys()]
+        values = self._format_row_values(data, timestamp)
         
-        for signal_code, value in data.items():
-            columns.append(signal_code)
-            if isinstance(value, str):
-                values.append(f"'{value}'")
-            elif isinstance(value, bool):
-                values.append(str(value).lower())
-            elif value is None:
-                values.append("NULL")
-            else:
-                values.append(str(value))
-        
-        sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join(values)})"
+        sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES {values}"
         
         await td_client.execute(sql)
     
+    async def _write_batch_to_new_structure(
+        self,
+        category_code: str,
+        points: List[Tuple[str, Dict[str, Any], datetime]]
+    ) -> Dict[int, Exception]:
+        """
+        批量写入新数据结构（TDengine多表插入）
+        
+        按 (子表, 列集合) 分组生成 `tb USING stb TAGS (..) (cols) VALUES (..)(..)`
+        片段，再按 `_max_batch_sql_bytes` 拼接成若干条INSERT语句依次执行。
+        某条语句失败只影响其包含的数据点。
+        
+        Args:
+            category_code: 资产类别编码
+            points: 数据点列表 [(asset_code, data, timestamp), ...]
+        
+        Returns:
+            Dict[int, Exception]: 写入失败的数据点索引 -> 异常
+        """
+        stable_name = f"raw_{category_code}"
+        
+        td_client = await self._get_td_client()
+        
+        if td_client is None:
+            logger.debug(f"TDengine客户端不可用，跳过新结构批量写入: {stable_name}")
+            return {}
+        
+        # 按 (子表, 列集合) 分组，同一子表内列集合相同的行才能共用一个VALUES列表
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[int]] = {}
+        for index, (asset_code, data, _) in enumerate(points):
+            groups.setdefault((asset_code, tuple(data.keys())), []).append(index)
+        
+        errors: Dict[int, Exception] = {}
+        prefix = "INSERT INTO"
+        statement_parts: List[str] = []
+        statement_indexes: List[int] = []
+        statement_size = len(prefix)
+        
+        async def flush():
+            nonlocal statement_parts, statement_indexes, statement_size
+            if not statement_parts:
+                return
+            sql = f"{prefix} {' '.join(statement_parts)}"
+            table_names = {f"raw_{category_code}_{points[index][0]}" for index in statement_indexes}
+            try:
+                await td_client.execute(sql)
+                self._table_registry.add_many(table_names)
+            except Exception as e:
+                for index in statement_indexes:
+                    errors[index] = e
+                # 子表可能已被删除，下次写入重新带上自动建表子句
+                for table_name in table_names:
+                    self._table_registry.discard(table_name)
+            statement_parts, statement_indexes = [], []
+            statement_size = len(prefix)
+        
+        for (asset_code, signal_codes), indexes in groups.items():
+            table_name = f"raw_{category_code}_{asset_code}"
+            # 已知存在的子表省略 USING ... TAGS 自动建表子句
+            using = "" if self._table_registry.contains(table_name) else f"USING {stable_name} TAGS ('{asset_code}') "
+            header = f"{table_name} {using}({', '.join(('ts', *signal_codes))}) VALUES "
+            
+            rows: List[str] = []
+            row_indexes: List[int] = []
+            rows_size = 0
+            for index in indexes:
+                _, data, timestamp = points[index]
+                row = self._format_row_values(data, timestamp)
+                
+                # 当前语句放不下时先提交已拼好的部分
+                if statement_size + len(header) + rows_size + len(row) + 1 > self._max_batch_sql_bytes:
+                    if rows:
+                        statement_parts.append(header + "".join(rows))
+                        statement_indexes.extend(row_indexes)
+                        rows, row_indexes, rows_size = [], [], 0
+                    await flush()
+                
+                rows.append(row)
+                row_indexes.append(index)
+                rows_size += len(row)
+            
+            if rows:
+                statement_parts.append(header + "".join(rows))
+                statement_indexes.extend(row_indexes)
+                statement_size += len(header) + rows_size + 1
+        
+        await flush()
+        
+        return errors
+    
+    @staticmethod
+    def _format_sql_value(value: Any) -> str:
+        """将信号值格式化为SQL字面量"""
+        if isinstance(value, str):
+            return f"'{value}'"
+        elif isinstance(value, bool):
+            return str(value).lower()
+        elif value is None:
+            return "NULL"
+        return str(value)
+    
+    def _format_row_values(self, data: Dict[str, Any], timestamp: datetime) -> str:
+        """格式化一行VALUES: ('ts', v1, v2, ...)"""
+        values = [f"'{timestamp.isoformat()}'"]
+        values.extend(self._format_sql_value(value) for value in data.values())
+        return f"({', '.join(values)})"
+    
     async def _write_to_old_structure(
         self,
         category_code: str,
@@ -421,21 +607,10 @@ class DualWriteAdapter:
         
         try:
             # 尝试写入旧表
-            columns = ["ts"]
-            values = [f"'{timestamp.isoformat()}'"]
+            columns = ["ts", *data.keys()]
+            values = self._format_row_values(data, timestamp)
             
-            for signal_code, value in data.items():
-                columns.append(signal_code)
-                if isinstance(value, str):
-                    values.append(f"'{value}'")
-                elif isinstance(value, bool):
-                    values.append(str(value).lower())
-                elif value is None:
-                    values.append("NULL")
-                else:
-                    values.append(str(value))
-            
-            sql = f"INSERT INTO {old_table_name} ({', '.join(columns)}) VALUES ({', '.join(values)})"
+            sql = f"INSERT INTO {old_table_name} ({', '.join(columns)}) VALUES {values}"
             await td_client.execute(sql)
             
         except Exception as e:
@@ -450,6 +625,9 @@ class DualWriteAdapter:
         asset_code: str
     ):
         """确保TDengine子表存在"""
+        if self._table_registry.contains(table_name):
+            return
+        
         try:
             # 检查表是否存在
             result = await td_client.query(f"SHOW TABLES LIKE '{table_name}'")
@@ -457,6 +635,7 @@ class DualWriteAdapter:
                 # 创建子表
                 sql = f"CREATE TABLE IF NOT EXISTS {table_name} USING {stable_name} TAGS ('{asset_code}')"
                 await td_client.execute(sql)
+            self._table_registry.add(table_name)
         except Exception as e:
             logger.debug(f"确保子表存在失败: {e}")
     
@@ -137,6 +137,8 @@ class IngestionMonitor:
             error_logger: 错误日志记录器
         """
         self._adapters: Dict[str, BaseAdapter] = {}
+        self._write_buffers: Dict[str, Any] = {}
+        self._polling_schedulers: Dict[str, Any] = {}
         self._health_info: Dict[str, AdapterHealthInfo] = {}
         self._check_interval = check_interval
         self._error_logger = error_logger or get_error_logger()
@@ -194,6 +196,48 @@ class IngestionMonitor:
             self._health_info.pop(name, None)
             logger.info(f"已注销适配器: {name}")
     
+    def register_write_buffer(self, name: str, write_buffer: Any):
+        """
+        注册写缓冲，其指标将包含在 get_metrics 中
+        
+        Args:
+            name: 写缓冲名称
+            write_buffer: 写缓冲实例（IngestionWriteBuffer）
+        """
+        self._write_buffers[name] = write_buffer
+        logger.info(f"已注册写缓冲: {name}")
+    
+    def unregister_write_buffer(self, name: str):
+        """注销写缓冲"""
+        self._write_buffers.pop(name, None)
+    
+    def register_polling_scheduler(self, name: str, scheduler: Any):
+        """
+        注册HTTP轮询调度器，其指标（含每个数据源的轮询延迟）将包含在 get_metrics 中
+        
+        Args:
+            name: 调度器名称
+            scheduler: 调度器实例（HTTPPollingScheduler）
+        """
+        self._polling_schedulers[name] = scheduler
+        logger.info(f"已注册轮询调度器: {name}")
+    
+    def unregister_polling_scheduler(self, name: str):
+        """注销轮询调度器"""
+        self._polling_schedulers.pop(name, None)
+    
+    def get_polling_lag(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取所有调度数据源的轮询延迟
+        
+        Returns:
+            Dict: 数据源名称 -> {last_lag_ms, avg_lag_ms, max_lag_ms, ...}
+        """
+        lag = {}
+        for scheduler in self._polling_schedulers.values():
+            lag.update(scheduler.get_metrics()["per_source"])
+        return lag
+    
     def get_adapter(self, name: str) -> Optional[BaseAdapter]:
         """获取适配器"""
         return self._adapters.get(name)
@@ -476,9 +520,23 @@ class IngestionMonitor:
                 "uptime_seconds": stats.uptime_seconds,
             }
         
+        # 写缓冲指标
+        buffer_metrics = {
+            name: write_buffer.get_metrics()
+            for name, write_buffer in self._write_buffers.items()
+        }
+        
+        # 轮询调度器指标
+        polling_metrics = {
+            name: scheduler.get_metrics()
+            for name, scheduler in self._polling_schedulers.items()
+        }
+        
         return {
             "overall": self._metrics.to_dict(),
             "adapters": adapter_metrics,
+            "write_buffers": buffer_metrics,
+            "polling": polling_metrics,
             "timestamp": datetime.now().isoformat(),
         }
     
@@ -498,6 +556,12 @@ class IngestionMonitor:
         
         health_info = self._health_info.get(name)
         
+        polling = None
+        for scheduler in self._polling_schedulers.values():
+            polling = scheduler.get_source_statistics(name)
+            if polling is not None:
+                break
+        
         return {
             "name": name,
             "protocol": adapter.protocol,
@@ -506,6 +570,7 @@ class IngestionMonitor:
             "health": health_info.to_dict() if health_info else None,
             "config": adapter.config,
             "statistics": adapter.statistics.to_dict(),
+            "polling": polling,
         }
     
     # =====================================================
@@ -0,0 +1,513 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP轮询调度器
+
+大量HTTP数据源（网关）共用一个调度器，代替每个 HTTPAdapter 各自的轮询循环和客户端:
+
+- 共享一个连接池化的 httpx.AsyncClient（keep-alive，安装 h2 时启用HTTP/2）
+- 时间轮（TimerWheel）按各数据源的轮询间隔触发，间隔加随机抖动，首次轮询在一个间隔内随机分布，
+  避免大量数据源同时请求
+- 全局并发上限和按主机的并发上限
+- 条件请求（If-None-Match / If-Modified-Since），304 响应不解析，跳过未变化的数据
+- 记录每个数据源的轮询延迟（实际开始时间与计划时间之差），通过 IngestionMonitor 查询
+
+数据源配置为 "scheduler": "shared" 的 HTTPAdapter 在连接时加入调度器，
+轮询结果解析后进入适配器的接收队列，仍由适配器的 run() 循环分发给回调。
+"""
+
+import asyncio
+import importlib.util
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Any, List, Optional, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from platform_core.ingestion.adapters.http_adapter import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    哈希时间轮
+    
+    按 tick 精度把到期时间映射到固定数量的槽位，调度和取消为 O(1)，
+    每次推进只检查经过的槽位。到期时间超过一圈的条目留在槽位中等待后续轮次。
+    """
+    
+    def __init__(self, tick: float = 0.1, slots: int = 512):
+        """
+        Args:
+            tick: 时间精度（秒）
+            slots: 槽位数量
+        """
+        self.tick = tick
+        self._slots: List[Dict[str, int]] = [{} for _ in range(slots)]
+        # key -> 所在槽位
+        self._where: Dict[str, int] = {}
+        self._current = math.floor(time.monotonic() / tick)
+    
+    def __len__(self) -> int:
+        return len(self._where)
+    
+    def schedule(self, key: str, due: float) -> None:
+        """
+        安排（或重新安排）到期时间
+        
+        Args:
+            key: 条目键
+            due: 到期时间（time.monotonic）
+        """
+        self.cancel(key)
+        due_tick = max(math.ceil(due / self.tick), self._current + 1)
+        slot = due_tick % len(self._slots)
+        self._slots[slot][key] = due_tick
+        self._where[key] = slot
+    
+    def cancel(self, key: str) -> None:
+        """取消条目"""
+        slot = self._where.pop(key, None)
+        if slot is not None:
+            self._slots[slot].pop(key, None)
+    
+    def advance(self, now: float) -> List[str]:
+        """
+        推进到指定时间
+        
+        Returns:
+            List[str]: 已到期的条目（按槽位顺序）
+        """
+        now_tick = math.floor(now / self.tick)
+        if now_tick <= self._current:
+            return []
+        
+        slots = len(self._slots)
+        start = self._current + 1
+        # 落后超过一圈时每个槽位只需检查一次
+        if now_tick - start >= slots:
+            start = now_tick - slots + 1
+        
+        expired: List[str] = []
+        for tick in range(start, now_tick + 1):
+            slot = self._slots[tick % slots]
+            if not slot:
+                continue
+            due = [key for key, due_tick in slot.items() if due_tick <= now_tick]
+            for key in due:
+                del slot[key]
+                del self._where[key]
+            expired.extend(due)
+        self._current = now_tick
+        return expired
+
+
+@dataclass
+class PollingSchedulerConfig:
+    """
+    轮询调度器配置
+    
+    Attributes:
+        max_concurrency: 同时进行的请求上限
+        max_per_host: 每个主机同时进行的请求上限
+        max_connections: 连接池最大连接数
+        max_keepalive_connections: 连接池保持的空闲连接数
+        keepalive_expiry: 空闲连接保持时间（秒）
+        http2: 是否启用HTTP/2（需要安装 h2）
+        jitter: 轮询间隔的随机抖动比例（0.1 表示 ±10%）
+        tick: 时间轮精度（秒）
+        conditional: 是否发送条件请求
+        parse_offload_bytes: 响应超过该大小时在线程中解析（字节，0表示不转移）
+    """
+    max_concurrency: int = 200
+    max_per_host: int = 8
+    max_connections: int = 500
+    max_keepalive_connections: int = 200
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    jitter: float = 0.1
+    tick: float = 0.1
+    conditional: bool = True
+    parse_offload_bytes: int = 256 * 1024
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PollingSchedulerConfig":
+        """从字典创建"""
+        defaults = cls()
+        return cls(**{key: data.get(key, getattr(defaults, key)) for key in defaults.__dataclass_fields__})
+
+
+@dataclass
+class PollSourceStatistics:
+    """
+    单个数据源的轮询统计
+    
+    Attributes:
+        polls: 轮询次数
+        not_modified: 304（未变化）次数
+        errors: 失败次数
+        data_points: 产生的数据点数
+        last_status: 最近一次响应状态码
+        last_lag_ms: 最近一次轮询延迟（毫秒）
+        avg_lag_ms: 轮询延迟的滑动平均（毫秒）
+        max_lag_ms: 最大轮询延迟（毫秒）
+        last_duration_ms: 最近一次请求耗时（毫秒）
+        last_poll_time: 最近一次轮询时间
+        last_error_message: 最近一次错误信息
+    """
+    polls: int = 0
+    not_modified: int = 0
+    errors: int = 0
+    data_points: int = 0
+    last_status: Optional[int] = None
+    last_lag_ms: float = 0.0
+    avg_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+    last_duration_ms: float = 0.0
+    last_poll_time: Optional[datetime] = None
+    last_error_message: Optional[str] = None
+    
+    def record_lag(self, lag_ms: float):
+        """记录轮询延迟"""
+        self.last_lag_ms = lag_ms
+        self.avg_lag_ms = lag_ms if self.polls == 0 else self.avg_lag_ms * 0.8 + lag_ms * 0.2
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "polls": self.polls,
+            "not_modified": self.not_modified,
+            "errors": self.errors,
+            "data_points": self.data_points,
+            "last_status": self.last_status,
+            "last_lag_ms": round(self.last_lag_ms, 2),
+            "avg_lag_ms": round(self.avg_lag_ms, 2),
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "last_duration_ms": round(self.last_duration_ms, 2),
+            "last_poll_time": self.last_poll_time.isoformat() if self.last_poll_time else None,
+            "last_error_message": self.last_error_message,
+        }
+
+
+class _PollSource:
+    """调度器中的数据源"""
+    
+    __slots__ = (
+        "adapter", "host", "due", "etag", "last_modified",
+        "failures", "in_flight", "statistics",
+    )
+    
+    def __init__(self, adapter: "HTTPAdapter"):
+        self.adapter = adapter
+        self.host = urlsplit(adapter.url).netloc
+        self.due = 0.0
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.failures = 0
+        self.in_flight = False
+        self.statistics = PollSourceStatistics()
+
+
+class HTTPPollingScheduler:
+    """
+    HTTP轮询调度器
+    
+    使用示例:
+    ```python
+    adapter = HTTPAdapter({"url": "http://gw-01/api/data", "poll_interval": 5, "scheduler": "shared"})
+    buffer.attach(adapter, category_code="welding")
+    
+    await adapter.run()   # 连接时加入调度器，停止时移除
+    ```
+    """
+    
+    def __init__(
+        self,
+        config: Optional[PollingSchedulerConfig] = None,
+        transport: Any = None
+    ):
+        """
+        初始化调度器
+        
+        Args:
+            config: 调度器配置（可选）
+            transport: httpx 传输层（可选，测试时传入 httpx.MockTransport）
+        """
+        self._config = config or PollingSchedulerConfig()
+        self._transport = transport
+        self._wheel = TimerWheel(tick=self._config.tick)
+        self._sources: Dict[str, _PollSource] = {}
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._limit: Optional[asyncio.Semaphore] = None
+        # verify_ssl -> 客户端
+        self._clients: Dict[bool, Any] = {}
+        self._http2 = False
+        self._tasks: set = set()
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self._running = False
+    
+    @property
+    def config(self) -> PollingSchedulerConfig:
+        """获取调度器配置"""
+        return self._config
+    
+    @property
+    def is_running(self) -> bool:
+        return self._running
+    
+    # =====================================================
+    # 数据源管理
+    # =====================================================
+    
+    def add_source(self, adapter: "HTTPAdapter"):
+        """
+        加入数据源，首次轮询时间在一个轮询间隔内随机分布
+        
+        Args:
+            adapter: HTTP适配器（以适配器名称区分数据源）
+        """
+        source = _PollSource(adapter)
+        self._sources[adapter.name] = source
+        source.due = time.monotonic() + random.uniform(0, adapter.poll_interval)
+        self._wheel.schedule(adapter.name, source.due)
+        logger.info(f"轮询调度器加入数据源: {adapter.name} ({adapter.url})")
+    
+    def remove_source(self, name: str):
+        """移除数据源（进行中的请求完成后不再调度）"""
+        if self._sources.pop(name, None) is not None:
+            self._wheel.cancel(name)
+            logger.info(f"轮询调度器移除数据源: {name}")
+    
+    def get_source_statistics(self, name: str) -> Optional[Dict[str, Any]]:
+        """获取数据源的轮询统计，未加入调度器时为None"""
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        return {
+            "url": source.adapter.url,
+            "host": source.host,
+            "poll_interval": source.adapter.poll_interval,
+            "next_poll_in": round(max(source.due - time.monotonic(), 0.0), 3),
+            "in_flight": source.in_flight,
+            **source.statistics.to_dict(),
+        }
+    
+    # =====================================================
+    # 生命周期
+    # =====================================================
+    
+    async def start(self):
+        """启动调度（创建客户端并开始分发）"""
+        if self._running:
+            return
+        self._limit = asyncio.Semaphore(self._config.max_concurrency)
+        self._http2 = self._config.http2 and importlib.util.find_spec("h2") is not None
+        if self._config.http2 and not self._http2:
+            logger.warning("未安装 h2，HTTP轮询调度器使用HTTP/1.1")
+        self._running = True
+        self._dispatch_task = asyncio.create_task(self._dispatch_loop())
+        logger.info(f"HTTP轮询调度器已启动: http2={self._http2}, max_concurrency={self._config.max_concurrency}")
+    
+    async def stop(self):
+        """停止调度并关闭客户端"""
+        self._running = False
+        if self._dispatch_task is not None:
+            self._dispatch_task.cancel()
+            try:
+                await self._dispatch_task
+            except asyncio.CancelledError:
+                pass
+            self._dispatch_task = None
+        
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+        logger.info("HTTP轮询调度器已停止")
+    
+    def _get_client(self, verify: bool):
+        """获取共享客户端（按是否校验证书区分）"""
+        client = self._clients.get(verify)
+        if client is None:
+            import httpx
+            
+            limits = httpx.Limits(
+                max_connections=self._config.max_connections,
+                max_keepalive_connections=self._config.max_keepalive_connections,
+                keepalive_expiry=self._config.keepalive_expiry,
+            )
+            client = httpx.AsyncClient(
+                http2=self._http2,
+                limits=limits,
+                verify=verify,
+                transport=self._transport,
+            )
+            self._clients[verify] = client
+        return client
+    
+    # =====================================================
+    # 调度
+    # =====================================================
+    
+    async def _dispatch_loop(self):
+        """按时间轮精度分发到期的轮询"""
+        while self._running:
+            try:
+                for name in self._wheel.advance(time.monotonic()):
+                    source = self._sources.get(name)
+                    if source is None:
+                        continue
+                    source.in_flight = True
+                    task = asyncio.create_task(self._poll(source))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+            except Exception as e:
+                logger.error(f"轮询调度分发失败: {e}")
+            await asyncio.sleep(self._wheel.tick)
+    
+    def _host_limit(self, host: str) -> asyncio.Semaphore:
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self._config.max_per_host)
+            self._host_limits[host] = limit
+        return limit
+    
+    async def _poll(self, source: _PollSource):
+        """执行一次轮询并安排下一次"""
+        adapter = source.adapter
+        statistics = source.statistics
+        try:
+            async with self._limit, self._host_limit(source.host):
+                started = time.monotonic()
+                statistics.record_lag((started - source.due) * 1000)
+                statistics.polls += 1
+                statistics.last_poll_time = datetime.now()
+                try:
+                    await self._request(source)
+                    source.failures = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    source.failures += 1
+                    statistics.errors += 1
+                    statistics.last_error_message = str(e)
+                    adapter.record_poll_error(e)
+                finally:
+                    statistics.last_duration_ms = (time.monotonic() - started) * 1000
+        finally:
+            source.in_flight = False
+            self._schedule_next(source)
+    
+    async def _request(self, source: _PollSource):
+        """发送请求，响应有变化时解析并交给适配器"""
+        adapter = source.adapter
+        request = adapter.build_request()
+        headers = dict(request.pop("headers", None) or {})
+        conditional = self._config.conditional and request["method"] == "GET"
+        if conditional:
+            if source.etag:
+                headers["If-None-Match"] = source.etag
+            if source.last_modified:
+                headers["If-Modified-Since"] = source.last_modified
+        
+        client = self._get_client(adapter.verify_ssl)
+        response = await client.request(headers=headers, **request)
+        source.statistics.last_status = response.status_code
+        if response.status_code == 304:
+            source.statistics.not_modified += 1
+            return
+        response.raise_for_status()
+        
+        if conditional:
+            source.etag = response.headers.get("etag")
+            source.last_modified = response.headers.get("last-modified")
+        
+        content = response.content
+        offload = self._config.parse_offload_bytes
+        if offload and len(content) > offload:
+            data_points = await asyncio.to_thread(adapter.parse_response_content, content)
+        else:
+            data_points = adapter.parse_response_content(content)
+        source.statistics.data_points += len(data_points)
+        adapter.deliver(data_points, len(content))
+    
+    def _schedule_next(self, source: _PollSource):
+        """按间隔（加抖动）安排下一次轮询；失败时按适配器的重试配置提前重试"""
+        adapter = source.adapter
+        if adapter.name not in self._sources:
+            return
+        now = time.monotonic()
+        if 0 < source.failures < adapter.retry_count:
+            due = now + adapter.retry_delay
+        else:
+            jitter = self._config.jitter
+            due = source.due + adapter.poll_interval * (1 + random.uniform(-jitter, jitter))
+            # 错过的轮询不补发
+            due = max(due, now)
+        source.due = due
+        self._wheel.schedule(adapter.name, due)
+    
+    # =====================================================
+    # 统计
+    # =====================================================
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取调度器指标
+        
+        Returns:
+            Dict: 整体指标及按数据源的轮询统计
+        """
+        lags = sorted(source.statistics.last_lag_ms for source in self._sources.values())
+        
+        def percentile(p: float) -> float:
+            return round(lags[min(int(len(lags) * p), len(lags) - 1)], 2) if lags else 0.0
+        
+        return {
+            "running": self._running,
+            "http2": self._http2,
+            "sources": len(self._sources),
+            "hosts": len(self._host_limits),
+            "in_flight": len(self._tasks),
+            "polls": sum(source.statistics.polls for source in self._sources.values()),
+            "not_modified": sum(source.statistics.not_modified for source in self._sources.values()),
+            "errors": sum(source.statistics.errors for source in self._sources.values()),
+            "lag_ms": {"p50": percentile(0.5), "p99": percentile(0.99), "max": lags[-1] if lags else 0.0},
+            "per_source": {name: self.get_source_statistics(name) for name in self._sources},
+        }
+
+
+# 全局调度器实例
+_default_scheduler: Optional[HTTPPollingScheduler] = None
+
+
+def get_http_polling_scheduler() -> HTTPPollingScheduler:
+    """获取默认轮询调度器（首次创建时注册到默认采集监控）"""
+    global _default_scheduler
+    if _default_scheduler is None:
+        from platform_core.ingestion.monitor import get_ingestion_monitor
+        
+        _default_scheduler = HTTPPollingScheduler()
+        get_ingestion_monitor().register_polling_scheduler("default", _default_scheduler)
+    return _default_scheduler
+
+
+async def shutdown_http_polling_scheduler():
+    """停止默认轮询调度器并关闭共享客户端（应用关闭时调用）"""
+    global _default_scheduler
+    if _default_scheduler is not None:
+        from platform_core.ingestion.monitor import get_ingestion_monitor
+        
+        await _default_scheduler.stop()
+        get_ingestion_monitor().unregister_polling_scheduler("default")
+        _default_scheduler = None
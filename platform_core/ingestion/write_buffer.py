@@ -0,0 +1,456 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+采集写缓冲
+
+在协议适配器与存储之间提供按类别划分的有界内存缓冲区（write-behind），
+按数量或时间批量刷写到双写适配器，使消息接收速率与数据库写入延迟解耦。
+
+缓冲区写满时的背压策略:
+- block: 阻塞生产者（适配器接收循环）直到有空间
+- drop_oldest: 丢弃最旧的数据点
+- spill_to_disk: 溢出到本地磁盘，缓冲区空闲后回放
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Any, List, Optional, Deque
+
+from platform_core.ingestion.adapters.base_adapter import BaseAdapter, DataPoint
+from platform_core.ingestion.dual_writer import DualWriteAdapter, get_dual_write_adapter
+
+logger = logging.getLogger(__name__)
+
+
+class BackpressurePolicy(str, Enum):
+    """背压策略枚举"""
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    SPILL_TO_DISK = "spill_to_disk"
+
+
+@dataclass
+class WriteBufferConfig:
+    """
+    写缓冲配置
+    
+    Attributes:
+        capacity: 每个类别缓冲区的最大数据点数
+        flush_size: 达到该数量立即刷写
+        flush_interval: 最长刷写间隔（秒）
+        backpressure: 缓冲区写满时的背压策略
+        spill_dir: 溢出文件目录（spill_to_disk 策略使用）
+        spill_segment_size: 单个溢出文件的最大数据点数
+    """
+    capacity: int = 50000
+    flush_size: int = 5000
+    flush_interval: float = 0.2
+    backpressure: BackpressurePolicy = BackpressurePolicy.BLOCK
+    spill_dir: str = "data/ingestion_spill"
+    spill_segment_size: int = 5000
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WriteBufferConfig":
+        """从字典创建"""
+        return cls(
+            capacity=data.get("capacity", 50000),
+            flush_size=data.get("flush_size", 5000),
+            flush_interval=data.get("flush_interval", 0.2),
+            backpressure=BackpressurePolicy(data.get("backpressure", BackpressurePolicy.BLOCK.value)),
+            spill_dir=data.get("spill_dir", "data/ingestion_spill"),
+            spill_segment_size=data.get("spill_segment_size", 5000),
+        )
+
+
+@dataclass
+class WriteBufferStatistics:
+    """
+    类别缓冲区统计信息
+    
+    Attributes:
+        enqueued: 入队数据点数
+        flushed: 成功写入数据点数
+        failed: 写入失败数据点数
+        dropped: 因背压或已停止而丢弃的数据点数
+        spilled: 溢出到磁盘的数据点数
+        replayed: 从磁盘回放的数据点数
+        flush_count: 刷写次数
+        blocked_seconds: 生产者累计阻塞时长（秒）
+        last_flush_size: 最近一次刷写的数据点数
+        last_flush_latency_ms: 最近一次刷写耗时（毫秒）
+        last_flush_time: 最近一次刷写时间
+    """
+    enqueued: int = 0
+    flushed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    spilled: int = 0
+    replayed: int = 0
+    flush_count: int = 0
+    blocked_seconds: float = 0.0
+    last_flush_size: int = 0
+    last_flush_latency_ms: float = 0.0
+    last_flush_time: Optional[datetime] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "flush_count": self.flush_count,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "last_flush_size": self.last_flush_size,
+            "last_flush_latency_ms": round(self.last_flush_latency_ms, 2),
+            "last_flush_time": self.last_flush_time.isoformat() if self.last_flush_time else None,
+        }
+
+
+class _CategoryBuffer:
+    """单个资产类别的环形缓冲区及其刷写任务"""
+    
+    def __init__(self, category_code: str):
+        self.category_code = category_code
+        self.points: Deque[DataPoint] = deque()
+        self.statistics = WriteBufferStatistics()
+        self.not_full = asyncio.Condition()
+        self.flush_event = asyncio.Event()
+        self.flush_task: Optional[asyncio.Task] = None
+        
+        # 溢出文件（按写入顺序）
+        self.spill_segments: Deque[str] = deque()
+        self.spill_file = None
+        self.spill_file_count = 0
+        self.spill_seq = 0
+
+
+class IngestionWriteBuffer:
+    """
+    采集写缓冲
+    
+    收集适配器产生的DataPoint，按类别缓存，达到 flush_size 或
+    flush_interval 时通过 DualWriteAdapter.write_batch 批量写入。
+    
+    使用示例:
+    ```python
+    buffer = IngestionWriteBuffer(config=WriteBufferConfig(flush_size=5000, flush_interval=0.2))
+    buffer.attach(mqtt_adapter, category_code="welding")
+    get_ingestion_monitor().register_write_buffer("default", buffer)
+    
+    await mqtt_adapter.run()
+    await buffer.stop()
+    ```
+    """
+    
+    def __init__(
+        self,
+        dual_writer: Optional[DualWriteAdapter] = None,
+        config: Optional[WriteBufferConfig] = None
+    ):
+        """
+        初始化写缓冲
+        
+        Args:
+            dual_writer: 双写适配器（可选，默认使用全局实例）
+            config: 缓冲配置（可选）
+        """
+        self._dual_writer = dual_writer or get_dual_write_adapter()
+        self._config = config or WriteBufferConfig()
+        self._buffers: Dict[str, _CategoryBuffer] = {}
+        self._running = True
+    
+    @property
+    def config(self) -> WriteBufferConfig:
+        """获取缓冲配置"""
+        return self._config
+    
+    # =====================================================
+    # 生产者接口
+    # =====================================================
+    
+    def attach(self, adapter: BaseAdapter, category_code: Optional[str] = None):
+        """
+        将适配器的数据回调接入缓冲区
+        
+        Args:
+            adapter: 协议适配器
+            category_code: 资产类别编码（可选，默认取适配器配置中的 category_code）
+        """
+        category = category_code or adapter.get_config_value("category_code")
+        
+        async def _on_data(data_point: DataPoint):
+            await self.put(data_point, category or data_point.metadata.get("category_code"))
+        
+        adapter.on_data(_on_data)
+    
+    async def put(self, data_point: DataPoint, category_code: Optional[str]) -> bool:
+        """
+        写入一个数据点
+        
+        Args:
+            data_point: 数据点
+            category_code: 资产类别编码
+        
+        Returns:
+            bool: 数据点是否被接收（进入内存或溢出到磁盘）；stop() 之后不再接收
+        """
+        if not category_code:
+            logger.warning(f"数据点缺少资产类别，已丢弃: {data_point.asset_code}")
+            return False
+        
+        buffer = self._get_buffer(category_code)
+        if not self._running:
+            # 已停止: 最后一次 flush 之后接收的数据不会被写出
+            buffer.statistics.dropped += 1
+            return False
+        capacity = self._config.capacity
+        
+        if len(buffer.points) >= capacity:
+            policy = self._config.backpressure
+            
+            if policy == BackpressurePolicy.DROP_OLDEST:
+                buffer.points.popleft()
+                buffer.statistics.dropped += 1
+            elif policy == BackpressurePolicy.SPILL_TO_DISK:
+                if self._spill(buffer, data_point):
+                    buffer.statistics.enqueued += 1
+                    return True
+                buffer.statistics.dropped += 1
+                return False
+            else:
+                started = time.monotonic()
+                async with buffer.not_full:
+                    await buffer.not_full.wait_for(
+                        lambda: len(buffer.points) < capacity or not self._running
+                    )
+                buffer.statistics.blocked_seconds += time.monotonic() - started
+                if not self._running:
+                    # 被 stop() 唤醒，缓冲仍然是满的
+                    buffer.statistics.dropped += 1
+                    return False
+        
+        buffer.points.append(data_point)
+        buffer.statistics.enqueued += 1
+        
+        if len(buffer.points) >= self._config.flush_size:
+            buffer.flush_event.set()
+        
+        return True
+    
+    # =====================================================
+    # 刷写
+    # =====================================================
+    
+    def _get_buffer(self, category_code: str) -> _CategoryBuffer:
+        """获取（必要时创建）类别缓冲区并启动刷写任务"""
+        buffer = self._buffers.get(category_code)
+        if buffer is None:
+            buffer = _CategoryBuffer(category_code)
+            self._buffers[category_code] = buffer
+        
+        if buffer.flush_task is None or buffer.flush_task.done():
+            buffer.flush_task = asyncio.create_task(self._flush_loop(buffer))
+        
+        return buffer
+    
+    async def _flush_loop(self, buffer: _CategoryBuffer):
+        """刷写循环：按数量或时间触发"""
+        while self._running:
+            try:
+                try:
+                    await asyncio.wait_for(buffer.flush_event.wait(), timeout=self._config.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                buffer.flush_event.clear()
+                
+                await self._flush_buffer(buffer)
+                
+                # 内存缓冲空闲时回放溢出数据
+                if buffer.spill_segments and len(buffer.points) < self._config.flush_size:
+                    await self._replay_spill(buffer)
+            
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"写缓冲刷写失败: {buffer.category_code} - {e}")
+    
+    async def _flush_buffer(self, buffer: _CategoryBuffer):
+        """将内存缓冲区中的数据全部按批写出"""
+        while buffer.points:
+            count = min(len(buffer.points), self._config.flush_size)
+            batch = [buffer.points.popleft() for _ in range(count)]
+            
+            async with buffer.not_full:
+                buffer.not_full.notify_all()
+            
+            await self._write_points(buffer, batch)
+    
+    async def _write_points(self, buffer: _CategoryBuffer, batch: List[DataPoint]):
+        """批量写入数据点并更新统计"""
+        started = time.monotonic()
+        stats = buffer.statistics
+        
+        try:
+            results = await self._dual_writer.write_batch(
+                buffer.category_code,
+                [(p.asset_code, p.signals, p.timestamp) for p in batch]
+            )
+            succeeded = sum(1 for r in results if r.success)
+            stats.flushed += succeeded
+            stats.failed += len(batch) - succeeded
+        except Exception as e:
+            stats.failed += len(batch)
+            logger.error(f"写缓冲批量写入失败: {buffer.category_code} - {e}")
+        
+        stats.flush_count += 1
+        stats.last_flush_size = len(batch)
+        stats.last_flush_latency_ms = (time.monotonic() - started) * 1000
+        stats.last_flush_time = datetime.now()
+    
+    async def flush(self, category_code: Optional[str] = None):
+        """
+        立即刷写缓冲区
+        
+        Args:
+            category_code: 资产类别编码（可选，默认刷写全部类别）
+        """
+        if category_code:
+            buffers = [self._buffers[category_code]] if category_code in self._buffers else []
+        else:
+            buffers = list(self._buffers.values())
+        
+        for buffer in buffers:
+            await self._flush_buffer(buffer)
+            while buffer.spill_segments:
+                await self._replay_spill(buffer)
+    
+    async def stop(self):
+        """停止刷写任务并写出剩余数据"""
+        self._running = False
+        
+        for buffer in self._buffers.values():
+            buffer.flush_event.set()
+            async with buffer.not_full:
+                buffer.not_full.notify_all()
+            if buffer.flush_task:
+                # 等待当前批次写完，避免已出队的数据丢失
+                try:
+                    await buffer.flush_task
+                except asyncio.CancelledError:
+                    pass
+                buffer.flush_task = None
+        
+        await self.flush()
+    
+    # =====================================================
+    # 磁盘溢出
+    # =====================================================
+    
+    def _spill(self, buffer: _CategoryBuffer, data_point: DataPoint) -> bool:
+        """将数据点追加到当前溢出文件"""
+        try:
+            if buffer.spill_file is None:
+                os.makedirs(self._config.spill_dir, exist_ok=True)
+                buffer.spill_seq += 1
+                path = os.path.join(
+                    self._config.spill_dir,
+                    f"{buffer.category_code}_{os.getpid()}_{buffer.spill_seq:06d}.jsonl"
+                )
+                buffer.spill_file = open(path, "a", encoding="utf-8")
+                buffer.spill_file_count = 0
+                buffer.spill_segments.append(path)
+            
+            buffer.spill_file.write(json.dumps(data_point.to_dict(), ensure_ascii=False, default=str) + "\n")
+            buffer.spill_file_count += 1
+            buffer.statistics.spilled += 1
+            
+            if buffer.spill_file_count >= self._config.spill_segment_size:
+                self._close_spill_file(buffer)
+            
+            return True
+        except Exception as e:
+            logger.error(f"写缓冲溢出到磁盘失败: {buffer.category_code} - {e}")
+            return False
+    
+    @staticmethod
+    def _close_spill_file(buffer: _CategoryBuffer):
+        """关闭当前溢出文件"""
+        if buffer.spill_file is not None:
+            buffer.spill_file.close()
+            buffer.spill_file = None
+            buffer.spill_file_count = 0
+    
+    async def _replay_spill(self, buffer: _CategoryBuffer):
+        """回放最旧的一个溢出文件"""
+        path = buffer.spill_segments[0]
+        if buffer.spill_file is not None and buffer.spill_file.name == path:
+            self._close_spill_file(buffer)
+        
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                batch = [DataPoint.from_dict(json.loads(line)) for line in f if line.strip()]
+        except Exception as e:
+            logger.error(f"读取溢出文件失败: {path} - {e}")
+            batch = []
+        
+        buffer.spill_segments.popleft()
+        
+        for start in range(0, len(batch), self._config.flush_size):
+            await self._write_points(buffer, batch[start:start + self._config.flush_size])
+        buffer.statistics.replayed += len(batch)
+        
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"删除溢出文件失败: {path} - {e}")
+    
+    # =====================================================
+    # 指标
+    # =====================================================
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        获取缓冲区指标
+        
+        Returns:
+            Dict: 缓冲区指标
+        """
+        categories = {}
+        for code, buffer in self._buffers.items():
+            categories[code] = {
+                "buffered": len(buffer.points),
+                "capacity": self._config.capacity,
+                "utilization": round(len(buffer.points) / self._config.capacity, 4) if self._config.capacity else 0,
+                "spill_segments": len(buffer.spill_segments),
+                **buffer.statistics.to_dict(),
+            }
+        
+        return {
+            "backpressure": self._config.backpressure.value,
+            "flush_size": self._config.flush_size,
+            "flush_interval": self._config.flush_interval,
+            "total_buffered": sum(len(b.points) for b in self._buffers.values()),
+            "categories": categories,
+        }
+
+
+# 全局写缓冲实例
+_default_write_buffer: Optional[IngestionWriteBuffer] = None
+
+
+def get_ingestion_write_buffer() -> IngestionWriteBuffer:
+    """获取默认写缓冲实例"""
+    global _default_write_buffer
+    if _default_write_buffer is None:
+        _default_write_buffer = IngestionWriteBuffer()
+    return _default_write_buffer
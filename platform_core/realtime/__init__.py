@@ -7,8 +7,16 @@ Realtime Push Service - 实时推送服务模块
 - 实时数据推送
 """
 
-from .websocket_server import ConnectionManager, connection_manager
+from .websocket_server import (
+    ConnectionManager,
+    connection_manager,
+    OutboundQueue,
+    SlowConsumerPolicy,
+    encode_message,
+)
+from .encoding import MessageEncoding, MessageFrames, SignalSchemaRegistry, signal_schema_registry
 from .subscription_manager import SubscriptionManager, subscription_manager, SubscriptionType, Subscription
+from .stream_distributor import StreamDistributor
 from .push_service import (
     RealtimePushService,
     push_service,
@@ -22,10 +30,18 @@ from .push_service import (
 __all__ = [
     "ConnectionManager",
     "connection_manager",
+    "OutboundQueue",
+    "SlowConsumerPolicy",
+    "encode_message",
+    "MessageEncoding",
+    "MessageFrames",
+    "SignalSchemaRegistry",
+    "signal_schema_registry",
     "SubscriptionManager",
     "subscription_manager",
     "SubscriptionType",
     "Subscription",
+    "StreamDistributor",
     "RealtimePushService",
     "push_service",
     "create_asset_data_message",
@@ -0,0 +1,330 @@
+"""
+实时推送消息编码
+
+/api/v3/ws 的客户端可在订阅时选择推送帧的编码:
+
+- json: 文本帧，与原有格式一致（默认）
+- msgpack: 二进制帧，消息结构不变，timestamp 转为毫秒时间戳
+- columnar: 二进制帧（MessagePack），资产数据按类别的信号定义编号为列式帧:
+      {"t": "d", "a": 资产ID, "c": 类别ID, "sv": 信号表版本, "ts": 毫秒时间戳,
+       "q": 质量, "i": [信号序号...], "v": [值...], "x": {未定义的信号: 值}}
+  质量编码: 0=good, 1=uncertain, 2=bad, 3=未知（缺失或无法识别的质量标识，不能按good处理）。
+  可选标志: "d": 1 表示增量帧（只含变化的信号），"s": 1 表示订阅时推送的最新值快照。
+  信号序号为该类别信号定义按ID排序后的位置；连接首次收到某类别（或版本变化）的
+  列式帧之前，会先收到一条 {"type": "schema", "category_id", "version", "signals"}。
+  其他消息（告警、预测等）按 msgpack 编码。
+
+msgpack / columnar 依赖 msgpack 包，未安装时只能使用 json。
+"""
+
+import asyncio
+import json
+import logging
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Iterable, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+
+class MessageEncoding:
+    """推送帧编码"""
+    JSON = "json"
+    MSGPACK = "msgpack"
+    COLUMNAR = "columnar"
+
+
+MESSAGE_ENCODINGS = (MessageEncoding.JSON, MessageEncoding.MSGPACK, MessageEncoding.COLUMNAR)
+
+# 质量标识在列式帧中的编码
+QUALITY_CODES = {"good": 0, "uncertain": 1, "bad": 2}
+# 缺失或无法识别的质量标识
+QUALITY_UNKNOWN = 3
+
+Payload = Union[str, bytes]
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """当前环境可用的编码"""
+    if msgpack is None:
+        return (MessageEncoding.JSON,)
+    return MESSAGE_ENCODINGS
+
+
+def validate_encoding(encoding: str) -> str:
+    """
+    校验编码名称
+    
+    Raises:
+        ValueError: 不支持或当前环境不可用的编码
+    """
+    if encoding not in MESSAGE_ENCODINGS:
+        raise ValueError(f"不支持的编码: {encoding}")
+    if encoding not in available_encodings():
+        raise ValueError(f"编码 {encoding} 需要安装 msgpack")
+    return encoding
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """
+    序列化推送消息（JSON文本帧）
+    
+    扇出时每条消息只调用一次，所有接收者共享同一份编码结果。
+    """
+    return json.dumps(message, ensure_ascii=False)
+
+
+def _timestamp_ms(value: Any) -> Any:
+    """ISO时间字符串转毫秒时间戳（无法解析时原样返回）"""
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value).timestamp() * 1000)
+        except ValueError:
+            return value
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return value
+
+
+def _packb(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True, default=str)
+
+
+def encode_msgpack(message: Dict[str, Any]) -> bytes:
+    """MessagePack二进制帧（timestamp 为毫秒时间戳）"""
+    if "timestamp" in message:
+        message = dict(message)
+        message["timestamp"] = _timestamp_ms(message["timestamp"])
+    return _packb(message)
+
+
+class SignalSchema:
+    """单个资产类别的信号序号表"""
+    
+    __slots__ = ("category_id", "signals", "index", "version", "_payload")
+    
+    def __init__(self, category_id: int, signals: Iterable[str]):
+        self.category_id = category_id
+        self.signals: Tuple[str, ...] = tuple(signals)
+        self.index: Dict[str, int] = {code: i for i, code in enumerate(self.signals)}
+        self.version = zlib.crc32("\x1f".join(self.signals).encode("utf-8"))
+        self._payload: Optional[bytes] = None
+    
+    @property
+    def key(self) -> Tuple[int, int]:
+        return (self.category_id, self.version)
+    
+    def message(self) -> Dict[str, Any]:
+        """下发给客户端的信号表消息"""
+        return {
+            "type": "schema",
+            "category_id": self.category_id,
+            "version": self.version,
+            "signals": list(self.signals)
+        }
+    
+    def payload(self) -> bytes:
+        """已编码的信号表消息（缓存）"""
+        if self._payload is None:
+            self._payload = _packb(self.message())
+        return self._payload
+
+
+class SignalSchemaRegistry:
+    """
+    资产 -> 类别 -> 信号序号表 的缓存
+    
+    编码在推送路径上同步执行，只读取缓存；未缓存的资产按 msgpack 编码，
+    同时在后台加载，之后的帧即为列式帧。缓存按 ttl 过期，以获取新增的信号定义；
+    不存在或加载失败的资产在 retry_interval 内不再重复查询。
+    """
+    
+    def __init__(self, ttl: float = 300.0, retry_interval: float = 30.0):
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        # asset_id -> (category_id, 加载时间)
+        self._assets: Dict[Any, Tuple[int, float]] = {}
+        # category_id -> (SignalSchema, 加载时间)
+        self._schemas: Dict[int, Tuple[SignalSchema, float]] = {}
+        # asset_id -> 上次加载失败的时间
+        self._missing: Dict[Any, float] = {}
+        self._loading: Optional[asyncio.Task] = None
+        self._pending: set = set()
+    
+    def register(self, category_id: int, signals: Iterable[str], asset_ids: Iterable[Any] = ()):
+        """直接登记类别的信号表及其资产（测试或预热用）"""
+        now = time.monotonic()
+        self._schemas[category_id] = (SignalSchema(category_id, signals), now)
+        for asset_id in asset_ids:
+            self._assets[asset_id] = (category_id, now)
+    
+    def get_for_asset(self, asset_id: Any) -> Optional[SignalSchema]:
+        """
+        获取资产的信号表（仅查缓存，未命中或过期时安排后台加载）
+        
+        Returns:
+            Optional[SignalSchema]: 信号表，未缓存时为None
+        """
+        now = time.monotonic()
+        entry = self._assets.get(asset_id)
+        schema_entry = self._schemas.get(entry[0]) if entry is not None else None
+        if entry is None or schema_entry is None:
+            failed_at = self._missing.get(asset_id)
+            if failed_at is None or now - failed_at > self.retry_interval:
+                self._schedule_load(asset_id)
+            return None
+        if now - entry[1] > self.ttl or now - schema_entry[1] > self.ttl:
+            # 过期期间继续使用旧表，后台刷新
+            self._schedule_load(asset_id)
+        return schema_entry[0]
+    
+    def _schedule_load(self, asset_id: Any):
+        if asset_id in self._pending:
+            return
+        self._pending.add(asset_id)
+        if self._loading is not None and not self._loading.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._loading = loop.create_task(self._load_pending())
+    
+    async def _load_pending(self):
+        while self._pending:
+            asset_ids, self._pending = list(self._pending), set()
+            await self.load_assets(asset_ids)
+    
+    async def load_assets(self, asset_ids: List[Any]) -> None:
+        """从数据库加载资产所属类别及类别的信号定义"""
+        if not asset_ids:
+            return
+        try:
+            from app.models.platform_upgrade import Asset, SignalDefinition
+            
+            rows = await Asset.filter(id__in=list(asset_ids)).values("id", "category_id")
+            now = time.monotonic()
+            categories = set()
+            for row in rows:
+                self._assets[row["id"]] = (row["category_id"], now)
+                self._missing.pop(row["id"], None)
+                categories.add(row["category_id"])
+            for asset_id in asset_ids:
+                if asset_id not in self._assets:
+                    self._missing[asset_id] = now
+            
+            stale = [
+                category_id for category_id in categories
+                if category_id not in self._schemas or now - self._schemas[category_id][1] > self.ttl
+            ]
+            if not stale:
+                return
+            
+            signals = await SignalDefinition.filter(category_id__in=stale).order_by("id").values(
+                "category_id", "code"
+            )
+            codes: Dict[int, List[str]] = {category_id: [] for category_id in stale}
+            for row in signals:
+                codes[row["category_id"]].append(row["code"])
+            for category_id, category_codes in codes.items():
+                self._schemas[category_id] = (SignalSchema(category_id, category_codes), now)
+        except Exception as e:
+            now = time.monotonic()
+            for asset_id in asset_ids:
+                self._missing[asset_id] = now
+            logger.warning(f"加载信号定义失败，列式编码暂按msgpack发送: {e}")
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {"assets": len(self._assets), "categories": len(self._schemas)}
+
+
+signal_schema_registry = SignalSchemaRegistry()
+
+
+def encode_columnar(
+    message: Dict[str, Any],
+    registry: SignalSchemaRegistry
+) -> Tuple[bytes, Optional[SignalSchema]]:
+    """
+    列式帧编码
+    
+    Returns:
+        Tuple[bytes, Optional[SignalSchema]]: (帧, 使用的信号表)；非资产数据消息
+            或资产的信号表尚未缓存时按 msgpack 编码，信号表为None
+    """
+    if message.get("type") != "asset_data":
+        return encode_msgpack(message), None
+    
+    asset_id = message.get("asset_id")
+    schema = registry.get_for_asset(asset_id)
+    if schema is None:
+        return encode_msgpack(message), None
+    
+    index = schema.index
+    indices: List[int] = []
+    values: List[Any] = []
+    extras: Dict[str, Any] = {}
+    for code, value in (message.get("data") or {}).items():
+        position = index.get(code)
+        if position is None:
+            extras[code] = value
+        else:
+            indices.append(position)
+            values.append(value)
+    
+    frame = {
+        "t": "d",
+        "a": asset_id,
+        "c": schema.category_id,
+        "sv": schema.version,
+        "ts": _timestamp_ms(message.get("timestamp")),
+        "q": QUALITY_CODES.get(message.get("quality"), QUALITY_UNKNOWN),
+        "i": indices,
+        "v": values,
+    }
+    if extras:
+        frame["x"] = extras
+    if message.get("delta"):
+        frame["d"] = 1
+    if message.get("snapshot"):
+        frame["s"] = 1
+    return _packb(frame), schema
+
+
+class MessageFrames:
+    """
+    一条推送消息的各编码结果
+    
+    扇出时按接收连接的编码惰性生成，每种编码只编码一次。
+    """
+    
+    __slots__ = ("message", "registry", "_frames")
+    
+    def __init__(self, message: Dict[str, Any], registry: Optional[SignalSchemaRegistry] = None):
+        self.message = message
+        self.registry = registry or signal_schema_registry
+        self._frames: Dict[str, Tuple[Payload, Optional[SignalSchema]]] = {}
+    
+    def get(self, encoding: str) -> Tuple[Payload, Optional[SignalSchema]]:
+        """
+        获取指定编码的帧
+        
+        Returns:
+            Tuple[Payload, Optional[SignalSchema]]: (帧, 列式帧使用的信号表)
+        """
+        frame = self._frames.get(encoding)
+        if frame is None:
+            if encoding == MessageEncoding.COLUMNAR:
+                frame = encode_columnar(self.message, self.registry)
+            elif encoding == MessageEncoding.MSGPACK:
+                frame = (encode_msgpack(self.message), None)
+            else:
+                frame = (encode_message(self.message), None)
+            self._frames[encoding] = frame
+        return frame
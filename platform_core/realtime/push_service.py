@@ -3,6 +3,10 @@
 
 实现Redis发布订阅集成和数据推送逻辑。
 
+分发模式:
+- pubsub: Redis Pub/Sub，每个节点接收全部消息（默认）
+- streams: 按资产分片的 Redis Streams，各节点只读取本节点订阅资产所在的分片（见 stream_distributor）
+
 需求: 3.2 - 当资产数据更新时，平台应在1秒内将数据推送到订阅的客户端
 需求: 3.6 - 当推送数据时，平台应包含时间戳和数据质量标识
 """
@@ -14,8 +18,13 @@ from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple, Callable
 from dataclasses import dataclass, field
 
+from .stream_distributor import StreamDistributor
+
 logger = logging.getLogger(__name__)
 
+# 支持的分发模式
+DISTRIBUTION_MODES = ("pubsub", "streams")
+
 
 # ============================================================================
 # 消息格式定义和创建函数
@@ -190,6 +199,10 @@ class PushStats:
     """推送统计信息"""
     total_pushed: int = 0
     total_failed: int = 0
+    # 推送间隔内合并的资产数据更新数
+    coalesced: int = 0
+    # delta 模式下没有变化而省略的推送数
+    suppressed: int = 0
     last_push_time: Optional[datetime] = None
     messages_per_second: float = 0.0
 
@@ -199,13 +212,15 @@ class RealtimePushService:
     实时数据推送服务
     
     负责：
-    - 订阅Redis数据更新通道
+    - 订阅Redis数据更新通道（Pub/Sub 或 Redis Streams）
     - 将数据推送到WebSocket客户端
     - 管理推送统计
     """
     
     def __init__(self):
         self._redis_client = None
+        self._distribution = "pubsub"
+        self._distributor: Optional[StreamDistributor] = None
         self._running = False
         self._push_task: Optional[asyncio.Task] = None
         self._stats = PushStats()
@@ -231,13 +246,27 @@ class RealtimePushService:
             self._subscription_manager = subscription_manager
         return self._subscription_manager
     
-    async def initialize(self, redis_client=None):
+    async def initialize(
+        self,
+        redis_client=None,
+        distribution: str = "pubsub",
+        **stream_options
+    ):
         """
         初始化推送服务
         
         Args:
             redis_client: Redis客户端实例
+            distribution: 分发模式（pubsub / streams），所有节点和发布端必须一致
+            **stream_options: streams 模式下传给 StreamDistributor 的参数（node_id、shards等）
+            
+        Raises:
+            ValueError: 不支持的分发模式
         """
+        if distribution not in DISTRIBUTION_MODES:
+            raise ValueError(f"不支持的分发模式: {distribution}")
+        self._distribution = distribution
+        
         if redis_client:
             self._redis_client = redis_client
         else:
@@ -248,6 +277,11 @@ class RealtimePushService:
                 self._redis_client = client.redis
             except Exception as e:
                 logger.warning(f"无法获取Redis客户端: {e}")
+        
+        if distribution == "streams" and self._redis_client:
+            self._distributor = StreamDistributor(self._redis_client, **stream_options)
+        else:
+            self._distributor = None
     
     async def start(self):
         """启动推送服务"""
@@ -257,7 +291,13 @@ class RealtimePushService:
         
         self._running = True
         
-        if self._redis_client:
+        if self._distributor:
+            self._push_task = asyncio.create_task(self._distributor.run(
+                self._handle_redis_message,
+                self.subscription_manager.get_subscribed_assets
+            ))
+            logger.info("实时推送服务已启动（Redis Streams）")
+        elif self._redis_client:
             self._push_task = asyncio.create_task(self._subscribe_to_data_updates())
             logger.info("实时推送服务已启动")
         else:
@@ -275,6 +315,9 @@ class RealtimePushService:
                 pass
             self._push_task = None
         
+        if self._distributor:
+            await self._distributor.stop()
+        
         logger.info("实时推送服务已停止")
     
     async def _subscribe_to_data_updates(self):
@@ -291,6 +334,7 @@ class RealtimePushService:
             
             while self._running:
                 try:
+                    # get_message 在超时前阻塞等待，无需额外休眠
                     message = await pubsub.get_message(
                         ignore_subscribe_messages=True,
                         timeout=1.0
@@ -300,13 +344,13 @@ class RealtimePushService:
                         channel = message.get("channel", "")
                         data = message.get("data", "")
                         
+                        if isinstance(channel, bytes):
+                            channel = channel.decode("utf-8")
                         if isinstance(data, bytes):
                             data = data.decode("utf-8")
                         
                         await self._handle_redis_message(channel, data)
                     
-                    await asyncio.sleep(0.01)
-                    
                 except asyncio.CancelledError:
                     break
                 except Exception as e:
@@ -397,35 +441,122 @@ class RealtimePushService:
         """
         向资产订阅者推送消息
         
+        消息只编码一次，并发扇出到各订阅者的发送队列。设置了限频/白名单/delta的
+        资产数据订阅按订阅单独合并和整形（见 _push_shaped）。
+        
         Args:
             asset_id: 资产ID
             message: 消息内容
             data_type: 数据类型
             
         Returns:
-            int: 成功推送的用户数
+            int: 成功推送（或已合并待推送）的用户数
         """
-        # 获取应该接收数据的用户
-        subscribers = self.subscription_manager.filter_subscribers_for_asset(
-            asset_id, data_type
-        )
+        if data_type != "asset_data":
+            # 获取应该接收数据的用户
+            subscribers = self.subscription_manager.filter_subscribers_for_asset(
+                asset_id, data_type
+            )
+            shaped = []
+        else:
+            subscriptions = self.subscription_manager.filter_subscriptions_for_asset(
+                asset_id, data_type
+            )
+            subscribers = [user_id for user_id, sub in subscriptions.items() if not sub.shaped]
+            shaped = [sub for sub in subscriptions.values() if sub.shaped]
         
-        if not subscribers:
+        if not subscribers and not shaped:
             return 0
         
-        success_count = 0
+        success_count = (
+            self.connection_manager.fanout(subscribers, message, asset_id=asset_id) if subscribers else 0
+        )
+        failed_count = len(subscribers) - success_count
         
-        for user_id in subscribers:
-            if await self.connection_manager.push_to_user(user_id, message):
+        for sub in shaped:
+            if self._push_shaped(sub, message):
                 success_count += 1
-                self._stats.total_pushed += 1
             else:
-                self._stats.total_failed += 1
+                failed_count += 1
+        
+        self._stats.total_pushed += success_count
+        self._stats.total_failed += failed_count
         
         self._stats.last_push_time = datetime.now()
         
         return success_count
     
+    def _push_shaped(self, sub, message: Dict[str, Any]) -> bool:
+        """
+        按订阅选项推送资产数据
+        
+        更新先按信号白名单筛选并合并到订阅的待发送数据中；距上次推送已超过
+        最小间隔时立即推送，否则在间隔到期时推送合并后的最新值。
+        
+        Args:
+            sub: 订阅信息
+            message: 资产数据消息
+            
+        Returns:
+            bool: 是否已推送或已合并待推送
+        """
+        if not self.connection_manager.is_connected(sub.user_id):
+            return False
+        
+        stream = sub.stream
+        stream.pending.update(sub.select_signals(message.get("data") or {}))
+        stream.quality = message.get("quality", "good")
+        stream.timestamp = message.get("timestamp")
+        
+        if stream.timer is not None:
+            self._stats.coalesced += 1
+            return True
+        
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if stream.last_sent is None or now - stream.last_sent >= sub.min_interval:
+            return self._flush_shaped(sub)
+        
+        stream.timer = loop.call_later(
+            stream.last_sent + sub.min_interval - now, self._flush_shaped, sub
+        )
+        return True
+    
+    def _flush_shaped(self, sub) -> bool:
+        """推送订阅合并后的待发送数据（delta 模式只推送变化的信号）"""
+        stream = sub.stream
+        stream.timer = None
+        pending, stream.pending = stream.pending, {}
+        
+        if sub.delta and stream.quality == stream.sent_quality:
+            last_values = stream.last_values
+            changed = {
+                name: value for name, value in pending.items()
+                if name not in last_values or last_values[name] != value
+            }
+        else:
+            changed = pending
+        
+        if not changed and stream.quality == stream.sent_quality:
+            self._stats.suppressed += 1
+            return True
+        
+        if sub.delta:
+            stream.last_values.update(changed)
+        stream.sent_quality = stream.quality
+        stream.last_sent = asyncio.get_running_loop().time()
+        
+        message = create_asset_data_message(
+            asset_id=sub.asset_id,
+            data=changed,
+            quality=stream.quality,
+            timestamp=stream.timestamp
+        )
+        if sub.delta:
+            message["delta"] = True
+        
+        return self.connection_manager.fanout([sub.user_id], message, asset_id=sub.asset_id) > 0
+    
     async def push_to_user(self, user_id: int, message: Dict[str, Any]) -> bool:
         """
         向指定用户推送消息
@@ -490,10 +621,7 @@ class RealtimePushService:
             "timestamp": datetime.now().isoformat()
         }
         
-        await self._redis_client.publish(
-            "asset_data_updates",
-            json.dumps(message, ensure_ascii=False)
-        )
+        await self._publish("asset_data_updates", message, asset_id)
     
     async def publish_alert(self, alert: Dict[str, Any]):
         """
@@ -511,10 +639,7 @@ class RealtimePushService:
                 await self.broadcast(message)
             return
         
-        await self._redis_client.publish(
-            "alert_updates",
-            json.dumps({"alert": alert}, ensure_ascii=False)
-        )
+        await self._publish("alert_updates", {"alert": alert}, alert.get("asset_id") or None)
     
     async def publish_prediction(
         self,
@@ -542,10 +667,22 @@ class RealtimePushService:
             "timestamp": datetime.now().isoformat()
         }
         
-        await self._redis_client.publish(
-            "prediction_updates",
-            json.dumps(message, ensure_ascii=False)
-        )
+        await self._publish("prediction_updates", message, asset_id)
+    
+    async def _publish(self, channel: str, message: Dict[str, Any], asset_id: Optional[int] = None):
+        """
+        发布消息到Redis
+        
+        Args:
+            channel: 通道名称
+            message: 消息内容
+            asset_id: 资产ID（streams 模式据此选择分片，None表示发给所有节点）
+        """
+        data = json.dumps(message, ensure_ascii=False)
+        if self._distributor:
+            await self._distributor.publish(channel, data, asset_id)
+        else:
+            await self._redis_client.publish(channel, data)
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -558,8 +695,12 @@ class RealtimePushService:
             "running": self._running,
             "total_pushed": self._stats.total_pushed,
             "total_failed": self._stats.total_failed,
+            "coalesced": self._stats.coalesced,
+            "suppressed": self._stats.suppressed,
             "last_push_time": self._stats.last_push_time.isoformat() if self._stats.last_push_time else None,
-            "redis_connected": self._redis_client is not None
+            "redis_connected": self._redis_client is not None,
+            "distribution": self._distribution,
+            "distributor": self._distributor.get_stats() if self._distributor else None
         }
 
 
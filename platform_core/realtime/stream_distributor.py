@@ -0,0 +1,337 @@
+"""
+Redis Streams 多节点分发
+
+Pub/Sub 模式下每个节点都会收到全部消息，即使本节点没有该资产的订阅者。
+此模块按资产分片写入 Redis Streams，各节点只阻塞读取本节点订阅资产所在的分片：
+
+- 发布: 资产消息写入 {prefix}:shard:{n}（n 由资产ID计算），无资产的消息写入 {prefix}:broadcast
+- 注册: 各节点将本节点订阅的资产集合登记到 {prefix}:node:{node_id}:assets，
+  并在 {prefix}:nodes（Sorted Set，分值为心跳时间）中保持心跳；
+  发布端据此跳过没有任何节点订阅的资产
+- 消费: XREAD BLOCK 读取所需分片，读取位置保存在 {prefix}:offsets:{node_id}，
+  断线重连或节点重启（node_id 不变）后从上次位置继续
+
+节点负载因此取决于本节点订阅者关注的资产，而不是全局消息速率。
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+import zlib
+from typing import Dict, Any, Optional, Set, Callable, Awaitable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+# 消息处理函数: (channel, data) -> None
+MessageHandler = Callable[[str, str], Awaitable[None]]
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _entry_ms(entry_id: str) -> int:
+    return int(entry_id.split("-", 1)[0])
+
+
+class StreamDistributor:
+    """
+    基于 Redis Streams 的分片消息分发器
+    
+    Attributes:
+        redis: redis.asyncio 客户端
+        node_id: 节点ID（重启后保持不变才能续读）
+        shards: 分片数量（所有节点和发布端必须一致）
+    """
+    
+    def __init__(
+        self,
+        redis,
+        node_id: Optional[str] = None,
+        prefix: str = "realtime",
+        shards: int = 16,
+        block_ms: int = 1000,
+        batch_size: int = 500,
+        maxlen: int = 10000,
+        node_ttl: float = 30.0,
+        max_replay: float = 60.0,
+        interest_refresh: float = 1.0,
+        filter_publish: bool = True
+    ):
+        """
+        Args:
+            redis: redis.asyncio.Redis 实例
+            node_id: 节点ID，默认为 "主机名:进程号"
+            prefix: 键前缀
+            shards: 分片数量
+            block_ms: XREAD 阻塞时间（毫秒），订阅变化最迟在此时间后生效
+            batch_size: 每个分片单次读取的最大条数
+            maxlen: 每个分片保留的近似最大长度
+            node_ttl: 节点心跳过期时间（秒），超时的节点不再计入订阅
+            max_replay: 续读时最多回放的时间范围（秒），更早的消息直接跳过
+            interest_refresh: 发布端刷新全局订阅资产集合的间隔（秒）
+            filter_publish: 发布端是否跳过没有任何节点订阅的资产
+        """
+        if shards <= 0:
+            raise ValueError(f"分片数量必须大于0: {shards}")
+        self.redis = redis
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.prefix = prefix
+        self.shards = shards
+        self.block_ms = block_ms
+        self.batch_size = batch_size
+        self.maxlen = maxlen
+        self.node_ttl = node_ttl
+        self.max_replay = max_replay
+        self.interest_refresh = interest_refresh
+        self.filter_publish = filter_publish
+        
+        self._running = False
+        # 流键 -> 已处理的最后一条消息ID
+        self._offsets: Dict[str, str] = {}
+        self._offsets_loaded = False
+        # 已登记到Redis的资产集合
+        self._registered: Optional[Set[str]] = None
+        self._last_heartbeat = 0.0
+        # 发布端缓存的全局订阅资产集合
+        self._interest: Set[str] = set()
+        self._interest_expires = 0.0
+        
+        self._stats = {
+            "published": 0,
+            "publish_skipped": 0,
+            "received": 0,
+            "skipped": 0,
+            "handled": 0,
+            "errors": 0,
+        }
+    
+    # ---------------- 键 ----------------
+    
+    def shard_of(self, asset_id: Any) -> int:
+        """计算资产所在分片"""
+        try:
+            return int(asset_id) % self.shards
+        except (TypeError, ValueError):
+            return zlib.crc32(str(asset_id).encode("utf-8")) % self.shards
+    
+    def shard_key(self, shard: int) -> str:
+        return f"{self.prefix}:shard:{shard}"
+    
+    @property
+    def broadcast_key(self) -> str:
+        return f"{self.prefix}:broadcast"
+    
+    @property
+    def _nodes_key(self) -> str:
+        return f"{self.prefix}:nodes"
+    
+    def _node_assets_key(self, node_id: str) -> str:
+        return f"{self.prefix}:node:{node_id}:assets"
+    
+    @property
+    def _offsets_key(self) -> str:
+        return f"{self.prefix}:offsets:{self.node_id}"
+    
+    async def _now_ms(self) -> int:
+        """Redis服务器时间（毫秒），消息ID由服务器时间生成"""
+        seconds, microseconds = await self.redis.time()
+        return int(seconds) * 1000 + int(microseconds) // 1000
+    
+    # ---------------- 发布 ----------------
+    
+    async def _interested_assets(self) -> Set[str]:
+        """获取所有存活节点订阅的资产集合（按 interest_refresh 缓存）"""
+        now = time.monotonic()
+        if now < self._interest_expires:
+            return self._interest
+        
+        cutoff = await self._now_ms() - int(self.node_ttl * 1000)
+        await self.redis.zremrangebyscore(self._nodes_key, "-inf", cutoff)
+        nodes = [_text(node) for node in await self.redis.zrange(self._nodes_key, 0, -1)]
+        if nodes:
+            members = await self.redis.sunion([self._node_assets_key(node) for node in nodes])
+            self._interest = {_text(member) for member in members}
+        else:
+            self._interest = set()
+        self._interest_expires = now + self.interest_refresh
+        return self._interest
+    
+    async def publish(self, channel: str, data: str, asset_id: Any = None) -> bool:
+        """
+        发布消息
+        
+        Args:
+            channel: 消息通道（asset_data_updates / alert_updates / prediction_updates）
+            data: 已序列化的消息
+            asset_id: 资产ID，None表示发给所有节点
+        
+        Returns:
+            bool: 是否已写入（没有节点订阅该资产时跳过）
+        """
+        if asset_id is None:
+            key = self.broadcast_key
+            fields = {"c": channel, "d": data}
+        else:
+            if self.filter_publish and str(asset_id) not in await self._interested_assets():
+                self._stats["publish_skipped"] += 1
+                return False
+            key = self.shard_key(self.shard_of(asset_id))
+            fields = {"c": channel, "a": str(asset_id), "d": data}
+        
+        await self.redis.xadd(key, fields, maxlen=self.maxlen, approximate=True)
+        self._stats["published"] += 1
+        return True
+    
+    # ---------------- 注册 ----------------
+    
+    async def _sync_registration(self, assets: Set[str]):
+        """登记本节点订阅的资产集合（有变化或心跳到期时写入）"""
+        now = time.monotonic()
+        heartbeat_due = now - self._last_heartbeat >= self.node_ttl / 3
+        if assets == self._registered and not heartbeat_due:
+            return
+        
+        key = self._node_assets_key(self.node_id)
+        registered = self._registered or set()
+        added = assets - registered
+        removed = registered - assets
+        
+        pipe = self.redis.pipeline(transaction=False)
+        if self._registered is None:
+            pipe.delete(key)
+            added = assets
+        if added:
+            pipe.sadd(key, *added)
+        if removed:
+            pipe.srem(key, *removed)
+        pipe.pexpire(key, int(self.node_ttl * 1000))
+        pipe.zadd(self._nodes_key, {self.node_id: await self._now_ms()})
+        await pipe.execute()
+        
+        self._registered = set(assets)
+        self._last_heartbeat = now
+    
+    async def _unregister(self):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self._node_assets_key(self.node_id))
+        pipe.zrem(self._nodes_key, self.node_id)
+        await pipe.execute()
+        self._registered = None
+    
+    # ---------------- 消费 ----------------
+    
+    async def _load_offsets(self):
+        """加载上次保存的读取位置（超过 max_replay 的部分跳过）"""
+        saved = await self.redis.hgetall(self._offsets_key)
+        floor_ms = await self._now_ms() - int(self.max_replay * 1000)
+        for key, entry_id in (saved or {}).items():
+            entry_id = _text(entry_id)
+            if _entry_ms(entry_id) < floor_ms:
+                entry_id = f"{floor_ms}-0"
+            self._offsets[_text(key)] = entry_id
+        self._offsets_loaded = True
+    
+    async def _streams_for(self, assets: Set[str]) -> Dict[str, str]:
+        """计算需要读取的流及起始位置，新加入的分片从当前时间开始读取"""
+        keys = {self.shard_key(self.shard_of(asset)) for asset in assets}
+        keys.add(self.broadcast_key)
+        
+        stale = [key for key in self._offsets if key not in keys]
+        if stale:
+            for key in stale:
+                del self._offsets[key]
+            await self.redis.hdel(self._offsets_key, *stale)
+        
+        missing = [key for key in keys if key not in self._offsets]
+        if missing:
+            start = f"{await self._now_ms()}-0"
+            for key in missing:
+                self._offsets[key] = start
+        
+        return dict(self._offsets)
+    
+    async def run(self, handler: MessageHandler, assets_provider: Callable[[], Iterable[Any]]):
+        """
+        消费循环（直到 stop 被调用或任务被取消）
+        
+        Args:
+            handler: 消息处理函数
+            assets_provider: 返回本节点当前订阅资产ID的函数
+        """
+        self._running = True
+        logger.info(f"Redis Streams分发已启动: node={self.node_id}, shards={self.shards}")
+        
+        try:
+            while self._running:
+                try:
+                    await self._consume_once(handler, {str(asset) for asset in assets_provider()})
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    # 重连后重新完整登记资产集合
+                    self._registered = None
+                    logger.error(f"Redis Streams读取失败，稍后从上次位置继续: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            self._running = False
+    
+    async def _consume_once(self, handler: MessageHandler, assets: Set[str]):
+        """执行一次阻塞读取并处理结果"""
+        if not self._offsets_loaded:
+            await self._load_offsets()
+        await self._sync_registration(assets)
+        
+        streams = await self._streams_for(assets)
+        response = await self.redis.xread(streams, count=self.batch_size, block=self.block_ms)
+        if not response:
+            return
+        
+        advanced: Dict[str, str] = {}
+        for stream, entries in response:
+            stream = _text(stream)
+            for entry_id, fields in entries:
+                entry_id = _text(entry_id)
+                self._offsets[stream] = entry_id
+                advanced[stream] = entry_id
+                self._stats["received"] += 1
+                
+                fields = {_text(k): v for k, v in fields.items()}
+                asset = fields.get("a")
+                if asset is not None and _text(asset) not in assets:
+                    # 同一分片中其他资产的消息
+                    self._stats["skipped"] += 1
+                    continue
+                
+                try:
+                    await handler(_text(fields.get("c", "")), _text(fields.get("d", "")))
+                    self._stats["handled"] += 1
+                except Exception as e:
+                    self._stats["errors"] += 1
+                    logger.error(f"处理Streams消息失败: stream={stream}, id={entry_id}, error={e}")
+        
+        if advanced:
+            await self.redis.hset(self._offsets_key, mapping=advanced)
+            await self.redis.pexpire(self._offsets_key, int(max(self.max_replay, self.node_ttl) * 2000))
+    
+    async def stop(self):
+        """停止消费并注销本节点"""
+        self._running = False
+        try:
+            await self._unregister()
+        except Exception as e:
+            logger.warning(f"注销节点失败: node={self.node_id}, error={e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取分发统计信息"""
+        return {
+            "node_id": self.node_id,
+            "shards": self.shards,
+            "streams": len(self._offsets),
+            "registered_assets": len(self._registered or ()),
+            **self._stats,
+        }
@@ -5,12 +5,15 @@
 
 需求: 3.3 - 当客户端订阅特定资产时，平台应只推送该资产的相关数据
 需求: 3.5 - 平台应支持批量订阅多个资产的实时数据
+
+资产数据订阅可指定最大推送频率、信号白名单和仅推送变化量（delta）模式，
+推送路径据此在服务端合并同一资产在一个推送间隔内的更新。
 """
 
 import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, Set, List, Optional, Any
+from typing import Dict, Set, List, Optional, Any, FrozenSet, Iterable
 from dataclasses import dataclass, field
 from enum import Enum
 
@@ -25,19 +28,93 @@ class SubscriptionType(str, Enum):
     ALL = "all"                     # 所有类型
 
 
+class StreamState:
+    """
+    资产数据订阅的推送状态
+    
+    pending 为推送间隔内合并的待发送信号，last_values 为已发送给客户端的信号值
+    （delta 模式据此只发送变化的信号）。
+    """
+    
+    __slots__ = (
+        "pending", "last_values", "last_sent", "timer",
+        "quality", "timestamp", "sent_quality",
+    )
+    
+    def __init__(self):
+        self.pending: Dict[str, Any] = {}
+        self.last_values: Dict[str, Any] = {}
+        self.last_sent: Optional[float] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        # 待发送数据的质量标识和时间戳（取间隔内最后一次更新）
+        self.quality: Optional[str] = None
+        self.timestamp: Optional[str] = None
+        self.sent_quality: Optional[str] = None
+    
+    def cancel(self):
+        """取消待执行的推送"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.pending.clear()
+
+
 @dataclass
 class Subscription:
-    """订阅信息"""
+    """
+    订阅信息
+    
+    Attributes:
+        max_rate: 资产数据最大推送频率（次/秒），None表示不限制
+        signals: 信号白名单，None表示推送全部信号
+        delta: 是否只推送变化的信号
+    """
     user_id: int
     asset_id: int
     subscription_type: SubscriptionType = SubscriptionType.ASSET_DATA
     created_at: datetime = field(default_factory=datetime.now)
     filters: Dict[str, Any] = field(default_factory=dict)
+    max_rate: Optional[float] = None
+    signals: Optional[FrozenSet[str]] = None
+    delta: bool = False
+    stream: Optional[StreamState] = field(default=None, repr=False, compare=False)
+    
+    def __post_init__(self):
+        if self.max_rate is not None and self.max_rate <= 0:
+            raise ValueError(f"max_rate必须大于0: {self.max_rate}")
+        if self.signals is not None:
+            self.signals = frozenset(str(signal) for signal in self.signals)
+        if self.shaped:
+            self.stream = StreamState()
     
     @property
     def key(self) -> str:
         """生成订阅唯一键"""
         return f"{self.user_id}:{self.asset_id}:{self.subscription_type.value}"
+    
+    @property
+    def shaped(self) -> bool:
+        """资产数据是否需要按订阅单独整形（限频/白名单/delta）"""
+        return self.max_rate is not None or self.signals is not None or self.delta
+    
+    @property
+    def min_interval(self) -> float:
+        """两次推送的最小间隔（秒）"""
+        return 1.0 / self.max_rate if self.max_rate else 0.0
+    
+    def select_signals(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """按白名单筛选信号"""
+        if self.signals is None:
+            return data
+        return {name: value for name, value in data.items() if name in self.signals}
+    
+    def options(self) -> Dict[str, Any]:
+        """订阅的推送选项"""
+        return {
+            "max_rate": self.max_rate,
+            "signals": sorted(self.signals) if self.signals is not None else None,
+            "delta": self.delta
+        }
 
 
 class SubscriptionManager:
@@ -66,30 +143,48 @@ class SubscriptionManager:
         user_id: int,
         asset_id: int,
         subscription_type: SubscriptionType = SubscriptionType.ASSET_DATA,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        max_rate: Optional[float] = None,
+        signals: Optional[Iterable[str]] = None,
+        delta: bool = False
     ) -> Subscription:
         """
         订阅单个资产
         
+        重复订阅同一资产的同一类型时，以新的推送选项替换旧订阅。
+        
         Args:
             user_id: 用户ID
             asset_id: 资产ID
             subscription_type: 订阅类型
             filters: 过滤条件
+            max_rate: 资产数据最大推送频率（次/秒），间隔内的更新合并为一次推送
+            signals: 信号白名单，只推送其中的信号
+            delta: 只推送相对上次推送发生变化的信号
             
         Returns:
             Subscription: 订阅信息
+            
+        Raises:
+            ValueError: max_rate 不大于0
         """
         subscription = Subscription(
             user_id=user_id,
             asset_id=asset_id,
             subscription_type=subscription_type,
-            filters=filters or {}
+            filters=filters or {},
+            max_rate=max_rate,
+            signals=signals,
+            delta=delta
         )
         
         async with self._lock:
             key = subscription.key
             
+            previous = self._subscriptions.get(key)
+            if previous is not None and previous.stream is not None:
+                previous.stream.cancel()
+            
             # 添加到订阅映射
             self._subscriptions[key] = subscription
             
@@ -111,7 +206,10 @@ class SubscriptionManager:
         user_id: int,
         asset_ids: List[int],
         subscription_type: SubscriptionType = SubscriptionType.ASSET_DATA,
-        filters: Optional[Dict[str, Any]] = None
+        filters: Optional[Dict[str, Any]] = None,
+        max_rate: Optional[float] = None,
+        signals: Optional[Iterable[str]] = None,
+        delta: bool = False
     ) -> List[Subscription]:
         """
         批量订阅多个资产
@@ -121,6 +219,9 @@ class SubscriptionManager:
             asset_ids: 资产ID列表
             subscription_type: 订阅类型
             filters: 过滤条件
+            max_rate: 资产数据最大推送频率（次/秒）
+            signals: 信号白名单
+            delta: 只推送变化的信号
             
         Returns:
             List[Subscription]: 订阅信息列表
@@ -132,7 +233,10 @@ class SubscriptionManager:
                 user_id=user_id,
                 asset_id=asset_id,
                 subscription_type=subscription_type,
-                filters=filters
+                filters=filters,
+                max_rate=max_rate,
+                signals=signals,
+                delta=delta
             )
             subscriptions.append(subscription)
         
@@ -239,6 +343,9 @@ class SubscriptionManager:
         user_id = subscription.user_id
         asset_id = subscription.asset_id
         
+        if subscription.stream is not None:
+            subscription.stream.cancel()
+        
         # 从订阅映射中移除
         del self._subscriptions[key]
         
@@ -286,6 +393,15 @@ class SubscriptionManager:
         subscriptions = self.get_user_subscriptions(user_id)
         return {sub.asset_id for sub in subscriptions}
     
+    def get_subscribed_assets(self) -> Set[int]:
+        """
+        获取当前有订阅者的资产ID集合
+        
+        Returns:
+            Set[int]: 资产ID集合
+        """
+        return set(self._asset_subscriptions)
+    
     def get_asset_subscribers(
         self,
         asset_id: int,
@@ -429,6 +545,43 @@ class SubscriptionManager:
         
         return specific_subscribers | all_subscribers
     
+    def filter_subscriptions_for_asset(
+        self,
+        asset_id: int,
+        data_type: str = "asset_data"
+    ) -> Dict[int, Subscription]:
+        """
+        获取应该接收指定资产数据的订阅（每个用户一条）
+        
+        用户同时订阅了特定类型和ALL类型时，以特定类型的订阅为准。
+        
+        Args:
+            asset_id: 资产ID
+            data_type: 数据类型
+            
+        Returns:
+            Dict[int, Subscription]: 用户ID -> 订阅
+        """
+        type_mapping = {
+            "asset_data": SubscriptionType.ASSET_DATA,
+            "alert": SubscriptionType.ALERT,
+            "prediction": SubscriptionType.PREDICTION
+        }
+        
+        subscription_type = type_mapping.get(data_type, SubscriptionType.ASSET_DATA)
+        
+        result: Dict[int, Subscription] = {}
+        for key in self._asset_subscriptions.get(asset_id, ()):
+            sub = self._subscriptions.get(key)
+            if sub is None:
+                continue
+            if sub.subscription_type == subscription_type:
+                result[sub.user_id] = sub
+            elif sub.subscription_type == SubscriptionType.ALL:
+                result.setdefault(sub.user_id, sub)
+        
+        return result
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         获取订阅统计信息
@@ -446,7 +599,10 @@ class SubscriptionManager:
                     if sub.subscription_type == sub_type
                 )
                 for sub_type in SubscriptionType
-            }
+            },
+            "shaped_subscriptions": sum(
+                1 for sub in self._subscriptions.values() if sub.shaped
+            )
         }
 
 
@@ -5,32 +5,237 @@ WebSocket连接管理器
 支持用户认证验证和连接状态管理。
 
 需求: 3.1 - 当客户端连接WebSocket时，平台应建立持久连接并进行身份验证
+
+推送采用"编码一次、并发扇出"：每条消息只序列化一次，放入各连接的有界发送队列，
+由每个连接自己的发送任务写出，慢客户端不会阻塞其他订阅者。
+连接按连接ID登记，同一用户可同时保持多个连接（多个浏览器标签页、监控大屏等）。
+每个连接可选择推送帧编码（json / msgpack / columnar，见 encoding 模块），扇出时每种编码只编码一次。
 """
 
 import asyncio
-import json
+import itertools
 import logging
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, Set, Optional, Any, List
-from dataclasses import dataclass, field
+from typing import Dict, Set, Optional, Any, List, Deque, Hashable, Iterable, Tuple
 
 from fastapi import WebSocket, WebSocketDisconnect, status
 
+from .encoding import (
+    MessageEncoding,
+    MessageFrames,
+    Payload,
+    SignalSchemaRegistry,
+    encode_message,
+    signal_schema_registry,
+    validate_encoding,
+)
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+class SlowConsumerPolicy:
+    """慢客户端策略（发送队列满时的处理方式）"""
+    DROP_OLDEST = "drop_oldest"    # 丢弃最早的待发送消息
+    COALESCE = "coalesce"          # 同一资产只保留最新一条待发送数据，队列满时丢弃最早的消息
+    DISCONNECT = "disconnect"      # 断开连接
+
+
+SLOW_CONSUMER_POLICIES = (
+    SlowConsumerPolicy.DROP_OLDEST,
+    SlowConsumerPolicy.COALESCE,
+    SlowConsumerPolicy.DISCONNECT,
+)
+
+
+def message_coalesce_key(message: Dict[str, Any]) -> Optional[Hashable]:
+    """
+    获取消息的合并键
+    
+    资产数据按资产合并，预测结果按 (资产, 模型) 合并；告警等消息不合并。
+    """
+    msg_type = message.get("type")
+    asset_id = message.get("asset_id")
+    if asset_id is None:
+        return None
+    if msg_type == "asset_data":
+        return (msg_type, asset_id)
+    if msg_type == "prediction":
+        return (msg_type, asset_id, message.get("model_id"))
+    return None
+
+
+class OutboundQueue:
+    """
+    单个连接的有界发送队列
+    
+    队列元素为 [合并键, 已编码消息, 入队时间]。COALESCE 策略下同一合并键在队列中
+    最多一条，新消息原地替换旧消息（保持原有位置，入队时间不变）。
+    """
+    
+    __slots__ = (
+        "maxsize", "policy", "closed", "_items", "_pending", "_waiter",
+        "enqueued", "sent", "dropped", "coalesced",
+        "last_lag", "max_lag", "total_lag",
+    )
+    
+    def __init__(self, maxsize: int = 1000, policy: str = SlowConsumerPolicy.COALESCE):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"不支持的慢客户端策略: {policy}")
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.closed = False
+        self._items: Deque[list] = deque()
+        self._pending: Dict[Hashable, list] = {}
+        self._waiter: Optional[asyncio.Future] = None
+        
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def put(self, payload: str, key: Optional[Hashable] = None) -> bool:
+        """
+        加入待发送消息
+        
+        Args:
+            payload: 已编码的消息
+            key: 合并键（仅 COALESCE 策略使用）
+        
+        Returns:
+            bool: 是否已加入；队列已关闭或 DISCONNECT 策略下队列已满时为False
+        """
+        if self.closed:
+            return False
+        
+        if key is not None and self.policy == SlowConsumerPolicy.COALESCE:
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry[1] = payload
+                self.coalesced += 1
+                return True
+        
+        if len(self._items) >= self.maxsize:
+            if self.policy == SlowConsumerPolicy.DISCONNECT:
+                return False
+            self._drop_oldest()
+        
+        entry = [key, payload, time.monotonic()]
+        self._items.append(entry)
+        if key is not None and self.policy == SlowConsumerPolicy.COALESCE:
+            self._pending[key] = entry
+        self.enqueued += 1
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return True
+    
+    def _drop_oldest(self):
+        self._pop()
+        self.dropped += 1
+    
+    def _pop(self) -> list:
+        entry = self._items.popleft()
+        key = entry[0]
+        if key is not None and self._pending.get(key) is entry:
+            del self._pending[key]
+        return entry
+    
+    async def get(self) -> Tuple[str, float]:
+        """
+        取出下一条待发送消息（队列为空时等待）
+        
+        Returns:
+            Tuple[str, float]: (已编码消息, 入队时间)
+        """
+        while not self._items:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        entry = self._pop()
+        return entry[1], entry[2]
+    
+    def record_sent(self, enqueued_at: float):
+        """记录一次发送完成及其排队延迟"""
+        lag = time.monotonic() - enqueued_at
+        self.sent += 1
+        self.last_lag = lag
+        self.total_lag += lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+    
+    def close(self):
+        """关闭队列并丢弃待发送消息"""
+        self.closed = True
+        self._items.clear()
+        self._pending.clear()
+    
+    def current_lag(self) -> float:
+        """队首消息已等待的时间（秒）"""
+        if not self._items:
+            return 0.0
+        return time.monotonic() - self._items[0][2]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取队列统计信息（延迟单位为毫秒）"""
+        return {
+            "policy": self.policy,
+            "queue_size": len(self._items),
+            "max_queue_size": self.maxsize,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "lag_ms": round(self.current_lag() * 1000, 3),
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "avg_lag_ms": round(self.total_lag / self.sent * 1000, 3) if self.sent else 0.0,
+        }
+
+
 class ConnectionInfo:
-    """WebSocket连接信息"""
-    user_id: int
-    websocket: WebSocket
-    connected_at: datetime = field(default_factory=datetime.now)
-    last_activity: datetime = field(default_factory=datetime.now)
-    subscribed_assets: Set[int] = field(default_factory=set)
+    """
+    WebSocket连接信息
+    
+    使用 __slots__ 并以时间戳（秒）记录时间，单进程数万连接时保持较小的内存占用。
+    """
+    
+    __slots__ = (
+        "connection_id", "user_id", "websocket", "connected_at", "last_activity",
+        "subscribed_assets", "outbound", "writer_task", "encoding", "schemas",
+    )
+    
+    def __init__(
+        self,
+        connection_id: int,
+        user_id: int,
+        websocket: WebSocket,
+        outbound: Optional[OutboundQueue] = None
+    ):
+        self.connection_id = connection_id
+        self.user_id = user_id
+        self.websocket = websocket
+        self.connected_at = time.time()
+        self.last_activity = self.connected_at
+        self.subscribed_assets: Set[int] = set()
+        self.outbound = outbound
+        self.writer_task: Optional[asyncio.Task] = None
+        # 推送帧编码，columnar 编码时记录已下发的信号表 (类别ID, 版本)
+        self.encoding = MessageEncoding.JSON
+        self.schemas: Optional[Set[Tuple[int, int]]] = None
     
     def update_activity(self):
         """更新最后活动时间"""
-        self.last_activity = datetime.now()
+        self.last_activity = time.time()
 
 
 class ConnectionManager:
@@ -38,180 +243,400 @@ class ConnectionManager:
     WebSocket连接管理器
     
     负责管理所有WebSocket连接，包括：
-    - 连接建立和断开
+    - 连接建立和断开（同一用户可同时保持多个连接）
     - 用户认证验证
     - 订阅管理
-    - 消息推送
+    - 消息推送（每个连接一个有界发送队列和发送任务）
+    
+    连接按连接ID登记，并维护 用户ID -> 连接ID、资产ID -> 连接ID 两个反向索引，
+    推送、订阅和清理均为按键查找。
     """
     
-    def __init__(self):
-        # 用户ID -> 连接信息
+    def __init__(
+        self,
+        max_queue_size: int = 1000,
+        slow_consumer_policy: str = SlowConsumerPolicy.COALESCE,
+        send_timeout: float = 10.0,
+        max_connections_per_user: Optional[int] = None,
+        schema_registry: Optional[SignalSchemaRegistry] = None
+    ):
+        """
+        Args:
+            max_queue_size: 每个连接的发送队列上限
+            slow_consumer_policy: 默认的慢客户端策略（SlowConsumerPolicy）
+            send_timeout: 单条消息发送超时（秒），超时视为连接失效
+            max_connections_per_user: 每个用户的最大连接数，超出时断开该用户最早的连接；None表示不限制
+            schema_registry: 列式编码使用的信号表缓存，默认为全局缓存
+        """
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"不支持的慢客户端策略: {slow_consumer_policy}")
+        self.max_queue_size = max_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.max_connections_per_user = max_connections_per_user
+        self.schema_registry = schema_registry or signal_schema_registry
+        # 连接ID -> 连接信息
         self._connections: Dict[int, ConnectionInfo] = {}
-        # 资产ID -> 订阅的用户ID集合
+        # 用户ID -> 连接ID集合
+        self._user_connections: Dict[int, Set[int]] = {}
+        # 资产ID -> 订阅的连接ID集合
         self._asset_subscriptions: Dict[int, Set[int]] = {}
+        self._next_id = itertools.count(1)
         # 锁，用于线程安全操作
         self._lock = asyncio.Lock()
-        
+        # 后台任务（断开慢客户端等）
+        self._background: Set[asyncio.Task] = set()
+        # 因队列满而断开的连接数
+        self._slow_disconnects = 0
+    
     @property
     def active_connections(self) -> int:
         """获取活跃连接数"""
         return len(self._connections)
     
+    @property
+    def active_users(self) -> int:
+        """获取已连接的用户数"""
+        return len(self._user_connections)
+    
     @property
     def total_subscriptions(self) -> int:
-        """获取总订阅数"""
-        return sum(len(users) for users in self._asset_subscriptions.values())
+        """获取总订阅数（按连接计）"""
+        return sum(len(connections) for connections in self._asset_subscriptions.values())
     
-    async def connect(self, websocket: WebSocket, user_id: int) -> bool:
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        slow_consumer_policy: Optional[str] = None
+    ) -> Optional[int]:
         """
         建立WebSocket连接
         
         Args:
             websocket: WebSocket连接对象
             user_id: 用户ID
+            slow_consumer_policy: 该连接的慢客户端策略，默认使用管理器配置
             
         Returns:
-            bool: 连接是否成功建立
+            Optional[int]: 连接ID，连接失败时为None
         """
         try:
+            outbound = OutboundQueue(
+                self.max_queue_size,
+                slow_consumer_policy or self.slow_consumer_policy
+            )
             await websocket.accept()
             
+            evicted: List[ConnectionInfo] = []
             async with self._lock:
-                # 如果用户已有连接，先断开旧连接
-                if user_id in self._connections:
-                    old_conn = self._connections[user_id]
-                    try:
-                        await old_conn.websocket.close(
-                            code=status.WS_1008_POLICY_VIOLATION,
-                            reason="新连接已建立"
-                        )
-                    except Exception:
-                        pass
-                    # 清理旧订阅
-                    self._cleanup_user_subscriptions(user_id)
+                connection_id = next(self._next_id)
+                conn_info = ConnectionInfo(connection_id, user_id, websocket, outbound)
+                self._connections[connection_id] = conn_info
+                user_connections = self._user_connections.setdefault(user_id, set())
+                user_connections.add(connection_id)
                 
-                # 创建新连接信息
-                conn_info = ConnectionInfo(
-                    user_id=user_id,
-                    websocket=websocket
-                )
-                self._connections[user_id] = conn_info
+                # 超出单用户连接数上限时断开最早的连接（连接ID递增）
+                limit = self.max_connections_per_user
+                if limit is not None and len(user_connections) > limit:
+                    for old_id in sorted(user_connections)[:len(user_connections) - limit]:
+                        evicted.append(self._remove_locked(self._connections[old_id]))
+                
+                # 连接成功消息作为队列中的第一条消息发送
+                outbound.put(encode_message({
+                    "type": "connection",
+                    "status": "connected",
+                    "user_id": user_id,
+                    "connection_id": connection_id,
+                    "timestamp": datetime.now().isoformat()
+                }))
+                conn_info.writer_task = asyncio.create_task(self._writer(conn_info))
             
-            logger.info(f"WebSocket连接建立: user_id={user_id}")
+            for old_conn in evicted:
+                try:
+                    await old_conn.websocket.close(
+                        code=status.WS_1008_POLICY_VIOLATION,
+                        reason="连接数超过上限"
+                    )
+                except Exception:
+                    pass
             
-            # 发送连接成功消息
-            await self._send_message(websocket, {
-                "type": "connection",
-                "status": "connected",
-                "user_id": user_id,
-                "timestamp": datetime.now().isoformat()
-            })
+            logger.info(f"WebSocket连接建立: user_id={user_id}, connection_id={connection_id}")
             
-            return True
+            return connection_id
             
         except Exception as e:
             logger.error(f"WebSocket连接失败: user_id={user_id}, error={e}")
-            return False
+            return None
     
-    async def disconnect(self, user_id: int):
+    async def disconnect(self, connection_id: int):
         """
         断开WebSocket连接
         
         Args:
-            user_id: 用户ID
+            connection_id: 连接ID
         """
         async with self._lock:
-            if user_id in self._connections:
-                conn_info = self._connections[user_id]
-                
-                # 清理订阅
-                self._cleanup_user_subscriptions(user_id)
-                
-                # 移除连接
-                del self._connections[user_id]
+            conn_info = self._connections.get(connection_id)
+            if conn_info is not None:
+                self._remove_locked(conn_info)
                 
-                logger.info(f"WebSocket连接断开: user_id={user_id}")
+                logger.info(
+                    f"WebSocket连接断开: user_id={conn_info.user_id}, connection_id={connection_id}"
+                )
     
-    def _cleanup_user_subscriptions(self, user_id: int):
+    def _remove_locked(self, conn_info: ConnectionInfo) -> ConnectionInfo:
         """
-        清理用户的所有订阅（内部方法，需在锁内调用）
+        移除连接及其索引并停止发送任务（内部方法，需在锁内调用）
         
         Args:
-            user_id: 用户ID
+            conn_info: 连接信息
         """
-        if user_id in self._connections:
-            subscribed_assets = self._connections[user_id].subscribed_assets.copy()
-            for asset_id in subscribed_assets:
-                if asset_id in self._asset_subscriptions:
-                    self._asset_subscriptions[asset_id].discard(user_id)
-                    # 如果没有订阅者了，移除资产订阅记录
-                    if not self._asset_subscriptions[asset_id]:
-                        del self._asset_subscriptions[asset_id]
+        connection_id = conn_info.connection_id
+        if self._connections.pop(connection_id, None) is None:
+            return conn_info
+        
+        # 清理订阅
+        self._cleanup_connection_subscriptions(conn_info)
+        
+        user_connections = self._user_connections.get(conn_info.user_id)
+        if user_connections is not None:
+            user_connections.discard(connection_id)
+            if not user_connections:
+                del self._user_connections[conn_info.user_id]
+        
+        self._stop_writer(conn_info)
+        return conn_info
+    
+    def _cleanup_connection_subscriptions(self, conn_info: ConnectionInfo):
+        """
+        清理连接的所有订阅（内部方法，需在锁内调用）
+        
+        Args:
+            conn_info: 连接信息
+        """
+        connection_id = conn_info.connection_id
+        for asset_id in conn_info.subscribed_assets:
+            connections = self._asset_subscriptions.get(asset_id)
+            if connections is not None:
+                connections.discard(connection_id)
+                # 如果没有订阅者了，移除资产订阅记录
+                if not connections:
+                    del self._asset_subscriptions[asset_id]
+        conn_info.subscribed_assets.clear()
+    
+    def _stop_writer(self, conn_info: ConnectionInfo):
+        """关闭连接的发送队列并停止发送任务"""
+        if conn_info.outbound is not None:
+            conn_info.outbound.close()
+        task = conn_info.writer_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        conn_info.writer_task = None
+    
+    async def _remove_connection(self, conn_info: ConnectionInfo):
+        """移除指定连接"""
+        async with self._lock:
+            self._remove_locked(conn_info)
+    
+    async def _writer(self, conn_info: ConnectionInfo):
+        """
+        连接的发送任务：按顺序写出发送队列中的消息
+        
+        发送失败或超时后移除连接。
+        """
+        outbound = conn_info.outbound
+        websocket = conn_info.websocket
+        try:
+            while True:
+                payload, enqueued_at = await outbound.get()
+                async with asyncio.timeout(self.send_timeout):
+                    if isinstance(payload, bytes):
+                        await websocket.send_bytes(payload)
+                    else:
+                        await websocket.send_text(payload)
+                outbound.record_sent(enqueued_at)
+                conn_info.update_activity()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(
+                f"推送失败: user_id={conn_info.user_id}, "
+                f"connection_id={conn_info.connection_id}, error={e!r}"
+            )
+            await self._remove_connection(conn_info)
+    
+    async def _disconnect_slow_consumer(self, conn_info: ConnectionInfo):
+        """断开发送队列已满的连接"""
+        await self._remove_connection(conn_info)
+        try:
+            await conn_info.websocket.close(
+                code=status.WS_1013_TRY_AGAIN_LATER,
+                reason="消息积压过多"
+            )
+        except Exception:
+            pass
     
-    async def subscribe(self, user_id: int, asset_ids: List[int]) -> bool:
+    def _enqueue(self, conn_info: ConnectionInfo, payload: Payload, key: Optional[Hashable] = None) -> bool:
+        """
+        将已编码的消息加入连接的发送队列
+        
+        DISCONNECT 策略下队列已满时关闭队列并在后台断开连接。
+        """
+        outbound = conn_info.outbound
+        if outbound.put(payload, key):
+            return True
+        
+        if not outbound.closed and outbound.policy == SlowConsumerPolicy.DISCONNECT:
+            outbound.close()
+            self._slow_disconnects += 1
+            logger.warning(
+                f"发送队列已满，断开慢客户端: user_id={conn_info.user_id}, "
+                f"connection_id={conn_info.connection_id}, queue_size={outbound.maxsize}"
+            )
+            task = asyncio.create_task(self._disconnect_slow_consumer(conn_info))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return False
+    
+    def _enqueue_frames(
+        self,
+        conn_info: ConnectionInfo,
+        frames: MessageFrames,
+        key: Optional[Hashable] = None
+    ) -> bool:
+        """
+        按连接的编码取出消息帧并加入发送队列
+        
+        列式帧使用的信号表尚未下发给该连接时，先加入信号表消息。
+        """
+        payload, schema = frames.get(conn_info.encoding)
+        if schema is not None and schema.key not in conn_info.schemas:
+            if not self._enqueue(conn_info, schema.payload()):
+                return False
+            conn_info.schemas.add(schema.key)
+        return self._enqueue(conn_info, payload, key)
+    
+    def set_encoding(self, connection_id: int, encoding: str) -> bool:
+        """
+        设置连接的推送帧编码
+        
+        Args:
+            connection_id: 连接ID
+            encoding: 编码（MessageEncoding）
+            
+        Returns:
+            bool: 连接是否存在
+            
+        Raises:
+            ValueError: 不支持或当前环境不可用的编码
+        """
+        validate_encoding(encoding)
+        conn_info = self._connections.get(connection_id)
+        if conn_info is None:
+            return False
+        if encoding != conn_info.encoding:
+            conn_info.encoding = encoding
+            conn_info.schemas = set() if encoding == MessageEncoding.COLUMNAR else None
+        return True
+    
+    async def subscribe(self, connection_id: int, asset_ids: List[int]) -> bool:
         """
         订阅资产数据
         
         Args:
-            user_id: 用户ID
+            connection_id: 连接ID
             asset_ids: 资产ID列表
             
         Returns:
             bool: 订阅是否成功
         """
         async with self._lock:
-            if user_id not in self._connections:
-                logger.warning(f"订阅失败: 用户未连接 user_id={user_id}")
+            conn_info = self._connections.get(connection_id)
+            if conn_info is None:
+                logger.warning(f"订阅失败: 连接不存在 connection_id={connection_id}")
                 return False
             
-            conn_info = self._connections[user_id]
-            
             for asset_id in asset_ids:
                 # 添加到资产订阅映射
-                if asset_id not in self._asset_subscriptions:
-                    self._asset_subscriptions[asset_id] = set()
-                self._asset_subscriptions[asset_id].add(user_id)
+                self._asset_subscriptions.setdefault(asset_id, set()).add(connection_id)
                 
-                # 添加到用户订阅列表
+                # 添加到连接订阅列表
                 conn_info.subscribed_assets.add(asset_id)
             
             conn_info.update_activity()
             
-        logger.info(f"订阅成功: user_id={user_id}, assets={asset_ids}")
+        logger.info(f"订阅成功: user_id={conn_info.user_id}, connection_id={connection_id}, assets={asset_ids}")
         return True
     
-    async def unsubscribe(self, user_id: int, asset_ids: List[int]) -> bool:
+    async def unsubscribe(self, connection_id: int, asset_ids: List[int]) -> bool:
         """
         取消订阅资产数据
         
         Args:
-            user_id: 用户ID
+            connection_id: 连接ID
             asset_ids: 资产ID列表
             
         Returns:
             bool: 取消订阅是否成功
         """
         async with self._lock:
-            if user_id not in self._connections:
+            conn_info = self._connections.get(connection_id)
+            if conn_info is None:
                 return False
             
-            conn_info = self._connections[user_id]
-            
             for asset_id in asset_ids:
                 # 从资产订阅映射中移除
-                if asset_id in self._asset_subscriptions:
-                    self._asset_subscriptions[asset_id].discard(user_id)
-                    if not self._asset_subscriptions[asset_id]:
+                connections = self._asset_subscriptions.get(asset_id)
+                if connections is not None:
+                    connections.discard(connection_id)
+                    if not connections:
                         del self._asset_subscriptions[asset_id]
                 
-                # 从用户订阅列表中移除
+                # 从连接订阅列表中移除
                 conn_info.subscribed_assets.discard(asset_id)
             
             conn_info.update_activity()
             
-        logger.info(f"取消订阅: user_id={user_id}, assets={asset_ids}")
+        logger.info(f"取消订阅: user_id={conn_info.user_id}, connection_id={connection_id}, assets={asset_ids}")
         return True
     
+    def get_connection(self, connection_id: int) -> Optional[ConnectionInfo]:
+        """
+        获取连接信息
+        
+        Args:
+            connection_id: 连接ID
+            
+        Returns:
+            Optional[ConnectionInfo]: 连接信息
+        """
+        return self._connections.get(connection_id)
+    
+    def get_user_connections(self, user_id: int) -> Set[int]:
+        """
+        获取用户的所有连接ID
+        
+        Args:
+            user_id: 用户ID
+            
+        Returns:
+            Set[int]: 连接ID集合
+        """
+        return set(self._user_connections.get(user_id, ()))
+    
+    def get_asset_connections(self, asset_id: int) -> Set[int]:
+        """
+        获取订阅资产的连接ID集合
+        
+        Args:
+            asset_id: 资产ID
+            
+        Returns:
+            Set[int]: 连接ID集合
+        """
+        return set(self._asset_subscriptions.get(asset_id, ()))
+    
     def get_asset_subscribers(self, asset_id: int) -> Set[int]:
         """
         获取资产的订阅者列表
@@ -222,11 +647,15 @@ class ConnectionManager:
         Returns:
             Set[int]: 订阅该资产的用户ID集合
         """
-        return self._asset_subscriptions.get(asset_id, set()).copy()
+        connections = self._connections
+        return {
+            connections[connection_id].user_id
+            for connection_id in self._asset_subscriptions.get(asset_id, ())
+        }
     
     def get_user_subscriptions(self, user_id: int) -> Set[int]:
         """
-        获取用户订阅的资产列表
+        获取用户订阅的资产列表（用户所有连接的订阅合集）
         
         Args:
             user_id: 用户ID
@@ -234,9 +663,10 @@ class ConnectionManager:
         Returns:
             Set[int]: 用户订阅的资产ID集合
         """
-        if user_id in self._connections:
-            return self._connections[user_id].subscribed_assets.copy()
-        return set()
+        assets: Set[int] = set()
+        for connection_id in self._user_connections.get(user_id, ()):
+            assets |= self._connections[connection_id].subscribed_assets
+        return assets
     
     def is_connected(self, user_id: int) -> bool:
         """
@@ -248,32 +678,119 @@ class ConnectionManager:
         Returns:
             bool: 是否已连接
         """
-        return user_id in self._connections
+        return user_id in self._user_connections
+    
+    async def push_to_connection(self, connection_id: int, message: Dict[str, Any]) -> bool:
+        """
+        向指定连接推送消息
+        
+        Args:
+            connection_id: 连接ID
+            message: 消息内容
+            
+        Returns:
+            bool: 是否已加入发送队列
+        """
+        conn_info = self._connections.get(connection_id)
+        if conn_info is None:
+            return False
+        
+        return self._enqueue_frames(
+            conn_info, MessageFrames(message, self.schema_registry), message_coalesce_key(message)
+        )
     
     async def push_to_user(self, user_id: int, message: Dict[str, Any]) -> bool:
         """
-        向指定用户推送消息
+        向指定用户的所有连接推送消息
         
         Args:
             user_id: 用户ID
             message: 消息内容
             
         Returns:
-            bool: 推送是否成功
+            bool: 是否至少一个连接推送成功
         """
-        if user_id not in self._connections:
-            return False
+        return self.fanout((user_id,), message) > 0
+    
+    def fanout(
+        self,
+        user_ids: Iterable[int],
+        message: Dict[str, Any],
+        coalesce_key: Optional[Hashable] = None,
+        asset_id: Optional[int] = None
+    ) -> int:
+        """
+        向多个用户扇出同一条消息
         
-        conn_info = self._connections[user_id]
-        try:
-            await self._send_message(conn_info.websocket, message)
-            conn_info.update_activity()
-            return True
-        except Exception as e:
-            logger.error(f"推送失败: user_id={user_id}, error={e}")
-            # 连接可能已断开，清理连接
-            await self.disconnect(user_id)
-            return False
+        消息每种编码只编码一次，加入各连接的发送队列后立即返回，实际发送由各连接的发送任务完成。
+        
+        Args:
+            user_ids: 用户ID集合
+            message: 消息内容
+            coalesce_key: 合并键，默认由消息类型推断（见 message_coalesce_key）
+            asset_id: 资产ID，指定时只发送到订阅了该资产的连接
+                （用户的连接都没有订阅该资产时发送到该用户的全部连接）
+            
+        Returns:
+            int: 至少一个连接成功加入发送队列的用户数
+        """
+        if coalesce_key is None:
+            coalesce_key = message_coalesce_key(message)
+        
+        frames = MessageFrames(message, self.schema_registry)
+        success_count = 0
+        connections = self._connections
+        user_connections = self._user_connections
+        for user_id in user_ids:
+            connection_ids = user_connections.get(user_id)
+            if not connection_ids:
+                continue
+            targets = [connections[connection_id] for connection_id in connection_ids]
+            if asset_id is not None and len(targets) > 1:
+                subscribed = [conn for conn in targets if asset_id in conn.subscribed_assets]
+                if subscribed:
+                    targets = subscribed
+            
+            delivered = False
+            for conn_info in targets:
+                if self._enqueue_frames(conn_info, frames, coalesce_key):
+                    delivered = True
+            if delivered:
+                success_count += 1
+        
+        return success_count
+    
+    def fanout_connections(
+        self,
+        connection_ids: Iterable[int],
+        message: Dict[str, Any],
+        coalesce_key: Optional[Hashable] = None
+    ) -> int:
+        """
+        向多个连接扇出同一条消息
+        
+        Args:
+            connection_ids: 连接ID集合
+            message: 消息内容
+            coalesce_key: 合并键，默认由消息类型推断
+            
+        Returns:
+            int: 成功加入发送队列的连接数
+        """
+        if coalesce_key is None:
+            coalesce_key = message_coalesce_key(message)
+        
+        frames = MessageFrames(message, self.schema_registry)
+        success_count = 0
+        connections = self._connections
+        for connection_id in connection_ids:
+            conn_info = connections.get(connection_id)
+            if conn_info is None:
+                continue
+            if self._enqueue_frames(conn_info, frames, coalesce_key):
+                success_count += 1
+        
+        return success_count
     
     async def push_to_asset_subscribers(self, asset_id: int, data: Dict[str, Any]) -> int:
         """
@@ -284,10 +801,10 @@ class ConnectionManager:
             data: 数据内容
             
         Returns:
-            int: 成功推送的用户数
+            int: 成功推送的连接数
         """
-        subscribers = self.get_asset_subscribers(asset_id)
-        if not subscribers:
+        connection_ids = self._asset_subscriptions.get(asset_id)
+        if not connection_ids:
             return 0
         
         message = {
@@ -298,17 +815,13 @@ class ConnectionManager:
             "quality": data.get("quality", "good")
         }
         
-        success_count = 0
-        failed_users = []
-        
-        for user_id in subscribers:
-            if await self.push_to_user(user_id, message):
-                success_count += 1
-            else:
-                failed_users.append(user_id)
+        total = len(connection_ids)
+        success_count = self.fanout_connections(list(connection_ids), message)
         
-        if failed_users:
-            logger.warning(f"部分推送失败: asset_id={asset_id}, failed_users={failed_users}")
+        if success_count < total:
+            logger.warning(
+                f"部分推送失败: asset_id={asset_id}, failed={total - success_count}"
+            )
         
         return success_count
     
@@ -332,22 +845,15 @@ class ConnectionManager:
     
     async def broadcast(self, message: Dict[str, Any]) -> int:
         """
-        广播消息给所有连接的用户
+        广播消息给所有连接
         
         Args:
             message: 消息内容
             
         Returns:
-            int: 成功推送的用户数
+            int: 成功推送的连接数
         """
-        success_count = 0
-        user_ids = list(self._connections.keys())
-        
-        for user_id in user_ids:
-            if await self.push_to_user(user_id, message):
-                success_count += 1
-        
-        return success_count
+        return self.fanout_connections(list(self._connections), message)
     
     async def _send_message(self, websocket: WebSocket, message: Dict[str, Any]):
         """
@@ -357,29 +863,64 @@ class ConnectionManager:
             websocket: WebSocket连接
             message: 消息内容
         """
-        await websocket.send_text(json.dumps(message, ensure_ascii=False))
+        await websocket.send_text(encode_message(message))
     
-    def get_connection_stats(self) -> Dict[str, Any]:
+    def get_connection_stats(self, include_connections: bool = True) -> Dict[str, Any]:
         """
         获取连接统计信息
         
+        每个连接包含发送队列统计（outbound）：队列长度、丢弃/合并数量，
+        以及排队延迟 lag_ms（队首消息已等待时间）、last_lag_ms、max_lag_ms、avg_lag_ms。
+        
+        Args:
+            include_connections: 是否包含每个连接的明细
+            
         Returns:
             Dict: 统计信息
         """
-        return {
+        connections = []
+        queued = dropped = coalesced = 0
+        max_lag = 0.0
+        encodings: Dict[str, int] = {}
+        for conn in self._connections.values():
+            encodings[conn.encoding] = encodings.get(conn.encoding, 0) + 1
+            queue = conn.outbound
+            queued += len(queue)
+            dropped += queue.dropped
+            coalesced += queue.coalesced
+            if len(queue):
+                max_lag = max(max_lag, queue.current_lag())
+            if include_connections:
+                outbound = queue.get_stats()
+                connections.append({
+                    "connection_id": conn.connection_id,
+                    "user_id": conn.user_id,
+                    "connected_at": datetime.fromtimestamp(conn.connected_at).isoformat(),
+                    "last_activity": datetime.fromtimestamp(conn.last_activity).isoformat(),
+                    "subscribed_assets_count": len(conn.subscribed_assets),
+                    "encoding": conn.encoding,
+                    "outbound": outbound
+                })
+        
+        stats = {
             "active_connections": self.active_connections,
+            "active_users": self.active_users,
             "total_subscriptions": self.total_subscriptions,
             "subscribed_assets": len(self._asset_subscriptions),
-            "connections": [
-                {
-                    "user_id": conn.user_id,
-                    "connected_at": conn.connected_at.isoformat(),
-                    "last_activity": conn.last_activity.isoformat(),
-                    "subscribed_assets_count": len(conn.subscribed_assets)
-                }
-                for conn in self._connections.values()
-            ]
+            "encodings": encodings,
+            "outbound": {
+                "slow_consumer_policy": self.slow_consumer_policy,
+                "max_queue_size": self.max_queue_size,
+                "queued": queued,
+                "dropped": dropped,
+                "coalesced": coalesced,
+                "max_lag_ms": round(max_lag * 1000, 3),
+                "slow_consumer_disconnects": self._slow_disconnects
+            }
         }
+        if include_connections:
+            stats["connections"] = connections
+        return stats
 
 
 # 全局连接管理器实例
@@ -0,0 +1,47 @@
+"""
+运行时状态后端模块
+
+规则冷却、报警活跃状态等运行时状态的可插拔存储，
+多worker部署时使用Redis后端在进程间共享。
+"""
+
+from platform_core.state.backend import (
+    StateBackend,
+    InMemoryStateBackend,
+    AlarmOutcome,
+    AlarmDecision,
+    AlarmAction,
+)
+from platform_core.state.redis_backend import RedisStateBackend
+
+
+def create_state_backend(backend: str = "memory", redis=None, **kwargs) -> StateBackend:
+    """
+    创建状态后端
+    
+    Args:
+        backend: memory / redis
+        redis: redis.asyncio 客户端（redis 后端必需）
+        **kwargs: 传给后端构造函数的参数
+    
+    Returns:
+        StateBackend: 状态后端实例
+    """
+    if backend == "redis":
+        if redis is None:
+            raise ValueError("Redis状态后端需要提供redis客户端")
+        return RedisStateBackend(redis, **kwargs)
+    if backend == "memory":
+        return InMemoryStateBackend(**kwargs)
+    raise ValueError(f"不支持的状态后端: {backend}")
+
+
+__all__ = [
+    "StateBackend",
+    "InMemoryStateBackend",
+    "RedisStateBackend",
+    "AlarmOutcome",
+    "AlarmDecision",
+    "AlarmAction",
+    "create_state_backend",
+]
@@ -0,0 +1,335 @@
+"""
+运行时状态后端
+
+规则冷却、报警活跃状态、连续触发/恢复计数等运行时状态原先保存在各进程的字典中，
+多worker部署时每个进程各有一份，会产生重复报警。此模块将这些状态抽象为可插拔后端:
+
+- InMemoryStateBackend: 进程内实现（默认，单进程部署）
+- RedisStateBackend: Redis实现（多worker/多节点共享，见 redis_backend）
+
+每次评估的状态读写合并为一次调用（Redis后端为一次Lua脚本执行），
+判定与状态变更在后端内原子完成。
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AlarmAction:
+    """报警状态转换结果"""
+    OPEN = "open"          # 已占用活跃位，调用方创建报警记录后登记ID
+    MERGE = "merge"        # 已有活跃报警，合并本次触发
+    RESOLVE = "resolve"    # 达到恢复次数，活跃状态已清除，调用方关闭报警记录
+
+
+@dataclass
+class AlarmOutcome:
+    """
+    单条规则的本次检测结果
+    
+    Attributes:
+        rule_code: 规则编码
+        triggered: 是否超过阈值
+        consecutive_count: 连续触发多少次后报警
+        silent_period: 静默期（秒），静默期内不重复报警
+        recovery_count: 连续正常多少次后自动恢复（<=0 表示不自动恢复）
+    """
+    rule_code: str
+    triggered: bool
+    consecutive_count: int = 1
+    silent_period: float = 300
+    recovery_count: int = 3
+
+
+@dataclass
+class AlarmDecision:
+    """
+    状态转换后需要调用方执行的动作
+    
+    Attributes:
+        rule_code: 规则编码
+        action: AlarmAction 之一
+        alarm_id: 活跃报警ID（open 时为None）
+    """
+    rule_code: str
+    action: str
+    alarm_id: Optional[int] = None
+
+
+class StateBackend(ABC):
+    """
+    状态后端接口
+    
+    冷却按命名空间隔离，键为规则ID；报警状态按设备编码组织，每条规则保存
+    活跃报警ID、连续触发次数、连续恢复次数和最后报警时间。
+    """
+    
+    name = "abstract"
+    # 是否跨进程共享（非共享后端同时提供同步接口）
+    shared = False
+    
+    # ---------------- 冷却 ----------------
+    
+    @abstractmethod
+    async def acquire_cooldowns(self, namespace: str, cooldowns: Dict[str, float]) -> Set[str]:
+        """
+        原子地为不在冷却期的键设置冷却
+        
+        Args:
+            namespace: 命名空间
+            cooldowns: 键 -> 冷却秒数
+        
+        Returns:
+            Set[str]: 本次成功进入冷却的键（即允许触发的键）
+        """
+    
+    @abstractmethod
+    async def get_cooldowns(self, namespace: str, keys: Iterable[str]) -> Dict[str, float]:
+        """
+        查询剩余冷却时间
+        
+        Returns:
+            Dict[str, float]: 仍在冷却期的键 -> 剩余秒数
+        """
+    
+    @abstractmethod
+    async def clear_cooldowns(self, namespace: str, keys: Optional[Iterable[str]] = None) -> None:
+        """清除冷却（keys为None时清除整个命名空间）"""
+    
+    # ---------------- 报警状态 ----------------
+    
+    @abstractmethod
+    async def apply_alarm_outcomes(self, device_code: str, outcomes: List[AlarmOutcome]) -> List[AlarmDecision]:
+        """
+        应用一台设备的一次检测结果
+        
+        触发时: 清零恢复计数；已有活跃报警则返回 merge，否则累加连续触发次数，
+        达到次数且不在静默期时占用活跃位并返回 open。
+        正常时: 清零触发计数；有活跃报警且允许自动恢复时累加恢复次数，
+        达到次数时清除活跃状态并返回 resolve。
+        
+        Returns:
+            List[AlarmDecision]: 需要执行的动作（与 outcomes 顺序一致）
+        """
+    
+    @abstractmethod
+    async def set_active_alarm(self, device_code: str, rule_code: str, alarm_id: int) -> None:
+        """登记 open 后创建的报警记录ID"""
+    
+    @abstractmethod
+    async def release_active_alarm(self, device_code: str, rule_code: str) -> None:
+        """释放 open 占用但未能创建报警记录的活跃位"""
+    
+    @abstractmethod
+    async def get_active_alarms(self) -> Dict[str, Dict[str, int]]:
+        """获取所有已登记的活跃报警 {device_code: {rule_code: alarm_id}}"""
+    
+    @abstractmethod
+    async def add_active_alarms(self, entries: List[Tuple[str, str, int]]) -> None:
+        """补充活跃报警（已有活跃状态的规则不覆盖）"""
+    
+    @abstractmethod
+    async def remove_active_alarms(self, entries: List[Tuple[str, str, int]]) -> None:
+        """移除活跃报警（仅当当前登记的ID与给定ID一致时）"""
+    
+    # ---------------- 协调 ----------------
+    
+    @abstractmethod
+    async def try_lock(self, name: str, ttl_seconds: float) -> bool:
+        """获取带过期时间的锁（用于多worker间只执行一次的任务）"""
+    
+    def describe(self) -> Dict[str, Any]:
+        """后端信息"""
+        return {"backend": self.name, "shared": self.shared}
+    
+    async def close(self) -> None:
+        """释放资源"""
+
+
+class InMemoryStateBackend(StateBackend):
+    """
+    进程内状态后端
+    
+    状态转换规则与 RedisStateBackend 的Lua脚本一致；除异步接口外提供同步的冷却接口，
+    供规则引擎的同步评估方法使用。
+    """
+    
+    name = "memory"
+    shared = False
+    
+    def __init__(self, claim_ttl: float = 60.0):
+        """
+        Args:
+            claim_ttl: open 占用活跃位后等待登记报警ID的最长时间（秒），超时视为占用失效
+        """
+        self._claim_ttl = claim_ttl
+        self._cooldowns: Dict[str, Dict[str, float]] = {}
+        # {device_code: {rule_code: {"active": id|None, "claimed_at": ts|None, "trigger": n, "recovery": n, "last_alarm": ts}}}
+        self._alarms: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._locks: Dict[str, float] = {}
+    
+    # ---------------- 冷却（同步） ----------------
+    
+    def acquire_cooldowns_sync(self, namespace: str, cooldowns: Dict[str, float]) -> Set[str]:
+        """同步版本的 acquire_cooldowns"""
+        if not cooldowns:
+            return set()
+        
+        entries = self._cooldowns.setdefault(namespace, {})
+        now = time.monotonic()
+        acquired = set()
+        for key, seconds in cooldowns.items():
+            until = entries.get(key)
+            if until is not None and now < until:
+                continue
+            if seconds > 0:
+                entries[key] = now + seconds
+            acquired.add(key)
+        return acquired
+    
+    def get_cooldowns_sync(self, namespace: str, keys: Iterable[str]) -> Dict[str, float]:
+        """同步版本的 get_cooldowns"""
+        entries = self._cooldowns.get(namespace)
+        if not entries:
+            return {}
+        
+        now = time.monotonic()
+        remaining = {}
+        for key in keys:
+            until = entries.get(key)
+            if until is None:
+                continue
+            if now >= until:
+                # 冷却期已过，清除记录
+                del entries[key]
+                continue
+            remaining[key] = until - now
+        return remaining
+    
+    def clear_cooldowns_sync(self, namespace: str, keys: Optional[Iterable[str]] = None) -> None:
+        """同步版本的 clear_cooldowns"""
+        if keys is None:
+            self._cooldowns.pop(namespace, None)
+            return
+        entries = self._cooldowns.get(namespace)
+        if entries:
+            for key in keys:
+                entries.pop(key, None)
+    
+    async def acquire_cooldowns(self, namespace: str, cooldowns: Dict[str, float]) -> Set[str]:
+        return self.acquire_cooldowns_sync(namespace, cooldowns)
+    
+    async def get_cooldowns(self, namespace: str, keys: Iterable[str]) -> Dict[str, float]:
+        return self.get_cooldowns_sync(namespace, keys)
+    
+    async def clear_cooldowns(self, namespace: str, keys: Optional[Iterable[str]] = None) -> None:
+        self.clear_cooldowns_sync(namespace, keys)
+    
+    # ---------------- 报警状态 ----------------
+    
+    @staticmethod
+    def _new_rule_state() -> Dict[str, Any]:
+        return {"active": None, "claimed_at": None, "trigger": 0, "recovery": 0, "last_alarm": None}
+    
+    async def apply_alarm_outcomes(self, device_code: str, outcomes: List[AlarmOutcome]) -> List[AlarmDecision]:
+        if not outcomes:
+            return []
+        
+        device_state = self._alarms.setdefault(device_code, {})
+        now = time.time()
+        decisions = []
+        
+        for outcome in outcomes:
+            state = device_state.get(outcome.rule_code)
+            if state is None:
+                state = device_state[outcome.rule_code] = self._new_rule_state()
+            
+            claimed = state["claimed_at"] is not None
+            if claimed and now - state["claimed_at"] >= self._claim_ttl:
+                # 占用后未登记报警ID（进程异常退出等），释放占用
+                state["claimed_at"] = None
+                claimed = False
+            is_active = claimed or state["active"] is not None
+            
+            if outcome.triggered:
+                state["recovery"] = 0
+                if is_active:
+                    if not claimed:
+                        decisions.append(AlarmDecision(outcome.rule_code, AlarmAction.MERGE, state["active"]))
+                    continue
+                
+                state["trigger"] += 1
+                if state["trigger"] < outcome.consecutive_count:
+                    continue
+                last_alarm = state["last_alarm"]
+                if last_alarm is not None and now - last_alarm < outcome.silent_period:
+                    continue
+                
+                state["last_alarm"] = now
+                state["claimed_at"] = now
+                decisions.append(AlarmDecision(outcome.rule_code, AlarmAction.OPEN))
+            else:
+                state["trigger"] = 0
+                if not is_active or claimed or outcome.recovery_count <= 0:
+                    continue
+                
+                state["recovery"] += 1
+                if state["recovery"] >= outcome.recovery_count:
+                    alarm_id = state["active"]
+                    state["active"] = None
+                    state["recovery"] = 0
+                    decisions.append(AlarmDecision(outcome.rule_code, AlarmAction.RESOLVE, alarm_id))
+        
+        return decisions
+    
+    async def set_active_alarm(self, device_code: str, rule_code: str, alarm_id: int) -> None:
+        state = self._alarms.setdefault(device_code, {}).setdefault(rule_code, self._new_rule_state())
+        state["active"] = alarm_id
+        state["claimed_at"] = None
+    
+    async def release_active_alarm(self, device_code: str, rule_code: str) -> None:
+        state = self._alarms.get(device_code, {}).get(rule_code)
+        if state is not None:
+            state["claimed_at"] = None
+    
+    async def get_active_alarms(self) -> Dict[str, Dict[str, int]]:
+        active = {}
+        for device_code, rules in self._alarms.items():
+            for rule_code, state in rules.items():
+                if state["active"] is not None:
+                    active.setdefault(device_code, {})[rule_code] = state["active"]
+        return active
+    
+    async def add_active_alarms(self, entries: List[Tuple[str, str, int]]) -> None:
+        for device_code, rule_code, alarm_id in entries:
+            state = self._alarms.setdefault(device_code, {}).setdefault(rule_code, self._new_rule_state())
+            if state["active"] is None and state["claimed_at"] is None:
+                state["active"] = alarm_id
+    
+    async def remove_active_alarms(self, entries: List[Tuple[str, str, int]]) -> None:
+        for device_code, rule_code, alarm_id in entries:
+            state = self._alarms.get(device_code, {}).get(rule_code)
+            if state is not None and state["active"] == alarm_id:
+                state["active"] = None
+                state["recovery"] = 0
+    
+    # ---------------- 协调 ----------------
+    
+    async def try_lock(self, name: str, ttl_seconds: float) -> bool:
+        now = time.monotonic()
+        until = self._locks.get(name)
+        if until is not None and now < until:
+            return False
+        self._locks[name] = now + ttl_seconds
+        return True
+    
+    def describe(self) -> Dict[str, Any]:
+        info = super().describe()
+        info["devices"] = len(self._alarms)
+        info["cooldown_namespaces"] = {ns: len(entries) for ns, entries in self._cooldowns.items()}
+        return info
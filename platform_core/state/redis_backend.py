@@ -0,0 +1,334 @@
+"""
+Redis状态后端
+
+多worker/多节点共享规则冷却和报警状态。判定与状态变更在Lua脚本中原子执行，
+时间取Redis服务器时间（不受各节点时钟偏差影响），每次评估只需一次往返。
+
+键结构（prefix 默认为 "state"）:
+- {prefix}:cooldown:{namespace}  Hash  键 -> 冷却截止时间(ms)
+- {prefix}:alarm:{device_code}   Hash  a:{rule} 活跃报警ID（"p:{ms}" 表示已占用待登记）
+                                       t:{rule} 连续触发次数
+                                       r:{rule} 连续恢复次数
+                                       s:{rule} 最后报警时间(ms)
+- {prefix}:alarm:devices         Set   有过报警状态的设备
+- {prefix}:lock:{name}           String 锁
+"""
+
+from typing import Dict, Any, List, Optional, Iterable, Set, Tuple
+import logging
+
+from .backend import StateBackend, AlarmOutcome, AlarmDecision
+
+logger = logging.getLogger(__name__)
+
+
+_ACQUIRE_COOLDOWNS = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local acquired = {}
+for i = 1, #ARGV, 2 do
+    local key = ARGV[i]
+    local ttl = tonumber(ARGV[i + 1])
+    local expire_at = tonumber(redis.call('HGET', KEYS[1], key) or '0')
+    if expire_at <= now then
+        if ttl > 0 then
+            redis.call('HSET', KEYS[1], key, now + ttl)
+        end
+        acquired[#acquired + 1] = key
+    end
+end
+return acquired
+"""
+
+_GET_COOLDOWNS = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local result = {}
+-- 逐个HGET而不是 HMGET + unpack(ARGV)：unpack 的参数个数有上限（约8000），规则数上万时会失败
+for i = 1, #ARGV do
+    local expire_at = tonumber(redis.call('HGET', KEYS[1], ARGV[i]) or '0')
+    if expire_at > now then
+        result[#result + 1] = ARGV[i]
+        result[#result + 1] = expire_at - now
+    end
+end
+return result
+"""
+
+# ARGV: claim_ttl_ms, state_ttl_ms, device_code, 然后每条规则5个参数:
+#       rule_code, triggered(1/0), consecutive_count, silent_period_ms, recovery_count
+_APPLY_ALARM_OUTCOMES = """
+local key = KEYS[1]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local claim_ttl = tonumber(ARGV[1])
+local state_ttl = tonumber(ARGV[2])
+local result = {}
+
+for i = 4, #ARGV, 5 do
+    local rule = ARGV[i]
+    local triggered = ARGV[i + 1] == '1'
+    local consecutive = tonumber(ARGV[i + 2])
+    local silent = tonumber(ARGV[i + 3])
+    local recovery = tonumber(ARGV[i + 4])
+    local active_field = 'a:' .. rule
+    
+    local active = redis.call('HGET', key, active_field)
+    local claimed = false
+    if active and string.sub(active, 1, 2) == 'p:' then
+        if now - tonumber(string.sub(active, 3)) < claim_ttl then
+            claimed = true
+        else
+            redis.call('HDEL', key, active_field)
+            active = false
+        end
+    end
+    
+    if triggered then
+        redis.call('HDEL', key, 'r:' .. rule)
+        if active then
+            if not claimed then
+                result[#result + 1] = rule
+                result[#result + 1] = 'merge'
+                result[#result + 1] = active
+            end
+        else
+            local count = redis.call('HINCRBY', key, 't:' .. rule, 1)
+            if count >= consecutive then
+                local last = redis.call('HGET', key, 's:' .. rule)
+                if (not last) or now - tonumber(last) >= silent then
+                    redis.call('HSET', key, 's:' .. rule, now, active_field, 'p:' .. now)
+                    redis.call('SADD', KEYS[2], ARGV[3])
+                    result[#result + 1] = rule
+                    result[#result + 1] = 'open'
+                    result[#result + 1] = ''
+                end
+            end
+        end
+    else
+        redis.call('HDEL', key, 't:' .. rule)
+        if active and (not claimed) and recovery > 0 then
+            local count = redis.call('HINCRBY', key, 'r:' .. rule, 1)
+            if count >= recovery then
+                redis.call('HDEL', key, active_field, 'r:' .. rule)
+                result[#result + 1] = rule
+                result[#result + 1] = 'resolve'
+                result[#result + 1] = active
+            end
+        end
+    end
+end
+
+if state_ttl > 0 then
+    redis.call('PEXPIRE', key, state_ttl)
+end
+return result
+"""
+
+# 登记报警ID：仅当活跃位为空或处于占用状态时写入
+_SET_ACTIVE_ALARM = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current and string.sub(current, 1, 2) ~= 'p:' then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('SADD', KEYS[2], ARGV[3])
+return 1
+"""
+
+# 释放占用：仅当活跃位处于占用状态时删除
+_RELEASE_ACTIVE_ALARM = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if current and string.sub(current, 1, 2) == 'p:' then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# 按ID移除活跃报警（比较后删除）
+_REMOVE_ACTIVE_ALARM = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    redis.call('HDEL', KEYS[1], ARGV[1], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Redis状态后端
+    
+    Attributes:
+        redis: redis.asyncio 客户端（decode_responses 可为 True 或 False）
+        prefix: 键前缀
+    """
+    
+    name = "redis"
+    shared = True
+    
+    def __init__(
+        self,
+        redis,
+        prefix: str = "state",
+        claim_ttl: float = 60.0,
+        state_ttl: float = 7 * 24 * 3600,
+    ):
+        """
+        Args:
+            redis: redis.asyncio.Redis 实例
+            prefix: 键前缀
+            claim_ttl: open 占用活跃位后等待登记报警ID的最长时间（秒）
+            state_ttl: 设备报警状态的过期时间（秒），设备停止上报后自动清理；
+                活跃报警会在下次从数据库同步时补回
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self._claim_ttl_ms = int(claim_ttl * 1000)
+        self._state_ttl_ms = int(state_ttl * 1000)
+        
+        self._acquire_cooldowns = redis.register_script(_ACQUIRE_COOLDOWNS)
+        self._get_cooldowns = redis.register_script(_GET_COOLDOWNS)
+        self._apply_alarm_outcomes = redis.register_script(_APPLY_ALARM_OUTCOMES)
+        self._set_active_alarm = redis.register_script(_SET_ACTIVE_ALARM)
+        self._release_active_alarm = redis.register_script(_RELEASE_ACTIVE_ALARM)
+        self._remove_active_alarm = redis.register_script(_REMOVE_ACTIVE_ALARM)
+    
+    def _cooldown_key(self, namespace: str) -> str:
+        return f"{self.prefix}:cooldown:{namespace}"
+    
+    def _alarm_key(self, device_code: str) -> str:
+        return f"{self.prefix}:alarm:{device_code}"
+    
+    @property
+    def _devices_key(self) -> str:
+        return f"{self.prefix}:alarm:devices"
+    
+    # ---------------- 冷却 ----------------
+    
+    async def acquire_cooldowns(self, namespace: str, cooldowns: Dict[str, float]) -> Set[str]:
+        if not cooldowns:
+            return set()
+        
+        args = []
+        for key, seconds in cooldowns.items():
+            args.extend((key, int(seconds * 1000)))
+        acquired = await self._acquire_cooldowns(keys=[self._cooldown_key(namespace)], args=args)
+        return {_text(key) for key in acquired}
+    
+    async def get_cooldowns(self, namespace: str, keys: Iterable[str]) -> Dict[str, float]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        
+        flat = await self._get_cooldowns(keys=[self._cooldown_key(namespace)], args=keys)
+        return {_text(flat[i]): int(flat[i + 1]) / 1000.0 for i in range(0, len(flat), 2)}
+    
+    async def clear_cooldowns(self, namespace: str, keys: Optional[Iterable[str]] = None) -> None:
+        if keys is None:
+            await self.redis.delete(self._cooldown_key(namespace))
+            return
+        keys = list(keys)
+        if keys:
+            await self.redis.hdel(self._cooldown_key(namespace), *keys)
+    
+    # ---------------- 报警状态 ----------------
+    
+    async def apply_alarm_outcomes(self, device_code: str, outcomes: List[AlarmOutcome]) -> List[AlarmDecision]:
+        if not outcomes:
+            return []
+        
+        args: List[Any] = [self._claim_ttl_ms, self._state_ttl_ms, device_code]
+        for outcome in outcomes:
+            args.extend((
+                outcome.rule_code,
+                1 if outcome.triggered else 0,
+                outcome.consecutive_count,
+                int(outcome.silent_period * 1000),
+                outcome.recovery_count,
+            ))
+        
+        flat = await self._apply_alarm_outcomes(
+            keys=[self._alarm_key(device_code), self._devices_key], args=args
+        )
+        
+        decisions = []
+        for i in range(0, len(flat), 3):
+            alarm_id = _text(flat[i + 2])
+            decisions.append(AlarmDecision(
+                rule_code=_text(flat[i]),
+                action=_text(flat[i + 1]),
+                alarm_id=int(alarm_id) if alarm_id else None,
+            ))
+        return decisions
+    
+    async def set_active_alarm(self, device_code: str, rule_code: str, alarm_id: int) -> None:
+        updated = await self._set_active_alarm(
+            keys=[self._alarm_key(device_code), self._devices_key],
+            args=[f"a:{rule_code}", alarm_id, device_code],
+        )
+        if not updated:
+            logger.warning(f"活跃报警已被其他进程登记，忽略: device={device_code}, rule={rule_code}, id={alarm_id}")
+    
+    async def release_active_alarm(self, device_code: str, rule_code: str) -> None:
+        await self._release_active_alarm(keys=[self._alarm_key(device_code)], args=[f"a:{rule_code}"])
+    
+    async def get_active_alarms(self) -> Dict[str, Dict[str, int]]:
+        devices = [_text(d) for d in await self.redis.smembers(self._devices_key)]
+        if not devices:
+            return {}
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for device_code in devices:
+            pipe.hgetall(self._alarm_key(device_code))
+        states = await pipe.execute()
+        
+        active: Dict[str, Dict[str, int]] = {}
+        for device_code, fields in zip(devices, states):
+            for field, value in (fields or {}).items():
+                field, value = _text(field), _text(value)
+                if field.startswith("a:") and not value.startswith("p:"):
+                    active.setdefault(device_code, {})[field[2:]] = int(value)
+        return active
+    
+    async def add_active_alarms(self, entries: List[Tuple[str, str, int]]) -> None:
+        if not entries:
+            return
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for device_code, rule_code, alarm_id in entries:
+            pipe.hsetnx(self._alarm_key(device_code), f"a:{rule_code}", alarm_id)
+            if self._state_ttl_ms > 0:
+                pipe.pexpire(self._alarm_key(device_code), self._state_ttl_ms)
+        pipe.sadd(self._devices_key, *{entry[0] for entry in entries})
+        await pipe.execute()
+    
+    async def remove_active_alarms(self, entries: List[Tuple[str, str, int]]) -> None:
+        if not entries:
+            return
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for device_code, rule_code, alarm_id in entries:
+            await self._remove_active_alarm(
+                keys=[self._alarm_key(device_code)],
+                args=[f"a:{rule_code}", alarm_id, f"r:{rule_code}"],
+                client=pipe,
+            )
+        await pipe.execute()
+    
+    # ---------------- 协调 ----------------
+    
+    async def try_lock(self, name: str, ttl_seconds: float) -> bool:
+        return bool(await self.redis.set(
+            f"{self.prefix}:lock:{name}", "1", nx=True, px=max(1, int(ttl_seconds * 1000))
+        ))
+    
+    def describe(self) -> Dict[str, Any]:
+        info = super().describe()
+        info["prefix"] = self.prefix
+        return info
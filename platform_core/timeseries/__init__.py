@@ -7,6 +7,10 @@ Platform Core Timeseries Module - 时序数据服务
 - tdengine_client: TDengine客户端封装
 - schema_manager: Schema动态管理器
 - query_builder: 查询构建器
+- table_registry: 已知表注册表（写入路径DDL缓存）
+- last_value_cache: 实时最新值缓存（写入路径更新，实时查询读取）
+- columnar: 列式查询结果
+- history_export: 历史数据流式导出
 
 迁移说明:
 - 从 platform_v2.timeseries 迁移到 platform_core.timeseries
@@ -16,18 +20,32 @@ Platform Core Timeseries Module - 时序数据服务
 __version__ = "3.0.0"
 
 from .tdengine_client import TDengineClient, get_tdengine_client
+from .columnar import ColumnarResult
+from .history_export import HistoryExporter, ExportFormat
 from .schema_manager import SchemaManager, SchemaVersionManager, schema_manager, schema_version_manager
+from .table_registry import KnownTableRegistry, get_table_registry
+from .last_value_cache import LastValueCache, get_last_value_cache
 from .query_builder import QueryBuilder, AggregateFunction, TimeInterval, query
 
 __all__ = [
     # TDengine Client
     "TDengineClient",
     "get_tdengine_client",
+    "ColumnarResult",
+    # History Export
+    "HistoryExporter",
+    "ExportFormat",
     # Schema Manager
     "SchemaManager",
     "SchemaVersionManager",
     "schema_manager",
     "schema_version_manager",
+    # Known Table Registry
+    "KnownTableRegistry",
+    "get_table_registry",
+    # Last Value Cache
+    "LastValueCache",
+    "get_last_value_cache",
     # Query Builder
     "QueryBuilder",
     "AggregateFunction",
@@ -0,0 +1,210 @@
+"""
+TDengine列式查询结果
+
+将TDengine REST格式的查询响应（column_meta + 行数据）直接解码为按列存储的
+NumPy数组，避免为每一行构造Python字典。
+
+- 数值列: 对应的NumPy数值类型（空值位置填0/NaN，并记录在null_mask中）
+- 时间戳列: datetime64[ms]（保留墙上时间，去掉时区后缀，与现有代码的处理方式一致）
+- 布尔列: bool
+- 字符串/JSON等: object
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
+import re
+
+import numpy as np
+
+
+# TDengine类型 -> NumPy dtype（REST v3返回类型名，v2返回类型编号）
+_TYPE_NAME_BY_CODE = {
+    1: "BOOL",
+    2: "TINYINT",
+    3: "SMALLINT",
+    4: "INT",
+    5: "BIGINT",
+    6: "FLOAT",
+    7: "DOUBLE",
+    8: "BINARY",
+    9: "TIMESTAMP",
+    10: "NCHAR",
+    11: "TINYINT UNSIGNED",
+    12: "SMALLINT UNSIGNED",
+    13: "INT UNSIGNED",
+    14: "BIGINT UNSIGNED",
+    15: "JSON",
+}
+
+_NUMERIC_DTYPES = {
+    "TINYINT": np.int8,
+    "SMALLINT": np.int16,
+    "INT": np.int32,
+    "BIGINT": np.int64,
+    "TINYINT UNSIGNED": np.uint8,
+    "SMALLINT UNSIGNED": np.uint16,
+    "INT UNSIGNED": np.uint32,
+    "BIGINT UNSIGNED": np.uint64,
+    "FLOAT": np.float32,
+    "DOUBLE": np.float64,
+}
+
+_TZ_SUFFIX = re.compile(r"(Z|[+-]\d{2}:?\d{2})$")
+
+
+def _normalize_type(col_type: Any) -> str:
+    """统一列类型为大写类型名"""
+    if isinstance(col_type, int):
+        return _TYPE_NAME_BY_CODE.get(col_type, "BINARY")
+    return str(col_type).upper()
+
+
+@dataclass
+class ColumnarResult:
+    """
+    列式查询结果
+    
+    Attributes:
+        columns: 列名列表（保持查询顺序）
+        types: 列类型名列表（TDengine类型）
+        arrays: 列名 -> 值数组
+        null_masks: 列名 -> 空值掩码（True表示NULL）
+        num_rows: 行数
+    """
+    columns: List[str] = field(default_factory=list)
+    types: List[str] = field(default_factory=list)
+    arrays: Dict[str, np.ndarray] = field(default_factory=dict)
+    null_masks: Dict[str, np.ndarray] = field(default_factory=dict)
+    num_rows: int = 0
+    
+    def __len__(self) -> int:
+        return self.num_rows
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.arrays
+    
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+    
+    def column(self, name: str) -> np.ndarray:
+        """获取列数组"""
+        return self.arrays[name]
+    
+    def null_mask(self, name: str) -> np.ndarray:
+        """获取列空值掩码"""
+        return self.null_masks[name]
+    
+    def valid(self, name: str) -> np.ndarray:
+        """获取去除空值后的列数组"""
+        mask = self.null_masks[name]
+        values = self.arrays[name]
+        return values[~mask] if mask.any() else values
+    
+    def to_float(self, name: str) -> np.ndarray:
+        """获取float64列，空值为NaN"""
+        values = self.arrays[name].astype(np.float64)
+        mask = self.null_masks[name]
+        if mask.any():
+            values[mask] = np.nan
+        return values
+    
+    def first(self, name: str, default: Any = None) -> Any:
+        """获取首行某列的Python值（适用于聚合查询）"""
+        if self.num_rows == 0 or name not in self.arrays or self.null_masks[name][0]:
+            return default
+        value = self.arrays[name][0]
+        return value.item() if hasattr(value, "item") else value
+    
+    def to_pandas(self):
+        """转换为pandas DataFrame（整数列含空值时使用可空整数类型）"""
+        import pandas as pd
+        
+        data = {}
+        for name in self.columns:
+            values = self.arrays[name]
+            mask = self.null_masks[name]
+            if mask.any() and values.dtype.kind in "iu":
+                data[name] = pd.arrays.IntegerArray(values, mask)
+            elif mask.any() and values.dtype.kind == "b":
+                data[name] = pd.arrays.BooleanArray(values, mask)
+            else:
+                data[name] = values
+        return pd.DataFrame(data, columns=self.columns)
+    
+    @classmethod
+    def from_response(cls, response: Dict[str, Any]) -> "ColumnarResult":
+        """
+        从TDengine REST格式响应解码
+        
+        Args:
+            response: {"column_meta": [[name, type, length], ...], "data": [[...], ...]}
+        
+        Returns:
+            ColumnarResult: 列式结果
+        """
+        meta = response.get("column_meta") or []
+        rows = response.get("data") or []
+        
+        columns = [m[0] for m in meta]
+        types = [_normalize_type(m[1]) for m in meta]
+        num_rows = len(rows)
+        
+        result = cls(columns=columns, types=types, num_rows=num_rows)
+        
+        # 一次转置得到每列的值序列
+        col_values = list(zip(*rows)) if num_rows else [() for _ in columns]
+        
+        for name, col_type, values in zip(columns, types, col_values):
+            array, mask = _decode_column(values, col_type, num_rows)
+            result.arrays[name] = array
+            result.null_masks[name] = mask
+        
+        return result
+
+
+def _decode_column(values, col_type: str, num_rows: int):
+    """按列类型解码一列值"""
+    mask = np.fromiter((v is None for v in values), dtype=bool, count=num_rows)
+    has_null = bool(mask.any())
+    
+    if col_type == "TIMESTAMP":
+        return _decode_timestamps(values, mask, num_rows), mask
+    
+    dtype = _NUMERIC_DTYPES.get(col_type)
+    if dtype is not None:
+        fill = np.nan if np.dtype(dtype).kind == "f" else 0
+        if has_null:
+            values = (fill if v is None else v for v in values)
+        return np.fromiter(values, dtype=dtype, count=num_rows), mask
+    
+    if col_type == "BOOL":
+        if has_null:
+            values = (False if v is None else v for v in values)
+        return np.fromiter(values, dtype=bool, count=num_rows), mask
+    
+    array = np.empty(num_rows, dtype=object)
+    array[:] = values
+    return array, mask
+
+
+def _decode_timestamps(values, mask: np.ndarray, num_rows: int) -> np.ndarray:
+    """解码时间戳列为datetime64[ms]"""
+    if num_rows == 0:
+        return np.empty(0, dtype="datetime64[ms]")
+    
+    sample = next((v for v in values if v is not None), None)
+    
+    # 纪元毫秒
+    if isinstance(sample, (int, float)):
+        ints = np.fromiter((0 if v is None else v for v in values), dtype=np.int64, count=num_rows)
+        array = ints.astype("datetime64[ms]")
+    else:
+        strings = [
+            "NaT" if v is None else _TZ_SUFFIX.sub("", v if isinstance(v, str) else str(v))
+            for v in values
+        ]
+        array = np.array(strings, dtype="datetime64[ms]")
+    
+    if mask.any():
+        array[mask] = np.datetime64("NaT")
+    return array
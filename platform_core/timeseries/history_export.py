@@ -0,0 +1,246 @@
+"""
+历史数据流式导出
+
+按时间键集游标（keyset cursor）分块扫描时间范围，逐块编码后输出，
+服务端内存占用只与分块大小有关，与导出的总行数无关。
+
+- 游标: 倒序时以 `ts < last_ts`，正序时以 `ts > last_ts` 推进，不使用 OFFSET，也不需要 count(*)
+  （要求过滤后时间戳唯一，即按单个子表或单个设备导出）
+- 输出格式: NDJSON / CSV / Arrow IPC（流格式，需要 pyarrow）
+
+配合 FastAPI StreamingResponse 使用:
+
+    exporter = HistoryExporter(query, table, where_clause)
+    return StreamingResponse(exporter.stream("ndjson"), media_type=exporter.media_type("ndjson"))
+"""
+
+from enum import Enum
+from typing import Optional, Dict, Any, List, AsyncIterator, Awaitable, Callable
+import csv
+import io
+import json
+import logging
+
+import numpy as np
+
+from .columnar import ColumnarResult
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExportFormat(str, Enum):
+    """导出格式"""
+    NDJSON = "ndjson"
+    CSV = "csv"
+    ARROW = "arrow"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+}
+
+FILE_EXTENSIONS = {
+    ExportFormat.NDJSON: "ndjson",
+    ExportFormat.CSV: "csv",
+    ExportFormat.ARROW: "arrow",
+}
+
+# Arrow IPC流结束标记（continuation + 0长度）
+_ARROW_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+
+def _column_to_list(result: ColumnarResult, name: str) -> List[Any]:
+    """将列转换为可序列化的Python列表（空值为None，时间戳为ISO字符串）"""
+    values = result[name]
+    mask = result.null_mask(name)
+    
+    if values.dtype.kind == "M":
+        items = np.datetime_as_string(values, unit="ms").tolist()
+    elif values.dtype.kind == "f":
+        items = values.astype(np.float64).tolist()
+    else:
+        items = values.tolist()
+    
+    if mask.any():
+        for i in np.flatnonzero(mask).tolist():
+            items[i] = None
+    return items
+
+
+def _dumps(obj: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode("utf-8")
+
+
+class HistoryExporter:
+    """
+    历史数据流式导出器
+    
+    Attributes:
+        query: 异步查询函数，接收SQL返回 ColumnarResult
+        table: 查询的表（超级表或子表，调用方负责转义）
+        where_clause: 过滤条件（不含游标条件）
+        chunk_size: 每次查询的行数
+        descending: 是否按时间倒序导出
+        max_rows: 最大导出行数（<=0 表示不限制）
+    """
+    
+    def __init__(
+        self,
+        query: Callable[[str], Awaitable[ColumnarResult]],
+        table: str,
+        where_clause: str = "1=1",
+        chunk_size: int = 5000,
+        descending: bool = False,
+        max_rows: int = 0,
+        ts_column: str = "ts",
+    ):
+        self.query = query
+        self.table = table
+        self.where_clause = where_clause or "1=1"
+        self.chunk_size = max(1, chunk_size)
+        self.descending = descending
+        self.max_rows = max_rows
+        self.ts_column = ts_column
+        
+        self.rows_exported = 0
+        self.chunks_exported = 0
+    
+    def _build_sql(self, cursor: Optional[str]) -> str:
+        conditions = [f"({self.where_clause})"]
+        if cursor is not None:
+            op = "<" if self.descending else ">"
+            conditions.append(f"{self.ts_column} {op} '{cursor}'")
+        
+        limit = self.chunk_size
+        if self.max_rows > 0:
+            limit = min(limit, self.max_rows - self.rows_exported)
+        
+        order = "DESC" if self.descending else "ASC"
+        return (
+            f"SELECT * FROM {self.table} WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {self.ts_column} {order} LIMIT {limit}"
+        )
+    
+    async def iter_chunks(self) -> AsyncIterator[ColumnarResult]:
+        """
+        按键集游标逐块查询
+        
+        Yields:
+            ColumnarResult: 每块查询结果
+        """
+        cursor: Optional[str] = None
+        
+        while self.max_rows <= 0 or self.rows_exported < self.max_rows:
+            chunk = await self.query(self._build_sql(cursor))
+            if chunk.num_rows == 0:
+                break
+            
+            self.rows_exported += chunk.num_rows
+            self.chunks_exported += 1
+            yield chunk
+            
+            if chunk.num_rows < self.chunk_size or self.ts_column not in chunk:
+                break
+            
+            last_ts = chunk[self.ts_column][-1]
+            cursor = np.datetime_as_string(last_ts, unit="ms").replace("T", " ")
+        
+        logger.debug(f"历史数据导出完成: table={self.table}, rows={self.rows_exported}, chunks={self.chunks_exported}")
+    
+    async def stream(self, fmt: str = ExportFormat.NDJSON) -> AsyncIterator[bytes]:
+        """
+        按指定格式流式输出
+        
+        Args:
+            fmt: 导出格式 ndjson / csv / arrow
+        
+        Yields:
+            bytes: 编码后的数据块
+        """
+        fmt = self.check_format(fmt)
+        if fmt == ExportFormat.CSV:
+            encoder = self._encode_csv
+        elif fmt == ExportFormat.ARROW:
+            encoder = self._encode_arrow
+        else:
+            encoder = self._encode_ndjson
+        
+        first = True
+        async for chunk in self.iter_chunks():
+            yield encoder(chunk, first)
+            first = False
+        
+        if fmt == ExportFormat.ARROW and not first:
+            yield _ARROW_EOS
+    
+    @staticmethod
+    def check_format(fmt: str) -> ExportFormat:
+        """
+        校验导出格式（应在开始流式响应前调用）
+        
+        Raises:
+            ValueError: 格式不支持或依赖未安装
+        """
+        try:
+            fmt = ExportFormat(fmt)
+        except ValueError:
+            raise ValueError(f"不支持的导出格式: {fmt}，可选: {', '.join(f.value for f in ExportFormat)}")
+        if fmt == ExportFormat.ARROW and pa is None:
+            raise ValueError("Arrow导出需要安装pyarrow")
+        return fmt
+    
+    @staticmethod
+    def media_type(fmt: str) -> str:
+        return MEDIA_TYPES[ExportFormat(fmt)]
+    
+    @staticmethod
+    def file_extension(fmt: str) -> str:
+        return FILE_EXTENSIONS[ExportFormat(fmt)]
+    
+    @staticmethod
+    def _encode_ndjson(chunk: ColumnarResult, first: bool) -> bytes:
+        columns = chunk.columns
+        lists = [_column_to_list(chunk, name) for name in columns]
+        return b"".join(_dumps(dict(zip(columns, row))) + b"\n" for row in zip(*lists))
+    
+    @staticmethod
+    def _encode_csv(chunk: ColumnarResult, first: bool) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if first:
+            writer.writerow(chunk.columns)
+        lists = [_column_to_list(chunk, name) for name in chunk.columns]
+        writer.writerows(zip(*lists))
+        return buffer.getvalue().encode("utf-8")
+    
+    @staticmethod
+    def _encode_arrow(chunk: ColumnarResult, first: bool) -> bytes:
+        arrays = []
+        for name in chunk.columns:
+            values = chunk[name]
+            mask = chunk.null_mask(name)
+            if values.dtype.kind == "O":
+                values = np.array([v if v is None or isinstance(v, str) else str(v) for v in values], dtype=object)
+                arrays.append(pa.array(values, type=pa.string(), mask=mask))
+            else:
+                arrays.append(pa.array(values, mask=mask))
+        
+        batch = pa.RecordBatch.from_arrays(arrays, names=chunk.columns)
+        payload = batch.serialize().to_pybytes()
+        if first:
+            payload = batch.schema.serialize().to_pybytes() + payload
+        return payload
@@ -0,0 +1,429 @@
+"""
+实时最新值缓存（Last-Value Cache）
+
+按 (资产/设备编码, 信号) 保存最新值，实时查询、WebSocket订阅快照和报警变化率计算直接读取，
+无需对TDengine执行 LAST_ROW 查询。
+
+- 写入路径（DualWriteAdapter）写入成功后更新缓存，这类条目始终视为最新
+- 其他来源的数据（未经写入路径的设备）由实时查询回填（prime），在 prime_ttl 内有效，
+  过期后调用方重新查询TDengine并回填
+- 每个信号额外保留上一个值，供报警引擎按时间取"上一次的值"计算变化率
+- 可选镜像到Redis（{prefix}:{code} Hash），多worker部署时各进程读取同一份最新值；
+  镜像为后台批量写入，同一信号在一个周期内的多次更新只写最后一次
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+import asyncio
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+
+def _epoch(timestamp: Any) -> float:
+    """时间戳转为秒（datetime / 秒 / 毫秒 / ISO字符串），无法解析时为当前时间"""
+    if timestamp is None:
+        return time.time()
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, (int, float)):
+        return timestamp / 1000.0 if timestamp > 1e11 else float(timestamp)
+    try:
+        return datetime.fromisoformat(str(timestamp)).timestamp()
+    except ValueError:
+        return time.time()
+
+
+class _Entry:
+    """单个资产/设备的缓存条目"""
+    
+    __slots__ = ("signals", "ts", "primary", "refreshed_at")
+    
+    def __init__(self):
+        # 信号 -> [值, 时间, 上一个值, 上一个时间]
+        self.signals: Dict[str, List[Any]] = {}
+        self.ts = 0.0
+        # 是否由写入路径更新（写入路径更新的条目不会过期）
+        self.primary = False
+        self.refreshed_at = 0.0
+
+
+class LastValueCache:
+    """
+    最新值缓存（LRU）
+    
+    时间戳以秒为单位比较，早于已缓存值的数据不会覆盖最新值。
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = 100000,
+        prime_ttl: float = 10.0,
+        mirror_interval: float = 0.2,
+        mirror_ttl: float = 24 * 3600
+    ):
+        """
+        初始化缓存
+        
+        Args:
+            max_entries: 最大资产/设备数量
+            prime_ttl: 查询回填条目的有效期（秒）
+            mirror_interval: Redis镜像的批量写入间隔（秒）
+            mirror_ttl: Redis镜像键的过期时间（秒），资产停止上报后自动清理
+        """
+        self._max_entries = max_entries
+        self._prime_ttl = prime_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self._redis = None
+        self._prefix = "lvc"
+        self._mirror_interval = mirror_interval
+        self._mirror_ttl_ms = int(mirror_ttl * 1000)
+        # 待镜像的更新: code -> {信号: [值, 时间]}
+        self._dirty: Dict[str, Dict[str, List[Any]]] = {}
+        self._mirror_task: Optional[asyncio.Task] = None
+        
+        self._stats = {
+            "updates": 0,
+            "primes": 0,
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0,
+            "mirror_writes": 0,
+            "mirror_reads": 0,
+            "mirror_errors": 0,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    # ---------------- 写入 ----------------
+    
+    def _apply(self, code: str, signals: Dict[str, Any], ts: float) -> Tuple[_Entry, Dict[str, List[Any]]]:
+        """写入信号值（需在锁内调用），返回条目和实际更新的信号"""
+        entry = self._entries.get(code)
+        if entry is None:
+            entry = _Entry()
+            self._entries[code] = entry
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        else:
+            self._entries.move_to_end(code)
+        
+        changed: Dict[str, List[Any]] = {}
+        stored = entry.signals
+        for signal, value in signals.items():
+            if value is None:
+                continue
+            sample = stored.get(signal)
+            if sample is None:
+                stored[signal] = [value, ts, None, None]
+            elif ts > sample[1]:
+                sample[2], sample[3] = sample[0], sample[1]
+                sample[0], sample[1] = value, ts
+            elif ts == sample[1]:
+                sample[0] = value
+            elif sample[3] is None or ts > sample[3]:
+                # 乱序到达：只可能成为"上一个值"
+                sample[2], sample[3] = value, ts
+                continue
+            else:
+                continue
+            changed[signal] = [value, ts]
+        
+        if ts > entry.ts and changed:
+            entry.ts = ts
+        return entry, changed
+    
+    def update(
+        self,
+        code: str,
+        signals: Dict[str, Any],
+        timestamp: Any = None,
+        primary: bool = True
+    ) -> None:
+        """
+        更新最新值
+        
+        Args:
+            code: 资产/设备编码
+            signals: 信号值 {信号: 值}
+            timestamp: 数据时间（datetime / 秒 / 毫秒 / ISO字符串），默认当前时间
+            primary: 是否来自写入路径；其他来源（如报警引擎的单个信号）传False，
+                不会使条目被视为完整的最新数据
+        """
+        ts = _epoch(timestamp)
+        with self._lock:
+            entry, changed = self._apply(code, signals, ts)
+            self._stats["updates"] += 1
+            if primary:
+                entry.primary = True
+                entry.refreshed_at = time.monotonic()
+                if changed and self._redis is not None:
+                    self._dirty.setdefault(code, {}).update(changed)
+    
+    def update_many(self, points: Iterable[Tuple[str, Dict[str, Any], Any]]) -> None:
+        """
+        批量更新最新值（写入路径）
+        
+        Args:
+            points: [(code, signals, timestamp), ...]
+        """
+        for code, signals, timestamp in points:
+            self.update(code, signals, timestamp)
+    
+    def prime(self, code: str, signals: Dict[str, Any], timestamp: Any) -> None:
+        """
+        用查询结果回填（未经写入路径的数据），在 prime_ttl 内有效
+        
+        Args:
+            code: 资产/设备编码
+            signals: 信号值
+            timestamp: 数据时间
+        """
+        ts = _epoch(timestamp)
+        with self._lock:
+            entry, _ = self._apply(code, signals, ts)
+            if not entry.primary:
+                entry.refreshed_at = time.monotonic()
+            self._stats["primes"] += 1
+    
+    def invalidate(self, code: Optional[str] = None) -> None:
+        """移除缓存条目（code为None时清空）"""
+        with self._lock:
+            if code is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(code, None)
+    
+    # ---------------- 读取 ----------------
+    
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        获取最新值快照（仅本进程缓存）
+        
+        Args:
+            code: 资产/设备编码
+        
+        Returns:
+            Optional[Dict]: {"ts": datetime, "values": {信号: 值}}，未缓存或回填已过期时为None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None or not entry.signals:
+                self._stats["misses"] += 1
+                return None
+            if not entry.primary and now - entry.refreshed_at > self._prime_ttl:
+                self._stats["stale"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(code)
+            self._stats["hits"] += 1
+            return {
+                "ts": datetime.fromtimestamp(entry.ts),
+                "values": {signal: sample[0] for signal, sample in entry.signals.items()},
+            }
+    
+    async def get_many(self, codes: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取最新值快照
+        
+        启用Redis镜像时先合并其他进程写入的最新值（一次往返）。
+        
+        Args:
+            codes: 资产/设备编码列表
+        
+        Returns:
+            Dict[str, Dict]: code -> 快照，未命中的编码不包含在结果中
+        """
+        codes = list(dict.fromkeys(codes))
+        if self._redis is not None and codes:
+            await self._merge_from_mirror(codes)
+        
+        snapshots = {}
+        for code in codes:
+            snapshot = self.get(code)
+            if snapshot is not None:
+                snapshots[code] = snapshot
+        return snapshots
+    
+    def sample(self, code: str, signal: str) -> Optional[Tuple[Any, float]]:
+        """获取单个信号的最新值 (值, 时间秒)"""
+        with self._lock:
+            entry = self._entries.get(code)
+            sample = entry.signals.get(signal) if entry is not None else None
+            return (sample[0], sample[1]) if sample is not None else None
+    
+    def previous(self, code: str, signal: str, before: Any) -> Optional[Tuple[Any, float]]:
+        """
+        获取早于指定时间的最近一个值（用于变化率计算）
+        
+        当前数据可能已由写入路径先行写入缓存，因此按时间取最新值或上一个值。
+        
+        Args:
+            code: 资产/设备编码
+            signal: 信号
+            before: 当前数据时间
+        
+        Returns:
+            Optional[Tuple[Any, float]]: (值, 时间秒)，没有更早的值时为None
+        """
+        ts = _epoch(before)
+        with self._lock:
+            entry = self._entries.get(code)
+            sample = entry.signals.get(signal) if entry is not None else None
+            if sample is None:
+                return None
+            if sample[1] < ts:
+                return sample[0], sample[1]
+            if sample[3] is not None and sample[3] < ts:
+                return sample[2], sample[3]
+            return None
+    
+    # ---------------- Redis镜像 ----------------
+    
+    def _mirror_key(self, code: str) -> str:
+        return f"{self._prefix}:{code}"
+    
+    def attach_redis(self, redis, prefix: str = "lvc") -> None:
+        """
+        启用Redis镜像
+        
+        Args:
+            redis: redis.asyncio.Redis 实例
+            prefix: 键前缀
+        """
+        self._redis = redis
+        self._prefix = prefix
+    
+    async def flush_mirror(self) -> int:
+        """
+        将待镜像的更新写入Redis
+        
+        Returns:
+            int: 写入的资产/设备数量
+        """
+        if self._redis is None or not self._dirty:
+            return 0
+        
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for code, signals in dirty.items():
+                key = self._mirror_key(code)
+                pipe.hset(key, mapping={signal: json.dumps(sample, default=str) for signal, sample in signals.items()})
+                pipe.pexpire(key, self._mirror_ttl_ms)
+            await pipe.execute()
+            self._stats["mirror_writes"] += len(dirty)
+            return len(dirty)
+        except Exception as e:
+            self._stats["mirror_errors"] += 1
+            # 保留未写入的更新，下次合并写入（不覆盖期间的新值）
+            with self._lock:
+                for code, signals in dirty.items():
+                    pending = self._dirty.setdefault(code, {})
+                    for signal, sample in signals.items():
+                        pending.setdefault(signal, sample)
+            logger.warning(f"最新值缓存镜像写入失败: {e}")
+            return 0
+    
+    async def _merge_from_mirror(self, codes: List[str]) -> None:
+        """读取Redis镜像并合并到本进程缓存"""
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for code in codes:
+                pipe.hgetall(self._mirror_key(code))
+            results = await pipe.execute()
+            self._stats["mirror_reads"] += 1
+        except Exception as e:
+            self._stats["mirror_errors"] += 1
+            logger.warning(f"最新值缓存镜像读取失败，使用本进程缓存: {e}")
+            return
+        
+        now = time.monotonic()
+        with self._lock:
+            for code, fields in zip(codes, results):
+                if not fields:
+                    continue
+                by_ts: Dict[float, Dict[str, Any]] = {}
+                for signal, raw in fields.items():
+                    try:
+                        value, ts = json.loads(_text(raw))
+                    except (ValueError, TypeError):
+                        continue
+                    by_ts.setdefault(float(ts), {})[_text(signal)] = value
+                entry = None
+                for ts in sorted(by_ts):
+                    entry, _ = self._apply(code, by_ts[ts], ts)
+                if entry is not None:
+                    # 镜像中只有写入路径的数据
+                    entry.primary = True
+                    entry.refreshed_at = now
+    
+    async def _mirror_loop(self):
+        while True:
+            await asyncio.sleep(self._mirror_interval)
+            await self.flush_mirror()
+    
+    def start_mirror(self) -> None:
+        """启动后台镜像写入任务"""
+        if self._redis is None or (self._mirror_task is not None and not self._mirror_task.done()):
+            return
+        self._mirror_task = asyncio.create_task(self._mirror_loop())
+    
+    async def stop_mirror(self) -> None:
+        """停止后台镜像写入任务并写出剩余更新"""
+        if self._mirror_task is not None:
+            self._mirror_task.cancel()
+            try:
+                await self._mirror_task
+            except asyncio.CancelledError:
+                pass
+            self._mirror_task = None
+        await self.flush_mirror()
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["primary"] = sum(1 for entry in self._entries.values() if entry.primary)
+            stats["pending_mirror"] = len(self._dirty)
+        
+        stats["max_entries"] = self._max_entries
+        stats["prime_ttl"] = self._prime_ttl
+        stats["mirror"] = self._redis is not None
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups > 0 else 0
+        return stats
+
+
+# 全局缓存
+_last_value_cache: Optional[LastValueCache] = None
+
+
+def get_last_value_cache() -> LastValueCache:
+    """
+    获取进程级最新值缓存
+    
+    Returns:
+        LastValueCache: 缓存实例
+    """
+    global _last_value_cache
+    if _last_value_cache is None:
+        _last_value_cache = LastValueCache()
+    return _last_value_cache
@@ -12,6 +12,8 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
 
+from .table_registry import get_table_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -86,6 +88,9 @@ class SchemaManager:
             else:
                 await self._update_stable(stable_name, signals, category.tdengine_database)
             
+            # 表结构已变更，失效写入路径的已知表缓存
+            get_table_registry().invalidate_category(category_code)
+            
             # 4. 记录Schema变更
             await self._record_schema_change(
                 category=category,
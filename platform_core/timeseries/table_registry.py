@@ -0,0 +1,219 @@
+"""
+TDengine已知表注册表
+
+进程内共享的“已存在表”缓存，供写入路径跳过建表/查表DDL。
+
+- 有界LRU + TTL，过期后写入方会重新执行一次 CREATE ... IF NOT EXISTS
+- 启动时可通过 TDengineClient.get_tables / get_super_tables 预热
+- 建表成功后由写入方登记，Schema同步时按类别失效
+"""
+
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable, List
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class KnownTableRegistry:
+    """
+    已知表注册表（LRU + TTL）
+    
+    表名不区分大小写，键为 `{database}.{table}`；写入方不关心数据库时 database 传空字符串。
+    """
+    
+    def __init__(self, max_size: int = 100000, ttl_seconds: float = 3600.0):
+        """
+        初始化注册表
+        
+        Args:
+            max_size: 最大缓存表数量
+            ttl_seconds: 缓存有效期（秒），<=0 表示不过期
+        """
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._tables: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+        }
+    
+    @staticmethod
+    def _make_key(table_name: str, database: Optional[str] = None) -> str:
+        return f"{(database or '').lower()}.{table_name.lower()}"
+    
+    def contains(self, table_name: str, database: Optional[str] = None) -> bool:
+        """
+        检查表是否已知存在
+        
+        Args:
+            table_name: 表名
+            database: 数据库名（可选）
+        
+        Returns:
+            bool: 是否命中有效缓存
+        """
+        key = self._make_key(table_name, database)
+        now = time.monotonic()
+        
+        with self._lock:
+            added_at = self._tables.get(key)
+            if added_at is None:
+                self._stats["misses"] += 1
+                return False
+            
+            if self._ttl > 0 and now - added_at > self._ttl:
+                del self._tables[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return False
+            
+            self._tables.move_to_end(key)
+            self._stats["hits"] += 1
+            return True
+    
+    def add(self, table_name: str, database: Optional[str] = None):
+        """
+        登记已存在的表
+        
+        Args:
+            table_name: 表名
+            database: 数据库名（可选）
+        """
+        self.add_many([table_name], database)
+    
+    def add_many(self, table_names: Iterable[str], database: Optional[str] = None):
+        """
+        批量登记已存在的表
+        
+        Args:
+            table_names: 表名列表
+            database: 数据库名（可选）
+        """
+        now = time.monotonic()
+        
+        with self._lock:
+            for table_name in table_names:
+                key = self._make_key(table_name, database)
+                self._tables[key] = now
+                self._tables.move_to_end(key)
+            
+            while len(self._tables) > self._max_size:
+                self._tables.popitem(last=False)
+                self._stats["evictions"] += 1
+    
+    def discard(self, table_name: str, database: Optional[str] = None):
+        """移除单个表"""
+        with self._lock:
+            if self._tables.pop(self._make_key(table_name, database), None) is not None:
+                self._stats["invalidations"] += 1
+    
+    def invalidate_prefix(self, prefix: str, database: Optional[str] = None) -> int:
+        """
+        按表名前缀失效（不限定数据库时匹配所有数据库）
+        
+        Args:
+            prefix: 表名前缀，如 raw_{category_code}
+            database: 数据库名（可选）
+        
+        Returns:
+            int: 失效的表数量
+        """
+        prefix = prefix.lower()
+        db = database.lower() if database else None
+        
+        with self._lock:
+            keys = [
+                key for key in self._tables
+                if key.split(".", 1)[1].startswith(prefix)
+                and (db is None or key.split(".", 1)[0] == db)
+            ]
+            for key in keys:
+                del self._tables[key]
+            self._stats["invalidations"] += len(keys)
+        
+        if keys:
+            logger.debug(f"已知表缓存失效: prefix={prefix}, count={len(keys)}")
+        return len(keys)
+    
+    def invalidate_category(self, category_code: str) -> int:
+        """
+        失效资产类别的原始数据表（超级表 raw_{category} 及其子表）
+        
+        Args:
+            category_code: 资产类别编码
+        
+        Returns:
+            int: 失效的表数量
+        """
+        return self.invalidate_prefix(f"raw_{category_code}")
+    
+    def clear(self):
+        """清空注册表"""
+        with self._lock:
+            self._tables.clear()
+    
+    async def seed(self, client, databases: List[str]) -> int:
+        """
+        从TDengine预热已存在的超级表和子表
+        
+        Args:
+            client: TDengineClient 实例
+            databases: 数据库名列表
+        
+        Returns:
+            int: 登记的表数量
+        """
+        total = 0
+        for database in databases:
+            try:
+                stables = await client.get_super_tables(database)
+                tables = await client.get_tables(database)
+            except Exception as e:
+                logger.warning(f"预热已知表缓存失败: {database} - {e}")
+                continue
+            
+            names = [name for name in (*stables, *tables) if isinstance(name, str)]
+            self.add_many(names, database)
+            # 不带数据库前缀写入的调用方同样可以命中
+            self.add_many(names)
+            total += len(names)
+        
+        logger.info(f"已知表缓存预热完成: {total} 张表")
+        return total
+    
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._tables)
+        
+        stats["max_size"] = self._max_size
+        stats["ttl_seconds"] = self._ttl
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups > 0 else 0
+        return stats
+
+
+# 全局注册表
+_table_registry: Optional[KnownTableRegistry] = None
+
+
+def get_table_registry() -> KnownTableRegistry:
+    """
+    获取进程级已知表注册表
+    
+    Returns:
+        KnownTableRegistry: 注册表实例
+    """
+    global _table_registry
+    if _table_registry is None:
+        _table_registry = KnownTableRegistry()
+    return _table_registry
@@ -12,6 +12,8 @@ from typing import Optional, Dict, Any, List
 from datetime import datetime
 import logging
 
+from .columnar import ColumnarResult
+
 logger = logging.getLogger(__name__)
 
 
@@ -68,6 +70,23 @@ class TDengineClient:
         result = await connector.query_data(sql, database)
         return result.get("data", [])
     
+    async def query_columnar(self, sql: str, database: Optional[str] = None) -> ColumnarResult:
+        """
+        执行查询并返回列式结果
+        
+        结果直接按列解码为NumPy数组，适用于大结果集的分析、特征计算等场景。
+        
+        Args:
+            sql: SQL查询语句
+            database: 数据库名
+            
+        Returns:
+            ColumnarResult: 列式查询结果
+        """
+        connector = await self.get_connector()
+        result = await connector.query_data(sql, database)
+        return ColumnarResult.from_response(result)
+    
     async def health_check(self) -> Dict[str, Any]:
         """
         执行健康检查
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批量推理基准测试
+
+训练一个孤立森林模型（sklearn），对指定数量的资产各生成一条输入，比较:
+- per-request: 原处理方式，每个资产调用一次 predictor.predict（单行矩阵，decision_function + predict 两次遍历）
+- batch: InferenceService.batch_predict（特征堆叠为一个矩阵，一次 decision_function）
+- micro-batch: 所有资产并发调用 InferenceService.predict_batched（微批处理器合并为批量调用），
+  与并发调用 predict 对比
+- persist: PredictionStore 批量写入时生成的TDengine语句数量和大小，与逐条写入对比
+  （只生成SQL，不连接数据库）
+
+用法:
+    python scripts/benchmarks/inference_batch_benchmark.py --assets 10000 --features 16 --repeat 3
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import joblib
+import numpy as np
+from loguru import logger
+from sklearn.ensemble import IsolationForest
+
+from ai_engine.inference.prediction_store import PredictionStore
+from app.services.ai.inference_service import InferenceService, IsolationForestPredictor
+from app.services.ai.micro_batcher import MicroBatcherConfig
+
+
+def build_inputs(args):
+    """生成预测请求: [{"asset_id", "input_data"}, ...]"""
+    rng = random.Random(args.seed)
+    names = [f"s{i}" for i in range(args.features)]
+    return [
+        {
+            "asset_id": asset_id,
+            "input_data": {name: rng.gauss(0, 1 if rng.random() > 0.02 else 6) for name in names}
+        }
+        for asset_id in range(1, args.assets + 1)
+    ]
+
+
+async def load_predictor(args, model_path: str) -> IsolationForestPredictor:
+    """训练并加载孤立森林模型"""
+    train = np.random.default_rng(args.seed).normal(size=(args.train_rows, args.features))
+    joblib.dump(IsolationForest(n_estimators=args.estimators, random_state=args.seed).fit(train), model_path)
+    predictor = IsolationForestPredictor(model_id=1, version_id=1)
+    await predictor.load_model(model_path)
+    return predictor
+
+
+async def measure(func, count: int, repeat: int) -> float:
+    """返回最好一轮的吞吐（条/秒）"""
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func()
+        elapsed = time.perf_counter() - started
+        best = max(best, count / elapsed if elapsed > 0 else 0.0)
+    return best
+
+
+async def measure_persist(args, requests, predictions):
+    """统计批量写入与逐条写入生成的TDengine语句"""
+    store = PredictionStore()
+    store.enable_postgresql(False)
+    statements = []
+    
+    async def capture(sql: str):
+        statements.append(sql)
+        return {"code": 0}
+    
+    store._execute_tdengine = capture
+    items = [
+        {
+            "asset_id": request["asset_id"],
+            "asset_code": f"A{request['asset_id']}",
+            "category_code": "bench",
+            "prediction_result": {**result, "prediction_details": result},
+        }
+        for request, result in zip(requests, predictions)
+    ]
+    
+    started = time.perf_counter()
+    await store.save_predictions(1, "v1", items)
+    batch_elapsed = time.perf_counter() - started
+    # 首次写入包含建表语句，第二次只有INSERT
+    statements.clear()
+    started = time.perf_counter()
+    await store.save_predictions(1, "v1", items)
+    insert_elapsed = time.perf_counter() - started
+    batch_statements = len(statements)
+    batch_bytes = sum(len(sql) for sql in statements)
+    
+    statements.clear()
+    started = time.perf_counter()
+    for item in items:
+        await store.save_prediction(1, "v1", item["asset_id"], item["asset_code"],
+                                    item["category_code"], item["prediction_result"])
+    single_elapsed = time.perf_counter() - started
+    
+    print(f"persist    batch  {batch_statements:>6} 条INSERT  {batch_bytes / 1024:>9.0f} KB  "
+          f"生成 {insert_elapsed * 1000:>8.1f} ms (首次含建表 {batch_elapsed * 1000:.1f} ms)")
+    print(f"persist    single {len(statements):>6} 条INSERT  {sum(len(sql) for sql in statements) / 1024:>9.0f} KB  "
+          f"生成 {single_elapsed * 1000:>8.1f} ms")
+
+
+async def run(args):
+    requests = build_inputs(args)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        predictor = await load_predictor(args, os.path.join(tmpdir, "isolation_forest.joblib"))
+    
+    service = InferenceService(batcher_config=MicroBatcherConfig(
+        max_batch_size=args.batch_size, max_wait_ms=args.max_wait_ms
+    ))
+    service._cache.put(1, predictor)
+    
+    async def per_request():
+        for request in requests:
+            features = np.array([predictor._extract_features(request["input_data"])])
+            predictor.model.decision_function(features)
+            predictor.model.predict(features)
+    
+    async def batch():
+        await service.batch_predict(1, requests, persist=False)
+    
+    async def concurrent_single():
+        await asyncio.gather(*[
+            service.predict(1, r["asset_id"], r["input_data"], persist=False) for r in requests
+        ])
+    
+    async def micro_batch():
+        await asyncio.gather(*[
+            service.predict_batched(1, r["asset_id"], r["input_data"], persist=False) for r in requests
+        ])
+    
+    print(f"资产: {args.assets}, 每个 {args.features} 个特征, 孤立森林 {args.estimators} 棵树")
+    per_request_rate = await measure(per_request, len(requests), args.repeat)
+    print(f"per-request {per_request_rate:>10.0f} 条/s")
+    batch_rate = await measure(batch, len(requests), args.repeat)
+    print(f"batch       {batch_rate:>10.0f} 条/s  ({batch_rate / per_request_rate:.1f}x)")
+    concurrent_rate = await measure(concurrent_single, len(requests), args.repeat)
+    print(f"concurrent  {concurrent_rate:>10.0f} 条/s  (predict)")
+    micro_rate = await measure(micro_batch, len(requests), args.repeat)
+    stats = service.get_batcher_stats()
+    print(f"micro-batch {micro_rate:>10.0f} 条/s  ({micro_rate / concurrent_rate:.1f}x, "
+          f"平均批大小 {stats['batch_size']['avg']}, 延迟p99 <= {stats['latency_ms']['p99']} ms)")
+    
+    results = await service.batch_predict(1, requests, persist=False)
+    anomalies = sum(1 for result in results if result["prediction"]["is_anomaly"])
+    labels = predictor.model.predict(np.array([predictor._extract_features(r["input_data"]) for r in requests]))
+    print(f"异常 {anomalies} 条, 与 model.predict 标签一致: {anomalies == int((labels == -1).sum())}")
+    
+    await measure_persist(args, requests, [result["prediction"] for result in results])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量推理基准测试")
+    parser.add_argument("--assets", type=int, default=10000)
+    parser.add_argument("--features", type=int, default=16)
+    parser.add_argument("--estimators", type=int, default=100, help="孤立森林的树数量")
+    parser.add_argument("--train-rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=64, help="微批处理的单批最大请求数")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="微批处理的最长等待时间")
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量的轮数（取最好一轮）")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    logger.remove()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
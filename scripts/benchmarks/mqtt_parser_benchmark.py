@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MQTT负载解析基准测试
+
+生成相同内容的 JSON / MessagePack / 二进制寄存器帧消息，测量每种解析器的吞吐（消息/秒）:
+- parse: 只解析负载（PayloadParser.parse）
+- adapter: 完整的适配器消息处理（MQTTAdapter._process_message，含构造DataPoint和统计）
+- baseline: 原处理方式 json.loads(payload.decode("utf-8")) + _parse_mqtt_message
+- batch: 消息入接收队列后按 receive_batch 批量取出，比较不同的解析工作池配置
+
+未安装 orjson 时 json 解析器使用标准库；未安装 msgpack 时跳过 msgpack。
+
+用法:
+    python scripts/benchmarks/mqtt_parser_benchmark.py --messages 200000 --signals 16 --repeat 3 \\
+        --workers 0,thread:4,process:4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from platform_core.ingestion.adapters.mqtt_adapter import MQTTAdapter
+from platform_core.ingestion.adapters.payload_parsers import create_parser, msgpack
+
+
+def build_messages(args):
+    """生成测试消息: 格式 -> [(topic, payload), ...]"""
+    rng = random.Random(args.seed)
+    names = [f"s{i}" for i in range(args.signals)]
+    layout = {
+        "format": "registers",
+        "byte_order": "big",
+        "timestamp": "u64",
+        "asset_level": 1,
+        "registers": [{"name": name, "type": "i16", "scale": 0.1} for name in names],
+    }
+    frame = struct.Struct(">Q" + "h" * args.signals)
+    
+    messages = {"json": [], "msgpack": [], "registers": []}
+    now_ms = int(time.time() * 1000)
+    for i in range(args.messages):
+        asset = f"A{rng.randint(1, args.assets)}"
+        raw = [rng.randint(-2000, 2000) for _ in names]
+        record = {"timestamp": now_ms + i, "signals": {name: value / 10 for name, value in zip(names, raw)}}
+        messages["json"].append((f"devices/{asset}/data", json.dumps(record).encode("utf-8")))
+        if msgpack is not None:
+            messages["msgpack"].append((f"edge/{asset}/data", msgpack.packb(record)))
+        messages["registers"].append((f"plc/{asset}/registers", frame.pack(now_ms + i, *raw)))
+    if msgpack is None:
+        del messages["msgpack"]
+    
+    parsers = [{"topic": "plc/+/registers", **layout}]
+    if msgpack is not None:
+        parsers.append({"topic": "edge/+/data", "format": "msgpack"})
+    return messages, layout, parsers
+
+
+def measure(func, items, repeat: int) -> float:
+    """返回最好一轮的吞吐（条/秒）"""
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(items)
+        elapsed = time.perf_counter() - started
+        best = max(best, len(items) / elapsed if elapsed > 0 else 0.0)
+    return best
+
+
+async def measure_batch(items, parser_specs, workers: int, executor: str, batch_size: int) -> float:
+    """receive_batch 吞吐（条/秒）"""
+    adapter = MQTTAdapter({
+        "host": "localhost",
+        "parsers": parser_specs,
+        "max_queue_size": len(items),
+        "batch_size": batch_size,
+        "parse_workers": workers,
+        "parse_executor": executor,
+    })
+    # 预热工作池
+    adapter._enqueue_nowait(*items[0])
+    await adapter.receive_batch(max_wait=0)
+    
+    for topic, payload in items:
+        adapter._enqueue_nowait(topic, payload)
+    started = time.perf_counter()
+    received = 0
+    while received < len(items):
+        received += len(await adapter.receive_batch(max_wait=0))
+    elapsed = time.perf_counter() - started
+    if adapter._parse_executor is not None:
+        adapter._parse_executor.shutdown()
+    return len(items) / elapsed
+
+
+def run(args):
+    messages, layout, parser_specs = build_messages(args)
+    adapter = MQTTAdapter({"host": "localhost", "parsers": parser_specs})
+    
+    def baseline(items):
+        for topic, payload in items:
+            adapter._parse_mqtt_message(topic, json.loads(payload.decode("utf-8")))
+    
+    def adapter_path(items):
+        for topic, payload in items:
+            adapter._process_message(topic, payload)
+    
+    sizes = {name: sum(len(p) for _, p in items) / len(items) for name, items in messages.items()}
+    print(f"消息: {args.messages} 条, 每条 {args.signals} 个信号, {args.assets} 个资产")
+    
+    base_rate = measure(baseline, messages["json"], args.repeat)
+    print(f"{'baseline':<10} {'json':<10} {sizes['json']:>7.0f} B  adapter {base_rate:>10.0f} 条/s")
+    
+    for name, items in messages.items():
+        parser = create_parser(layout if name == "registers" else name)
+        backend = parser.describe().get("backend", name)
+        
+        def parse_only(batch, parser=parser):
+            for topic, payload in batch:
+                parser.parse(payload, topic)
+        
+        parse_rate = measure(parse_only, items, args.repeat)
+        adapter_rate = measure(adapter_path, items, args.repeat)
+        print(f"{name:<10} {backend:<10} {sizes[name]:>7.0f} B  parse {parse_rate:>10.0f} 条/s  "
+              f"adapter {adapter_rate:>10.0f} 条/s  ({adapter_rate / base_rate:.2f}x baseline)")
+    
+    mixed = [message for batch in zip(*messages.values()) for message in batch]
+    for spec in args.workers.split(","):
+        executor, _, workers = spec.rpartition(":")
+        executor = executor or "thread"
+        rate = asyncio.run(measure_batch(mixed, parser_specs, int(workers), executor, args.batch_size))
+        label = f"{executor}:{workers}" if int(workers) else "inline"
+        print(f"batch      {label:<10} {len(mixed)} 条混合消息, batch_size {args.batch_size}  {rate:>10.0f} 条/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MQTT负载解析基准测试")
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--signals", type=int, default=16, help="每条消息的信号数")
+    parser.add_argument("--assets", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3, help="每项测量的轮数（取最好一轮）")
+    parser.add_argument("--workers", default="0,thread:4", help="批量接收的工作池配置，逗号分隔（0 / thread:N / process:N）")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
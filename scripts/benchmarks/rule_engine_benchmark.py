@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+决策规则引擎基准测试
+
+生成指定数量的随机规则（分布在多个模型/类别上），对比:
+- interpreted: 逐条过滤、排序并解释执行条件树（编译前的评估方式）
+- compiled: RuleRuntime.evaluate_sync（编译闭包 + (model_id, category_id) 索引）
+- batch: RuleRuntime.evaluate_batch_sync（按列向量化求值）
+
+用法:
+    python scripts/benchmarks/rule_engine_benchmark.py --rules 10000 --models 100 --categories 20 --predictions 2000
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from ai_engine.decision import RuleRuntime
+from ai_engine.decision.rule_parser import ConditionGroup, ConditionOperator, LogicalOperator
+
+OPERATORS = ["gt", "gte", "lt", "lte", "eq", "ne", "between", "in"]
+FIELDS = ["predicted_value", "confidence", "anomaly_score", "health_score"]
+
+
+def random_condition(rng: random.Random) -> dict:
+    """生成阈值型条件（阈值多落在分布尾部，与告警规则的触发率接近）"""
+    operator = rng.choice(OPERATORS)
+    if operator == "between":
+        low = rng.uniform(0, 90)
+        value = [low, low + rng.uniform(2, 10)]
+    elif operator == "in":
+        value = [rng.randint(0, 100) for _ in range(3)]
+    elif operator in ("gt", "gte"):
+        value = round(rng.uniform(60, 100), 2)
+    elif operator in ("lt", "lte"):
+        value = round(rng.uniform(0, 40), 2)
+    else:
+        value = round(rng.uniform(0, 100), 2)
+    return {"field": rng.choice(FIELDS), "operator": operator, "value": value}
+
+
+def random_rule(index: int, rng: random.Random, models: int, categories: int) -> dict:
+    conditions = [random_condition(rng) for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.3:
+        conditions.append({"type": "OR", "rules": [random_condition(rng) for _ in range(2)]})
+    return {
+        "rule_id": f"bench_{index}",
+        "name": f"benchmark rule {index}",
+        "enabled": True,
+        "priority": rng.randint(0, 10),
+        "conditions": {"type": "AND" if rng.random() < 0.8 else "OR", "rules": conditions},
+        "actions": [{"type": "alert", "level": "warning"}],
+        "cooldown_seconds": 0,
+        "model_id": rng.randint(1, models) if rng.random() < 0.95 else None,
+        "category_id": rng.randint(1, categories) if rng.random() < 0.8 else None,
+    }
+
+
+def random_prediction(rng: random.Random, models: int, categories: int) -> dict:
+    return {
+        "model_id": rng.randint(1, models),
+        "category_id": rng.randint(1, categories),
+        "asset_id": rng.randint(1, 100000),
+        "predicted_value": rng.uniform(0, 100),
+        "confidence": rng.random(),
+        "anomaly_score": rng.uniform(0, 100),
+        "health_score": rng.uniform(0, 100),
+    }
+
+
+def interpret_condition(condition, data: dict) -> bool:
+    """解释执行单个条件（编译前的评估方式，仅作对比基线）"""
+    value = data.get(condition.field)
+    if value is None:
+        return False
+    op, target = condition.operator, condition.value
+    try:
+        if op == ConditionOperator.EQ:
+            return value == target
+        if op == ConditionOperator.NE:
+            return value != target
+        if op == ConditionOperator.GT:
+            return value > target
+        if op == ConditionOperator.GTE:
+            return value >= target
+        if op == ConditionOperator.LT:
+            return value < target
+        if op == ConditionOperator.LTE:
+            return value <= target
+        if op == ConditionOperator.IN:
+            return value in target
+        if op == ConditionOperator.BETWEEN:
+            return target[0] <= value <= target[1]
+    except Exception:
+        return False
+    return False
+
+
+def interpret_group(group: ConditionGroup, data: dict) -> bool:
+    """递归解释执行条件组"""
+    results = [
+        interpret_group(rule, data) if isinstance(rule, ConditionGroup) else interpret_condition(rule, data)
+        for rule in group.rules
+    ]
+    return all(results) if group.type == LogicalOperator.AND else any(results)
+
+
+def interpreted_evaluate(runtime: RuleRuntime, prediction: dict) -> int:
+    """编译前的评估方式：每次过滤、排序全部规则并解释执行条件"""
+    triggered = 0
+    enabled_rules = [r for r in runtime.rules.values() if r.enabled]
+    for rule in sorted(enabled_rules, key=lambda r: r.priority):
+        if rule.model_id is not None and prediction.get("model_id") != rule.model_id:
+            continue
+        if rule.category_id is not None and prediction.get("category_id") != rule.category_id:
+            continue
+        if interpret_group(rule.conditions, prediction):
+            triggered += 1
+    return triggered
+
+
+def run(name: str, evaluate, predictions: list) -> float:
+    started = time.perf_counter()
+    triggered = 0
+    for prediction in predictions:
+        triggered += evaluate(prediction)
+    elapsed = time.perf_counter() - started
+    rate = len(predictions) / elapsed if elapsed > 0 else 0
+    print(f"{name:<12} {len(predictions):>10} {elapsed:>10.3f} {rate:>14.0f} {triggered:>10}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="决策规则引擎基准测试")
+    parser.add_argument("--rules", type=int, default=10000)
+    parser.add_argument("--models", type=int, default=100)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--predictions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    logging.disable(logging.INFO)
+    rng = random.Random(args.seed)
+    
+    runtime = RuleRuntime()
+    started = time.perf_counter()
+    loaded = runtime.load_rules_from_dicts(
+        [random_rule(i, rng, args.models, args.categories) for i in range(args.rules)]
+    )
+    print(f"加载并编译 {loaded} 条规则: {time.perf_counter() - started:.2f}s")
+    
+    predictions = [random_prediction(rng, args.models, args.categories) for _ in range(args.predictions)]
+    
+    print(f"{'mode':<12} {'evals':>10} {'elapsed_s':>10} {'evals/s':>14} {'triggered':>10}")
+    base = run("interpreted", lambda p: interpreted_evaluate(runtime, p), predictions)
+    fast = run("compiled", lambda p: len(runtime.evaluate_sync(p)), predictions)
+    
+    # 向量化条件在首次批量评估时编译，不计入耗时
+    runtime.evaluate_batch_sync(predictions)
+    
+    started = time.perf_counter()
+    triggered = len(runtime.evaluate_batch_sync(predictions))
+    elapsed = time.perf_counter() - started
+    batch = len(predictions) / elapsed if elapsed > 0 else 0
+    print(f"{'batch':<12} {len(predictions):>10} {elapsed:>10.3f} {batch:>14.0f} {triggered:>10}")
+    
+    if base > 0:
+        print(f"加速比: compiled {fast / base:.1f}x, batch {batch / base:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
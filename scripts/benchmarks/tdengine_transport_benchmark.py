@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+TDengine传输层基准测试
+
+对比 REST / WebSocket / 原生 传输执行同一查询的延迟与吞吐。
+
+用法:
+    python scripts/benchmarks/tdengine_transport_benchmark.py \\
+        --sql "SELECT * FROM raw_welding LIMIT 100000" --iterations 20 --concurrency 4 \\
+        --protocols rest,websocket
+
+连接参数默认取 TDENGINE_* 环境变量（与应用一致）。
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.core.tdengine_connector import TDengineConnector
+
+
+async def run_protocol(protocol: str, args) -> dict:
+    """对单个协议执行基准测试"""
+    connector = TDengineConnector(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        database=args.database,
+        protocol=protocol,
+    )
+    actual_protocol = connector._transport.protocol
+    
+    # 预热（建立连接）
+    await connector.query_data(args.sql)
+    
+    latencies = []
+    rows = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+    
+    async def one_query():
+        nonlocal rows
+        async with semaphore:
+            started = time.perf_counter()
+            result = await connector.query_data(args.sql)
+            latencies.append((time.perf_counter() - started) * 1000)
+            rows += len(result.get("data", []))
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(one_query() for _ in range(args.iterations)))
+    elapsed = time.perf_counter() - started
+    await connector.close()
+    
+    latencies.sort()
+    return {
+        "protocol": protocol,
+        "transport": actual_protocol,
+        "queries": args.iterations,
+        "rows": rows,
+        "elapsed_s": elapsed,
+        "mean_ms": statistics.mean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "rows_per_s": rows / elapsed if elapsed > 0 else 0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="TDengine传输层基准测试")
+    parser.add_argument("--host", default=os.getenv("TDENGINE_HOST", "localhost"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("TDENGINE_PORT", "6041")))
+    parser.add_argument("--user", default=os.getenv("TDENGINE_USER", "root"))
+    parser.add_argument("--password", default=os.getenv("TDENGINE_PASSWORD", "taosdata"))
+    parser.add_argument("--database", default=os.getenv("TDENGINE_DATABASE", "test_db"))
+    parser.add_argument("--sql", required=True, help="基准查询语句（SELECT）")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--protocols", default="rest,websocket", help="逗号分隔: rest,websocket,native")
+    args = parser.parse_args()
+    
+    print(f"{'protocol':<10} {'transport':<10} {'rows':>10} {'mean_ms':>10} {'p50_ms':>10} {'p95_ms':>10} {'rows/s':>12}")
+    for protocol in [p.strip() for p in args.protocols.split(",") if p.strip()]:
+        try:
+            r = await run_protocol(protocol, args)
+        except Exception as e:
+            print(f"{protocol:<10} 失败: {e}")
+            continue
+        print(
+            f"{r['protocol']:<10} {r['transport']:<10} {r['rows']:>10} {r['mean_ms']:>10.2f} "
+            f"{r['p50_ms']:>10.2f} {r['p95_ms']:>10.2f} {r['rows_per_s']:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+WebSocket连接管理器负载测试
+
+在进程内创建指定数量的模拟WebSocket客户端（同一事件循环，无网络开销），测量:
+- 建立连接和订阅的耗时、每个连接的内存占用（tracemalloc，单独采样测量）
+- 资产数据扇出吞吐（消息编码一次，写入各连接的发送队列并由发送任务写出）
+- 排队延迟（get_connection_stats 中的 lag 统计）
+- 断开全部连接的耗时，以及断开后索引是否清空
+
+部分客户端可模拟为慢客户端（每条消息发送耗时 --slow-delay 秒），用于观察慢客户端策略。
+
+用法:
+    python scripts/benchmarks/websocket_fanout_benchmark.py --connections 50000 --users 20000 --assets 2000 --messages 2000
+"""
+
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from platform_core.realtime.websocket_server import ConnectionManager, SLOW_CONSUMER_POLICIES
+
+
+class InProcessWebSocket:
+    """进程内模拟的WebSocket客户端"""
+    
+    __slots__ = ("delay", "received", "received_bytes", "closed")
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+        self.received_bytes = 0
+        self.closed = False
+    
+    async def accept(self):
+        pass
+    
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        self.received_bytes += len(text)
+    
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.closed = True
+
+
+async def measure_memory(args) -> float:
+    """用单独的管理器测量每个连接（含订阅和发送任务）的内存占用"""
+    rng = random.Random(args.seed)
+    manager = ConnectionManager(max_queue_size=args.queue_size, slow_consumer_policy=args.policy)
+    count = min(args.memory_sample, args.connections)
+    
+    gc.collect()
+    tracemalloc.start()
+    base_memory = tracemalloc.get_traced_memory()[0]
+    clients = []
+    for _ in range(count):
+        websocket = InProcessWebSocket()
+        connection_id = await manager.connect(websocket, rng.randint(1, args.users))
+        await manager.subscribe(connection_id, rng.sample(range(1, args.assets + 1), args.per_connection))
+        clients.append((connection_id, websocket))
+    await asyncio.sleep(0.1)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0] - base_memory
+    tracemalloc.stop()
+    
+    for connection_id, _ in clients:
+        await manager.disconnect(connection_id)
+    await asyncio.sleep(0)
+    return memory / count if count else 0.0
+
+
+async def run(args):
+    per_connection = await measure_memory(args)
+    print(f"内存: 每连接 {per_connection:.0f} 字节（tracemalloc，{min(args.memory_sample, args.connections)} 个连接采样）, "
+          f"{args.connections} 个连接约 {per_connection * args.connections / 1024 / 1024:.1f} MiB")
+    
+    rng = random.Random(args.seed)
+    manager = ConnectionManager(
+        max_queue_size=args.queue_size,
+        slow_consumer_policy=args.policy
+    )
+    
+    # 建立连接
+    started = time.perf_counter()
+    clients = []
+    for i in range(args.connections):
+        slow = rng.random() < args.slow_ratio
+        websocket = InProcessWebSocket(args.slow_delay if slow else 0.0)
+        connection_id = await manager.connect(websocket, rng.randint(1, args.users))
+        clients.append((connection_id, websocket))
+    connect_elapsed = time.perf_counter() - started
+    
+    # 订阅
+    started = time.perf_counter()
+    for connection_id, _ in clients:
+        await manager.subscribe(connection_id, rng.sample(range(1, args.assets + 1), args.per_connection))
+    subscribe_elapsed = time.perf_counter() - started
+    
+    # 等待连接成功消息发送完毕
+    await asyncio.sleep(0.1)
+    
+    print(f"连接: {args.connections} 个（{manager.active_users} 个用户）, {connect_elapsed:.2f}s, "
+          f"{args.connections / connect_elapsed:.0f} 连接/s")
+    print(f"订阅: 每连接 {args.per_connection} 个资产, {subscribe_elapsed:.2f}s")
+    
+    # 扇出
+    received_before = sum(ws.received for _, ws in clients)
+    started = time.perf_counter()
+    enqueued = 0
+    for i in range(args.messages):
+        asset_id = rng.randint(1, args.assets)
+        enqueued += await manager.push_to_asset_subscribers(
+            asset_id, {"temperature": rng.uniform(20, 90), "current": rng.uniform(0, 50), "seq": i}
+        )
+        if i % 100 == 99:
+            # 让出事件循环，发送任务在推送过程中持续写出
+            await asyncio.sleep(0)
+    fanout_elapsed = time.perf_counter() - started
+    
+    deadline = time.perf_counter() + args.drain_timeout
+    while time.perf_counter() < deadline:
+        stats = manager.get_connection_stats(include_connections=False)
+        if stats["outbound"]["queued"] == 0:
+            break
+        await asyncio.sleep(0.05)
+    drain_elapsed = time.perf_counter() - started
+    delivered = sum(ws.received for _, ws in clients) - received_before
+    
+    stats = manager.get_connection_stats()
+    lags = sorted(conn["outbound"]["max_lag_ms"] for conn in stats["connections"])
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    print(f"扇出: {args.messages} 条消息, 入队 {enqueued} 次, {fanout_elapsed:.2f}s, "
+          f"{enqueued / fanout_elapsed:.0f} 次/s")
+    print(f"写出: {delivered} 帧, 全部写出耗时 {drain_elapsed:.2f}s, {delivered / drain_elapsed:.0f} 帧/s")
+    print(f"慢客户端: 丢弃 {stats['outbound']['dropped']}, 合并 {stats['outbound']['coalesced']}, "
+          f"断开 {stats['outbound']['slow_consumer_disconnects']}")
+    print(f"排队延迟: 连接最大延迟的P99 {p99:.1f}ms, 最大 {lags[-1] if lags else 0.0:.1f}ms")
+    
+    # 断开
+    started = time.perf_counter()
+    for connection_id, _ in clients:
+        await manager.disconnect(connection_id)
+    await asyncio.sleep(0)
+    disconnect_elapsed = time.perf_counter() - started
+    print(f"断开: {disconnect_elapsed:.2f}s, 剩余连接 {manager.active_connections}, "
+          f"剩余订阅 {manager.total_subscriptions}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket连接管理器负载测试")
+    parser.add_argument("--connections", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--assets", type=int, default=2000)
+    parser.add_argument("--per-connection", type=int, default=10, help="每个连接订阅的资产数")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--memory-sample", type=int, default=5000, help="内存测量采样的连接数")
+    parser.add_argument("--policy", choices=SLOW_CONSUMER_POLICIES, default="coalesce")
+    parser.add_argument("--slow-ratio", type=float, default=0.01, help="慢客户端比例")
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="慢客户端每帧发送耗时（秒）")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()